@@ -836,7 +836,7 @@ static void ConvertProcessStateToJSON(const ProcessState& process_state,
 }
 
 static void ConvertMemoryInfoToJSON(Minidump& dump,
-                                    Json::Value& raw_root,
+                                    const Json::Value& raw_root,
                                     Json::Value& root)
 {
   MinidumpMemoryInfoList* memory_info_list = dump.GetMemoryInfoList();
@@ -1178,12 +1178,145 @@ static void PrintProcessStateMachineReadable(const ProcessState& process_state)
 
 //*** End of copy-paste from minidump_stackwalk.cc ***
 
+// Processes a single minidump and returns the JSON output for it.
+//
+// The resolver is passed in so that a long-running server can keep
+// symbols it has already loaded across minidumps. A new symbolizer is
+// created for every minidump since it tracks per-minidump state.
+static Json::Value ProcessMinidump(const string& minidump_path,
+                                   const Json::Value& raw_root,
+                                   SymbolSupplier* symbol_supplier,
+                                   HTTPSymbolSupplier* http_symbol_supplier,
+                                   SourceLineResolverInterface* resolver,
+                                   bool pipe) {
+  Minidump minidump(minidump_path);
+  minidump.Read();
+  // process minidump
+  // bug 950710 - Bad symbol files are causing the stackwalker to
+  // run amok. Disabling this until we get an upstream fix.
+  //Stackwalker::set_max_frames(UINT32_MAX);
+  Json::Value root;
+  StackFrameSymbolizerForward symbolizer(symbol_supplier, resolver);
+  MinidumpProcessor minidump_processor(&symbolizer, true);
+  ProcessState process_state;
+  ProcessResult result =
+    minidump_processor.Process(&minidump, &process_state);
+
+  if (pipe) {
+    if (result == google_breakpad::PROCESS_OK) {
+      PrintProcessStateMachineReadable(process_state);
+    }
+    printf("====PIPE DUMP ENDS===\n");
+  }
+
+  root["status"] = ResultString(result);
+  root["sensitive"] = Json::Value(Json::objectValue);
+  if (result == google_breakpad::PROCESS_OK) {
+    ConvertProcessStateToJSON(process_state, symbolizer,
+                              http_symbol_supplier, root, raw_root);
+  }
+  ConvertMemoryInfoToJSON(minidump, raw_root, root);
+
+  // Get the PID.
+  MinidumpMiscInfo* misc_info = minidump.GetMiscInfo();
+  if (misc_info && misc_info->misc_info() &&
+      (misc_info->misc_info()->flags1 & MD_MISCINFO_FLAGS1_PROCESS_ID)) {
+    root["pid"] = misc_info->misc_info()->process_id;
+  }
+
+  // See if this is a Linux dump with /proc/cpuinfo in it
+  uint32_t cpuinfo_length = 0;
+  if (process_state.system_info()->os == "Linux" &&
+      minidump.SeekToStreamType(MD_LINUX_CPU_INFO, &cpuinfo_length)) {
+    string contents;
+    contents.resize(cpuinfo_length);
+    if (minidump.ReadBytes(const_cast<char*>(contents.data()), cpuinfo_length)) {
+      ConvertCPUInfoToJSON(contents, root);
+    }
+  }
+
+  // See if this is a Linux dump with /etc/lsb-release in it
+  uint32_t length = 0;
+  if (process_state.system_info()->os == "Linux" &&
+      minidump.SeekToStreamType(MD_LINUX_LSB_RELEASE, &length)) {
+    string contents;
+    contents.resize(length);
+    if (minidump.ReadBytes(const_cast<char*>(contents.data()), length)) {
+      ConvertLSBReleaseToJSON(contents, root);
+    }
+  }
+
+  return root;
+}
+
+// Reads a frame from fp. A frame is the payload length in decimal followed
+// by a newline and then that many bytes of payload. Returns false on EOF or
+// a malformed frame.
+static bool ReadFrame(FILE* fp, string& payload) {
+  char header[32];
+  if (!fgets(header, sizeof(header), fp)) {
+    return false;
+  }
+  char* end = nullptr;
+  unsigned long length = strtoul(header, &end, 10);
+  if (end == header || *end != '\n') {
+    return false;
+  }
+  payload.resize(length);
+  if (length > 0 && fread(&payload[0], 1, length, fp) != length) {
+    return false;
+  }
+  return true;
+}
+
+static void WriteFrame(FILE* fp, const string& payload) {
+  fprintf(fp, "%zu\n", payload.size());
+  fwrite(payload.data(), 1, payload.size(), fp);
+  fflush(fp);
+}
+
+// Runs as a long-lived server reading requests from stdin and writing
+// responses to stdout until stdin is closed.
+//
+// A request is a frame containing a JSON object with "minidump" (the path to
+// the minidump file) and optionally "raw_crash" (the raw crash annotations).
+// The response is a frame containing the JSON output for that minidump.
+//
+// Symbols loaded for one minidump are kept in memory for later minidumps.
+static int RunServer(SymbolSupplier* symbol_supplier,
+                     HTTPSymbolSupplier* http_symbol_supplier) {
+  BasicSourceLineResolver resolver;
+  Json::FastWriter writer;
+  string payload;
+  while (ReadFrame(stdin, payload)) {
+    Json::Value request;
+    Json::Reader reader;
+    Json::Value response;
+    if (!reader.parse(payload, request) || !request.isObject() ||
+        !request["minidump"].isString()) {
+      response["status"] = "ERROR_BAD_REQUEST";
+    } else {
+      Json::Value raw_root(Json::objectValue);
+      if (request["raw_crash"].isObject()) {
+        raw_root = request["raw_crash"];
+      }
+      response = ProcessMinidump(request["minidump"].asString(), raw_root,
+                                 symbol_supplier, http_symbol_supplier,
+                                 &resolver, false);
+    }
+    WriteFrame(stdout, writer.write(response));
+  }
+  return 0;
+}
+
 void usage() {
   fprintf(stderr, "Usage: stackwalker [options] <minidump> [<symbol paths]\n");
+  fprintf(stderr, "       stackwalker --server [options] [<symbol paths]\n");
   fprintf(stderr, "Options:\n");
   fprintf(stderr, "\t--pretty\tPretty-print JSON output.\n");
   fprintf(stderr, "\t--pipe-dump\tProduce pipe-delimited output in addition to JSON output\n");
   fprintf(stderr, "\t--raw-json\tAn input file with the raw annotations as JSON\n");
+  fprintf(stderr, "\t--server\tRead framed requests from stdin and write framed responses to stdout\n");
   http_commandline_usage();
   fprintf(stderr, "\t--help\tDisplay this help text.\n");
 }
@@ -1193,6 +1326,7 @@ int main(int argc, char** argv)
 {
   bool pretty = false;
   bool pipe = false;
+  bool server = false;
   char* json_path = nullptr;
   // Yeah, this is ugly.
   vector<char*> symbols_urls;
@@ -1202,6 +1336,7 @@ int main(int argc, char** argv)
     {"pretty", no_argument, nullptr, 'p'},
     {"pipe-dump", no_argument, nullptr, 'i'},
     {"raw-json", required_argument, nullptr, 'r'},
+    {"server", no_argument, nullptr, 'S'},
     HTTP_COMMANDLINE_OPTIONS
     {"help", no_argument, nullptr, 'h'},
     {nullptr, 0, nullptr, 0}
@@ -1224,6 +1359,9 @@ int main(int argc, char** argv)
     case 'r':
       json_path = optarg;
       break;
+    case 'S':
+      server = true;
+      break;
     HANDLE_HTTP_COMMANDLINE_OPTIONS
     case 'h':
       usage();
@@ -1237,7 +1375,7 @@ int main(int argc, char** argv)
     }
   }
 
-  if (optind >= argc) {
+  if (!server && optind >= argc) {
     usage();
     return 1;
   }
@@ -1249,19 +1387,12 @@ int main(int argc, char** argv)
     return 1;
   }
 
-  Minidump minidump(argv[optind]);
   vector<string> symbol_paths;
   // allow symbol paths to be passed on the commandline.
-  for (int i = optind + 1; i < argc; i++) {
+  for (int i = server ? optind : optind + 1; i < argc; i++) {
     symbol_paths.push_back(argv[i]);
   }
 
-  minidump.Read();
-  // process minidump
-  // bug 950710 - Bad symbol files are causing the stackwalker to
-  // run amok. Disabling this until we get an upstream fix.
-  //Stackwalker::set_max_frames(UINT32_MAX);
-  Json::Value root;
   scoped_ptr<SymbolSupplier> symbol_supplier;
   HTTPSymbolSupplier* http_symbol_supplier = nullptr;
   if (!symbols_urls.empty()) {
@@ -1275,18 +1406,8 @@ int main(int argc, char** argv)
     symbol_supplier.reset(new SimpleSymbolSupplier(symbol_paths));
   }
 
-  BasicSourceLineResolver resolver;
-  StackFrameSymbolizerForward symbolizer(symbol_supplier.get(), &resolver);
-  MinidumpProcessor minidump_processor(&symbolizer, true);
-  ProcessState process_state;
-  ProcessResult result =
-    minidump_processor.Process(&minidump, &process_state);
-
-  if (pipe) {
-    if (result == google_breakpad::PROCESS_OK) {
-      PrintProcessStateMachineReadable(process_state);
-    }
-    printf("====PIPE DUMP ENDS===\n");
+  if (server) {
+    return RunServer(symbol_supplier.get(), http_symbol_supplier);
   }
 
   Json::Value raw_root(Json::objectValue);
@@ -1296,42 +1417,10 @@ int main(int argc, char** argv)
     reader.parse(raw_stream, raw_root);
   }
 
-  root["status"] = ResultString(result);
-  root["sensitive"] = Json::Value(Json::objectValue);
-  if (result == google_breakpad::PROCESS_OK) {
-    ConvertProcessStateToJSON(process_state, symbolizer,
-                              http_symbol_supplier, root, raw_root);
-  }
-  ConvertMemoryInfoToJSON(minidump, raw_root, root);
-
-  // Get the PID.
-  MinidumpMiscInfo* misc_info = minidump.GetMiscInfo();
-  if (misc_info && misc_info->misc_info() &&
-      (misc_info->misc_info()->flags1 & MD_MISCINFO_FLAGS1_PROCESS_ID)) {
-    root["pid"] = misc_info->misc_info()->process_id;
-  }
-
-  // See if this is a Linux dump with /proc/cpuinfo in it
-  uint32_t cpuinfo_length = 0;
-  if (process_state.system_info()->os == "Linux" &&
-      minidump.SeekToStreamType(MD_LINUX_CPU_INFO, &cpuinfo_length)) {
-    string contents;
-    contents.resize(cpuinfo_length);
-    if (minidump.ReadBytes(const_cast<char*>(contents.data()), cpuinfo_length)) {
-      ConvertCPUInfoToJSON(contents, root);
-    }
-  }
-
-  // See if this is a Linux dump with /etc/lsb-release in it
-  uint32_t length = 0;
-  if (process_state.system_info()->os == "Linux" &&
-      minidump.SeekToStreamType(MD_LINUX_LSB_RELEASE, &length)) {
-    string contents;
-    contents.resize(length);
-    if (minidump.ReadBytes(const_cast<char*>(contents.data()), length)) {
-      ConvertLSBReleaseToJSON(contents, root);
-    }
-  }
+  BasicSourceLineResolver resolver;
+  Json::Value root = ProcessMinidump(argv[optind], raw_root,
+                                     symbol_supplier.get(),
+                                     http_symbol_supplier, &resolver, pipe);
 
   scoped_ptr<Json::Writer> writer;
   if (pretty)
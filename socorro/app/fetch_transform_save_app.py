@@ -74,7 +74,11 @@ class FetchTransformSaveApp(App):
     required_config.producer_consumer = Namespace()
     required_config.producer_consumer.add_option(
         "producer_consumer_class",
-        doc="the class implements a threaded producer consumer queue",
+        doc=(
+            "the class implements a producer consumer queue; use "
+            "socorro.lib.process_pool_task_manager.ProcessPoolTaskManager to "
+            "run transforms in worker processes"
+        ),
         default="socorro.lib.threaded_task_manager.ThreadedTaskManager",
         from_string_converter=class_converter,
     )
@@ -154,6 +158,34 @@ class FetchTransformSaveApp(App):
             self.config.destination, namespace=self.app_name,
         )
 
+    def _setup_worker(self):
+        """Set up per-worker source and destination.
+
+        This is run in each worker process when the task manager runs
+        transforms in worker processes so that workers don't share
+        connections with the parent.
+
+        """
+        self.source = self.config.source.crashstorage_class(
+            self.config.source, namespace=self.app_name,
+        )
+        self.destination = self.config.destination.crashstorage_class(
+            self.config.destination, namespace=self.app_name,
+        )
+
+    def _close_worker(self):
+        """Close per-worker source and destination.
+
+        This is run in each worker process when it quits so buffered data gets
+        flushed.
+
+        """
+        for resource in (self.source, self.destination):
+            try:
+                resource.close()
+            except AttributeError:
+                pass
+
     def _setup_task_manager(self):
         """instantiate the threaded task manager to run the producer/consumer
         queue that is the heart of the processor."""
@@ -168,6 +200,8 @@ class FetchTransformSaveApp(App):
             self.config.producer_consumer,
             job_source_iterator=self.source_iterator,
             task_func=self.transform,
+            worker_init_func=self._setup_worker,
+            worker_close_func=self._close_worker,
         )
 
     def close(self):
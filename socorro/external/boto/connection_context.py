@@ -5,6 +5,7 @@
 import io
 import logging
 import random
+import shutil
 import time
 
 import boto3
@@ -60,6 +61,7 @@ class S3Connection(RequiredConfig):
     * ``s3:ListBucket``: Socorro lists contents of the bucket.
     * ``s3:PutObject``: Socorro saves crash data in the bucket.
     * ``s3:GetObject``: Socorro retrieves crash data from buckets.
+    * ``s3:DeleteObject``: Socorro deletes crash data when removing crashes.
 
 
     **Retrying loads and saves**
@@ -103,6 +105,15 @@ class S3Connection(RequiredConfig):
         default="",
         reference_value_from="resource.boto",
     )
+    required_config.add_option(
+        "download_chunk_size",
+        doc=(
+            "maximum number of bytes of a file held in memory at a time when "
+            "downloading it to the local filesystem"
+        ),
+        default=1024 * 1024,
+        reference_value_from="resource.boto",
+    )
 
     KeyNotFound = KeyNotFound
 
@@ -210,3 +221,117 @@ class S3Connection(RequiredConfig):
                 "%s (bucket=%r key=%r) not found, no value returned"
                 % (id, self.config.bucket_name, path)
             )
+
+    @retry(
+        retryable_exceptions=[
+            # FIXME(willkg): Seems like botocore always raises ClientError
+            # which is unhelpful for granularity purposes.
+            ClientError
+        ],
+        wait_time_generator=wait_times_access,
+        module_logger=logger,
+    )
+    def load_file_to_path(self, path, dest_path):
+        """Load a file from S3 and write it to a local file.
+
+        The file is streamed in chunks of at most ``download_chunk_size`` bytes so
+        memory use is bounded regardless of the size of the file.
+
+        This will retry a handful of times in short succession so as to deal
+        with some amount of fishiness. After that, the caller should retry
+        loading after a longer period of time.
+
+        :arg str path: the path to load from
+
+        :arg str dest_path: the local path to write the file to; if it exists,
+            it's overwritten
+
+        :raises botocore.exceptions.ClientError: connection issues, permissions
+            issues, bucket is missing, etc.
+        :raises KeyNotFound: if the key is not found
+
+        """
+        try:
+            resp = self.client.get_object(Bucket=self.config.bucket_name, Key=path)
+        except self.client.exceptions.NoSuchKey:
+            raise KeyNotFound(
+                "%s (bucket=%r key=%r) not found, no value returned"
+                % (id, self.config.bucket_name, path)
+            )
+
+        with open(dest_path, "wb") as fp:
+            shutil.copyfileobj(resp["Body"], fp, self.config.download_chunk_size)
+
+    @retry(
+        retryable_exceptions=[
+            # FIXME(willkg): Seems like botocore always raises ClientError
+            # which is unhelpful for granularity purposes.
+            ClientError
+        ],
+        wait_time_generator=wait_times_access,
+        module_logger=logger,
+    )
+    def exists(self, path):
+        """Returns whether a file exists in S3.
+
+        :arg str path: the path to check
+
+        :returns: bool
+
+        :raises botocore.exceptions.ClientError: connection issues, permissions
+            issues, bucket is missing, etc.
+
+        """
+        try:
+            self.client.head_object(Bucket=self.config.bucket_name, Key=path)
+        except ClientError as exc:
+            if exc.response["Error"]["Code"] in ("404", "NoSuchKey"):
+                return False
+            raise
+        return True
+
+    @retry(
+        retryable_exceptions=[
+            # FIXME(willkg): Seems like botocore always raises ClientError
+            # which is unhelpful for granularity purposes.
+            ClientError
+        ],
+        wait_time_generator=wait_times_access,
+        module_logger=logger,
+    )
+    def list_files(self, prefix):
+        """Lists the files in S3 that start with a prefix.
+
+        :arg str prefix: the prefix
+
+        :returns: list of paths
+
+        :raises botocore.exceptions.ClientError: connection issues, permissions
+            issues, bucket is missing, etc.
+
+        """
+        paginator = self.client.get_paginator("list_objects_v2")
+        paths = []
+        for page in paginator.paginate(Bucket=self.config.bucket_name, Prefix=prefix):
+            paths.extend(item["Key"] for item in page.get("Contents", []))
+        return paths
+
+    @retry(
+        retryable_exceptions=[
+            # FIXME(willkg): Seems like botocore always raises ClientError
+            # which is unhelpful for granularity purposes.
+            ClientError
+        ],
+        wait_time_generator=wait_times_access,
+        module_logger=logger,
+    )
+    def delete_file(self, path):
+        """Deletes a file from S3. Deleting a file that doesn't exist is not an error.
+
+        :arg str path: the path to delete
+
+        :raises botocore.exceptions.ClientError: connection issues, permissions
+            issues, bucket is missing, etc.
+
+        """
+        self.client.delete_object(Bucket=self.config.bucket_name, Key=path)
@@ -2,9 +2,12 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at http://mozilla.org/MPL/2.0/
 
+import concurrent.futures
 import datetime
+import hashlib
 import json
 import logging
+import os
 
 from configman import Namespace
 from configman.converters import class_converter
@@ -12,9 +15,12 @@ from configman.dotdict import DotDict
 import json_schema_reducer
 
 from socorro.external.crashstorage_base import (
+    CrashBundle,
     CrashStorageBase,
     CrashIDNotFound,
+    FileDumpsMapping,
     MemoryDumpsMapping,
+    get_temp_dump_pathname,
 )
 from socorro.external.es.super_search_fields import SuperSearchFieldsData
 from socorro.lib.ooid import date_from_ooid
@@ -99,6 +105,30 @@ def build_keys(name_of_thing, crashid):
     ]
 
 
+def build_dump_hash_key(dump_hash):
+    """Builds the s3 pseudo-filename for a dump stored by content
+
+    :arg dump_hash: the sha256 hex digest of the dump
+
+    :returns: key
+
+    """
+    return "v1/dump_by_hash/%s" % dump_hash
+
+
+def build_dump_ref_key(dump_hash, crashid):
+    """Builds the s3 pseudo-filename recording that a crash refers to a dump
+
+    :arg dump_hash: the sha256 hex digest of the dump
+    :arg crashid: the crash id referring to the dump; pass ``""`` to get the prefix
+        for all references to the dump
+
+    :returns: key
+
+    """
+    return "v1/dump_refs/%s/%s" % (dump_hash, crashid)
+
+
 class JSONISOEncoder(json.JSONEncoder):
     def default(self, obj):
         if isinstance(obj, datetime.date):
@@ -148,10 +178,49 @@ class BotoS3CrashStorage(CrashStorageBase):
         default="configman.dotdict.DotDict",
         from_string_converter=class_converter,
     )
+    required_config.add_option(
+        "dedupe_dumps",
+        doc=(
+            "whether to store dumps once per sha256 hash rather than once per "
+            "crash; crashes saved with the other setting are still readable"
+        ),
+        default=False,
+        reference_value_from="resource.boto",
+    )
+    required_config.add_option(
+        "read_dump_pointers",
+        doc=(
+            "whether to look for dumps stored by hash when dedupe_dumps is off; "
+            "turn this on if crashes were saved with dedupe_dumps on"
+        ),
+        default=False,
+        reference_value_from="resource.boto",
+    )
+    required_config.add_option(
+        "fetch_concurrency",
+        doc="maximum number of concurrent S3 requests when fetching a crash bundle",
+        default=8,
+    )
 
     def __init__(self, config, namespace=""):
         super().__init__(config, namespace=namespace)
         self.conn = config.resource_class(config)
+        # Created on first use so that nothing is started in a process that
+        # forks workers
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.config.fetch_concurrency, thread_name_prefix="s3fetch",
+            )
+        return self._executor
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        super().close()
 
     def save_raw_crash(self, raw_crash, dumps, crash_id):
         """Save raw crash data to S3 bucket.
@@ -176,12 +245,77 @@ class BotoS3CrashStorage(CrashStorageBase):
         # however, that by calling the memory_dump_mapping method, we will get
         # a MemoryDumpMapping which is exactly what we need.
         dumps = dumps.as_memory_dumps_mapping()
+        if self.config.dedupe_dumps:
+            self._save_dumps_by_hash(crash_id, dumps)
+            return
+
         for dump_name, dump in dumps.items():
             if dump_name in (None, "", "upload_file_minidump"):
                 dump_name = "dump"
             path = build_keys(dump_name, crash_id)[0]
             self.conn.save_file(path, dump)
 
+    def _save_dumps_by_hash(self, crash_id, dumps):
+        """Save dumps once per content hash.
+
+        For each dump, this saves a reference from the crash to the dump and then
+        the dump itself if it's not already stored. After that, it saves the
+        crash's pointer record mapping dump names to hashes.
+
+        """
+        pointers = {}
+        for dump_name, dump in dumps.items():
+            if dump_name in (None, "", "upload_file_minidump"):
+                dump_name = "dump"
+            dump_hash = hashlib.sha256(dump).hexdigest()
+
+            # Save the reference before checking whether the dump exists so that
+            # removing another crash doesn't delete the dump out from under us
+            self.conn.save_file(build_dump_ref_key(dump_hash, crash_id), b"")
+            path = build_dump_hash_key(dump_hash)
+            if not self.conn.exists(path):
+                self.conn.save_file(path, dump)
+            pointers[dump_name] = dump_hash
+
+        path = build_keys("dump_pointers", crash_id)[0]
+        self.conn.save_file(path, dict_to_str(pointers).encode("utf-8"))
+
+    def _get_dump_pointers(self, crash_id):
+        """Get the dump name -> dump hash mapping for a crash.
+
+        Crashes saved with ``dedupe_dumps`` off don't have a pointer record, so
+        this is only looked up if ``dedupe_dumps`` or ``read_dump_pointers`` is
+        on.
+
+        :returns: dict; empty if the crash's dumps were stored per crash or
+            pointers aren't looked up
+
+        """
+        if not (self.config.dedupe_dumps or self.config.read_dump_pointers):
+            return {}
+        try:
+            path = build_keys("dump_pointers", crash_id)[0]
+            return json.loads(self.conn.load_file(path))
+        except self.conn.KeyNotFound:
+            return {}
+
+    @staticmethod
+    def _get_dump_path(crash_id, dump_name, pointers):
+        """Get the key for a dump.
+
+        :arg crash_id: the crash id
+        :arg dump_name: the name of the dump
+        :arg pointers: the crash's dump pointers
+
+        :returns: key
+
+        """
+        if dump_name in (None, "", "upload_file_minidump"):
+            dump_name = "dump"
+        if dump_name in pointers:
+            return build_dump_hash_key(pointers[dump_name])
+        return build_keys(dump_name, crash_id)[0]
+
     def save_processed_crash(self, raw_crash, processed_crash):
         """Save the processed crash file."""
         crash_id = processed_crash["uuid"]
@@ -215,9 +349,8 @@ class BotoS3CrashStorage(CrashStorageBase):
 
         """
         try:
-            if name in (None, "", "upload_file_minidump"):
-                name = "dump"
-            path = build_keys(name, crash_id)[0]
+            pointers = self._get_dump_pointers(crash_id)
+            path = self._get_dump_path(crash_id, name, pointers)
             a_dump = self.conn.load_file(path)
             return a_dump
         except self.conn.KeyNotFound as x:
@@ -236,11 +369,12 @@ class BotoS3CrashStorage(CrashStorageBase):
             dump_names_as_string = self.conn.load_file(path)
             dump_names = str_to_list(dump_names_as_string)
 
+            pointers = self._get_dump_pointers(crash_id)
             dumps = MemoryDumpsMapping()
             for dump_name in dump_names:
                 if dump_name in (None, "", "upload_file_minidump"):
                     dump_name = "dump"
-                path = build_keys(dump_name, crash_id)[0]
+                path = self._get_dump_path(crash_id, dump_name, pointers)
                 dumps[dump_name] = self.conn.load_file(path)
             return dumps
         except self.conn.KeyNotFound as x:
@@ -254,13 +388,26 @@ class BotoS3CrashStorage(CrashStorageBase):
         :raises CrashIDNotFound: if file does not exist
 
         """
-        in_memory_dumps = self.get_raw_dumps(crash_id)
-        # convert our native memory dump mapping into a file dump mapping.
-        return in_memory_dumps.as_file_dumps_mapping(
-            crash_id,
-            self.config.temporary_file_system_storage_path,
-            self.config.dump_file_suffix,
-        )
+        dumps = FileDumpsMapping()
+        try:
+            dump_names = self.get_dump_names(crash_id)
+            pointers = self._get_dump_pointers(crash_id)
+            for dump_name in dump_names:
+                if dump_name in (None, "", "dump"):
+                    dump_name = "upload_file_minidump"
+                dumps[dump_name] = self._save_dump_as_file(
+                    crash_id, dump_name, pointers
+                )
+        except Exception:
+            # Remove dumps that were written so we don't leave temporary files
+            # lying around
+            for dump_pathname in dumps.values():
+                try:
+                    os.unlink(dump_pathname)
+                except OSError:
+                    pass
+            raise
+        return dumps
 
     def get_unredacted_processed(self, crash_id):
         """Get the processed crash.
@@ -279,6 +426,174 @@ class BotoS3CrashStorage(CrashStorageBase):
         except self.conn.KeyNotFound as x:
             raise CrashIDNotFound("%s not found: %s" % (crash_id, x))
 
+    def get_dump_names(self, crash_id):
+        """Get the names of the dumps for the given crash id.
+
+        :returns: list of dump names
+
+        :raises CrashIDNotFound: if file does not exist
+
+        """
+        try:
+            path = build_keys("dump_names", crash_id)[0]
+            return str_to_list(self.conn.load_file(path))
+        except self.conn.KeyNotFound as x:
+            raise CrashIDNotFound("%s not found: %s" % (crash_id, x))
+
+    def _save_dump_as_file(self, crash_id, dump_name, pointers):
+        """Stream a dump from S3 to a temporary file.
+
+        The dump is never held in memory in full.
+
+        :arg crash_id: the crash id
+        :arg dump_name: the name of the dump
+        :arg pointers: the crash's dump pointers
+
+        :returns: the path of the temporary file
+
+        :raises CrashIDNotFound: if the dump doesn't exist
+
+        """
+        dump_pathname = get_temp_dump_pathname(
+            crash_id,
+            dump_name,
+            self.config.temporary_file_system_storage_path,
+            self.config.dump_file_suffix,
+        )
+        path = self._get_dump_path(crash_id, dump_name, pointers)
+        try:
+            self.conn.load_file_to_path(path, dump_pathname)
+        except self.conn.KeyNotFound as x:
+            raise CrashIDNotFound("%s not found: %s" % (crash_id, x))
+        except Exception:
+            # Don't leave a partially written dump behind
+            try:
+                os.unlink(dump_pathname)
+            except OSError:
+                pass
+            raise
+        return dump_pathname
+
+    def get_crash_bundle(self, crash_id):
+        """Get the raw crash, dumps as files, and processed crash concurrently.
+
+        The raw crash, dump names, and processed crash are fetched at the same
+        time. As soon as the dump names are known, the dumps are fetched
+        concurrently and each is written to its temporary file as it arrives.
+
+        :returns: CrashBundle
+
+        :raises CrashIDNotFound: if the raw crash or dumps don't exist
+
+        """
+        executor = self._get_executor()
+        raw_crash_future = executor.submit(self.get_raw_crash, crash_id)
+        processed_crash_future = executor.submit(
+            self.get_unredacted_processed, crash_id
+        )
+        pointers_future = executor.submit(self._get_dump_pointers, crash_id)
+        dump_futures = {}
+        try:
+            dump_names = self.get_dump_names(crash_id)
+            pointers = pointers_future.result()
+            for dump_name in dump_names:
+                if dump_name in (None, "", "dump"):
+                    dump_name = "upload_file_minidump"
+                dump_futures[dump_name] = executor.submit(
+                    self._save_dump_as_file, crash_id, dump_name, pointers
+                )
+
+            raw_crash = raw_crash_future.result()
+            dumps = FileDumpsMapping(
+                (dump_name, future.result())
+                for dump_name, future in dump_futures.items()
+            )
+            try:
+                processed_crash = processed_crash_future.result()
+            except CrashIDNotFound:
+                processed_crash = DotDict()
+
+        except Exception:
+            # Wait for everything to finish and remove any dumps that were
+            # written so we don't leave temporary files lying around
+            all_futures = [raw_crash_future, processed_crash_future, pointers_future]
+            all_futures.extend(dump_futures.values())
+            concurrent.futures.wait(all_futures)
+            for future in dump_futures.values():
+                if future.exception() is None:
+                    try:
+                        os.unlink(future.result())
+                    except OSError:
+                        pass
+            raise
+
+        return CrashBundle(raw_crash, dumps, processed_crash)
+
+    def remove(self, crash_id):
+        """Delete the raw crash, dumps, and processed crash for a crash id.
+
+        Dumps stored by hash are deleted once no other crash refers to them.
+
+        A crash saved while this is running can see a dump as stored, skip
+        uploading it, and then have it deleted. To cover that, the dump is read
+        before it's deleted and restored if a reference turns up afterwards. If
+        this process dies between deleting and restoring, the dump is lost.
+
+        :raises CrashIDNotFound: if the raw crash doesn't exist
+
+        """
+        raw_crash_path = build_keys("raw_crash", crash_id)[0]
+        if not self.conn.exists(raw_crash_path):
+            raise CrashIDNotFound("%s not found" % crash_id)
+
+        try:
+            dump_names = self.get_dump_names(crash_id)
+        except CrashIDNotFound:
+            dump_names = []
+        pointers = self._get_dump_pointers(crash_id)
+
+        paths = [
+            raw_crash_path,
+            build_keys("dump_names", crash_id)[0],
+            build_keys("dump_pointers", crash_id)[0],
+            build_keys("processed_crash", crash_id)[0],
+        ]
+        # Dumps stored per crash
+        paths.extend(
+            self._get_dump_path(crash_id, dump_name, {}) for dump_name in dump_names
+        )
+
+        for path in paths:
+            self.conn.delete_file(path)
+
+        # Dumps stored by hash that no other crash refers to
+        for dump_hash in sorted(set(pointers.values())):
+            self._remove_dump_by_hash(crash_id, dump_hash)
+
+    def _remove_dump_by_hash(self, crash_id, dump_hash):
+        """Remove a crash's reference to a dump and the dump if it was the last.
+
+        :arg crash_id: the crash id
+        :arg dump_hash: the sha256 hash of the dump
+
+        """
+        self.conn.delete_file(build_dump_ref_key(dump_hash, crash_id))
+        refs_prefix = build_dump_ref_key(dump_hash, "")
+        if self.conn.list_files(refs_prefix):
+            return
+
+        path = build_dump_hash_key(dump_hash)
+        try:
+            dump = self.conn.load_file(path)
+        except self.conn.KeyNotFound:
+            return
+        self.conn.delete_file(path)
+
+        # A crash saved since we checked the references may have skipped
+        # uploading the dump because it existed at the time
+        if self.conn.list_files(refs_prefix):
+            self.conn.save_file(path, dump)
+
 
 class TelemetryBotoS3CrashStorage(BotoS3CrashStorage):
     """Sends a subset of the processed crash to an S3 bucket
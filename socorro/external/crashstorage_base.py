@@ -16,6 +16,15 @@ from configman.dotdict import DotDict
 import markus
 
 
+def get_temp_dump_pathname(crash_id, dump_name, temp_path, dump_file_suffix):
+    """Return the temporary file path for a dump when saved as a file."""
+    if dump_name in (None, "", "dump"):
+        dump_name = "upload_file_minidump"
+    return os.path.join(
+        temp_path, "%s.%s.TEMPORARY%s" % (crash_id, dump_name, dump_file_suffix)
+    )
+
+
 class MemoryDumpsMapping(dict):
     """there has been a bifurcation in the crash storage data throughout the
     history of the classes.  The crash dumps have two different
@@ -41,12 +50,11 @@ class MemoryDumpsMapping(dict):
         each of the dump to a filesystem."""
         name_to_pathname_mapping = FileDumpsMapping()
         for a_dump_name, a_dump in self.items():
+            dump_pathname = get_temp_dump_pathname(
+                crash_id, a_dump_name, temp_path, dump_file_suffix
+            )
             if a_dump_name in (None, "", "dump"):
                 a_dump_name = "upload_file_minidump"
-            dump_pathname = os.path.join(
-                temp_path,
-                "%s.%s.TEMPORARY%s" % (crash_id, a_dump_name, dump_file_suffix),
-            )
             name_to_pathname_mapping[a_dump_name] = dump_pathname
             with open(dump_pathname, "wb") as f:
                 f.write(a_dump)
@@ -145,6 +153,14 @@ class CrashIDNotFound(Exception):
     pass
 
 
+# Everything the processor needs to process a crash: the raw crash, a
+# FileDumpsMapping of dump name -> temporary file path, and the processed crash
+# from a previous run (an empty DotDict if the crash hasn't been processed)
+CrashBundle = collections.namedtuple(
+    "CrashBundle", ["raw_crash", "dumps", "processed_crash"]
+)
+
+
 class CrashStorageBase(RequiredConfig):
     """Base class for all crash storage classes."""
 
@@ -264,6 +280,29 @@ class CrashStorageBase(RequiredConfig):
         """
         raise NotImplementedError("get_unredacted_processed is not implemented")
 
+    def get_crash_bundle(self, crash_id):
+        """Fetch everything needed to process a crash report
+
+        This fetches the raw crash, the dumps as files, and the unredacted
+        processed crash one after the other. Crash storage classes where each
+        fetch is a network round trip should override this to do the fetches
+        concurrently.
+
+        :param crash_id: crash report id
+
+        :returns: CrashBundle
+
+        :raises CrashIDNotFound: if the raw crash or dumps don't exist
+
+        """
+        raw_crash = self.get_raw_crash(crash_id)
+        dumps = self.get_raw_dumps_as_files(crash_id)
+        try:
+            processed_crash = self.get_unredacted_processed(crash_id)
+        except CrashIDNotFound:
+            processed_crash = DotDict()
+        return CrashBundle(raw_crash, dumps, processed_crash)
+
     def remove(self, crash_id):
         """Delete crash report data from storage
 
@@ -565,6 +604,13 @@ class BenchmarkingCrashStorage(CrashStorageBase):
         )
         return result
 
+    def get_crash_bundle(self, crash_id):
+        start_time = self.start_timer()
+        result = self.wrapped_crashstore.get_crash_bundle(crash_id)
+        end_time = self.end_timer()
+        self.logger.debug("%s get_crash_bundle %s", self.tag, end_time - start_time)
+        return result
+
     def remove(self, crash_id):
         start_time = self.start_timer()
         self.wrapped_crashstore.remove(crash_id)
@@ -4,16 +4,25 @@
 
 import contextlib
 import datetime
+import os
 import re
+import threading
+import time
 
 from configman import Namespace, RequiredConfig
 from configman.converters import list_converter
 import elasticsearch
+from elasticsearch.connection import RequestsHttpConnection
+import markus
+from requests.adapters import HTTPAdapter
 
 from socorro.external.es.super_search_fields import SuperSearchFields
 from socorro.lib.datetimeutil import utc_now
 
 
+METRICS = markus.get_metrics("es.connection")
+
+
 # Elasticsearch indices configuration.
 ES_CUSTOM_ANALYZERS = {
     "analyzer": {"semicolon_keywords": {"type": "pattern", "pattern": ";"}}
@@ -21,6 +30,38 @@ ES_CUSTOM_ANALYZERS = {
 ES_QUERY_SETTINGS = {"default_field": "signature"}
 
 
+class PooledRequestsHttpConnection(RequestsHttpConnection):
+    """RequestsHttpConnection with a configurable pool size that emits metrics
+
+    Each connection is to a single Elasticsearch node. Its requests session keeps
+    up to ``pool_maxsize`` HTTP connections to that node alive for reuse.
+
+    """
+
+    def __init__(self, *args, pool_maxsize=10, **kwargs):
+        super().__init__(*args, **kwargs)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def perform_request(self, *args, **kwargs):
+        start_time = time.perf_counter()
+        outcome = "fail"
+        try:
+            ret = super().perform_request(*args, **kwargs)
+            outcome = "success"
+            return ret
+        finally:
+            delta = (time.perf_counter() - start_time) * 1000.0
+            METRICS.timing("request", value=delta, tags=["outcome:%s" % outcome])
+
+
+# Map of (pid, client settings) -> Elasticsearch client shared by all
+# ConnectionContext instances in this process
+_CLIENTS = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
 class ConnectionContext(RequiredConfig):
     """Elasticsearch connection manager.
 
@@ -84,14 +125,34 @@ class ConnectionContext(RequiredConfig):
             "default is 5."
         ),
     )
+    required_config.add_option(
+        "elasticsearch_pool_maxsize",
+        default=10,
+        doc="maximum number of kept-alive HTTP connections per Elasticsearch node",
+        reference_value_from="resource.elasticsearch",
+    )
+    required_config.add_option(
+        "elasticsearch_sniff",
+        default=False,
+        doc=(
+            "whether to discover Elasticsearch nodes from the cluster rather than "
+            "only using elasticsearch_urls; don't use this if the nodes are behind "
+            "a load balancer"
+        ),
+        reference_value_from="resource.elasticsearch",
+    )
 
     def __init__(self, config):
         super().__init__()
         self.config = config
 
     def connection(self, name=None, timeout=None):
-        """Returns an instance of elasticsearch-py's Elasticsearch class as
-        encapsulated by the Connection class above.
+        """Returns an instance of elasticsearch-py's Elasticsearch class.
+
+        Clients are shared by all ConnectionContext instances in the process
+        with the same settings and timeout, so HTTP connections to Elasticsearch
+        are reused across requests. Clients are thread-safe. Nodes that fail
+        are marked dead and skipped until they've had time to recover.
 
         Documentation: http://elasticsearch-py.readthedocs.org
 
@@ -99,12 +160,40 @@ class ConnectionContext(RequiredConfig):
         if timeout is None:
             timeout = self.config.elasticsearch_timeout
 
-        return elasticsearch.Elasticsearch(
-            hosts=self.config.elasticsearch_urls,
-            timeout=timeout,
-            connection_class=elasticsearch.connection.RequestsHttpConnection,
-            verify_certs=True,
+        # The pid is part of the key so forked processes don't share sockets
+        # with their parent
+        key = (
+            os.getpid(),
+            tuple(self.config.elasticsearch_urls),
+            timeout,
+            self.config.elasticsearch_pool_maxsize,
+            self.config.elasticsearch_sniff,
         )
+        client = _CLIENTS.get(key)
+        if client is not None:
+            return client
+
+        with _CLIENTS_LOCK:
+            client = _CLIENTS.get(key)
+            if client is None:
+                kwargs = {}
+                if self.config.elasticsearch_sniff:
+                    kwargs = {
+                        "sniff_on_start": True,
+                        "sniff_on_connection_fail": True,
+                        "sniffer_timeout": 60,
+                    }
+                client = elasticsearch.Elasticsearch(
+                    hosts=self.config.elasticsearch_urls,
+                    timeout=timeout,
+                    connection_class=PooledRequestsHttpConnection,
+                    pool_maxsize=self.config.elasticsearch_pool_maxsize,
+                    verify_certs=True,
+                    **kwargs,
+                )
+                _CLIENTS[key] = client
+                METRICS.incr("client_created")
+        return client
 
     def get_index_template(self):
         """Return template for index names."""
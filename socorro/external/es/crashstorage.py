@@ -5,6 +5,7 @@
 import copy
 import json
 import re
+import threading
 import time
 
 from configman import Namespace
@@ -348,6 +349,76 @@ class ESCrashStorage(CrashStorageBase):
                 "index", value=elapsed_time * 1000.0, tags=["outcome:" + index_outcome]
             )
 
+    def _remove_bad_field(self, crash_document, error):
+        """Remove the field that caused an indexing error from the document
+
+        This modifies the crash document in place and notes the removed field
+        in ``removed_fields``.
+
+        :arg dict crash_document: the document that failed to index
+        :arg str error: the error Elasticsearch returned
+
+        :returns: the name of the removed field or None if the field couldn't
+            be figured out from the error
+
+        """
+        field_name = None
+
+        if "MaxBytesLengthExceededException" in error:
+            # This is caused by a string that is way too long for
+            # Elasticsearch.
+            matches = self.field_name_string_error_re.findall(error)
+            if matches:
+                field_name = matches[0]
+                self.metrics.incr("indexerror", tags=["error:maxbyteslengthexceeded"])
+
+        elif "NumberFormatException" in error:
+            # This is caused by a number that is either too big for
+            # Elasticsearch or just not a number.
+            matches = self.field_name_number_error_re.findall(error)
+            if matches:
+                field_name = matches[0]
+                self.metrics.incr("indexerror", tags=["error:numberformatexception"])
+
+        elif "unknown property" in error:
+            # This is caused by field values that are nested for a field where a
+            # previously indexed value was a string. For example, the processor
+            # first indexes ModuleSignatureInfo value as a string, then tries to
+            # index ModuleSignatureInfo as a nested dict.
+            matches = self.field_name_unknown_property_error_re.findall(error)
+            if matches:
+                field_name = matches[0]
+                self.metrics.incr("indexerror", tags=["error:unknownproperty"])
+
+        if not field_name:
+            return None
+
+        if field_name.endswith(".full"):
+            # Remove the `.full` at the end, that is a special mapping
+            # construct that is not part of the real field name.
+            field_name = field_name.rstrip(".full")
+
+        # Now remove that field from the document before trying again.
+        field_path = field_name.split(".")
+        parent = crash_document
+        for i, field in enumerate(field_path):
+            if i == len(field_path) - 1:
+                # This is the last level, so `field` contains the name
+                # of the field that we want to remove from `parent`.
+                del parent[field]
+            else:
+                parent = parent[field]
+
+        # Add a note in the document that a field has been removed.
+        if crash_document.get("removed_fields"):
+            crash_document["removed_fields"] = "{} {}".format(
+                crash_document["removed_fields"], field_name
+            )
+        else:
+            crash_document["removed_fields"] = field_name
+
+        return field_name
+
     def _submit_crash_to_elasticsearch(self, crash_document):
         """Submit a crash report to elasticsearch"""
         index_name = self.get_index_for_crash(
@@ -376,38 +447,7 @@ class ESCrashStorage(CrashStorageBase):
             except elasticsearch.exceptions.TransportError as e:
                 # If this is a TransportError, we try to figure out what the error
                 # is and fix the document and try again
-                field_name = None
-
-                if "MaxBytesLengthExceededException" in e.error:
-                    # This is caused by a string that is way too long for
-                    # Elasticsearch.
-                    matches = self.field_name_string_error_re.findall(e.error)
-                    if matches:
-                        field_name = matches[0]
-                        self.metrics.incr(
-                            "indexerror", tags=["error:maxbyteslengthexceeded"]
-                        )
-
-                elif "NumberFormatException" in e.error:
-                    # This is caused by a number that is either too big for
-                    # Elasticsearch or just not a number.
-                    matches = self.field_name_number_error_re.findall(e.error)
-                    if matches:
-                        field_name = matches[0]
-                        self.metrics.incr(
-                            "indexerror", tags=["error:numberformatexception"]
-                        )
-
-                elif "unknown property" in e.error:
-                    # This is caused by field values that are nested for a field where a
-                    # previously indexed value was a string. For example, the processor
-                    # first indexes ModuleSignatureInfo value as a string, then tries to
-                    # index ModuleSignatureInfo as a nested dict.
-                    matches = self.field_name_unknown_property_error_re.findall(e.error)
-                    if matches:
-                        field_name = matches[0]
-                        self.metrics.incr("indexerror", tags=["error:unknownproperty"])
-
+                field_name = self._remove_bad_field(crash_document, e.error)
                 if not field_name:
                     # We are unable to parse which field to remove, we cannot
                     # try to fix the document. Let it raise.
@@ -420,30 +460,6 @@ class ESCrashStorage(CrashStorageBase):
                     self.metrics.incr("indexerror", tags=["error:unhandled"])
                     raise
 
-                if field_name.endswith(".full"):
-                    # Remove the `.full` at the end, that is a special mapping
-                    # construct that is not part of the real field name.
-                    field_name = field_name.rstrip(".full")
-
-                # Now remove that field from the document before trying again.
-                field_path = field_name.split(".")
-                parent = crash_document
-                for i, field in enumerate(field_path):
-                    if i == len(field_path) - 1:
-                        # This is the last level, so `field` contains the name
-                        # of the field that we want to remove from `parent`.
-                        del parent[field]
-                    else:
-                        parent = parent[field]
-
-                # Add a note in the document that a field has been removed.
-                if crash_document.get("removed_fields"):
-                    crash_document["removed_fields"] = "{} {}".format(
-                        crash_document["removed_fields"], field_name
-                    )
-                else:
-                    crash_document["removed_fields"] = field_name
-
             except elasticsearch.exceptions.ElasticsearchException as exc:
                 self.logger.critical(
                     "Submission to Elasticsearch failed for %s (%s)",
@@ -543,3 +559,198 @@ class ESCrashStorageRedactedJsonDump(ESCrashStorageRedactedSave):
         processed_crash["json_dump"] = redacted_json_dump
 
         super().prepare_processed_crash(raw_crash, processed_crash)
+
+
+class ESBulkCrashStorage(ESCrashStorage):
+    """This buffers crash reports and sends them to Elasticsearch in bulk.
+
+    Crash documents are prepared the same way as ``ESCrashStorage``, but
+    instead of one index request per crash, they're kept in a buffer and sent
+    with the ``_bulk`` API when the buffer has ``bulk_size`` documents or
+    every ``bulk_flush_interval`` seconds, whichever comes first. Documents
+    that fail to index because of a bad field have that field removed and only
+    those documents are sent again.
+
+    Indices that have been created are remembered so the index mapping isn't
+    rebuilt for every crash.
+
+    Note: Since documents are buffered, ``save_processed_crash`` returns
+    before the crash is in Elasticsearch. Indexing errors are logged and
+    counted, but not raised to the caller. Buffered documents are sent when
+    the crash storage is closed.
+
+    """
+
+    required_config = Namespace()
+    required_config.add_option(
+        "bulk_size",
+        doc="number of crash reports to buffer before sending them to Elasticsearch",
+        default=500,
+    )
+    required_config.add_option(
+        "bulk_flush_interval",
+        doc="maximum number of seconds to buffer crash reports before sending them",
+        default=5.0,
+    )
+
+    def __init__(self, config, namespace=""):
+        super().__init__(config, namespace=namespace)
+        self._buffer = []
+        self._buffer_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._known_indices = set()
+        self._stop_flushing = threading.Event()
+        self._flush_thread = None
+
+    def _start_flush_thread(self):
+        # The thread is started on first use so that nothing is running in a
+        # process that forks workers. This must be called with _buffer_lock held
+        # so that concurrent saves start only one thread.
+        if self._flush_thread is None and self.config.bulk_flush_interval:
+            self._flush_thread = threading.Thread(
+                name="ESBulkFlush", target=self._flush_periodically, daemon=True
+            )
+            self._flush_thread.start()
+
+    def _flush_periodically(self):
+        while not self._stop_flushing.wait(self.config.bulk_flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                self.logger.exception("error flushing crash reports to Elasticsearch")
+
+    def _ensure_index(self, index_name):
+        """Create the index if we haven't seen it before."""
+        if index_name not in self._known_indices:
+            # Attempt to create the index; it's OK if it already exists.
+            self.es_context.create_index(index_name)
+            self._known_indices.add(index_name)
+
+    def _submit_crash_to_elasticsearch(self, crash_document):
+        """Add a crash report to the buffer and flush if it's full"""
+        index_name = self.get_index_for_crash(
+            crash_document["processed_crash"]["date_processed"]
+        )
+        with self._buffer_lock:
+            self._start_flush_thread()
+            self._buffer.append((index_name, crash_document))
+            is_full = len(self._buffer) >= self.config.bulk_size
+
+        if is_full:
+            self.flush()
+
+    def flush(self):
+        """Send all buffered crash reports to Elasticsearch"""
+        with self._flush_lock:
+            with self._buffer_lock:
+                batch, self._buffer = self._buffer, []
+            if batch:
+                self._submit_bulk(batch)
+
+    def _build_bulk_body(self, batch):
+        es_doctype = self.config.elasticsearch.elasticsearch_doctype
+        body = []
+        for index_name, crash_document in batch:
+            body.append(
+                {
+                    "index": {
+                        "_index": index_name,
+                        "_type": es_doctype,
+                        "_id": crash_document["crash_id"],
+                    }
+                }
+            )
+            body.append(crash_document)
+        return body
+
+    def _submit_bulk(self, batch):
+        """Index a batch of crash documents
+
+        :arg list batch: list of ``(index_name, crash_document)`` tuples
+
+        """
+        start_time = time.time()
+        self.metrics.histogram("bulk_size", value=len(batch))
+
+        for index_name in {index_name for index_name, _ in batch}:
+            self._ensure_index(index_name)
+
+        # Don't retry more than 5 times. That is to avoid infinite loops in
+        # case of an unhandled exception.
+        pending = batch
+        failed = 0
+        for attempt in range(5):
+            try:
+                with self.es_context() as conn:
+                    resp = conn.bulk(body=self._build_bulk_body(pending))
+
+            except elasticsearch.exceptions.ConnectionError:
+                # If this is a connection error, sleep a second and then try again
+                time.sleep(1.0)
+                continue
+
+            except elasticsearch.exceptions.ElasticsearchException as exc:
+                self.logger.critical(
+                    "Bulk submission to Elasticsearch failed for %d crashes (%s)",
+                    len(pending),
+                    exc,
+                    exc_info=True,
+                )
+                self.metrics.incr("indexerror", value=len(pending), tags=["error:bulk"])
+                failed += len(pending)
+                pending = []
+                break
+
+            retry = []
+            for (index_name, crash_document), item in zip(pending, resp["items"]):
+                result = item.get("index") or item.get("create") or {}
+                error = result.get("error")
+                if not error:
+                    continue
+
+                crash_id = crash_document["crash_id"]
+                if not isinstance(error, str):
+                    error = json.dumps(error)
+                if self._remove_bad_field(crash_document, error):
+                    retry.append((index_name, crash_document))
+                else:
+                    self.logger.critical(
+                        "Submission to Elasticsearch failed for %s (%s)",
+                        crash_id,
+                        error,
+                    )
+                    self.metrics.incr("indexerror", tags=["error:unhandled"])
+                    failed += 1
+
+            pending = retry
+            if not pending:
+                break
+
+        for index_name, crash_document in pending:
+            self.logger.critical(
+                "Submission to Elasticsearch failed for %s (gave up retrying)",
+                crash_document["crash_id"],
+            )
+            self.metrics.incr("indexerror", tags=["error:gaveup"])
+            failed += 1
+
+        elapsed_time = time.time() - start_time
+        outcome = "failed" if failed else "successful"
+        self.metrics.histogram(
+            "bulk_index", value=elapsed_time * 1000.0, tags=["outcome:" + outcome]
+        )
+
+    def close(self):
+        """Stop the flush thread and send any buffered crash reports"""
+        self._stop_flushing.set()
+        if self._flush_thread is not None:
+            self._flush_thread.join()
+            self._flush_thread = None
+        self.flush()
+        super().close()
+
+
+class ESBulkCrashStorageRedactedJsonDump(
+    ESBulkCrashStorage, ESCrashStorageRedactedJsonDump
+):
+    """Bulk version of ESCrashStorageRedactedJsonDump"""
@@ -2,7 +2,10 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
+import base64
+import binascii
 from collections import defaultdict
+import json
 import re
 
 from configman import class_converter, Namespace, RequiredConfig
@@ -19,6 +22,32 @@ ELASTICSEARCH_PARSE_EXCEPTION_REGEX = re.compile(
     r"ElasticsearchParseException\[Failed to parse \[([^\]]+)\]\]"
 )
 
+# Value of the _cursor parameter that starts paging through results
+CURSOR_START = "*"
+
+
+def encode_cursor(uuid):
+    """Return an opaque cursor for results after the given crash id."""
+    data = json.dumps({"uuid": uuid}).encode("utf-8")
+    return base64.urlsafe_b64encode(data).decode("ascii")
+
+
+def decode_cursor(cursor):
+    """Return the crash id a cursor points after.
+
+    :raises BadArgumentError: if the cursor is not valid
+
+    """
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        uuid = data["uuid"]
+    except (binascii.Error, UnicodeError, ValueError, TypeError, KeyError):
+        raise BadArgumentError("_cursor", msg="Bad value for parameter _cursor")
+
+    if not isinstance(uuid, str):
+        raise BadArgumentError("_cursor", msg="Bad value for parameter _cursor")
+    return uuid
+
 
 class SuperSearch(RequiredConfig, SearchBase):
     required_config = Namespace()
@@ -179,6 +208,7 @@ class SuperSearch(RequiredConfig, SearchBase):
         # Create filters.
         filters = []
         histogram_intervals = {}
+        cursor = None
 
         for field, sub_params in params.items():
             sub_filters = None
@@ -190,6 +220,8 @@ class SuperSearch(RequiredConfig, SearchBase):
                     # so we just extract it from the made-up list.
                     if param.name == "_results_offset":
                         results_from = param.value[0]
+                    elif param.name == "_cursor":
+                        cursor = param.value[0]
                     elif param.name == "_results_number":
                         results_number = param.value[0]
                         if results_number > 1000:
@@ -321,6 +353,26 @@ class SuperSearch(RequiredConfig, SearchBase):
             if sub_filters is not None:
                 filters.append(sub_filters)
 
+        if cursor is not None:
+            # Cursors page through results sorted by crash id. Each page
+            # starts right after the last crash id of the previous page, so
+            # Elasticsearch never has to skip over results like it does with
+            # _results_offset, no matter how deep the page is.
+            if results_from:
+                raise BadArgumentError(
+                    "_cursor", msg="_cursor cannot be used with _results_offset"
+                )
+            if any(value for param in params["_sort"] for value in param.value):
+                raise BadArgumentError(
+                    "_cursor", msg="_cursor cannot be used with _sort"
+                )
+
+            uuid_field_name = self.get_full_field_name(self.all_fields["uuid"])
+            if cursor != CURSOR_START:
+                filters.append(
+                    F("range", **{uuid_field_name: {"gt": decode_cursor(cursor)}})
+                )
+
         search = search.filter(F("bool", must=filters))
 
         # Restricting returned fields.
@@ -338,6 +390,11 @@ class SuperSearch(RequiredConfig, SearchBase):
                 field_name = self.get_field_name(value, full=False)
                 fields.append(field_name)
 
+        if cursor is not None and "uuid" not in self.request_columns:
+            # The crash id of the last hit is needed to build the next cursor.
+            self.request_columns.append("uuid")
+            fields.append(uuid_field_name)
+
         search = search.fields(fields)
 
         # Sorting.
@@ -366,6 +423,9 @@ class SuperSearch(RequiredConfig, SearchBase):
 
                 sort_fields.append(field_name)
 
+        if cursor is not None:
+            sort_fields = [uuid_field_name]
+
         search = search.sort(*sort_fields)
 
         # Pagination.
@@ -462,7 +522,20 @@ class SuperSearch(RequiredConfig, SearchBase):
                     {"type": "shards", "index": index, "shards_count": shards_count}
                 )
 
-        return {"hits": hits, "total": total, "facets": aggregations, "errors": errors}
+        response = {
+            "hits": hits,
+            "total": total,
+            "facets": aggregations,
+            "errors": errors,
+        }
+        if cursor is not None:
+            # A page that isn't full is the last one.
+            if hits and len(hits) == results_number:
+                response["next_cursor"] = encode_cursor(hits[-1]["uuid"])
+            else:
+                response["next_cursor"] = None
+
+        return response
 
     def _create_aggregations(self, params, search, facets_size, histogram_intervals):
         # Create facets.
@@ -525,6 +598,9 @@ class SuperSearch(RequiredConfig, SearchBase):
     def _get_cardinality_agg(self, field):
         return A("cardinality", field=self.get_field_name(field))
 
+    def _get_min_agg(self, field):
+        return A("min", field=self.get_field_name(field))
+
     def _get_fields_agg(self, field, facets_size):
         return A("terms", field=self.get_field_name(field), size=facets_size)
 
@@ -549,6 +625,12 @@ class SuperSearch(RequiredConfig, SearchBase):
                 bucket_name = "cardinality_%s" % field_name
                 bucket = self._get_cardinality_agg(field_name)
 
+            elif field.startswith("_min"):
+                field_name = field[len("_min.") :]
+
+                bucket_name = "min_%s" % field_name
+                bucket = self._get_min_agg(field_name)
+
             else:
                 bucket_name = field
                 bucket = self._get_fields_agg(field, facets_size)
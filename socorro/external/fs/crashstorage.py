@@ -4,9 +4,11 @@
 
 from contextlib import contextmanager, closing
 import gzip
+import hashlib
 import json
 from io import BytesIO
 import os
+import threading
 
 from configman import Namespace
 from configman.dotdict import DotDict
@@ -57,6 +59,14 @@ class FSPermanentStorage(CrashStorageBase):
 
     Used alone, it is intended to store only processed crashes.
 
+    If ``dedupe_dumps`` is True, each distinct dump is stored once under::
+
+        root/dumps_by_hash/ab/<sha256 of dump>.dump
+
+    and the crash's dump file is a hard link to it. Reading is the same either
+    way. The link count of the hashed file tracks how many crashes use it and it
+    is deleted when the last crash using it is removed.
+
     """
 
     required_config = Namespace()
@@ -105,6 +115,12 @@ class FSPermanentStorage(CrashStorageBase):
         default="name",
         reference_value_from="resource.fs",
     )
+    required_config.add_option(
+        "dedupe_dumps",
+        doc="whether to store dumps once per sha256 hash rather than once per crash",
+        default=False,
+        reference_value_from="resource.fs",
+    )
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -169,6 +185,48 @@ class FSPermanentStorage(CrashStorageBase):
                 with open(os.sep.join([parent_dir, fn]), "wb") as f:
                     f.write(contents)
 
+    def _get_dump_hash_path(self, dump_hash):
+        return os.sep.join(
+            [
+                self.config.fs_root,
+                "dumps_by_hash",
+                dump_hash[:2],
+                dump_hash + self.config.dump_file_suffix,
+            ]
+        )
+
+    def _link_dumps_by_hash(self, crash_id, dumps):
+        """Store each dump once by hash and hard link the crash's dump files to it"""
+        parent_dir = self._get_radixed_parent_directory(crash_id)
+
+        with using_umask(self.config.umask):
+            for dump_name, dump in dumps.items():
+                hash_path = self._get_dump_hash_path(hashlib.sha256(dump).hexdigest())
+                dump_path = os.sep.join(
+                    [parent_dir, self._get_dump_file_name(crash_id, dump_name)]
+                )
+                if os.path.exists(dump_path):
+                    os.unlink(dump_path)
+
+                try:
+                    os.link(hash_path, dump_path)
+                    continue
+                except FileNotFoundError:
+                    pass
+
+                # Write the dump to a temporary file and rename it so other
+                # threads and processes never see a partially written dump
+                os.makedirs(os.path.dirname(hash_path), exist_ok=True)
+                tmp_path = "%s.%s.%s.tmp" % (
+                    hash_path,
+                    os.getpid(),
+                    threading.get_ident(),
+                )
+                with open(tmp_path, "wb") as f:
+                    f.write(dump)
+                os.replace(tmp_path, hash_path)
+                os.link(hash_path, dump_path)
+
     def save_raw_crash(self, raw_crash, dumps, crash_id):
         if dumps is None:
             dumps = MemoryDumpsMapping()
@@ -177,13 +235,16 @@ class FSPermanentStorage(CrashStorageBase):
             + self.config.json_file_suffix: json.dumps(raw_crash).encode("utf-8")
         }
         in_memory_dumps = dumps.as_memory_dumps_mapping()
-        files.update(
-            {
-                self._get_dump_file_name(crash_id, fn): dump
-                for fn, dump in in_memory_dumps.items()
-            }
-        )
+        if not self.config.dedupe_dumps:
+            files.update(
+                {
+                    self._get_dump_file_name(crash_id, fn): dump
+                    for fn, dump in in_memory_dumps.items()
+                }
+            )
         self._save_files(crash_id, files)
+        if self.config.dedupe_dumps:
+            self._link_dumps_by_hash(crash_id, in_memory_dumps)
 
     def save_processed_crash(self, raw_crash, processed_crash):
         crash_id = processed_crash["uuid"]
@@ -264,6 +325,7 @@ class FSPermanentStorage(CrashStorageBase):
         # Remove all the files related to the crash
         for cand in removal_candidates:
             try:
+                self._unlink_dump_hash(cand)
                 os.unlink(cand)
             except OSError:
                 self.logger.error("could not delete: %s", cand, exc_info=True)
@@ -274,3 +336,22 @@ class FSPermanentStorage(CrashStorageBase):
                 os.rmdir(parent_dir)
             except OSError:
                 self.logger.error("could not delete: %s", parent_dir, exc_info=True)
+
+    def _unlink_dump_hash(self, pathname):
+        """If pathname is the last crash using a dump stored by hash, delete the
+        dump stored by hash"""
+        if not self.config.dedupe_dumps or not pathname.endswith(
+            self.config.dump_file_suffix
+        ):
+            return
+        # Two links means the hashed file and this crash's file
+        if os.stat(pathname).st_nlink != 2:
+            return
+
+        dump_hash = hashlib.sha256()
+        with open(pathname, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                dump_hash.update(chunk)
+        hash_path = self._get_dump_hash_path(dump_hash.hexdigest())
+        if os.path.exists(hash_path) and os.path.samefile(hash_path, pathname):
+            os.unlink(hash_path)
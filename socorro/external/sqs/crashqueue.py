@@ -2,9 +2,11 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
+from collections import deque
 from functools import partial
 import logging
 import random
+import threading
 import time
 
 import boto3
@@ -261,3 +263,350 @@ class SQSCrashQueue(CrashQueueBase):
             raise CrashIdsFailedToPublish(
                 "Crashids failed to publish: %s", ",".join(failed)
             )
+
+
+# Maximum number of messages SQS returns for a receive or accepts in a batch
+SQS_MAX_BATCH = 10
+
+# Maximum long polling wait time SQS allows
+SQS_MAX_WAIT_TIME_SECONDS = 20
+
+
+class InFlightMessage:
+    """Bookkeeping for a message we've received but not acked."""
+
+    __slots__ = ("queue_url", "handle", "visible_until", "received")
+
+    def __init__(self, queue_url, handle, visible_until, received):
+        self.queue_url = queue_url
+        self.handle = handle
+        self.visible_until = visible_until
+        self.received = received
+
+
+class PrefetchingSQSCrashQueue(SQSCrashQueue):
+    """SQS crash queue that prefetches crash ids in the background.
+
+    This has the same API and queue requirements as ``SQSCrashQueue``, but:
+
+    * A background thread per queue keeps a bounded buffer of messages filled
+      using long polling. Iteration yields from the priority buffer first,
+      then standard, then reprocessing.
+    * When all the buffers are empty, iteration waits up to ``idle_wait``
+      seconds for new messages before it stops. Crash ids that arrive in that
+      time are yielded right away.
+    * Acks are batched and sent with ``delete_message_batch``.
+    * Visibility timeouts for messages that are buffered or being processed
+      are extended so they don't go back on the queue while we have them, for
+      up to ``max_hold_time`` seconds. After that, the message is dropped and
+      goes back on the queue when its visibility timeout runs out. This
+      covers crashes whose processing died without acking.
+    * When the queue is closed, buffered messages that weren't handed out are
+      made visible again right away.
+
+    Background threads are started the first time the queue is iterated over.
+
+    This requires the additional ``sqs:ChangeMessageVisibility`` permission.
+
+    """
+
+    required_config = Namespace()
+    required_config.add_option(
+        "prefetch_size",
+        doc="maximum number of crash ids to buffer per queue",
+        default=20,
+    )
+    required_config.add_option(
+        "wait_time_seconds",
+        doc="long polling wait time in seconds for receiving messages (max 20)",
+        default=SQS_MAX_WAIT_TIME_SECONDS,
+    )
+    required_config.add_option(
+        "idle_wait",
+        doc="seconds to wait for new crash ids before iteration stops",
+        default=20,
+    )
+    required_config.add_option(
+        "ack_flush_interval",
+        doc="maximum seconds to wait before sending batched acks",
+        default=1.0,
+    )
+    required_config.add_option(
+        "visibility_timeout",
+        doc=(
+            "seconds to extend visibility for messages we're holding; these "
+            "are extended when half of this time has passed"
+        ),
+        default=300,
+    )
+    required_config.add_option(
+        "max_hold_time",
+        doc=(
+            "maximum seconds to extend visibility for a message that hasn't been "
+            "acked; after this it goes back on the queue"
+        ),
+        default=3600,
+    )
+
+    def __init__(self, config, namespace=""):
+        super().__init__(config, namespace)
+
+        # Queues in priority order
+        self.queue_urls = [
+            self.priority_queue_url,
+            self.standard_queue_url,
+            self.reprocessing_queue_url,
+        ]
+        self._buffers = {queue_url: deque() for queue_url in self.queue_urls}
+        self._condition = threading.Condition()
+
+        # handle -> InFlightMessage for messages we've received and not acked
+        self._in_flight = {}
+        # queue_url -> list of handles to delete
+        self._pending_acks = {queue_url: [] for queue_url in self.queue_urls}
+        self._ack_lock = threading.Lock()
+
+        self._stop = threading.Event()
+        self._threads = []
+
+    def _start_threads(self):
+        if self._threads:
+            return
+        for queue_url in self.queue_urls:
+            thread = threading.Thread(
+                name="SQSPrefetch-%s" % queue_url.rsplit("/", 1)[-1],
+                target=self._prefetch_loop,
+                args=(queue_url,),
+            )
+            thread.daemon = True
+            self._threads.append(thread)
+        thread = threading.Thread(name="SQSMaintenance", target=self._maintenance_loop)
+        thread.daemon = True
+        self._threads.append(thread)
+        for thread in self._threads:
+            thread.start()
+
+    def _buffer_has_room(self, queue_url):
+        with self._condition:
+            return len(self._buffers[queue_url]) < self.config.prefetch_size
+
+    def _prefetch_loop(self, queue_url):
+        """Keep the buffer for this queue filled."""
+        while not self._stop.is_set():
+            if not self._buffer_has_room(queue_url):
+                self._stop.wait(0.1)
+                continue
+
+            try:
+                msgs = self._receive(queue_url)
+            except Exception:
+                logger.exception("error receiving messages from %s", queue_url)
+                self._stop.wait(1.0)
+                continue
+
+            for msg in msgs:
+                crash_id = msg["Body"]
+                handle = msg["ReceiptHandle"]
+                logger.debug("got %s from %s", crash_id, queue_url)
+                if crash_id == "test":
+                    # Ack and drop any test crash ids
+                    self.ack_crash(queue_url, handle)
+                    continue
+                with self._condition:
+                    self._buffers[queue_url].append((crash_id, handle))
+                    self._condition.notify()
+
+    def _receive(self, queue_url):
+        with self._condition:
+            room = self.config.prefetch_size - len(self._buffers[queue_url])
+        resp = self.client.receive_message(
+            QueueUrl=queue_url,
+            WaitTimeSeconds=min(
+                self.config.wait_time_seconds, SQS_MAX_WAIT_TIME_SECONDS
+            ),
+            MaxNumberOfMessages=max(1, min(room, SQS_MAX_BATCH)),
+            VisibilityTimeout=self.config.visibility_timeout,
+        )
+        msgs = resp.get("Messages", [])
+        now = time.monotonic()
+        visible_until = now + self.config.visibility_timeout
+        with self._ack_lock:
+            for msg in msgs:
+                handle = msg["ReceiptHandle"]
+                self._in_flight[handle] = InFlightMessage(
+                    queue_url, handle, visible_until, now
+                )
+        return msgs
+
+    def _next_crash(self):
+        """Pop the next crash in priority order; returns None if none are buffered."""
+        for queue_url in self.queue_urls:
+            buf = self._buffers[queue_url]
+            if buf:
+                crash_id, handle = buf.popleft()
+                return queue_url, crash_id, handle
+        return None
+
+    def __iter__(self):
+        """Return iterator over crash ids from AWS SQS.
+
+        Each returned crash is a ``(crash_id, {kwargs})`` tuple with
+        ``finished_func`` as the only key in ``kwargs``. The caller should call
+        ``finished_func`` when it's done processing the crash.
+
+        """
+        self._start_threads()
+        while True:
+            with self._condition:
+                item = self._next_crash()
+                if item is None:
+                    self._condition.wait_for(
+                        lambda: any(self._buffers.values()) or self._stop.is_set(),
+                        timeout=self.config.idle_wait,
+                    )
+                    item = self._next_crash()
+            if item is None:
+                # There's nothing to process, so return
+                return
+
+            queue_url, crash_id, handle = item
+            yield (
+                (crash_id,),
+                {"finished_func": partial(self.ack_crash, queue_url, handle)},
+            )
+
+    def ack_crash(self, queue_url, handle):
+        """Queue the message for deletion; it's deleted in the next batch."""
+        with self._ack_lock:
+            self._in_flight.pop(handle, None)
+            pending = self._pending_acks[queue_url]
+            pending.append(handle)
+            flush_now = len(pending) >= SQS_MAX_BATCH
+        logger.debug("ack %s from %s", handle, queue_url)
+        if flush_now:
+            self.flush_acks(queue_url)
+
+    def flush_acks(self, queue_url=None):
+        """Delete acked messages in batches.
+
+        :arg queue_url: the queue to flush acks for or None for all queues
+
+        """
+        queue_urls = [queue_url] if queue_url else self.queue_urls
+        for queue_url in queue_urls:
+            with self._ack_lock:
+                handles = self._pending_acks[queue_url]
+                self._pending_acks[queue_url] = []
+
+            for batch in chunked(handles, SQS_MAX_BATCH):
+                entries = [
+                    {"Id": str(i), "ReceiptHandle": handle}
+                    for i, handle in enumerate(batch)
+                ]
+                try:
+                    resp = self.client.delete_message_batch(
+                        QueueUrl=queue_url, Entries=entries
+                    )
+                except Exception:
+                    logger.exception("error deleting messages from %s", queue_url)
+                    continue
+                for item in resp.get("Failed", []):
+                    logger.warning(
+                        "failed to delete %s from %s: %s",
+                        entries[int(item["Id"])]["ReceiptHandle"],
+                        queue_url,
+                        item.get("Message", item.get("Code")),
+                    )
+
+    def _change_visibility(self, queue_url, handles, timeout):
+        """Change the visibility timeout for messages in batches.
+
+        :arg queue_url: the queue the messages are from
+        :arg handles: list of receipt handles
+        :arg timeout: the new visibility timeout in seconds
+
+        :returns: set of handles whose visibility was changed
+
+        """
+        changed = set()
+        for batch in chunked(handles, SQS_MAX_BATCH):
+            entries = [
+                {"Id": str(i), "ReceiptHandle": handle, "VisibilityTimeout": timeout}
+                for i, handle in enumerate(batch)
+            ]
+            try:
+                resp = self.client.change_message_visibility_batch(
+                    QueueUrl=queue_url, Entries=entries
+                )
+            except Exception:
+                logger.exception("error changing visibility in %s", queue_url)
+                continue
+            failed = {int(item["Id"]) for item in resp.get("Failed", [])}
+            changed.update(handle for i, handle in enumerate(batch) if i not in failed)
+        return changed
+
+    def extend_visibility(self):
+        """Extend visibility timeout for messages past half their timeout.
+
+        Messages held longer than ``max_hold_time`` are dropped instead so they
+        go back on the queue.
+
+        """
+        timeout = self.config.visibility_timeout
+        now = time.monotonic()
+        to_extend = {}
+        with self._ack_lock:
+            for handle, msg in list(self._in_flight.items()):
+                if now - msg.received >= self.config.max_hold_time:
+                    logger.warning(
+                        "not extending visibility for %s from %s; held too long",
+                        handle,
+                        msg.queue_url,
+                    )
+                    del self._in_flight[handle]
+                elif msg.visible_until - now < timeout / 2:
+                    to_extend.setdefault(msg.queue_url, []).append(msg)
+
+        for queue_url, msgs in to_extend.items():
+            changed = self._change_visibility(
+                queue_url, [msg.handle for msg in msgs], timeout
+            )
+            for msg in msgs:
+                if msg.handle in changed:
+                    msg.visible_until = now + timeout
+
+    def release_buffered(self):
+        """Make buffered messages that weren't handed out visible again."""
+        to_release = {}
+        with self._condition:
+            for queue_url, buf in self._buffers.items():
+                if buf:
+                    to_release[queue_url] = [handle for crash_id, handle in buf]
+                buf.clear()
+
+        for queue_url, handles in to_release.items():
+            with self._ack_lock:
+                for handle in handles:
+                    self._in_flight.pop(handle, None)
+            self._change_visibility(queue_url, handles, 0)
+
+    def _maintenance_loop(self):
+        """Flush acks and extend visibility timeouts periodically."""
+        while not self._stop.wait(self.config.ack_flush_interval):
+            try:
+                self.flush_acks()
+                self.extend_visibility()
+            except Exception:
+                logger.exception("error in sqs maintenance")
+
+    def close(self):
+        """Stop background threads, send outstanding acks, and release buffered
+        messages."""
+        self._stop.set()
+        with self._condition:
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self.flush_acks()
+        self.release_buffered()
@@ -8,9 +8,12 @@ In-memory caching utilities.
 
 from collections import MutableMapping, OrderedDict
 import datetime
+import heapq
+import itertools
 import threading
+from time import monotonic
 
-from socorro.lib.datetimeutil import utc_now
+import markus
 
 
 #: Default time-to-live for keys in seconds
@@ -18,10 +21,14 @@ DEFAULT_TTL = 600
 
 
 class ExpiringCache(MutableMapping):
-    """In-memory cache that drops data older than a specified ttl
+    """Thread-safe in-memory LRU cache that drops data older than a specified ttl
 
-    This will do bookkeeping periodically when setting values. If you
-    want to explicitly remove all expired data, call ``.flush()``.
+    Expiration times are computed with a monotonic clock, so they aren't affected
+    by changes to the system clock. Expired keys are removed when they're
+    accessed and when values are set. If you want to explicitly remove all
+    expired data, call ``.flush()``.
+
+    When the cache is full, setting a new key evicts the least recently used key.
 
     Example of usage:
 
@@ -48,12 +55,19 @@ class ExpiringCache(MutableMapping):
     >>> cache['long_key']
     'something'
 
+    ExpiringCache keeps counts of hits, misses, evictions, and expirations. If
+    you pass a ``metrics_prefix``, it also emits them as a ``cache`` markus incr
+    metric tagged ``result:hit``, ``result:miss``, ``result:evict``, or
+    ``result:expire``.
+
     """
 
-    def __init__(self, max_size=128, default_ttl=DEFAULT_TTL):
+    def __init__(self, max_size=128, default_ttl=DEFAULT_TTL, metrics_prefix=None):
         """
         :arg max_size: maximum number of items in the cache
-        :arg ttl: ttl for items in the cache in seconds
+        :arg default_ttl: ttl for items in the cache in seconds
+        :arg metrics_prefix: prefix for markus metrics; if None, no metrics are
+            emitted
 
         """
         if max_size <= 0:
@@ -61,49 +75,124 @@ class ExpiringCache(MutableMapping):
         if default_ttl <= 0:
             raise ValueError("ttl must be greater than 0")
         self._max_size = max_size
-        self._default_ttl = datetime.timedelta(seconds=default_ttl)
-        # Map of key -> (expire time, value)
+        self._default_ttl = default_ttl
+        # Map of key -> (expire time, value) in least to most recently used order
         self._data = OrderedDict()
-        self._lock = threading.RLock()
+        # Heap of (expire time, sequence number, key); keys that were set again
+        # or removed leave stale entries which are skipped when popped
+        self._expiry = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.metrics = markus.get_metrics(metrics_prefix) if metrics_prefix else None
+
+    def _incr(self, name, value):
+        if self.metrics is not None and value:
+            self.metrics.incr("cache", value=value, tags=["result:%s" % name])
+
+    def _remove_expired(self, now):
+        """Removes expired keys; must be called with the lock held
+
+        :arg now: the current monotonic time
+
+        :returns: number of keys removed
+
+        """
+        expired = 0
+        while self._expiry and self._expiry[0][0] <= now:
+            expire_at, _, key = heapq.heappop(self._expiry)
+            record = self._data.get(key)
+            if record is not None and record[0] == expire_at:
+                del self._data[key]
+                expired += 1
+
+        # Drop stale heap entries if they outnumber the live ones
+        if len(self._expiry) > 2 * len(self._data) + 16:
+            self._expiry = [
+                (expire_at, next(self._counter), key)
+                for key, (expire_at, _) in self._data.items()
+            ]
+            heapq.heapify(self._expiry)
+
+        self.expirations += expired
+        return expired
 
     def flush(self):
         """Removes all expired keys"""
         with self._lock:
-            NOW = utc_now()
-
-            for key, value_record in list(self._data.items()):
-                if value_record[0] < NOW:
-                    del self._data[key]
+            expired = self._remove_expired(monotonic())
+        self._incr("expire", expired)
 
     def __getitem__(self, key):
+        expired = 0
         with self._lock:
-            value_record = self._data[key]
-
-            if value_record[0] < utc_now():
+            record = self._data.get(key)
+            if record is not None and record[0] <= monotonic():
                 del self._data[key]
-                raise KeyError()
+                record = None
+                expired = 1
+                self.expirations += 1
+
+            if record is None:
+                self.misses += 1
+            else:
+                self._data.move_to_end(key)
+                self.hits += 1
 
-            return value_record[1]
+        self._incr("expire", expired)
+        if record is None:
+            self._incr("miss", 1)
+            raise KeyError(key)
+
+        self._incr("hit", 1)
+        return record[1]
 
     def __setitem__(self, key, value):
         self.set(key, value, ttl=self._default_ttl)
 
     def set(self, key, value, ttl=None):
+        """Sets a value in the cache
+
+        :arg key: the key
+        :arg value: the value
+        :arg ttl: ttl for this key in seconds (int, float, or timedelta); defaults
+            to the cache's default ttl
+
+        """
         ttl = ttl if ttl is not None else self._default_ttl
-        if isinstance(ttl, int):
-            ttl = datetime.timedelta(seconds=ttl)
+        if isinstance(ttl, datetime.timedelta):
+            ttl = ttl.total_seconds()
+
+        evicted = 0
+        with self._lock:
+            now = monotonic()
+            expired = self._remove_expired(now)
 
-        self._data[key] = [utc_now() + ttl, value]
+            expire_at = now + ttl
+            self._data[key] = (expire_at, value)
+            self._data.move_to_end(key)
+            heapq.heappush(self._expiry, (expire_at, next(self._counter), key))
 
-        # If we've exceeded the max size, remove the oldest one
-        if len(self._data) > self._max_size:
-            self._data.popitem(last=False)
+            # If we've exceeded the max size, remove the least recently used one
+            while len(self._data) > self._max_size:
+                self._data.popitem(last=False)
+                evicted += 1
+            self.evictions += evicted
+
+        self._incr("expire", expired)
+        self._incr("evict", evicted)
 
     def __delitem__(self, key):
-        del self._data[key]
+        with self._lock:
+            del self._data[key]
 
     def __iter__(self):
-        return iter(self._data)
+        with self._lock:
+            return iter(list(self._data))
 
     def __len__(self):
         return len(self._data)
@@ -0,0 +1,507 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""This module defines a producer/consumer system that runs jobs in a pool of
+worker processes rather than threads.  A queuing thread in the parent process
+reads the iterator and hands jobs to the workers.  A results thread in the
+parent collects completed jobs and calls their ``finished_func`` so
+acknowledging jobs (e.g. deleting SQS messages) stays in the process that
+owns the queue.
+
+This lets CPU-bound transforms scale with the number of cores rather than
+being bound by the GIL."""
+
+import itertools
+import logging
+import multiprocessing
+from multiprocessing.connection import wait as wait_for_connections
+import signal
+import threading
+import time
+
+from configman import Namespace
+import markus
+
+from socorro.lib.task_manager import default_task_func, default_iterator, TaskManager
+
+
+METRICS = markus.get_metrics("task_manager")
+
+
+def _worker_main(
+    worker_name, task_queue, result_conn, task_func, worker_init_func, worker_close_func
+):
+    """Main loop for a worker process.
+
+    The worker pulls ``(job_id, args, kwargs)`` tuples off its task queue,
+    executes the task and sends ``(job_id, worker_name, succeeded, elapsed)``
+    back to the parent on its own result pipe.  A ``None`` on the task queue is
+    the death token. When the worker quits, it calls ``worker_close_func`` so
+    per-worker resources get flushed and closed.
+
+    """
+    # The parent coordinates shutdown; workers finish the job they're on and
+    # then quit when they get a death token
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+    logger = logging.getLogger(__name__ + ".worker")
+    if worker_init_func is not None:
+        worker_init_func()
+
+    try:
+        while True:
+            job = task_queue.get()
+            if job is None:
+                logger.info("%s quits", worker_name)
+                break
+
+            job_id, args, kwargs = job
+            start_time = time.monotonic()
+            succeeded = True
+            try:
+                task_func(*args, **kwargs)
+            except Exception:
+                succeeded = False
+                logger.error("Error in processing a job", exc_info=True)
+            elapsed = time.monotonic() - start_time
+            # Send synchronously so the result isn't lost if this process dies
+            # while working on the next job
+            result_conn.send((job_id, worker_name, succeeded, elapsed))
+    finally:
+        if worker_close_func is not None:
+            try:
+                worker_close_func()
+            except Exception:
+                logger.error("Error closing worker", exc_info=True)
+        result_conn.close()
+
+
+class WorkerStats:
+    """Throughput counters for a single worker process."""
+
+    def __init__(self):
+        self.jobs = 0
+        self.failures = 0
+        self.busy_seconds = 0.0
+        self.started = time.monotonic()
+
+    def record(self, succeeded, elapsed):
+        self.jobs += 1
+        if not succeeded:
+            self.failures += 1
+        self.busy_seconds += elapsed
+
+    def jobs_per_second(self):
+        uptime = time.monotonic() - self.started
+        if uptime <= 0:
+            return 0.0
+        return self.jobs / uptime
+
+
+class ProcessPoolTaskManager(TaskManager):
+    """Given an iterator over a sequence of job parameters and a function,
+    this class will execute the function in a pool of worker processes.
+
+    Workers are forked from the parent, so ``task_func``, ``worker_init_func``
+    and ``worker_close_func`` don't need to be picklable, but job args and kwargs
+    do. A ``finished_func`` kwarg is never sent to the workers; it's held in
+    the parent and called once the worker reports the job is done.
+
+    Each worker has its own task queue so the parent always knows which jobs
+    a worker holds, and its own result pipe so a worker dying while sending a
+    result can't block the others. If a worker dies, its jobs are dropped
+    without calling ``finished_func`` so the job source can redeliver them, and
+    the worker is replaced.
+
+    """
+
+    required_config = Namespace()
+    required_config.add_option(
+        "idle_delay", default=7, doc="the delay in seconds if no job is found"
+    )
+    required_config.add_option(
+        "number_of_processes",
+        default=multiprocessing.cpu_count(),
+        doc="the number of worker processes",
+    )
+    # This bounds the number of jobs that have been pulled off the job source
+    # but not finished. Unfinished jobs are lost if the app dies, so keep this
+    # at around twice the number of processes.
+    required_config.add_option(
+        "maximum_queue_size",
+        default=2 * multiprocessing.cpu_count(),
+        doc="the maximum number of jobs in flight",
+    )
+    required_config.add_option(
+        "worker_stats_interval",
+        default=60,
+        doc="seconds between logging per-worker throughput; 0 to disable",
+    )
+
+    def __init__(
+        self,
+        config,
+        job_source_iterator=default_iterator,
+        task_func=default_task_func,
+        worker_init_func=None,
+        worker_close_func=None,
+    ):
+        """
+        parameters:
+            job_source_iterator - an iterator to serve as the source of data.
+                                  See TaskManager for the forms it can take.
+            task_func - a function that will accept the args and kwargs yielded
+                        by the job_source_iterator; it's run in a worker
+                        process
+            worker_init_func - a function that's called once in each worker
+                               process before it starts taking jobs; use it
+                               to set up per-process resources
+            worker_close_func - a function that's called once in each worker
+                                process when it quits; use it to flush and
+                                close per-process resources"""
+        super().__init__(
+            config, job_source_iterator, task_func, worker_init_func, worker_close_func,
+        )
+        self.number_of_processes = config.number_of_processes
+        self.worker_stats_interval = config.get("worker_stats_interval", 60)
+
+        # Fork so workers inherit task_func and everything it refers to
+        self._mp_context = multiprocessing.get_context("fork")
+        self.in_flight = threading.BoundedSemaphore(config.maximum_queue_size)
+
+        self._job_ids = itertools.count()
+        # job_id -> finished_func for jobs handed to workers
+        self._pending = {}
+        # worker name -> set of job_ids handed to that worker
+        self._assigned = {}
+        self._pending_lock = threading.Lock()
+
+        # worker name -> multiprocessing.Process
+        self.workers = {}
+        # worker name -> worker's task queue
+        self.task_queues = {}
+        # worker name -> read end of the worker's result pipe
+        self.result_readers = {}
+        self.worker_stats = {}
+        self._worker_names = ("Worker-%d" % x for x in itertools.count())
+
+        self._stopping = False
+        self._last_stats_log = time.monotonic()
+        self.queuing_thread = None
+        self.results_thread = None
+
+    def _spawn_worker(self):
+        worker_name = next(self._worker_names)
+        task_queue = self._mp_context.Queue()
+        result_reader, result_writer = self._mp_context.Pipe(duplex=False)
+        process = self._mp_context.Process(
+            name=worker_name,
+            target=_worker_main,
+            args=(
+                worker_name,
+                task_queue,
+                result_writer,
+                self.task_func,
+                self.worker_init_func,
+                self.worker_close_func,
+            ),
+        )
+        process.daemon = True
+        process.start()
+        # Only the worker writes to its pipe
+        result_writer.close()
+        with self._pending_lock:
+            self.workers[worker_name] = process
+            self.task_queues[worker_name] = task_queue
+            self.result_readers[worker_name] = result_reader
+            self._assigned[worker_name] = set()
+        self.worker_stats[worker_name] = WorkerStats()
+        self.logger.info("started %s (pid %s)", worker_name, process.pid)
+
+    def start(self):
+        """Start the worker processes, the results thread and the queuing
+        thread. This is non-blocking."""
+        self.logger.debug("start")
+        for x in range(self.number_of_processes):
+            self._spawn_worker()
+        self.results_thread = threading.Thread(
+            name="ResultsThread", target=self._results_thread_func
+        )
+        self.results_thread.start()
+        self.queuing_thread = threading.Thread(
+            name="QueuingThread", target=self._queuing_thread_func
+        )
+        self.queuing_thread.start()
+
+    def wait_for_completion(self, waiting_func=None):
+        """Block until the queuing thread and results thread complete.
+
+        parameters:
+            waiting_func - this function will be called every one second while
+                           waiting. This allows for logging timers, status
+                           indicators, etc."""
+        self.logger.debug("waiting to join queuingThread")
+        self._responsive_join(self.queuing_thread, waiting_func)
+        self._responsive_join(self.results_thread, waiting_func)
+
+    def stop(self):
+        """Tell the queuing thread to quit and wait for everything to stop."""
+        self.quit = True
+        self.wait_for_completion()
+
+    def blocking_start(self, waiting_func=None):
+        """Start everything and wait for it to complete. A KeyboardInterrupt
+        (which SIGTERM and SIGHUP are translated to) stops the queuing thread
+        and lets in-flight jobs finish."""
+        try:
+            self.start()
+            self.wait_for_completion(waiting_func)
+        except KeyboardInterrupt:
+            while True:
+                try:
+                    self.stop()
+                    break
+                except KeyboardInterrupt:
+                    self.logger.warning(
+                        "We heard you the first time.  There "
+                        "is no need for further keyboard or signal "
+                        "interrupts.  We are waiting for the "
+                        "worker processes to stop.  If this app "
+                        "does not halt soon, you may have to send "
+                        "SIGKILL (kill -9)"
+                    )
+
+    def _responsive_join(self, thread, waiting_func=None):
+        """Join a thread while calling waiting_func once a second."""
+        while True:
+            try:
+                thread.join(1.0)
+                if not thread.is_alive():
+                    break
+                if waiting_func:
+                    waiting_func()
+            except KeyboardInterrupt:
+                self.logger.debug("quit detected by _responsive_join")
+                self.quit = True
+
+    def _acquire_slot(self):
+        """Wait for a free in-flight slot; returns False if we should quit."""
+        while not self.quit:
+            if self.in_flight.acquire(timeout=1.0):
+                return True
+        return False
+
+    def _pending_count(self):
+        with self._pending_lock:
+            return len(self._pending)
+
+    def wait_for_empty_queue(self, wait_log_interval=0, wait_reason=""):
+        """Sit around and wait for all in-flight jobs to finish."""
+        seconds = 0
+        while self._pending_count():
+            if wait_log_interval and not seconds % wait_log_interval:
+                self.logger.info("%s: %dsec so far", wait_reason, seconds)
+            seconds += 1
+            time.sleep(1.0)
+
+    def _queuing_thread_func(self):
+        """Read the iterator and hand jobs to the workers. On exhaustion,
+        failure, or a quit request, tell the workers to stop and wait for
+        them."""
+        self.logger.debug("_queuing_thread_func start")
+        try:
+            # May never exhaust
+            for job_params in self._get_iterator():
+                self.logger.debug("received %r", job_params)
+                if job_params is None:
+                    if self.config.quit_on_empty_queue:
+                        self.wait_for_empty_queue(
+                            wait_log_interval=10,
+                            wait_reason="waiting for jobs to finish",
+                        )
+                        raise KeyboardInterrupt
+                    self.logger.info(
+                        "there is nothing to do.  Sleeping "
+                        "for %d seconds" % self.config.idle_delay
+                    )
+                    self._responsive_sleep(self.config.idle_delay)
+                    continue
+                if self.quit:
+                    break
+                try:
+                    args, kwargs = job_params
+                except ValueError:
+                    args = job_params
+                    kwargs = {}
+                kwargs = dict(kwargs)
+                finished_func = kwargs.pop("finished_func", None)
+
+                if not self._acquire_slot():
+                    break
+                self._dispatch(tuple(args), kwargs, finished_func)
+        except Exception:
+            self.logger.error("queuing jobs has failed", exc_info=True)
+        except KeyboardInterrupt:
+            self.logger.debug("queuingThread gets quit request")
+        finally:
+            self.logger.debug("we're quitting queuingThread")
+            self._kill_workers()
+            self.logger.debug("all worker processes stopped")
+            self.quit = True
+
+    def _dispatch(self, args, kwargs, finished_func):
+        """Hand a job to the worker with the fewest jobs."""
+        job_id = next(self._job_ids)
+        while True:
+            with self._pending_lock:
+                # There may be no workers for a moment while a dead one is
+                # being replaced
+                if self._assigned:
+                    worker_name = min(
+                        self._assigned, key=lambda name: len(self._assigned[name])
+                    )
+                    self._pending[job_id] = finished_func
+                    self._assigned[worker_name].add(job_id)
+                    task_queue = self.task_queues[worker_name]
+                    break
+            time.sleep(0.1)
+        task_queue.put((job_id, args, kwargs))
+
+    def _kill_workers(self):
+        """Put a death token on each worker's queue and wait for the workers
+        to finish what they're doing and exit."""
+        with self._pending_lock:
+            self._stopping = True
+            task_queues = list(self.task_queues.values())
+            workers = list(self.workers.values())
+        for task_queue in task_queues:
+            task_queue.put(None)
+        self.logger.debug("waiting for worker processes to stop")
+        for process in workers:
+            process.join()
+
+    def _finish_job(self, job_id):
+        """Release the job's slot and call its finished_func."""
+        with self._pending_lock:
+            finished_func = self._pending.pop(job_id, None)
+        self.in_flight.release()
+        if finished_func is not None:
+            try:
+                finished_func()
+            except Exception:
+                self.logger.error("Error completing job %s", job_id, exc_info=True)
+
+    def _handle_result(self, result):
+        job_id, worker_name, succeeded, elapsed = result
+        with self._pending_lock:
+            self._assigned.get(worker_name, set()).discard(job_id)
+        self.worker_stats[worker_name].record(succeeded, elapsed)
+        METRICS.timing(
+            "job_time", value=elapsed * 1000.0, tags=["worker:%s" % worker_name]
+        )
+        self._finish_job(job_id)
+
+    def _reap_dead_workers(self):
+        """Replace workers that died unexpectedly.
+
+        Jobs handed to a dead worker are dropped without calling their
+        finished_func so the job source can redeliver them.
+
+        """
+        for worker_name, process in list(self.workers.items()):
+            if process.is_alive() or process.exitcode == 0:
+                continue
+            self.logger.error(
+                "%s died with exit code %s", worker_name, process.exitcode
+            )
+            # Handle results the worker sent before it died
+            reader = self.result_readers.get(worker_name)
+            if reader is not None:
+                self._read_results(worker_name, reader)
+            with self._pending_lock:
+                del self.workers[worker_name]
+                del self.task_queues[worker_name]
+                self.result_readers.pop(worker_name, None)
+                job_ids = self._assigned.pop(worker_name)
+                for job_id in job_ids:
+                    self._pending.pop(job_id, None)
+                stopping = self._stopping
+            for job_id in job_ids:
+                self.logger.error("dropping job %s from %s", job_id, worker_name)
+                self.in_flight.release()
+            METRICS.incr("worker_died")
+            if not stopping:
+                self._spawn_worker()
+
+    def log_worker_stats(self):
+        """Log per-worker throughput."""
+        for worker_name, stats in sorted(self.worker_stats.items()):
+            self.logger.info(
+                "%s: %d jobs (%d failed), %.2f jobs/sec, %.1fs busy",
+                worker_name,
+                stats.jobs,
+                stats.failures,
+                stats.jobs_per_second(),
+                stats.busy_seconds,
+            )
+
+    def _read_results(self, worker_name, reader):
+        """Handle the results waiting on a worker's result pipe.
+
+        :returns: number of results handled
+
+        """
+        handled = 0
+        try:
+            while reader.poll():
+                self._handle_result(reader.recv())
+                handled += 1
+        except (EOFError, OSError):
+            # The worker has exited and closed its end of the pipe
+            with self._pending_lock:
+                self.result_readers.pop(worker_name, None)
+            reader.close()
+        except Exception:
+            self.logger.error("reading results has failed", exc_info=True)
+        return handled
+
+    def _results_thread_func(self):
+        """Collect results from workers until the queuing thread is done and
+        there's nothing left in flight."""
+        self.logger.debug("_results_thread_func start")
+        while True:
+            with self._pending_lock:
+                readers = {
+                    reader: worker_name
+                    for worker_name, reader in self.result_readers.items()
+                }
+
+            handled = 0
+            if readers:
+                for reader in wait_for_connections(list(readers), timeout=1.0):
+                    handled += self._read_results(readers[reader], reader)
+            else:
+                time.sleep(1.0)
+
+            self._reap_dead_workers()
+
+            if (
+                self.worker_stats_interval
+                and time.monotonic() - self._last_stats_log
+                >= self.worker_stats_interval
+            ):
+                self._last_stats_log = time.monotonic()
+                self.log_worker_stats()
+
+            if (
+                not handled
+                and self.queuing_thread is not None
+                and not self.queuing_thread.is_alive()
+                and not any(p.is_alive() for p in self.workers.values())
+            ):
+                # Everything's stopped and there's nothing left to read
+                break
+        self.log_worker_stats()
+        self.logger.debug("we're quitting resultsThread")
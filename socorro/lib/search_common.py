@@ -83,6 +83,7 @@ class SearchBase:
         SearchFilter(
             "_columns", default=["uuid", "date", "signature", "product", "version"]
         ),
+        SearchFilter("_cursor"),
         SearchFilter("_facets", default="signature"),
         SearchFilter("_facets_size", data_type="int", default=50),
         SearchFilter("_results_number", data_type="int", default=100),
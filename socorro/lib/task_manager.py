@@ -62,7 +62,12 @@ class TaskManager(RequiredConfig):
     )
 
     def __init__(
-        self, config, job_source_iterator=default_iterator, task_func=default_task_func
+        self,
+        config,
+        job_source_iterator=default_iterator,
+        task_func=default_task_func,
+        worker_init_func=None,
+        worker_close_func=None,
     ):
         """
         parameters:
@@ -77,13 +82,21 @@ class TaskManager(RequiredConfig):
                                   mapping of kwargs.
                                   Ex:  (('a', 17), {'x': 23})
             task_func - a function that will accept the args and kwargs yielded
-                        by the job_source_iterator"""
+                        by the job_source_iterator
+            worker_init_func - a function to set up per-worker resources;
+                               only task managers whose workers don't share
+                               memory with the caller use it
+            worker_close_func - a function to close per-worker resources;
+                                used by the same task managers as
+                                worker_init_func"""
         super().__init__()
         self.config = config
         self._pid = os.getpid()
         self.logger = logging.getLogger(__name__ + "." + self.__class__.__name__)
         self.job_param_source_iter = job_source_iterator
         self.task_func = task_func
+        self.worker_init_func = worker_init_func
+        self.worker_close_func = worker_close_func
         self.quit = False
         self.logger.debug("TaskManager finished init")
 
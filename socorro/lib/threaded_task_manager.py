@@ -45,7 +45,12 @@ class ThreadedTaskManager(TaskManager):
     )
 
     def __init__(
-        self, config, job_source_iterator=default_iterator, task_func=default_task_func
+        self,
+        config,
+        job_source_iterator=default_iterator,
+        task_func=default_task_func,
+        worker_init_func=None,
+        worker_close_func=None,
     ):
         """the constructor accepts the function that will serve as the data
         source iterator and the function that the threads will execute on
@@ -63,8 +68,13 @@ class ThreadedTaskManager(TaskManager):
                                   mapping of kwargs.
                                   Ex:  (('a', 17), {'x': 23})
             task_func - a function that will accept the args and kwargs yielded
-                        by the job_source_iterator"""
-        super().__init__(config, job_source_iterator, task_func)
+                        by the job_source_iterator
+            worker_init_func - unused; worker threads share the caller's
+                               resources
+            worker_close_func - unused; the caller closes its own resources"""
+        super().__init__(
+            config, job_source_iterator, task_func, worker_init_func, worker_close_func,
+        )
         self.thread_list = []  # the thread object storage
         self.number_of_threads = config.number_of_threads
         self.task_queue = queue.Queue(config.maximum_queue_size)
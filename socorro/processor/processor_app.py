@@ -10,7 +10,6 @@ import sys
 
 from configman import Namespace
 from configman.converters import class_converter
-from configman.dotdict import DotDict
 import markus
 
 from socorro.app.fetch_transform_save_app import FetchTransformSaveApp
@@ -168,10 +167,10 @@ class ProcessorApp(FetchTransformSaveApp):
         the processed crash is saved to the ``destination``.
 
         """
-        # Fetch the raw crash data
+        # Fetch the raw crash data, dumps, and processed crash data--there won't
+        # be any processed crash data if this crash hasn't been processed, yet
         try:
-            raw_crash = self.source.get_raw_crash(crash_id)
-            dumps = self.source.get_raw_dumps_as_files(crash_id)
+            raw_crash, dumps, processed_crash = self.source.get_crash_bundle(crash_id)
         except CrashIDNotFound:
             # If the crash isn't found, we just reject it--no need to capture
             # errors here
@@ -186,13 +185,6 @@ class ProcessorApp(FetchTransformSaveApp):
             self.processor.reject_raw_crash(crash_id, "error in loading: %s" % x)
             return
 
-        # Fetch processed crash data--there won't be any if this crash hasn't
-        # been processed, yet
-        try:
-            processed_crash = self.source.get_unredacted_processed(crash_id)
-        except CrashIDNotFound:
-            processed_crash = DotDict()
-
         # Process the crash and remove any temporary artifacts from disk
         try:
             # Process the crash to generate a processed crash
@@ -243,6 +235,20 @@ class ProcessorApp(FetchTransformSaveApp):
 
         self.processor = self.config.processor.processor_class(self.config.processor)
 
+    def _setup_worker(self):
+        """Set up per-worker source, destination, and processor."""
+        super()._setup_worker()
+        self.processor = self.config.processor.processor_class(self.config.processor)
+
+    def _close_worker(self):
+        """Close per-worker source, destination, and processor."""
+        super()._close_worker()
+        try:
+            self.processor.close()
+        except AttributeError:
+            # The processor implementation does not have a close method
+            pass
+
     def close(self):
         """Clean up the processor on shutdown."""
         super().close()
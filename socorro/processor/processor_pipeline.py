@@ -12,13 +12,15 @@ import os
 import tempfile
 
 from configman import Namespace, RequiredConfig
-from configman.converters import str_to_list
+from configman.converters import class_converter, str_to_list
 from configman.dotdict import DotDict
 
 from socorro.lib import sentry_client
 from socorro.lib.datetimeutil import utc_now
+from socorro.processor.profiling import SlowestCrashProfiler
 from socorro.processor.rules.breakpad import (
     BreakpadStackwalkerRule2015,
+    BreakpadStackwalkerServerRule,
     CrashingThreadRule,
     JitCrashCategorizeRule,
     MinidumpSha256Rule,
@@ -58,6 +60,7 @@ from socorro.processor.rules.mozilla import (
     TopMostFilesRule,
     UserDataRule,
 )
+from socorro.signature.rules import DEFAULT_FRAME_CACHE_SIZE
 
 
 class ProcessorPipeline(RequiredConfig):
@@ -120,6 +123,42 @@ class ProcessorPipeline(RequiredConfig):
         doc="a path where temporary files may be written",
         default=tempfile.gettempdir(),
     )
+    required_config.breakpad.add_option(
+        "server_pool_size",
+        doc=(
+            "number of long-lived stackwalker processes to run in server mode; "
+            "0 runs a new stackwalker process for every minidump"
+        ),
+        default=0,
+    )
+    required_config.breakpad.add_option(
+        "server_max_requests",
+        doc=(
+            "number of minidumps a stackwalker server processes before it's "
+            "replaced; 0 means never replace"
+        ),
+        default=1000,
+    )
+    required_config.breakpad.output_cache = Namespace()
+    required_config.breakpad.output_cache.add_option(
+        "cache_class",
+        doc=(
+            "fully qualified dotted Python classname of the stackwalker output "
+            "cache (for example, socorro.processor.stackwalker_cache."
+            "DiskStackwalkerCache); empty to not cache output"
+        ),
+        default="",
+        from_string_converter=class_converter,
+    )
+    required_config.breakpad.output_cache.add_option(
+        "bypass",
+        doc=(
+            "always run the stackwalker and replace cached output; output with "
+            "missing symbols is never cached, so this is only needed when "
+            "symbols were replaced"
+        ),
+        default=False,
+    )
 
     # JitClassCategorizationRule configuration
     required_config.jit = Namespace()
@@ -151,6 +190,45 @@ class ProcessorPipeline(RequiredConfig):
         doc="url for the version string api endpoint in the webapp",
         default="https://crash-stats.mozilla.org/api/VersionString",
     )
+    required_config.betaversion.add_option(
+        "version_strings_api",
+        doc=(
+            "url for the bulk version strings api endpoint in the webapp used to "
+            "preload version strings for recent builds; empty to disable preloading"
+        ),
+        default="https://crash-stats.mozilla.org/api/VersionStrings",
+    )
+    required_config.betaversion.add_option(
+        "preload_interval",
+        doc="seconds between preloads of version strings for recent builds",
+        default=BetaVersionRule.DEFAULT_PRELOAD_INTERVAL,
+    )
+
+    # SignatureGeneratorRule configuration
+    required_config.signature = Namespace()
+    required_config.signature.add_option(
+        "frame_cache_size",
+        doc="number of normalized frame functions to cache; 0 disables the cache",
+        default=DEFAULT_FRAME_CACHE_SIZE,
+    )
+
+    # Sampling profiler configuration
+    required_config.profiling = Namespace()
+    required_config.profiling.add_option(
+        "profile_dir",
+        doc="directory to save cProfile profiles of the slowest crashes in; empty to disable",
+        default="",
+    )
+    required_config.profiling.add_option(
+        "sample_rate",
+        doc="fraction of crashes to profile (between 0.0 and 1.0)",
+        default=0.0,
+    )
+    required_config.profiling.add_option(
+        "keep_slowest",
+        doc="number of profiles of the slowest crashes to keep",
+        default=10,
+    )
 
     def __init__(self, config, rules=None):
         super().__init__()
@@ -161,6 +239,15 @@ class ProcessorPipeline(RequiredConfig):
         for rule in self.rules:
             self.logger.info("Loaded rule: %r" % rule)
 
+        self.profiler = None
+        profiling_config = config.get("profiling")
+        if profiling_config and profiling_config.profile_dir:
+            self.profiler = SlowestCrashProfiler(
+                profile_dir=profiling_config.profile_dir,
+                sample_rate=profiling_config.sample_rate,
+                keep_slowest=profiling_config.keep_slowest,
+            )
+
     def get_ruleset(self, config):
         """Generate rule set for Mozilla crash processing.
 
@@ -186,16 +273,7 @@ class ProcessorPipeline(RequiredConfig):
             # rules to transform a raw crash into a processed crash
             IdentifierRule(),
             MinidumpSha256Rule(),
-            BreakpadStackwalkerRule2015(
-                dump_field=config.breakpad.dump_field,
-                symbols_urls=config.breakpad.symbols_urls,
-                command_line=config.breakpad.command_line,
-                command_pathname=config.breakpad.command_pathname,
-                kill_timeout=config.breakpad.kill_timeout,
-                symbol_tmp_path=config.breakpad.symbol_tmp_path,
-                symbol_cache_path=config.breakpad.symbol_cache_path,
-                tmp_storage_path=config.breakpad.tmp_storage_path,
-            ),
+            self.get_stackwalker_rule(config),
             ProductRule(),
             UserDataRule(),
             EnvironmentRule(),
@@ -210,7 +288,11 @@ class ProcessorPipeline(RequiredConfig):
             CrashingThreadRule(),
             CPUInfoRule(),
             OSInfoRule(),
-            BetaVersionRule(version_string_api=config.betaversion.version_string_api),
+            BetaVersionRule(
+                version_string_api=config.betaversion.version_string_api,
+                version_strings_api=config.betaversion.version_strings_api,
+                preload_interval=config.betaversion.preload_interval,
+            ),
             ExploitablityRule(),
             FlashVersionRule(),
             OSPrettyVersionRule(),
@@ -219,7 +301,7 @@ class ProcessorPipeline(RequiredConfig):
             ThemePrettyNameRule(),
             MemoryReportExtraction(),
             # generate signature now that we've done all the processing it depends on
-            SignatureGeneratorRule(),
+            SignatureGeneratorRule(frame_cache_size=config.signature.frame_cache_size),
             # a set of classifiers to help with jit crashes--must be last since it
             # depends on signature generation
             JitCrashCategorizeRule(
@@ -230,6 +312,39 @@ class ProcessorPipeline(RequiredConfig):
             ),
         ]
 
+    def get_stackwalker_rule(self, config):
+        """Generate the stackwalker rule.
+
+        :arg config: configman DotDict config instance
+
+        :returns: a stackwalker rule that runs the stackwalker in server mode if
+            ``breakpad.server_pool_size`` is set or once per minidump otherwise
+
+        """
+        kwargs = {
+            "dump_field": config.breakpad.dump_field,
+            "symbols_urls": config.breakpad.symbols_urls,
+            "command_line": config.breakpad.command_line,
+            "command_pathname": config.breakpad.command_pathname,
+            "kill_timeout": config.breakpad.kill_timeout,
+            "symbol_tmp_path": config.breakpad.symbol_tmp_path,
+            "symbol_cache_path": config.breakpad.symbol_cache_path,
+            "tmp_storage_path": config.breakpad.tmp_storage_path,
+        }
+        output_cache_config = config.breakpad.get("output_cache")
+        if output_cache_config and output_cache_config.cache_class:
+            kwargs["output_cache"] = output_cache_config.cache_class(
+                output_cache_config
+            )
+            kwargs["output_cache_bypass"] = output_cache_config.bypass
+        if config.breakpad.get("server_pool_size", 0):
+            return BreakpadStackwalkerServerRule(
+                pool_size=config.breakpad.server_pool_size,
+                max_requests=config.breakpad.server_max_requests,
+                **kwargs,
+            )
+        return BreakpadStackwalkerRule2015(**kwargs)
+
     def process_crash(self, raw_crash, raw_dumps, processed_crash):
         """Take a raw_crash and its associated raw_dumps and return a processed_crash
 
@@ -269,23 +384,13 @@ class ProcessorPipeline(RequiredConfig):
         start_time = self.logger.info("starting transform for crash: %s", crash_id)
         processor_meta_data.started_timestamp = start_time
 
-        # Apply rules; if a rule fails, capture the error and continue onward
-        for rule in self.rules:
-            try:
-                rule.act(raw_crash, raw_dumps, processed_crash, processor_meta_data)
-
-            except Exception as exc:
-                # If a rule throws an error, capture it and toss it in the
-                # processor notes
-                sentry_client.capture_error(
-                    logger=self.logger, extra={"crash_id": crash_id}
-                )
-                # NOTE(willkg): notes are public, so we can't put exception
-                # messages in them
-                processor_meta_data.processor_notes.append(
-                    "rule %s failed: %s"
-                    % (rule.__class__.__name__, exc.__class__.__name__)
+        if self.profiler is not None:
+            with self.profiler.profile(crash_id):
+                self.apply_rules(
+                    raw_crash, raw_dumps, processed_crash, processor_meta_data
                 )
+        else:
+            self.apply_rules(raw_crash, raw_dumps, processed_crash, processor_meta_data)
 
         # The crash made it through the processor rules with no exceptions
         # raised, call it a success
@@ -308,6 +413,26 @@ class ProcessorPipeline(RequiredConfig):
         )
         return processed_crash
 
+    def apply_rules(self, raw_crash, raw_dumps, processed_crash, processor_meta_data):
+        """Apply rules; if a rule fails, capture the error and continue onward"""
+        crash_id = raw_crash["uuid"]
+        for rule in self.rules:
+            try:
+                rule.act(raw_crash, raw_dumps, processed_crash, processor_meta_data)
+
+            except Exception as exc:
+                # If a rule throws an error, capture it and toss it in the
+                # processor notes
+                sentry_client.capture_error(
+                    logger=self.logger, extra={"crash_id": crash_id}
+                )
+                # NOTE(willkg): notes are public, so we can't put exception
+                # messages in them
+                processor_meta_data.processor_notes.append(
+                    "rule %s failed: %s"
+                    % (rule.__class__.__name__, exc.__class__.__name__)
+                )
+
     def reject_raw_crash(self, crash_id, reason):
         self.logger.warning("%s rejected: %s", crash_id, reason)
 
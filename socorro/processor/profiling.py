@@ -0,0 +1,92 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""Sampling profiler for the processor pipeline.
+
+Per-rule timings tell us which rule got slow, but not why. This profiles a
+random sample of crashes with cProfile and keeps the profiles for the slowest
+ones so they can be looked at with ``python -m pstats`` or snakeviz.
+
+"""
+
+import contextlib
+import cProfile
+import heapq
+import logging
+import os
+import random
+import threading
+import time
+
+import markus
+
+
+METRICS = markus.get_metrics("processor.profiling")
+
+
+class SlowestCrashProfiler:
+    """Profiles a sample of crashes and keeps profiles of the slowest ones
+
+    Profiles are written to ``profile_dir`` as ``<milliseconds>ms_<crash_id>.prof``
+    so sorting by name sorts by how long the crash took. Once there are more than
+    ``keep_slowest`` profiles, the fastest one is deleted.
+
+    cProfile only profiles the thread that enabled it, so this is safe to use
+    from multiple processor threads.
+
+    """
+
+    def __init__(self, profile_dir, sample_rate, keep_slowest):
+        self.profile_dir = profile_dir
+        self.sample_rate = sample_rate
+        self.keep_slowest = keep_slowest
+        self.logger = logging.getLogger(__name__ + "." + self.__class__.__name__)
+
+        # Min-heap of (elapsed seconds, profile path)
+        self._slowest = []
+        self._lock = threading.Lock()
+
+    def should_profile(self):
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    @contextlib.contextmanager
+    def profile(self, crash_id):
+        """Profile the body of the with block if this crash is sampled"""
+        if not self.should_profile():
+            yield
+            return
+
+        profiler = cProfile.Profile()
+        start_time = time.perf_counter()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            self._keep(crash_id, time.perf_counter() - start_time, profiler)
+
+    def _keep(self, crash_id, elapsed, profiler):
+        METRICS.incr("sampled")
+        with self._lock:
+            if len(self._slowest) >= self.keep_slowest and (
+                not self._slowest or elapsed <= self._slowest[0][0]
+            ):
+                return
+
+            path = os.path.join(
+                self.profile_dir, "%08dms_%s.prof" % (elapsed * 1000, crash_id)
+            )
+            profiler.dump_stats(path)
+            heapq.heappush(self._slowest, (elapsed, path))
+            self.logger.info(
+                "saved profile for %s (%.1fs): %s", crash_id, elapsed, path
+            )
+            METRICS.incr("saved")
+
+            if len(self._slowest) > self.keep_slowest:
+                _, evicted_path = heapq.heappop(self._slowest)
+                try:
+                    os.unlink(evicted_path)
+                except OSError:
+                    self.logger.warning("could not remove profile %s", evicted_path)
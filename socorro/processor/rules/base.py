@@ -3,6 +3,7 @@
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
 import logging
+import time
 
 import markus
 
@@ -57,12 +58,42 @@ class Rule:
             processing as we process
 
         """
-        rule_name = self.__class__.__name__
-        with metrics.timer("act.timing", tags=["rule:%s" % rule_name]):
-            if self.predicate(
-                raw_crash, raw_dumps, processed_crash, processor_meta_data
-            ):
-                self.action(raw_crash, raw_dumps, processed_crash, processor_meta_data)
+        tags = ["rule:%s" % self.__class__.__name__]
+        with metrics.timer("act.timing", tags=tags):
+            start_cpu_time = time.thread_time()
+            start_time = time.perf_counter()
+            try:
+                should_run = self.predicate(
+                    raw_crash, raw_dumps, processed_crash, processor_meta_data
+                )
+                predicate_end_time = time.perf_counter()
+                metrics.timing(
+                    "predicate.timing",
+                    value=(predicate_end_time - start_time) * 1000.0,
+                    tags=tags,
+                )
+                if not should_run:
+                    metrics.incr("skipped", tags=tags)
+                    return
+
+                try:
+                    self.action(
+                        raw_crash, raw_dumps, processed_crash, processor_meta_data
+                    )
+                finally:
+                    metrics.timing(
+                        "action.timing",
+                        value=(time.perf_counter() - predicate_end_time) * 1000.0,
+                        tags=tags,
+                    )
+            finally:
+                # CPU time for this thread only; wall time much larger than CPU
+                # time means the rule is waiting on something
+                metrics.timing(
+                    "act.cputime",
+                    value=(time.thread_time() - start_cpu_time) * 1000.0,
+                    tags=tags,
+                )
 
     def close(self):
         pass
@@ -4,6 +4,7 @@
 
 from collections import Mapping
 from contextlib import contextmanager, closing
+import hashlib
 import json
 import os
 import shlex
@@ -15,6 +16,7 @@ import markus
 
 from socorro.lib.util import dotdict_to_dict
 from socorro.processor.rules.base import Rule
+from socorro.processor.stackwalker_pool import StackwalkerServerPool
 
 
 class CrashingThreadRule(Rule):
@@ -96,7 +98,18 @@ class BreakpadStackwalkerRule2015(Rule):
         symbol_tmp_path,
         symbol_cache_path,
         tmp_storage_path,
+        output_cache=None,
+        output_cache_bypass=False,
     ):
+        """
+        :arg output_cache: cache for stackwalker output with ``get(key)`` and
+            ``set(key, data)`` methods (see ``socorro.processor.stackwalker_cache``)
+            or None to not cache
+        :arg output_cache_bypass: if True, always run the stackwalker and replace
+            cached output; output with missing symbols is never cached, so this
+            is only needed when symbols were replaced
+
+        """
         super().__init__()
         self.dump_field = dump_field
         self.symbols_urls = symbols_urls
@@ -106,6 +119,10 @@ class BreakpadStackwalkerRule2015(Rule):
         self.symbol_tmp_path = symbol_tmp_path
         self.symbol_cache_path = symbol_cache_path
         self.tmp_storage_path = tmp_storage_path
+        self.output_cache = output_cache
+        self.output_cache_bypass = output_cache_bypass
+        # Hash of the stackwalker binary; computed on first use
+        self._stackwalker_hash = None
 
         self.metrics = markus.get_metrics("processor.breakpadstackwalkerrule")
 
@@ -135,8 +152,7 @@ class BreakpadStackwalkerRule2015(Rule):
         finally:
             os.unlink(file_pathname)
 
-    def _interpret_output(self, fp, processor_meta, command_pathname):
-        data = fp.read()
+    def _parse_output(self, data, processor_meta, command_pathname):
         try:
             return json.loads(data)
         except Exception as x:
@@ -148,6 +164,9 @@ class BreakpadStackwalkerRule2015(Rule):
             )
         return {}
 
+    def _interpret_output(self, fp, processor_meta, command_pathname):
+        return self._parse_output(fp.read(), processor_meta, command_pathname)
+
     def _execute_external_process(
         self, crash_id, command_pathname, command_line, processor_meta
     ):
@@ -157,7 +176,113 @@ class BreakpadStackwalkerRule2015(Rule):
             processor_meta=processor_meta,
             interpret_output=self._interpret_output,
         )
+        return self._build_stackwalker_data(
+            crash_id, output, return_code, processor_meta
+        )
+
+    def _get_stackwalker_hash(self):
+        """Returns the sha256 hex digest of the stackwalker binary."""
+        if self._stackwalker_hash is None:
+            stackwalker_hash = hashlib.sha256()
+            with open(self.command_pathname, "rb") as fp:
+                for chunk in iter(lambda: fp.read(1024 * 1024), b""):
+                    stackwalker_hash.update(chunk)
+            self._stackwalker_hash = stackwalker_hash.hexdigest()
+        return self._stackwalker_hash
+
+    def _get_output_cache_key(self, raw_crash, dump_name, dump_pathname):
+        """Builds the output cache key for a minidump.
+
+        The stackwalker output depends on the minidump, the raw crash, the symbols
+        urls, the stackwalker, and how it's run, so the key covers all of them.
+
+        :returns: the key or None if output shouldn't be cached
+
+        """
+        if self.output_cache is None:
+            return None
+
+        # The collector computes the hash of the main minidump so we only need to
+        # hash additional minidumps
+        dump_hash = None
+        if dump_name == self.dump_field:
+            dump_hash = raw_crash.get("MinidumpSha256Hash")
+        try:
+            if not dump_hash:
+                dump_hash = hashlib.sha256()
+                with open(dump_pathname, "rb") as fp:
+                    for chunk in iter(lambda: fp.read(1024 * 1024), b""):
+                        dump_hash.update(chunk)
+                dump_hash = dump_hash.hexdigest()
+            stackwalker_hash = self._get_stackwalker_hash()
+        except OSError:
+            self.logger.warning("unable to build stackwalker output cache key")
+            return None
+
+        key_data = {
+            "minidump": dump_hash,
+            "raw_crash": dotdict_to_dict(raw_crash),
+            "symbols_urls": [url.strip() for url in self.symbols_urls],
+            "stackwalker": stackwalker_hash,
+            "command_line": self.command_line,
+        }
+        key_data = json.dumps(key_data, sort_keys=True).encode("utf-8")
+        return hashlib.sha256(key_data).hexdigest()
+
+    def _get_cached_output(self, cache_key):
+        """Returns cached stackwalker output or None."""
+        if cache_key is None:
+            return None
+        if self.output_cache_bypass:
+            self.metrics.incr("output_cache", tags=["result:bypass"])
+            return None
+
+        try:
+            data = self.output_cache.get(cache_key)
+        except Exception:
+            self.logger.exception("error getting cached stackwalker output")
+            data = None
+
+        if data is None:
+            self.metrics.incr("output_cache", tags=["result:miss"])
+            return None
+        self.metrics.incr("output_cache", tags=["result:hit"])
+        return json.loads(data)
+
+    def _cache_output(self, cache_key, stackwalker_data):
+        """Caches stackwalker output if the stackwalker succeeded and had all the
+        symbols it needed."""
+        if cache_key is None:
+            return
+        # Failures might be transient (timeouts, symbol server errors, etc), so
+        # only successful output is cached
+        if stackwalker_data["mdsw_return_code"] != 0 or not stackwalker_data["success"]:
+            return
+        # Symbols might get uploaded later and the key doesn't cover the symbols,
+        # so output with missing symbols isn't cached; otherwise reprocessing
+        # wouldn't pick up the new symbols
+        modules = glom.glom(stackwalker_data, "json_dump.modules", default=None) or []
+        if any(module.get("missing_symbols") for module in modules):
+            self.metrics.incr("output_cache", tags=["result:missingsymbols"])
+            return
+
+        try:
+            data = json.dumps(stackwalker_data["json_dump"]).encode("utf-8")
+            self.output_cache.set(cache_key, data)
+        except Exception:
+            self.logger.exception("error caching stackwalker output")
+
+    def _build_stackwalker_data(
+        self, crash_id, output, return_code, processor_meta, cached=False
+    ):
+        """Convert stackwalker output and return code into stackwalker data.
 
+        :arg cached: whether the output came from the output cache rather than a
+            stackwalker run
+
+        :returns: (stackwalker_data, return_code)
+
+        """
         if not isinstance(output, Mapping):
             msg = "MDSW produced unexpected output: %s (%s)" % str(output)[:20]
             processor_meta["processor_notes"].append(msg)
@@ -171,13 +296,15 @@ class BreakpadStackwalkerRule2015(Rule):
             "success": output.get("status", "") == "OK",
         }
 
-        self.metrics.incr(
-            "run",
-            tags=[
-                "outcome:%s" % ("success" if stackwalker_data["success"] else "fail"),
-                "exitcode:%s" % return_code,
-            ],
-        )
+        if not cached:
+            self.metrics.incr(
+                "run",
+                tags=[
+                    "outcome:%s"
+                    % ("success" if stackwalker_data["success"] else "fail"),
+                    "exitcode:%s" % return_code,
+                ],
+            )
 
         if return_code == 124:
             msg = "MDSW timeout (SIGKILL)"
@@ -244,6 +371,19 @@ class BreakpadStackwalkerRule2015(Rule):
 
                 dump_file_pathname = raw_dumps[dump_name]
 
+                cache_key = self._get_output_cache_key(
+                    raw_crash, dump_name, dump_file_pathname
+                )
+                output = self._get_cached_output(cache_key)
+                if output is not None:
+                    stackwalker_data, return_code = self._build_stackwalker_data(
+                        crash_id, output, 0, processor_meta, cached=True
+                    )
+                    self._save_stackwalker_data(
+                        processed_crash, dump_name, stackwalker_data
+                    )
+                    continue
+
                 command_line = self.expand_commandline(
                     dump_file_pathname=dump_file_pathname,
                     raw_crash_pathname=raw_crash_pathname,
@@ -255,12 +395,126 @@ class BreakpadStackwalkerRule2015(Rule):
                     command_line=command_line,
                     processor_meta=processor_meta,
                 )
+                self._cache_output(cache_key, stackwalker_data)
+
+                self._save_stackwalker_data(
+                    processed_crash, dump_name, stackwalker_data
+                )
+
+    def _save_stackwalker_data(self, processed_crash, dump_name, stackwalker_data):
+        if dump_name == self.dump_field:
+            processed_crash.update(stackwalker_data)
+        else:
+            processed_crash["additional_minidumps"].append(dump_name)
+            processed_crash[dump_name] = stackwalker_data
+
+
+class BreakpadStackwalkerServerRule(BreakpadStackwalkerRule2015):
+    """Runs minidumps through a pool of long-lived stackwalker servers.
+
+    This avoids process startup and symbol loading costs for every minidump
+    and caps the number of concurrent stackwalkers at ``pool_size``
+    regardless of how many threads are processing crashes. The raw crash is
+    sent in the request, so no temporary raw crash file is written.
+
+    """
+
+    def __init__(
+        self,
+        dump_field,
+        symbols_urls,
+        command_pathname,
+        command_line,
+        kill_timeout,
+        symbol_tmp_path,
+        symbol_cache_path,
+        tmp_storage_path,
+        pool_size,
+        max_requests,
+        output_cache=None,
+        output_cache_bypass=False,
+    ):
+        super().__init__(
+            dump_field=dump_field,
+            symbols_urls=symbols_urls,
+            command_pathname=command_pathname,
+            command_line=command_line,
+            kill_timeout=kill_timeout,
+            symbol_tmp_path=symbol_tmp_path,
+            symbol_cache_path=symbol_cache_path,
+            tmp_storage_path=tmp_storage_path,
+            output_cache=output_cache,
+            output_cache_bypass=output_cache_bypass,
+        )
+        self.pool_size = pool_size
+        self.max_requests = max_requests
+        self.pool = StackwalkerServerPool(
+            command_line_args=self.server_command_line_args(),
+            size=pool_size,
+            kill_timeout=kill_timeout,
+            max_requests=max_requests,
+        )
+
+    def __repr__(self):
+        keys = (
+            "dump_field",
+            "symbols_urls",
+            "command_pathname",
+            "kill_timeout",
+            "symbol_tmp_path",
+            "symbol_cache_path",
+            "pool_size",
+            "max_requests",
+        )
+        return self.generate_repr(keys=keys)
+
+    def server_command_line_args(self):
+        """Returns the args for running the stackwalker in server mode"""
+        args = [self.command_pathname, "--server"]
+        for url in self.symbols_urls:
+            args.extend(["--symbols-url", url.strip()])
+        args.extend(
+            [
+                "--symbols-cache",
+                self.symbol_cache_path,
+                "--symbols-tmp",
+                self.symbol_tmp_path,
+            ]
+        )
+        return args
+
+    def action(self, raw_crash, raw_dumps, processed_crash, processor_meta):
+        crash_id = raw_crash["uuid"]
+
+        if "additional_minidumps" not in processed_crash:
+            processed_crash["additional_minidumps"] = []
+
+        raw_crash_data = dotdict_to_dict(raw_crash)
+        for dump_name in raw_dumps.keys():
+            # Only dumps with names that start with the dump_field are for the
+            # stackwalker
+            if not dump_name.startswith(self.dump_field):
+                continue
+
+            cache_key = self._get_output_cache_key(
+                raw_crash, dump_name, raw_dumps[dump_name]
+            )
+            output = self._get_cached_output(cache_key)
+            if output is not None:
+                stackwalker_data, return_code = self._build_stackwalker_data(
+                    crash_id, output, 0, processor_meta, cached=True
+                )
+            else:
+                data, return_code = self.pool.run(raw_dumps[dump_name], raw_crash_data)
+                output = self._parse_output(data, processor_meta, self.command_pathname)
+                stackwalker_data, return_code = self._build_stackwalker_data(
+                    crash_id, output, return_code, processor_meta
+                )
+                self._cache_output(cache_key, stackwalker_data)
+            self._save_stackwalker_data(processed_crash, dump_name, stackwalker_data)
 
-                if dump_name == self.dump_field:
-                    processed_crash.update(stackwalker_data)
-                else:
-                    processed_crash["additional_minidumps"].append(dump_name)
-                    processed_crash[dump_name] = stackwalker_data
+    def close(self):
+        self.pool.close()
 
 
 class JitCrashCategorizeRule(Rule):
@@ -6,6 +6,7 @@ import datetime
 import gzip
 import json
 import re
+import threading
 import time
 from urllib.parse import unquote_plus
 
@@ -22,7 +23,8 @@ from socorro.lib.ooid import date_from_ooid
 from socorro.lib.requestslib import session_with_retries
 from socorro.lib.util import dotdict_to_dict
 from socorro.processor.rules.base import Rule
-from socorro.signature.generator import SignatureGenerator
+from socorro.signature.generator import DEFAULT_PIPELINE, SignatureGenerator
+from socorro.signature.rules import DEFAULT_FRAME_CACHE_SIZE, SignatureGenerationRule
 from socorro.signature.utils import convert_to_crash_data
 
 
@@ -31,6 +33,9 @@ from socorro.signature.utils import convert_to_crash_data
 # I'm not sure what we should replace this with.
 MAXINT = 9223372036854775807
 
+# Sentinel for cache lookups since None is a valid cached value
+NOT_CACHED = object()
+
 
 class ConvertModuleSignatureInfoRule(Rule):
     """Make ModuleSignatureInfo to a string.
@@ -662,10 +667,32 @@ class BetaVersionRule(Rule):
     #: List of products to do lookups for
     SUPPORTED_PRODUCTS = ["firefox", "fennec", "fennecandroid"]
 
-    def __init__(self, version_string_api):
+    #: Release channels to preload version strings for
+    PRELOAD_CHANNELS = ["beta", "aurora"]
+
+    #: Reload version strings every 30 minutes by default
+    DEFAULT_PRELOAD_INTERVAL = 60 * 30
+
+    def __init__(
+        self,
+        version_string_api,
+        version_strings_api=None,
+        preload_interval=DEFAULT_PRELOAD_INTERVAL,
+    ):
+        """
+        :arg version_string_api: url for the VersionString API endpoint for
+            looking up a single version string
+        :arg version_strings_api: url for the VersionStrings API endpoint for
+            loading version strings for recent builds in bulk; if None, there's
+            no preloading
+        :arg preload_interval: seconds between loads of recent version strings
+
+        """
         super().__init__()
         self.cache = ExpiringCache(
-            max_size=self.CACHE_MAX_SIZE, default_ttl=self.SHORT_CACHE_TTL
+            max_size=self.CACHE_MAX_SIZE,
+            default_ttl=self.SHORT_CACHE_TTL,
+            metrics_prefix="processor.betaversionrule",
         )
         self.metrics = markus.get_metrics("processor.betaversionrule")
 
@@ -673,8 +700,61 @@ class BetaVersionRule(Rule):
         self.version_string_api = version_string_api
         self.session = session_with_retries()
 
+        # For preloading version strings
+        self.version_strings_api = version_strings_api
+        self.preload_interval = preload_interval
+        self._preload_thread = None
+        self._preload_lock = threading.Lock()
+        self._stop_preloading = threading.Event()
+
     def __repr__(self):
-        return self.generate_repr(keys=["version_string_api"])
+        return self.generate_repr(keys=["version_string_api", "version_strings_api"])
+
+    def preload(self):
+        """Loads version strings for recent builds into the cache
+
+        :returns: number of version strings loaded
+
+        """
+        resp = self.session.get(
+            self.version_strings_api, params={"channel": self.PRELOAD_CHANNELS}
+        )
+        resp.raise_for_status()
+        hits = resp.json()["hits"]
+        for hit in hits:
+            key = "%s:%s:%s" % (hit["product"], hit["channel"], hit["build_id"])
+            self.cache.set(key, value=hit["version_string"], ttl=self.LONG_CACHE_TTL)
+        self.metrics.gauge("preload.size", len(hits))
+        return len(hits)
+
+    def _preload_periodically(self):
+        while True:
+            try:
+                self.preload()
+                self.metrics.incr("preload", tags=["result:success"])
+            except Exception:
+                self.metrics.incr("preload", tags=["result:fail"])
+                self.logger.exception("betaversionrule: error preloading versions")
+
+            if self._stop_preloading.wait(self.preload_interval):
+                return
+
+    def _start_preload_thread(self):
+        # The thread is started on first use so that nothing is running in a
+        # process that forks workers
+        if self._preload_thread is not None or not self.version_strings_api:
+            return
+        with self._preload_lock:
+            if self._preload_thread is None:
+                self._preload_thread = threading.Thread(
+                    name="BetaVersionPreload",
+                    target=self._preload_periodically,
+                    daemon=True,
+                )
+                self._preload_thread.start()
+
+    def close(self):
+        self._stop_preloading.set()
 
     def _get_real_version(self, product, channel, build_id):
         """Return real version number from crashstats_productversion table
@@ -686,6 +766,10 @@ class BetaVersionRule(Rule):
         :returns: ``None`` or the version string that should be used
 
         """
+        # Release channels are stored lowercased, so lowercase this one so it
+        # matches preloaded version strings
+        channel = channel.lower()
+
         # Fix the product so it matches the data in the table
         if (product, channel) == ("firefox", "aurora") and build_id > "20170601":
             product = "DevEdition"
@@ -695,11 +779,9 @@ class BetaVersionRule(Rule):
             product = "Fennec"
 
         key = "%s:%s:%s" % (product, channel, build_id)
-        if key in self.cache:
-            self.metrics.incr("cache", tags=["result:hit"])
-            return self.cache[key]
-
-        self.metrics.incr("cache", tags=["result:miss"])
+        real_version = self.cache.get(key, NOT_CACHED)
+        if real_version is not NOT_CACHED:
+            return real_version
 
         resp = self.session.get(
             self.version_string_api,
@@ -739,6 +821,8 @@ class BetaVersionRule(Rule):
         )
 
     def action(self, raw_crash, raw_dumps, processed_crash, processor_meta):
+        self._start_preload_thread()
+
         product = processed_crash.get("product", "").strip().lower()
         build_id = processed_crash.get("build", "").strip()
         release_channel = processed_crash.get("release_channel").strip()
@@ -898,11 +982,47 @@ class ThemePrettyNameRule(Rule):
 
 
 class SignatureGeneratorRule(Rule):
-    """Generates a Socorro crash signature."""
+    """Generates a Socorro crash signature.
 
-    def __init__(self):
+    The signature generation rule caches normalized frames. After each crash,
+    this emits the number of frame cache hits and misses since the last crash
+    and the size of the cache.
+
+    """
+
+    def __init__(self, frame_cache_size=DEFAULT_FRAME_CACHE_SIZE):
         super().__init__()
-        self.generator = SignatureGenerator(error_handler=self._error_handler)
+        pipeline = [
+            rule.__class__(frame_cache_size=frame_cache_size)
+            if isinstance(rule, SignatureGenerationRule)
+            else rule
+            for rule in DEFAULT_PIPELINE
+        ]
+        self.generator = SignatureGenerator(
+            pipeline=pipeline, error_handler=self._error_handler
+        )
+        self.frame_caches = [
+            rule.c_signature_tool.frame_cache
+            for rule in pipeline
+            if isinstance(rule, SignatureGenerationRule)
+        ]
+        self.metrics = markus.get_metrics("processor.signaturegeneratorrule")
+        self._reported = (0, 0)
+        self._reported_lock = threading.Lock()
+
+    def _report_frame_cache_stats(self):
+        hits = sum(cache.hits for cache in self.frame_caches)
+        misses = sum(cache.misses for cache in self.frame_caches)
+        with self._reported_lock:
+            reported_hits, reported_misses = self._reported
+            self._reported = (hits, misses)
+        if hits > reported_hits:
+            self.metrics.incr("frame_cache.hit", value=hits - reported_hits)
+        if misses > reported_misses:
+            self.metrics.incr("frame_cache.miss", value=misses - reported_misses)
+        self.metrics.gauge(
+            "frame_cache.size", sum(len(cache) for cache in self.frame_caches)
+        )
 
     def _error_handler(self, crash_data, exc_info, extra):
         """Captures errors from signature generation"""
@@ -917,6 +1037,7 @@ class SignatureGeneratorRule(Rule):
         processor_meta["processor_notes"].extend(ret.notes)
         # NOTE(willkg): this picks up proto_signature
         processed_crash.update(ret.extra)
+        self._report_frame_cache_stats()
 
 
 class PHCRule(Rule):
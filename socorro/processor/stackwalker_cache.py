@@ -0,0 +1,160 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""Caches for stackwalker output.
+
+Walking a minidump is the most expensive part of processing a crash. When the
+same minidump is walked again with the same raw crash, stackwalker, and symbol
+urls--for example, when crashes are reprocessed--the output can come from a
+cache instead. Output where any module is missing symbols isn't cached since the
+symbols might be uploaded later.
+
+A cache has a ``get(key)`` method which returns the cached bytes or None and a
+``set(key, data)`` method. Keys are hex digests.
+
+"""
+
+import os
+import tempfile
+import threading
+
+from configman import Namespace, RequiredConfig
+from configman.converters import class_converter
+
+
+class DiskStackwalkerCache(RequiredConfig):
+    """Stackwalker output cache on the local filesystem.
+
+    Outputs are stored in files under ``cache_path``. When the files take up more
+    than ``max_size`` bytes, the least recently used ones are deleted until they
+    take up less than 90% of that. Multiple processes can share a cache
+    directory.
+
+    """
+
+    required_config = Namespace()
+    required_config.add_option(
+        "cache_path",
+        doc="directory to store stackwalker output in",
+        default=os.path.join(tempfile.gettempdir(), "stackwalker-output"),
+    )
+    required_config.add_option(
+        "max_size",
+        doc="maximum size in bytes of the stackwalker output cache",
+        default=1024 * 1024 * 1024,
+    )
+
+    def __init__(self, config):
+        self.config = config
+        self.cache_path = config.cache_path
+        self.max_size = config.max_size
+        # Size of the cache in bytes; computed on first set
+        self._size = None
+        self._lock = threading.Lock()
+
+    def _get_pathname(self, key):
+        return os.path.join(self.cache_path, key[:2], key + ".json")
+
+    def get(self, key):
+        """Returns the cached data for key or None."""
+        pathname = self._get_pathname(key)
+        try:
+            with open(pathname, "rb") as fp:
+                data = fp.read()
+        except FileNotFoundError:
+            return None
+
+        # Update the modification time to mark it as recently used
+        try:
+            os.utime(pathname)
+        except OSError:
+            pass
+        return data
+
+    def set(self, key, data):
+        """Caches data for key."""
+        pathname = self._get_pathname(key)
+        os.makedirs(os.path.dirname(pathname), exist_ok=True)
+
+        # Write to a temporary file and rename it so readers never see a partially
+        # written file
+        tmp_pathname = "%s.%s.%s.tmp" % (pathname, os.getpid(), threading.get_ident())
+        with open(tmp_pathname, "wb") as fp:
+            fp.write(data)
+        os.replace(tmp_pathname, pathname)
+
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._list_files())
+            else:
+                self._size += len(data)
+
+            if self._size > self.max_size:
+                self._evict()
+
+    def _list_files(self):
+        """Returns list of (mtime, size, pathname) for files in the cache."""
+        files = []
+        for dirpath, _, filenames in os.walk(self.cache_path):
+            for filename in filenames:
+                if not filename.endswith(".json"):
+                    continue
+                pathname = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(pathname)
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, pathname))
+        return files
+
+    def _evict(self):
+        """Deletes least recently used files; must be called with the lock held."""
+        files = sorted(self._list_files())
+        self._size = sum(size for _, size, _ in files)
+        target_size = self.max_size * 0.9
+        for _, size, pathname in files:
+            if self._size <= target_size:
+                break
+            try:
+                os.unlink(pathname)
+            except FileNotFoundError:
+                pass
+            self._size -= size
+
+
+class S3StackwalkerCache(RequiredConfig):
+    """Stackwalker output cache in S3.
+
+    Outputs are stored in ``v1/stackwalker_output/{key}``. This doesn't delete
+    anything--use a bucket lifecycle rule to expire old outputs.
+
+    """
+
+    required_config = Namespace()
+    required_config.add_option(
+        "resource_class",
+        default="socorro.external.boto.connection_context.S3Connection",
+        doc="fully qualified dotted Python classname to handle Boto connections",
+        from_string_converter=class_converter,
+        reference_value_from="resource.boto",
+    )
+
+    def __init__(self, config):
+        self.config = config
+        self.conn = config.resource_class(config)
+
+    @staticmethod
+    def _get_path(key):
+        return "v1/stackwalker_output/%s" % key
+
+    def get(self, key):
+        """Returns the cached data for key or None."""
+        try:
+            return self.conn.load_file(self._get_path(key))
+        except self.conn.KeyNotFound:
+            return None
+
+    def set(self, key, data):
+        """Caches data for key."""
+        self.conn.save_file(self._get_path(key), data)
@@ -0,0 +1,252 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""Pool of long-lived stackwalker processes running in server mode.
+
+Rather than fork/exec'ing the stackwalker for every minidump, the processor
+can keep a pool of stackwalkers running with ``--server``. Each server reads
+framed requests from stdin and writes framed responses to stdout. A frame is
+the payload length in bytes as a decimal number, a newline, and the payload.
+
+See ``minidump-stackwalk/README.rst`` for the protocol.
+
+"""
+
+from contextlib import contextmanager
+import json
+import logging
+import os
+import queue
+import select
+import signal
+import subprocess
+import threading
+import time
+
+import markus
+
+
+# Return code for a request that timed out; this matches what the "timeout"
+# command returns so the processor notes are the same in both modes
+TIMEOUT_RETURN_CODE = 124
+
+
+class StackwalkerServerError(Exception):
+    """The stackwalker server died or sent something we couldn't read."""
+
+
+class StackwalkerServerTimeout(StackwalkerServerError):
+    """The stackwalker server didn't respond in time."""
+
+
+class StackwalkerServer:
+    """A single stackwalker process running in server mode."""
+
+    def __init__(self, command_line_args):
+        self.process = subprocess.Popen(
+            command_line_args,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        self.requests = 0
+        self._buffer = b""
+
+    @property
+    def pid(self):
+        return self.process.pid
+
+    def is_alive(self):
+        return self.process.poll() is None
+
+    def _read_some(self, deadline):
+        """Read whatever is available on stdout into the buffer."""
+        fd = self.process.stdout.fileno()
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise StackwalkerServerTimeout("timed out waiting for stackwalker")
+        readable, _, _ = select.select([fd], [], [], remaining)
+        if not readable:
+            raise StackwalkerServerTimeout("timed out waiting for stackwalker")
+        data = os.read(fd, 65536)
+        if not data:
+            raise StackwalkerServerError("stackwalker closed stdout")
+        self._buffer += data
+
+    def _read_frame(self, deadline):
+        while b"\n" not in self._buffer:
+            self._read_some(deadline)
+        header, self._buffer = self._buffer.split(b"\n", 1)
+        try:
+            length = int(header)
+        except ValueError:
+            raise StackwalkerServerError("bad frame header: %r" % header[:20])
+
+        while len(self._buffer) < length:
+            self._read_some(deadline)
+        payload, self._buffer = self._buffer[:length], self._buffer[length:]
+        return payload
+
+    def request(self, minidump_pathname, raw_crash, timeout):
+        """Process a minidump and return the stackwalker's output.
+
+        :arg minidump_pathname: path to the minidump file
+        :arg raw_crash: the raw crash annotations as a dict
+        :arg timeout: seconds to wait for the response
+
+        :returns: the response payload as bytes
+
+        :raises StackwalkerServerTimeout: if the server doesn't respond in time
+        :raises StackwalkerServerError: if the server dies or sends garbage
+
+        """
+        deadline = time.monotonic() + timeout
+        payload = json.dumps(
+            {"minidump": minidump_pathname, "raw_crash": raw_crash}
+        ).encode("utf-8")
+        self.requests += 1
+        try:
+            self.process.stdin.write(b"%d\n" % len(payload) + payload)
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError) as exc:
+            raise StackwalkerServerError("error writing request: %s" % exc)
+        return self._read_frame(deadline)
+
+    def kill(self):
+        """Kill the server and return its return code."""
+        if self.is_alive():
+            self.process.send_signal(signal.SIGKILL)
+        return_code = self.process.wait()
+        self._close_pipes()
+        return return_code
+
+    def close(self, timeout=5):
+        """Ask the server to exit by closing stdin; kill it if it doesn't."""
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self._close_pipes()
+
+    def _close_pipes(self):
+        for fp in (self.process.stdin, self.process.stdout):
+            try:
+                fp.close()
+            except OSError:
+                pass
+
+
+class StackwalkerServerPool:
+    """Thread-safe pool of stackwalker servers.
+
+    Servers are started lazily, so creating a pool in a parent process that
+    forks workers doesn't start any stackwalkers in the parent. At most
+    ``size`` requests are run concurrently; other callers wait for a server.
+    Servers that die or time out are killed and replaced on the next request.
+    Servers are recycled after ``max_requests`` requests to bound the memory
+    used by symbols they've loaded.
+
+    """
+
+    def __init__(self, command_line_args, size, kill_timeout, max_requests=0):
+        self.command_line_args = command_line_args
+        self.size = size
+        self.kill_timeout = kill_timeout
+        self.max_requests = max_requests
+
+        self.logger = logging.getLogger(__name__ + "." + self.__class__.__name__)
+        self.metrics = markus.get_metrics("processor.stackwalkerpool")
+
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._servers = set()
+
+    def _spawn(self):
+        server = StackwalkerServer(self.command_line_args)
+        with self._lock:
+            self._servers.add(server)
+        self.metrics.incr("spawn")
+        self.logger.debug("started stackwalker server %s", server.pid)
+        return server
+
+    def _discard(self, server, kill=False):
+        with self._lock:
+            self._servers.discard(server)
+        if kill:
+            return server.kill()
+        server.close()
+        return server.process.returncode
+
+    @contextmanager
+    def _checkout(self):
+        self._slots.acquire()
+        try:
+            server = None
+            while server is None:
+                try:
+                    server = self._idle.get_nowait()
+                except queue.Empty:
+                    server = self._spawn()
+                    break
+                if not server.is_alive():
+                    self._discard(server, kill=True)
+                    server = None
+            yield server
+        finally:
+            self._slots.release()
+
+    def run(self, minidump_pathname, raw_crash):
+        """Run a minidump through a stackwalker server.
+
+        :arg minidump_pathname: path to the minidump file
+        :arg raw_crash: the raw crash annotations as a dict
+
+        :returns: ``(output, return_code)`` where output is the response
+            payload as a str and return_code is 0 on success,
+            ``TIMEOUT_RETURN_CODE`` if the request timed out, or the server's
+            return code if it died
+
+        """
+        with self._checkout() as server:
+            try:
+                output = server.request(
+                    minidump_pathname, raw_crash, timeout=self.kill_timeout
+                )
+            except StackwalkerServerTimeout:
+                self.metrics.incr("timeout")
+                self._discard(server, kill=True)
+                return "", TIMEOUT_RETURN_CODE
+            except StackwalkerServerError as exc:
+                return_code = self._discard(server, kill=True)
+                self.metrics.incr("died")
+                self.logger.warning(
+                    "stackwalker server %s died: %s (%s)", server.pid, exc, return_code
+                )
+                # If the server exited cleanly, it still failed to respond
+                return "", return_code or -1
+            except Exception:
+                # The server may be in the middle of a request, so it can't be
+                # reused
+                self._discard(server, kill=True)
+                raise
+
+            if self.max_requests and server.requests >= self.max_requests:
+                self._discard(server)
+            else:
+                self._idle.put(server)
+            return output.decode("utf-8"), 0
+
+    def close(self):
+        """Stop all the servers."""
+        with self._lock:
+            servers = list(self._servers)
+            self._servers.clear()
+        for server in servers:
+            server.close()
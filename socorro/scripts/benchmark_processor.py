@@ -0,0 +1,514 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import argparse
+from collections import defaultdict, namedtuple
+import gc
+import glob
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from configman import ConfigurationManager
+from configman.dotdict import DotDict
+import markus
+from markus.backends import BackendBase
+
+from socorro.processor.processor_pipeline import ProcessorPipeline
+from socorro.processor.rules.breakpad import (
+    BreakpadStackwalkerRule2015,
+    JitCrashCategorizeRule,
+)
+from socorro.processor.rules.mozilla import BetaVersionRule
+from socorro.scripts import WrappedTextHelpFormatter
+
+
+DESCRIPTION = """
+Replays a corpus of crashes through the processor pipeline and reports timings
+"""
+
+EPILOG = """
+The corpus is a directory of crash data as written by "socorro-cmd fetch_crash_data" with
+"--processed". Crashes without processed crash data are skipped.
+
+Rules that call out to other programs or services are replaced with rules that replay what was
+recorded in the processed crash: the stackwalker output comes from "json_dump" and
+"mdsw_return_code", JIT categorization comes from "classifications.jit", and beta version lookups
+come from "version". Everything else runs as it does in the processor.
+
+To compare with an earlier run, save that run with "--output" and pass it in with "--baseline".
+
+"""
+
+
+RecordedCrash = namedtuple(
+    "RecordedCrash", ["crash_id", "raw_crash", "raw_dumps", "processed_crash"]
+)
+
+
+def load_json(path):
+    with open(path, "r") as fp:
+        return json.load(fp)
+
+
+def load_corpus(corpusdir):
+    """Load crashes in the fetch_crash_data layout
+
+    :arg str corpusdir: the directory with crash data
+
+    :returns: list of RecordedCrash
+
+    """
+    crashes = []
+    raw_crash_paths = glob.glob(
+        os.path.join(corpusdir, "v2", "raw_crash", "*", "*", "*")
+    )
+    for raw_crash_path in sorted(raw_crash_paths):
+        crash_id = os.path.basename(raw_crash_path)
+        processed_crash_path = os.path.join(
+            corpusdir, "v1", "processed_crash", crash_id
+        )
+        if not os.path.exists(processed_crash_path):
+            print("Skipping %s: no processed crash" % crash_id)
+            continue
+
+        raw_crash = load_json(raw_crash_path)
+        raw_crash.setdefault("uuid", crash_id)
+
+        # Dumps that were fetched; rules like MemoryReportExtraction read them
+        raw_dumps = {}
+        dump_names_path = os.path.join(corpusdir, "v1", "dump_names", crash_id)
+        if os.path.exists(dump_names_path):
+            for dump_name in load_json(dump_names_path):
+                file_name = "dump" if dump_name == "upload_file_minidump" else dump_name
+                dump_path = os.path.join(corpusdir, "v1", file_name, crash_id)
+                if os.path.exists(dump_path):
+                    raw_dumps[dump_name] = dump_path
+
+        crashes.append(
+            RecordedCrash(
+                crash_id=crash_id,
+                raw_crash=raw_crash,
+                raw_dumps=raw_dumps,
+                processed_crash=load_json(processed_crash_path),
+            )
+        )
+    return crashes
+
+
+class ReplayStackwalkerRule(BreakpadStackwalkerRule2015):
+    """Replays recorded stackwalker output rather than running the stackwalker
+
+    The output is kept as a JSON string and parsed for every crash so the cost
+    of parsing stackwalker output is part of the benchmark.
+
+    """
+
+    def __init__(self, recorded, **kwargs):
+        super().__init__(**kwargs)
+        # crash id -> dump name -> (stackwalker output, return code)
+        self.recorded = {}
+        for crash in recorded:
+            processed_crash = crash.processed_crash
+            outputs = {}
+            if "json_dump" in processed_crash:
+                outputs[self.dump_field] = (
+                    json.dumps(processed_crash["json_dump"]),
+                    processed_crash.get("mdsw_return_code", 0),
+                )
+            for dump_name in processed_crash.get("additional_minidumps", []):
+                dump_data = processed_crash.get(dump_name) or {}
+                if "json_dump" in dump_data:
+                    outputs[dump_name] = (
+                        json.dumps(dump_data["json_dump"]),
+                        dump_data.get("mdsw_return_code", 0),
+                    )
+            self.recorded[crash.crash_id] = outputs
+
+    def action(self, raw_crash, raw_dumps, processed_crash, processor_meta):
+        crash_id = raw_crash["uuid"]
+
+        if "additional_minidumps" not in processed_crash:
+            processed_crash["additional_minidumps"] = []
+
+        for dump_name, (output, return_code) in self.recorded[crash_id].items():
+            stackwalker_data, return_code = self._build_stackwalker_data(
+                crash_id,
+                self._parse_output(output, processor_meta, "replay"),
+                return_code,
+                processor_meta,
+            )
+            self._save_stackwalker_data(processed_crash, dump_name, stackwalker_data)
+
+
+class ReplayJitCrashCategorizeRule(JitCrashCategorizeRule):
+    """Replays recorded JIT categorization rather than running the categorizer"""
+
+    def __init__(self, recorded, **kwargs):
+        super().__init__(**kwargs)
+        self.recorded = {
+            crash.crash_id: (crash.processed_crash.get("classifications") or {}).get(
+                "jit"
+            )
+            for crash in recorded
+        }
+
+    def action(self, raw_crash, raw_dumps, processed_crash, processor_meta):
+        jit = self.recorded.get(raw_crash["uuid"])
+        if jit:
+            processed_crash.setdefault("classifications", {})["jit"] = dict(jit)
+
+
+class ReplayBetaVersionRule(BetaVersionRule):
+    """Replays recorded versions rather than looking them up in the webapp"""
+
+    def __init__(self, recorded):
+        super().__init__(version_string_api=None)
+        self.versions = {}
+        for crash in recorded:
+            processed_crash = crash.processed_crash
+            key = (
+                processed_crash.get("product", "").strip().lower(),
+                processed_crash.get("release_channel", "").strip(),
+                str(processed_crash.get("build", "")).strip(),
+            )
+            self.versions[key] = processed_crash.get("version")
+
+    def _get_real_version(self, product, channel, build_id):
+        return self.versions.get((product, channel, build_id))
+
+
+class ReplayProcessorPipeline(ProcessorPipeline):
+    """ProcessorPipeline with external rules replaced by replay rules"""
+
+    def __init__(self, config, recorded):
+        self.recorded = recorded
+        super().__init__(config)
+
+    def get_stackwalker_rule(self, config):
+        return ReplayStackwalkerRule(
+            recorded=self.recorded,
+            dump_field=config.breakpad.dump_field,
+            symbols_urls=config.breakpad.symbols_urls,
+            command_line=config.breakpad.command_line,
+            command_pathname=config.breakpad.command_pathname,
+            kill_timeout=config.breakpad.kill_timeout,
+            symbol_tmp_path=config.breakpad.symbol_tmp_path,
+            symbol_cache_path=config.breakpad.symbol_cache_path,
+            tmp_storage_path=config.breakpad.tmp_storage_path,
+        )
+
+    def get_ruleset(self, config):
+        rules = []
+        for rule in super().get_ruleset(config):
+            if isinstance(rule, JitCrashCategorizeRule):
+                rule = ReplayJitCrashCategorizeRule(
+                    recorded=self.recorded,
+                    dump_field=rule.dump_field,
+                    command_pathname=rule.command_pathname,
+                    command_line=rule.command_line,
+                    kill_timeout=rule.kill_timeout,
+                )
+            elif isinstance(rule, BetaVersionRule):
+                rule = ReplayBetaVersionRule(recorded=self.recorded)
+            rules.append(rule)
+        return rules
+
+
+def get_pipeline_config():
+    config_manager = ConfigurationManager(
+        definition_source=ProcessorPipeline.get_required_config(),
+        values_source_list=[],
+        argv_source=[],
+    )
+    config = config_manager.get_config()
+    config.processor_name = "benchmark"
+    return config
+
+
+class RuleTimingsBackend(BackendBase):
+    """Markus backend that collects the processor rule metrics in memory"""
+
+    def __init__(self, options=None, filters=None):
+        super().__init__(options=options, filters=filters)
+        self.timings = options["timings"]
+        self.skipped = options["skipped"]
+
+    def emit(self, record):
+        if not record.key.startswith("processor.rule."):
+            return
+        rule_name = None
+        for tag in record.tags:
+            if tag.startswith("rule:"):
+                rule_name = tag[len("rule:") :]
+        if rule_name is None:
+            return
+
+        key = record.key[len("processor.rule.") :]
+        if record.stat_type == "incr" and key == "skipped":
+            self.skipped[rule_name] += record.value
+        elif record.stat_type == "timing":
+            self.timings[(rule_name, key)].append(record.value)
+
+
+def percentile(sorted_values, pct):
+    """Return the nearest-rank percentile of a sorted list of values"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, int(round(pct / 100.0 * len(sorted_values))) - 1)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+def run_benchmark(pipeline, crashes, iterations, trace_memory=False):
+    """Replay crashes through the pipeline and collect measurements
+
+    :arg pipeline: the ProcessorPipeline to use
+    :arg crashes: list of RecordedCrash
+    :arg iterations: number of times to replay the corpus
+    :arg trace_memory: whether to measure peak memory allocated per crash with
+        tracemalloc; this makes processing a lot slower
+
+    :returns: dict of results that can be saved as JSON
+
+    """
+    timings = defaultdict(list)
+    skipped = defaultdict(int)
+    markus.configure(
+        [
+            {
+                "class": RuleTimingsBackend,
+                "options": {"timings": timings, "skipped": skipped},
+            }
+        ]
+    )
+
+    latencies = []
+    peak_memory = []
+    gc_collections_start = sum(stat["collections"] for stat in gc.get_stats())
+    if trace_memory:
+        tracemalloc.start()
+
+    start_time = time.perf_counter()
+    try:
+        for i in range(iterations):
+            for crash in crashes:
+                # Rules modify the raw crash, so each run gets a fresh copy
+                raw_crash = json.loads(json.dumps(crash.raw_crash), object_hook=DotDict)
+                if trace_memory:
+                    tracemalloc.clear_traces()
+                crash_start_time = time.perf_counter()
+                pipeline.process_crash(raw_crash, crash.raw_dumps, DotDict())
+                latencies.append((time.perf_counter() - crash_start_time) * 1000.0)
+                if trace_memory:
+                    peak_memory.append(tracemalloc.get_traced_memory()[1] / 1024.0)
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+        markus.configure([])
+    total_time = time.perf_counter() - start_time
+
+    latencies.sort()
+    peak_memory.sort()
+    rules = {}
+    for (rule_name, key), values in timings.items():
+        rule = rules.setdefault(rule_name, {"skipped": skipped.get(rule_name, 0)})
+        rule[key.replace(".", "_") + "_total_ms"] = sum(values)
+        rule[key.replace(".", "_") + "_mean_ms"] = sum(values) / len(values)
+
+    return {
+        "crashes": len(latencies),
+        "total_time_s": total_time,
+        "crashes_per_sec": len(latencies) / total_time if total_time else 0.0,
+        "latency_ms": {
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": latencies[-1] if latencies else 0.0,
+        },
+        "peak_memory_kb": {
+            "p50": percentile(peak_memory, 50),
+            "p95": percentile(peak_memory, 95),
+            "max": peak_memory[-1] if peak_memory else 0.0,
+        },
+        "gc_collections": (
+            sum(stat["collections"] for stat in gc.get_stats()) - gc_collections_start
+        ),
+        "rules": rules,
+    }
+
+
+def format_change(value, baseline_value, higher_is_better=False):
+    if baseline_value is None:
+        return ""
+    if not baseline_value:
+        return "  (baseline %.2f)" % baseline_value
+    change = (value - baseline_value) / baseline_value * 100.0
+    if higher_is_better:
+        change = -change
+    return "  (%.1f%% %s)" % (abs(change), "worse" if change > 0 else "better")
+
+
+def print_results(results, baseline=None, top=15):
+    baseline = baseline or {}
+    print("Crashes processed: %d" % results["crashes"])
+    print(
+        "Throughput:        %.2f crashes/sec%s"
+        % (
+            results["crashes_per_sec"],
+            format_change(
+                results["crashes_per_sec"],
+                baseline.get("crashes_per_sec"),
+                higher_is_better=True,
+            ),
+        )
+    )
+    for key in ("p50", "p95", "p99", "max"):
+        print(
+            "Latency %-4s       %.2f ms%s"
+            % (
+                key + ":",
+                results["latency_ms"][key],
+                format_change(
+                    results["latency_ms"][key], baseline.get("latency_ms", {}).get(key),
+                ),
+            )
+        )
+    if results["peak_memory_kb"]["max"]:
+        for key in ("p50", "p95", "max"):
+            print(
+                "Peak memory %-4s   %.1f KB%s"
+                % (
+                    key + ":",
+                    results["peak_memory_kb"][key],
+                    format_change(
+                        results["peak_memory_kb"][key],
+                        baseline.get("peak_memory_kb", {}).get(key),
+                    ),
+                )
+            )
+    print("GC collections:    %d" % results["gc_collections"])
+
+    print("")
+    print("Slowest rules by total time:")
+    print(
+        "  %-36s %12s %10s %10s %10s %8s"
+        % ("rule", "total ms", "mean ms", "pred ms", "cpu ms", "skipped")
+    )
+    rules = sorted(
+        results["rules"].items(),
+        key=lambda item: item[1].get("act_timing_total_ms", 0),
+        reverse=True,
+    )
+    baseline_rules = baseline.get("rules", {})
+    for rule_name, rule in rules[:top]:
+        baseline_mean = baseline_rules.get(rule_name, {}).get("act_timing_mean_ms")
+        print(
+            "  %-36s %12.2f %10.3f %10.3f %10.3f %8d%s"
+            % (
+                rule_name,
+                rule.get("act_timing_total_ms", 0),
+                rule.get("act_timing_mean_ms", 0),
+                rule.get("predicate_timing_mean_ms", 0),
+                rule.get("act_cputime_mean_ms", 0),
+                rule["skipped"],
+                format_change(rule.get("act_timing_mean_ms", 0), baseline_mean),
+            )
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        formatter_class=WrappedTextHelpFormatter,
+        description=DESCRIPTION.strip(),
+        epilog=EPILOG.strip(),
+    )
+    parser.add_argument(
+        "--iterations",
+        type=int,
+        default=1,
+        help="number of times to replay the corpus",
+    )
+    parser.add_argument(
+        "--warmup",
+        type=int,
+        default=1,
+        help="number of times to replay the corpus before measuring",
+    )
+    parser.add_argument(
+        "--memory",
+        action="store_true",
+        help="measure peak memory allocated per crash with tracemalloc (slow)",
+    )
+    parser.add_argument("--output", help="file to save results to as JSON")
+    parser.add_argument(
+        "--baseline", help="results file from an earlier run to compare to"
+    )
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=None,
+        help="exit with 1 if p95 latency is this many percent worse than the baseline",
+    )
+    parser.add_argument("corpusdir", help="directory of crash data to replay")
+
+    if argv is None:
+        args = parser.parse_args()
+    else:
+        args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.corpusdir):
+        print("%s is not a directory. Please fix. Exiting." % args.corpusdir)
+        return 1
+
+    crashes = load_corpus(args.corpusdir)
+    if not crashes:
+        print("No crashes with processed crash data found. Exiting.")
+        return 1
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r") as fp:
+            baseline = json.load(fp)
+
+    with tempfile.TemporaryDirectory() as tmp_path:
+        config = get_pipeline_config()
+        config.breakpad.tmp_storage_path = tmp_path
+        pipeline = ReplayProcessorPipeline(config, recorded=crashes)
+
+        print("Replaying %d crashes..." % len(crashes))
+        if args.warmup:
+            run_benchmark(pipeline, crashes, iterations=args.warmup)
+        results = run_benchmark(
+            pipeline, crashes, iterations=args.iterations, trace_memory=args.memory
+        )
+        pipeline.close()
+
+    print("")
+    print_results(results, baseline=baseline)
+
+    if args.output:
+        with open(args.output, "w") as fp:
+            json.dump(results, fp, indent=2, sort_keys=True)
+        print("")
+        print("Results saved to %s" % args.output)
+
+    if baseline and args.max_regression is not None:
+        baseline_p95 = baseline["latency_ms"]["p95"]
+        if baseline_p95:
+            change = (results["latency_ms"]["p95"] - baseline_p95) / baseline_p95 * 100
+            if change > args.max_regression:
+                print(
+                    "p95 latency is %.1f%% worse than baseline (max %.1f%%)."
+                    % (change, args.max_regression)
+                )
+                return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,9 +3,14 @@
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
 import argparse
+from concurrent.futures import ThreadPoolExecutor
+import email.utils
 import json
 import os
 import os.path
+import tempfile
+import threading
+import time
 
 from socorro.lib.datetimeutil import JsonDTEncoder
 from socorro.lib.requestslib import session_with_retries
@@ -31,8 +36,18 @@ To create an API token for Socorro in -prod, visit:
 
     https://crash-stats.mozilla.org/api/tokens/
 
+Crashes that have already been fetched to the directory are skipped and files are written
+atomically, so if a run is interrupted, you can run it again with the same crash ids and it'll
+pick up where it left off.
+
 """
 
+# Seconds to wait after an HTTP 429 response without a usable Retry-After header
+DEFAULT_RETRY_AFTER = 30
+
+# Number of times to try a request that keeps getting HTTP 429 responses
+MAX_RATE_LIMITED_ATTEMPTS = 10
+
 
 class CrashDoesNotExist(Exception):
     pass
@@ -42,25 +57,167 @@ class BadAPIToken(Exception):
     pass
 
 
+class RateLimitedError(Exception):
+    pass
+
+
 def create_dir_if_needed(d):
-    if not os.path.exists(d):
-        os.makedirs(d)
+    os.makedirs(d, exist_ok=True)
+
+
+def write_atomically(fn, data):
+    """Write data to a file so the file is either complete or doesn't exist
+
+    The data is written to a temporary file in the same directory which is then
+    renamed. The temporary file starts with a . so it's skipped by globs.
+
+    :arg str fn: the path to write to
+    :arg bytes data: the data to write
+
+    """
+    dirname, basename = os.path.split(fn)
+    create_dir_if_needed(dirname)
+    fd, tmp_fn = tempfile.mkstemp(dir=dirname, prefix="." + basename, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fp:
+            fp.write(data)
+        os.replace(tmp_fn, fn)
+    except BaseException:
+        os.unlink(tmp_fn)
+        raise
+
+
+def write_json_atomically(fn, data, **kwargs):
+    write_atomically(fn, json.dumps(data, **kwargs).encode("utf-8"))
+
+
+def parse_retry_after(value):
+    """Returns the number of seconds to wait for a Retry-After header value
+
+    The value is either a number of seconds or an HTTP date.
+
+    """
+    if not value:
+        return DEFAULT_RETRY_AFTER
+    try:
+        return max(0, int(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER
+    return max(0, retry_at.timestamp() - time.time())
+
+
+class RateLimitedSession:
+    """Thread-safe requests wrapper that backs off when rate limited
+
+    Each thread gets its own session. When any request gets an HTTP 429, all
+    threads wait as long as the Retry-After header says before sending more
+    requests, and the rate-limited request is retried.
+
+    """
+
+    def __init__(self, max_attempts=MAX_RATE_LIMITED_ATTEMPTS):
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._paused_until = 0
+
+    def _get_session(self):
+        if not hasattr(self._local, "session"):
+            # We handle 429 here so all threads back off together
+            self._local.session = session_with_retries(status_forcelist=(500,))
+        return self._local.session
+
+    def _wait(self):
+        while True:
+            with self._lock:
+                delay = self._paused_until - time.monotonic()
+            if delay <= 0:
+                return
+            time.sleep(delay)
+
+    def _pause(self, seconds):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def get(self, url, **kwargs):
+        for attempt in range(self.max_attempts):
+            self._wait()
+            resp = self._get_session().get(url, **kwargs)
+            if resp.status_code != 429:
+                return resp
+
+            retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+            print("Rate limited; waiting %ds" % retry_after)
+            self._pause(retry_after)
+        raise RateLimitedError(
+            "still rate limited after %d attempts: %s" % (self.max_attempts, url)
+        )
+
+
+def get_raw_crash_path(outputdir, crash_id):
+    return os.path.join(
+        outputdir, "v2", "raw_crash", crash_id[0:3], "20" + crash_id[-6:], crash_id
+    )
+
+
+def get_dump_path(outputdir, dump_name, crash_id):
+    # We store "upload_file_minidump" as "dump"
+    if dump_name == "upload_file_minidump":
+        dump_name = "dump"
+    return os.path.join(outputdir, "v1", dump_name, crash_id)
+
+
+def is_fetched(fetchraw, fetchdumps, fetchprocessed, outputdir, crash_id):
+    """Returns whether everything we want for this crash is in outputdir"""
+    if fetchraw and not os.path.exists(get_raw_crash_path(outputdir, crash_id)):
+        return False
+
+    if fetchdumps:
+        dump_names_path = os.path.join(outputdir, "v1", "dump_names", crash_id)
+        if not os.path.exists(dump_names_path):
+            return False
+        with open(dump_names_path, "r") as fp:
+            dump_names = json.load(fp)
+        for dump_name in dump_names:
+            if not os.path.exists(get_dump_path(outputdir, dump_name, crash_id)):
+                return False
+
+    if fetchprocessed and not os.path.exists(
+        os.path.join(outputdir, "v1", "processed_crash", crash_id)
+    ):
+        return False
+
+    return True
 
 
 def fetch_crash(
-    host, fetchraw, fetchdumps, fetchprocessed, outputdir, api_token, crash_id
+    host,
+    fetchraw,
+    fetchdumps,
+    fetchprocessed,
+    outputdir,
+    api_token,
+    crash_id,
+    session=None,
 ):
     """Fetch crash data and save to correct place on the file system
 
     http://antenna.readthedocs.io/en/latest/architecture.html#aws-s3-file-hierarchy
 
+    Files are written atomically. The raw crash is written last, after the dumps,
+    so a crash is only considered fetched once everything has been written.
+
     """
     if api_token:
         headers = {"Auth-Token": api_token}
     else:
         headers = {}
 
-    session = session_with_retries()
+    session = session or RateLimitedSession()
 
     if fetchraw:
         # Fetch raw crash metadata
@@ -80,14 +237,7 @@ def fetch_crash(
         # Raise an error for any other non-200 response
         resp.raise_for_status()
 
-        # Save raw crash to file system
         raw_crash = resp.json()
-        fn = os.path.join(
-            outputdir, "v2", "raw_crash", crash_id[0:3], "20" + crash_id[-6:], crash_id
-        )
-        create_dir_if_needed(os.path.dirname(fn))
-        with open(fn, "w") as fp:
-            json.dump(raw_crash, fp, cls=JsonDTEncoder, indent=2, sort_keys=True)
 
     if fetchdumps:
         # Fetch dumps
@@ -116,21 +266,13 @@ def fetch_crash(
 
             dumps[dump_name] = resp.content
 
-        # Save dump_names to file system
-        fn = os.path.join(outputdir, "v1", "dump_names", crash_id)
-        create_dir_if_needed(os.path.dirname(fn))
-        with open(fn, "w") as fp:
-            json.dump(list(dumps.keys()), fp)
-
         # Save dumps to file system
         for dump_name, data in dumps.items():
-            if dump_name == "upload_file_minidump":
-                dump_name = "dump"
+            write_atomically(get_dump_path(outputdir, dump_name, crash_id), data)
 
-            fn = os.path.join(outputdir, "v1", dump_name, crash_id)
-            create_dir_if_needed(os.path.dirname(fn))
-            with open(fn, "wb") as fp:
-                fp.write(data)
+        # Save dump_names to file system
+        fn = os.path.join(outputdir, "v1", "dump_names", crash_id)
+        write_json_atomically(fn, list(dumps.keys()))
 
     if fetchprocessed:
         # Fetch processed crash data
@@ -153,9 +295,19 @@ def fetch_crash(
         # Save processed crash to file system
         processed_crash = resp.json()
         fn = os.path.join(outputdir, "v1", "processed_crash", crash_id)
-        create_dir_if_needed(os.path.dirname(fn))
-        with open(fn, "w") as fp:
-            json.dump(processed_crash, fp, cls=JsonDTEncoder, indent=2, sort_keys=True)
+        write_json_atomically(
+            fn, processed_crash, cls=JsonDTEncoder, indent=2, sort_keys=True
+        )
+
+    if fetchraw:
+        # Save raw crash to file system
+        write_json_atomically(
+            get_raw_crash_path(outputdir, crash_id),
+            raw_crash,
+            cls=JsonDTEncoder,
+            indent=2,
+            sort_keys=True,
+        )
 
 
 def main(argv=None):
@@ -193,6 +345,20 @@ def main(argv=None):
         default=False,
         help="whether or not to save processed crash data",
     )
+    parser.add_argument(
+        "--overwrite",
+        "--no-overwrite",
+        dest="overwrite",
+        action=FlagAction,
+        default=False,
+        help="whether or not to fetch crashes that are already in the directory",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="number of crashes to fetch concurrently; defaults to %(default)s",
+    )
 
     parser.add_argument("outputdir", help="directory to place crash data in")
     parser.add_argument(
@@ -226,18 +392,50 @@ def main(argv=None):
             "No api token provided. Skipping dumps and personally identifiable information."
         )
 
-    for crash_id in args.crashid:
-        crash_id = crash_id.strip()
+    session = RateLimitedSession()
+    abort = threading.Event()
 
-        print("Working on %s..." % crash_id)
-        fetch_crash(
-            host=args.host,
+    def fetch(crash_id):
+        if abort.is_set():
+            return
+        if not args.overwrite and is_fetched(
             fetchraw=args.fetchraw,
             fetchdumps=args.fetchdumps,
             fetchprocessed=args.fetchprocessed,
             outputdir=outputdir,
-            api_token=api_token,
             crash_id=crash_id,
-        )
+        ):
+            print("Skipping %s: already fetched" % crash_id)
+            return
 
+        print("Working on %s..." % crash_id)
+        try:
+            fetch_crash(
+                host=args.host,
+                fetchraw=args.fetchraw,
+                fetchdumps=args.fetchdumps,
+                fetchprocessed=args.fetchprocessed,
+                outputdir=outputdir,
+                api_token=api_token,
+                crash_id=crash_id,
+                session=session,
+            )
+        except CrashDoesNotExist:
+            print("%s: does not exist." % crash_id)
+        except BadAPIToken as exc:
+            # Every other request is going to fail, too, so stop
+            print("Bad API token: %s" % exc)
+            abort.set()
+            return crash_id
+        except Exception as exc:
+            print("%s: error: %r" % (crash_id, exc))
+            return crash_id
+
+    crash_ids = [crash_id.strip() for crash_id in args.crashid if crash_id.strip()]
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        failed = [crash_id for crash_id in executor.map(fetch, crash_ids) if crash_id]
+
+    if failed:
+        print("Failed to fetch %d crashes; run again to retry them." % len(failed))
+        return 1
     return 0
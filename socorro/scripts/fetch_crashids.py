@@ -28,6 +28,9 @@ DEFAULT_HOST = "https://crash-stats.mozilla.org"
 
 MAX_PAGE = 1000
 
+# Super Search _cursor value for the first page of results
+CURSOR_START = "*"
+
 
 @total_ordering
 class Infinity:
@@ -75,10 +78,20 @@ def fetch_crashids(host, params, num_results):
 
     session = session_with_retries()
 
+    # Sorted queries have to page with _results_offset. Otherwise, page with
+    # _cursor so that deep pages are as cheap for Elasticsearch as the first one.
+    use_cursor = not params.get("_sort")
+
     # Set up first page
-    params["_results_offset"] = 0
+    if use_cursor:
+        params["_cursor"] = CURSOR_START
+    else:
+        params["_results_offset"] = 0
     params["_results_number"] = min(MAX_PAGE, num_results)
 
+    # We only want crash ids, so don't make Super Search compute facets for every page
+    params["_facets_size"] = 0
+
     # Fetch pages of crash ids until we've gotten as many as we want or there aren't any more to get
     crashids_count = 0
     while True:
@@ -86,7 +99,8 @@ def fetch_crashids(host, params, num_results):
         if resp.status_code != 200:
             raise Exception("Bad response: %s %s" % (resp.status_code, resp.content))
 
-        hits = resp.json()["hits"]
+        data = resp.json()
+        hits = data["hits"]
 
         for hit in hits:
             crashids_count += 1
@@ -97,20 +111,35 @@ def fetch_crashids(host, params, num_results):
                 return
 
         # If there are no more crash ids to get, we return
-        total = resp.json()["total"]
-        if not hits or crashids_count >= total:
+        if not hits:
             return
 
         # Get the next page, but only as many results as we need
-        params["_results_offset"] += MAX_PAGE
-        params["_results_number"] = min(
-            # MAX_PAGE is the maximum we can request
-            MAX_PAGE,
-            # The number of results Super Search can return to us that is hasn't returned so far
-            total - crashids_count,
-            # The numver of results we want that we haven't gotten, yet
-            num_results - crashids_count,
-        )
+        if use_cursor:
+            # In cursor mode, total only counts the hits after the cursor, so it
+            # can't tell us how many are left; stop when there's no next page
+            if not data.get("next_cursor"):
+                return
+            params["_cursor"] = data["next_cursor"]
+            params["_results_number"] = min(
+                # MAX_PAGE is the maximum we can request
+                MAX_PAGE,
+                # The numver of results we want that we haven't gotten, yet
+                num_results - crashids_count,
+            )
+        else:
+            total = data["total"]
+            if crashids_count >= total:
+                return
+            params["_results_offset"] += MAX_PAGE
+            params["_results_number"] = min(
+                # MAX_PAGE is the maximum we can request
+                MAX_PAGE,
+                # The number of results Super Search can return to us that is hasn't returned so far
+                total - crashids_count,
+                # The numver of results we want that we haven't gotten, yet
+                num_results - crashids_count,
+            )
 
 
 def extract_params(url):
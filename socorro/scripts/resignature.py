@@ -0,0 +1,346 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import argparse
+from collections import Counter, defaultdict
+import contextlib
+import csv
+import gzip
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import boto3
+
+from socorro.external.boto.crashstorage import build_keys
+from socorro.scripts import WrappedTextHelpFormatter
+from socorro.signature.generator import SignatureGenerator
+from socorro.signature.utils import convert_to_crash_data
+
+
+DESCRIPTION = """
+Regenerates signatures for stored processed crashes in bulk and reports how
+signatures changed.
+"""
+
+EPILOG = """
+Sources are either directories in the layout FSPermanentStorage uses or S3
+locations of the form s3://BUCKET/CRASHIDPREFIX where the prefix is optional.
+S3 credentials and endpoint are taken from the same environment variables the
+Socorro services use::
+
+    resource.boto.access_key
+    secrets.boto.secret_access_key
+    resource.boto.region
+    resource.boto.s3_endpoint_url
+
+The report has one row per (old signature, new signature) transition with the
+number of crashes that made that transition and some example crash ids.
+"""
+
+# How many items each worker process takes at a time
+CHUNK_SIZE = 20
+
+
+class FSSource:
+    """Processed crashes in an FSPermanentStorage directory tree
+
+    Processed crashes are gzipped JSON in ``<crash_id>.jsonz`` files and the raw
+    crash, if there is one, is in ``<crash_id>.json`` next to it.
+
+    """
+
+    def __init__(self, fs_root):
+        self.fs_root = fs_root
+
+    def __str__(self):
+        return self.fs_root
+
+    def list(self):
+        """Yields paths of processed crash files"""
+        for dirpath, dirnames, filenames in os.walk(self.fs_root):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                if filename.endswith(".jsonz"):
+                    yield os.path.join(dirpath, filename)
+
+    def load(self, item):
+        """Returns ``(crash_id, raw_crash, processed_crash)`` for an item"""
+        dirpath, filename = os.path.split(item)
+        crash_id = filename[: -len(".jsonz")]
+        with gzip.open(item, "rb") as fp:
+            processed_crash = json.load(fp)
+
+        raw_crash = {}
+        raw_crash_path = os.path.join(dirpath, crash_id + ".json")
+        if os.path.exists(raw_crash_path):
+            with open(raw_crash_path, "r") as fp:
+                raw_crash = json.load(fp)
+        return crash_id, raw_crash, processed_crash
+
+
+class S3Source:
+    """Processed crashes in an S3 bucket
+
+    Crash data is stored using the keys ``BotoS3CrashStorage`` uses. The client
+    is created lazily so sources can be sent to worker processes.
+
+    """
+
+    def __init__(self, bucket, crashid_prefix=""):
+        self.bucket = bucket
+        self.crashid_prefix = crashid_prefix
+        self._client = None
+
+    def __str__(self):
+        return "s3://%s/%s" % (self.bucket, self.crashid_prefix)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_client"] = None
+        return state
+
+    @property
+    def client(self):
+        if self._client is None:
+            session = boto3.session.Session(
+                aws_access_key_id=os.environ.get("resource.boto.access_key"),
+                aws_secret_access_key=os.environ.get("secrets.boto.secret_access_key"),
+            )
+            self._client = session.client(
+                service_name="s3",
+                region_name=os.environ.get("resource.boto.region"),
+                endpoint_url=os.environ.get("resource.boto.s3_endpoint_url"),
+            )
+        return self._client
+
+    def list(self):
+        """Yields crash ids of processed crashes"""
+        prefix = "v1/processed_crash/"
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(
+            Bucket=self.bucket, Prefix=prefix + self.crashid_prefix
+        ):
+            for item in page.get("Contents", []):
+                yield item["Key"][len(prefix) :]
+
+    def _load_json(self, key):
+        try:
+            resp = self.client.get_object(Bucket=self.bucket, Key=key)
+        except self.client.exceptions.NoSuchKey:
+            return None
+        return json.loads(resp["Body"].read())
+
+    def load(self, item):
+        """Returns ``(crash_id, raw_crash, processed_crash)`` for an item"""
+        crash_id = item
+        processed_crash = self._load_json(build_keys("processed_crash", crash_id)[0])
+        if processed_crash is None:
+            raise ValueError("processed crash does not exist")
+        raw_crash = self._load_json(build_keys("raw_crash", crash_id)[0]) or {}
+        return crash_id, raw_crash, processed_crash
+
+
+def get_source(source):
+    """Returns the source object for a source argument"""
+    if source.startswith("s3://"):
+        bucket, _, crashid_prefix = source[len("s3://") :].partition("/")
+        return S3Source(bucket, crashid_prefix)
+    if not os.path.isdir(source):
+        raise ValueError("%s is not a directory or s3:// url" % source)
+    return FSSource(source)
+
+
+# Per-process state for resignature_item; set up by init_worker
+_worker = {}
+
+
+def init_worker(sources):
+    _worker["sources"] = sources
+    _worker["generator"] = SignatureGenerator()
+
+
+def resignature_item(task):
+    """Regenerates the signature for one crash
+
+    :arg task: ``(source index, item)`` tuple
+
+    :returns: ``(crash_id or item, old signature, new signature, error)``
+
+    """
+    source_index, item = task
+    try:
+        crash_id, raw_crash, processed_crash = _worker["sources"][source_index].load(
+            item
+        )
+        crash_data = convert_to_crash_data(raw_crash, processed_crash)
+        result = _worker["generator"].generate(crash_data)
+    except Exception as exc:
+        return item, None, None, "%s: %s" % (exc.__class__.__name__, exc)
+    return crash_id, processed_crash.get("signature", ""), result.signature, None
+
+
+def iter_tasks(sources):
+    for source_index, source in enumerate(sources):
+        for item in source.list():
+            yield source_index, item
+
+
+@contextlib.contextmanager
+def results_iterator(sources, workers):
+    """Yields an iterator of resignature_item results in no particular order"""
+    tasks = iter_tasks(sources)
+    if workers <= 1:
+        init_worker(sources)
+        yield map(resignature_item, tasks)
+        return
+
+    pool = multiprocessing.Pool(
+        processes=workers, initializer=init_worker, initargs=(sources,)
+    )
+    try:
+        yield pool.imap_unordered(resignature_item, tasks, chunksize=CHUNK_SIZE)
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+class Report:
+    """Tallies signature transitions"""
+
+    def __init__(self, max_examples):
+        self.max_examples = max_examples
+        self.transitions = Counter()
+        self.examples = defaultdict(list)
+        self.total = 0
+        self.changed = 0
+        self.errors = []
+
+    def add(self, crash_id, old_signature, new_signature, error):
+        if error:
+            self.errors.append((crash_id, error))
+            return
+
+        self.total += 1
+        if old_signature != new_signature:
+            self.changed += 1
+        key = (old_signature, new_signature)
+        self.transitions[key] += 1
+        if len(self.examples[key]) < self.max_examples:
+            self.examples[key].append(crash_id)
+
+    def rows(self, include_unchanged=False):
+        """Yields transition dicts with the most common transitions first"""
+        transitions = sorted(
+            self.transitions.items(), key=lambda item: (-item[1], item[0])
+        )
+        for (old_signature, new_signature), count in transitions:
+            if old_signature == new_signature and not include_unchanged:
+                continue
+            yield {
+                "old_signature": old_signature,
+                "new_signature": new_signature,
+                "count": count,
+                "crash_ids": sorted(self.examples[(old_signature, new_signature)]),
+            }
+
+
+def write_csv(rows, fp):
+    writer = csv.writer(fp, quoting=csv.QUOTE_ALL)
+    writer.writerow(["old_signature", "new_signature", "count", "crash_ids"])
+    for row in rows:
+        writer.writerow(
+            [
+                row["old_signature"],
+                row["new_signature"],
+                row["count"],
+                " ".join(row["crash_ids"]),
+            ]
+        )
+
+
+def write_jsonl(rows, fp):
+    for row in rows:
+        fp.write(json.dumps(row, sort_keys=True) + "\n")
+
+
+WRITERS = {"csv": write_csv, "jsonl": write_jsonl}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        formatter_class=WrappedTextHelpFormatter,
+        description=DESCRIPTION.strip(),
+        epilog=EPILOG.strip(),
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=multiprocessing.cpu_count(),
+        help="number of worker processes; defaults to the number of cpus",
+    )
+    parser.add_argument(
+        "--format", choices=sorted(WRITERS), default="csv", help="report format"
+    )
+    parser.add_argument(
+        "--output", help="file to write the report to; defaults to stdout"
+    )
+    parser.add_argument(
+        "--include-unchanged",
+        action="store_true",
+        help="include crashes whose signature didn't change in the report",
+    )
+    parser.add_argument(
+        "--examples",
+        type=int,
+        default=5,
+        help="number of example crash ids per transition; defaults to %(default)s",
+    )
+    parser.add_argument(
+        "sources",
+        metavar="SOURCE",
+        nargs="+",
+        help="FSPermanentStorage directory or s3://BUCKET/CRASHIDPREFIX",
+    )
+
+    if argv is None:
+        args = parser.parse_args()
+    else:
+        args = parser.parse_args(argv)
+
+    try:
+        sources = [get_source(source) for source in args.sources]
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    report = Report(max_examples=args.examples)
+    start_time = time.time()
+    with results_iterator(sources, args.workers) as results:
+        for result in results:
+            report.add(*result)
+    elapsed = time.time() - start_time
+
+    rows = report.rows(include_unchanged=args.include_unchanged)
+    if args.output:
+        with open(args.output, "w") as fp:
+            WRITERS[args.format](rows, fp)
+    else:
+        WRITERS[args.format](rows, sys.stdout)
+
+    for crash_id, error in report.errors:
+        print("WARNING: %s: %s" % (crash_id, error), file=sys.stderr)
+    print(
+        "%d crashes, %d changed signature, %d errors in %.1fs (%.1f crashes/s)"
+        % (
+            report.total,
+            report.changed,
+            len(report.errors),
+            elapsed,
+            report.total / elapsed if elapsed else 0,
+        ),
+        file=sys.stderr,
+    )
+    return 1 if report.errors else 0
@@ -0,0 +1,110 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import argparse
+import timeit
+
+from .rules import CSignatureTool
+
+
+DESCRIPTION = """
+Micro-benchmark for frame normalization. Times normalizing pathological symbols
+of increasing size without the frame cache. If normalization is linear, the
+time per character should stay roughly the same as the symbols get longer.
+"""
+
+DEFAULT_SIZES = [10, 100, 1000, 5000]
+
+
+def nested_templates(size):
+    """Deeply nested C++ templates: A<A<A<...>>>::Run(A<A<...>>)"""
+    template = "mozilla::A<" * size + "int" + ">" * size
+    return "%s::Run(%s)" % (template, template)
+
+
+def flat_templates(size):
+    """One template with many arguments that are templates themselves"""
+    args = ", ".join("mozilla::Maybe<nsTArray<uint8_t>>" for i in range(size))
+    return "void mozilla::Variant<%s>::match(%s) const" % (args, args)
+
+
+def many_tokens(size):
+    """Lots of top-level tokens, with exceptions sprinkled throughout"""
+    parts = []
+    for i in range(size):
+        if i % 10 == 0:
+            parts.append("IPC::ParamTraits<nsTSubstring<char> >")
+        else:
+            parts.append("ns%d::Foo<T%d>::Bar(int)" % (i, i))
+    return "::".join(parts)
+
+
+def rust_traits(size):
+    """Rust trait methods that are exceptions for collapsing"""
+    inner = "<alloc::vec::Vec<T> as core::ops::Drop>" * size
+    return "<%s as core::ops::Drop>::drop::h0123456789abcdef" % inner
+
+
+SYMBOLS = [
+    ("nested_templates", nested_templates, False),
+    ("flat_templates", flat_templates, False),
+    ("many_tokens", many_tokens, False),
+    ("rust_traits", rust_traits, True),
+]
+
+
+def run_benchmark(sizes, number):
+    """Times normalizing each pathological symbol at each size
+
+    :arg sizes: list of symbol sizes to generate
+    :arg number: number of times to normalize each symbol
+
+    :returns: list of ``(name, size, length, seconds per call)`` tuples
+
+    """
+    tool = CSignatureTool(cache_size=0)
+    results = []
+    for name, make_symbol, is_rust in SYMBOLS:
+        if is_rust:
+            normalize = tool.normalize_rust_function
+        else:
+            normalize = tool.normalize_cpp_function
+
+        for size in sizes:
+            function = make_symbol(size)
+            seconds = timeit.timeit(lambda: normalize(function, 1), number=number)
+            results.append((name, size, len(function), seconds / number))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=DESCRIPTION)
+    parser.add_argument(
+        "--sizes",
+        default=",".join(str(size) for size in DEFAULT_SIZES),
+        help="comma-separated list of symbol sizes; defaults to %(default)s",
+    )
+    parser.add_argument(
+        "--number",
+        type=int,
+        default=10,
+        help="number of times to normalize each symbol; defaults to %(default)s",
+    )
+
+    if argv is None:
+        args = parser.parse_args()
+    else:
+        args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+
+    print(
+        "%-18s %8s %10s %14s %12s" % ("symbol", "size", "length", "ms/call", "ns/char")
+    )
+    for name, size, length, seconds in run_benchmark(sizes, args.number):
+        print(
+            "%-18s %8d %10d %14.3f %12.1f"
+            % (name, size, length, seconds * 1000, seconds * 1e9 / length)
+        )
+    return 0
@@ -2,6 +2,7 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
+from collections import namedtuple
 from itertools import islice
 import json
 import re
@@ -13,6 +14,7 @@ from .utils import (
     collapse,
     drop_bad_characters,
     drop_prefix_and_return_type,
+    LRUCache,
     parse_source_file,
 )
 
@@ -20,6 +22,10 @@ from .utils import (
 SIGNATURE_MAX_LENGTH = 255
 MAXIMUM_FRAMES_TO_CONSIDER = 40
 
+# Number of normalized function names CSignatureTool keeps; the set of functions
+# that show up in crash stacks is heavily skewed so this covers most frames
+DEFAULT_FRAME_CACHE_SIZE = 10000
+
 
 def join_ignore_empty(delimiter, list_of_strings):
     return delimiter.join(x for x in list_of_strings if x)
@@ -79,6 +85,96 @@ class SignatureTool:
         raise NotImplementedError
 
 
+SiglistMatch = namedtuple(
+    "SiglistMatch", ["sentinel", "irrelevant", "prefix", "line_number"]
+)
+SiglistMatch.__doc__ = """Which siglists a frame matched
+
+``sentinel`` is False if the frame isn't a sentinel, True if it's a sentinel,
+or a tuple of condition functions if it's only a sentinel when one of the
+conditions is true for the stack. The rest are bools.
+
+"""
+
+
+class SiglistMatcher:
+    """Classifies frames against all the siglists at once
+
+    The irrelevant, prefix, and line number lists are compiled into a single
+    regular expression with a lookahead per list, so one match tells us which
+    of the lists a frame is in. Sentinels are exact matches, so they're looked
+    up in a dict. Classifications are cached by frame.
+
+    """
+
+    def __init__(
+        self,
+        irrelevant,
+        prefix,
+        line_numbers,
+        sentinels,
+        cache_size=DEFAULT_FRAME_CACHE_SIZE,
+    ):
+        """
+        :arg irrelevant: list of irrelevant signature regexes
+        :arg prefix: list of prefix signature regexes
+        :arg line_numbers: list of signatures with line numbers regexes
+        :arg sentinels: list of sentinel frames or ``(frame, condition)`` tuples
+        :arg cache_size: maximum number of frame classifications to cache; 0
+            disables the cache
+
+        """
+        # Each list is matched the same way as re.compile("|".join(list)).match
+        self.siglists_re = re.compile(
+            "".join(
+                "(?:(?=(?P<%s>%s)))?" % (name, "|".join(patterns))
+                for name, patterns in (
+                    ("irrelevant", irrelevant),
+                    ("prefix", prefix),
+                    ("line_number", line_numbers),
+                )
+            )
+        )
+
+        # Maps sentinel frame -> True or tuple of condition functions
+        self.sentinels = {}
+        for sentinel in sentinels:
+            if type(sentinel) == tuple:
+                sentinel, condition_fn = sentinel
+                conditions = self.sentinels.get(sentinel, ())
+                if conditions is not True:
+                    self.sentinels[sentinel] = conditions + (condition_fn,)
+            else:
+                self.sentinels[sentinel] = True
+
+        self.cache = LRUCache(maxsize=cache_size)
+
+    def classify(self, frame):
+        """Returns a SiglistMatch for the frame"""
+        match = self.cache.get(frame)
+        if match is None:
+            groups = self.siglists_re.match(frame)
+            match = SiglistMatch(
+                sentinel=self.sentinels.get(frame, False),
+                irrelevant=groups.group("irrelevant") is not None,
+                prefix=groups.group("prefix") is not None,
+                line_number=groups.group("line_number") is not None,
+            )
+            self.cache.set(frame, match)
+        return match
+
+    def find_sentinel(self, source_list):
+        """Returns the index of the first sentinel frame in the list or None"""
+        sentinels = self.sentinels
+        for index, frame in enumerate(source_list):
+            sentinel = sentinels.get(frame)
+            if sentinel is True:
+                return index
+            if sentinel and any(condition_fn(source_list) for condition_fn in sentinel):
+                return index
+        return None
+
+
 class CSignatureTool(SignatureTool):
     """Generates signature from C/C++/Rust stacks.
 
@@ -90,7 +186,12 @@ class CSignatureTool(SignatureTool):
 
     hang_prefixes = {-1: "hang", 1: "chromehang"}
 
-    def __init__(self):
+    def __init__(self, cache_size=DEFAULT_FRAME_CACHE_SIZE):
+        """
+        :arg cache_size: maximum number of normalized function names to cache;
+            0 disables the cache
+
+        """
         super(CSignatureTool, self).__init__()
 
         self.irrelevant_signature_re = re.compile(
@@ -103,6 +204,13 @@ class CSignatureTool(SignatureTool):
             "|".join(siglists_utils.SIGNATURES_WITH_LINE_NUMBERS_RE)
         )
         self.signature_sentinels = siglists_utils.SIGNATURE_SENTINELS
+        self.siglist_matcher = SiglistMatcher(
+            irrelevant=siglists_utils.IRRELEVANT_SIGNATURE_RE,
+            prefix=siglists_utils.PREFIX_SIGNATURE_RE,
+            line_numbers=siglists_utils.SIGNATURES_WITH_LINE_NUMBERS_RE,
+            sentinels=siglists_utils.SIGNATURE_SENTINELS,
+            cache_size=cache_size,
+        )
 
         self.collapse_arguments = True
 
@@ -110,8 +218,11 @@ class CSignatureTool(SignatureTool):
         self.fixup_comma = re.compile(r",(?! )")
         self.fixup_hash = re.compile(r"::h[0-9a-fA-F]+$")
 
-    def normalize_rust_function(self, function, line):
-        """Normalizes a single Rust frame with a function."""
+        # Maps (function, is_rust) -> (collapsed function, normalized function).
+        # The normalized function is None if it needs a line number.
+        self.frame_cache = LRUCache(maxsize=cache_size)
+
+    def _collapse_rust_function(self, function):
         # Drop the prefix and return type if there is any
         function = drop_prefix_and_return_type(function)
 
@@ -130,9 +241,9 @@ class CSignatureTool(SignatureTool):
                 function, open_string="(", close_string=")", replacement=""
             )
 
-        if self.signatures_with_line_numbers_re.match(function):
-            function = "{}:{}".format(function, line)
+        return function
 
+    def _fixup_rust_function(self, function):
         # Remove spaces before all stars, ampersands, and commas
         function = self.fixup_space.sub("", function)
 
@@ -144,8 +255,16 @@ class CSignatureTool(SignatureTool):
 
         return function
 
-    def normalize_cpp_function(self, function, line):
-        """Normalizes a single cpp frame with a function"""
+    def normalize_rust_function(self, function, line):
+        """Normalizes a single Rust frame with a function."""
+        function = self._collapse_rust_function(function)
+
+        if self.siglist_matcher.classify(function).line_number:
+            function = "{}:{}".format(function, line)
+
+        return self._fixup_rust_function(function)
+
+    def _collapse_cpp_function(self, function):
         # Drop member function cv/ref qualifiers like const, const&, &, and &&
         for ref in ("const", "const&", "&&", "&"):
             if function.endswith(ref):
@@ -182,9 +301,9 @@ class CSignatureTool(SignatureTool):
                 function, open_string="[", close_string="]", replacement=""
             )
 
-        if self.signatures_with_line_numbers_re.match(function):
-            function = "{}:{}".format(function, line)
+        return function
 
+    def _fixup_cpp_function(self, function):
         # Remove spaces before all stars, ampersands, and commas
         function = self.fixup_space.sub("", function)
 
@@ -193,6 +312,51 @@ class CSignatureTool(SignatureTool):
 
         return function
 
+    def normalize_cpp_function(self, function, line):
+        """Normalizes a single cpp frame with a function"""
+        function = self._collapse_cpp_function(function)
+
+        if self.siglist_matcher.classify(function).line_number:
+            function = "{}:{}".format(function, line)
+
+        return self._fixup_cpp_function(function)
+
+    def normalize_function(self, function, line, is_rust):
+        """Normalizes a function using the frame cache
+
+        This returns the same thing as ``normalize_rust_function`` or
+        ``normalize_cpp_function``, but the work is cached by function name. The
+        line number only matters for functions in the signatures with line
+        numbers list, so those are cached without it and the line is added
+        afterwards.
+
+        """
+        key = (function, is_rust)
+        cached = self.frame_cache.get(key)
+        if cached is None:
+            if is_rust:
+                collapsed = self._collapse_rust_function(function)
+            else:
+                collapsed = self._collapse_cpp_function(function)
+
+            if self.siglist_matcher.classify(collapsed).line_number:
+                normalized = None
+            elif is_rust:
+                normalized = self._fixup_rust_function(collapsed)
+            else:
+                normalized = self._fixup_cpp_function(collapsed)
+
+            cached = (collapsed, normalized)
+            self.frame_cache.set(key, cached)
+
+        collapsed, normalized = cached
+        if normalized is None:
+            function = "{}:{}".format(collapsed, line)
+            if is_rust:
+                return self._fixup_rust_function(function)
+            return self._fixup_cpp_function(function)
+        return normalized
+
     def normalize_frame(
         self,
         module=None,
@@ -225,12 +389,11 @@ class CSignatureTool(SignatureTool):
 
         if function:
             # If there's a filename and it ends in .rs, then normalize using
-            # Rust rules
-            if file and (parse_source_file(file) or "").endswith(".rs"):
-                return self.normalize_rust_function(function=function, line=line)
-
-            # Otherwise normalize it with C/C++ rules
-            return self.normalize_cpp_function(function=function, line=line)
+            # Rust rules; otherwise normalize it with C/C++ rules
+            is_rust = bool(file) and (parse_source_file(file) or "").endswith(".rs")
+            return self.normalize_function(
+                function=function, line=line, is_rust=is_rust
+            )
 
         # If there's a file and line number, use that
         if file and line:
@@ -267,19 +430,8 @@ class CSignatureTool(SignatureTool):
         debug_notes = []
 
         # Shorten source_list to the first sentinel found
-        sentinel_locations = []
-        for a_sentinel in self.signature_sentinels:
-            if type(a_sentinel) == tuple:
-                a_sentinel, condition_fn = a_sentinel
-                if not condition_fn(source_list):
-                    continue
-            try:
-                sentinel_locations.append(source_list.index(a_sentinel))
-            except ValueError:
-                pass
-
-        if sentinel_locations:
-            min_index = min(sentinel_locations)
+        min_index = self.siglist_matcher.find_sentinel(source_list)
+        if min_index is not None:
             debug_notes.append(
                 'sentinel; starting at "{}" index {}'.format(
                     source_list[min_index], min_index
@@ -292,7 +444,7 @@ class CSignatureTool(SignatureTool):
         new_signature_list = []
         for a_signature in source_list:
             # If the signature matches the irrelevant signatures regex, skip to the next frame.
-            if self.irrelevant_signature_re.match(a_signature):
+            if self.siglist_matcher.classify(a_signature).irrelevant:
                 debug_notes.append('irrelevant; ignoring: "{}"'.format(a_signature))
                 continue
 
@@ -308,7 +460,7 @@ class CSignatureTool(SignatureTool):
 
             # If the signature does not match the prefix signatures regex, then it is the last
             # one we add to the list.
-            if not self.prefix_signature_re.match(a_signature):
+            if not self.siglist_matcher.classify(a_signature).prefix:
                 debug_notes.append('not a prefix; stop: "{}"'.format(a_signature))
                 break
 
@@ -508,10 +660,10 @@ class SignatureGenerationRule(Rule):
 
     """
 
-    def __init__(self):
+    def __init__(self, frame_cache_size=DEFAULT_FRAME_CACHE_SIZE):
         super(SignatureGenerationRule, self).__init__()
         self.java_signature_tool = JavaSignatureTool()
-        self.c_signature_tool = CSignatureTool()
+        self.c_signature_tool = CSignatureTool(cache_size=frame_cache_size)
 
     def _create_frame_list(
         self, crashing_thread_mapping, make_modules_lower_case=False
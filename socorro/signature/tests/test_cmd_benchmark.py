@@ -0,0 +1,23 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+from ..cmd_benchmark import main, run_benchmark, SYMBOLS
+
+
+def test_run_benchmark():
+    results = run_benchmark([1, 2], number=1)
+    assert [(name, size) for name, size, length, seconds in results] == [
+        (name, size) for name, make_symbol, is_rust in SYMBOLS for size in [1, 2]
+    ]
+    for name, size, length, seconds in results:
+        assert length > 0
+        assert seconds >= 0
+
+
+def test_main(capsys):
+    assert main(["--sizes=1,2", "--number=1"]) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].split() == ["symbol", "size", "length", "ms/call", "ns/char"]
+    assert len(lines) == 1 + 2 * len(SYMBOLS)
+    assert lines[1].split()[:2] == ["nested_templates", "1"]
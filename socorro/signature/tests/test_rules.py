@@ -16,6 +16,7 @@ import pytest
 base_module = ".".join(__name__.split(".")[:-2])
 rules = importlib.import_module(base_module + ".rules")
 generator = importlib.import_module(base_module + ".generator")
+siglists_utils = importlib.import_module(base_module + ".siglists_utils")
 
 
 @pytest.mark.parametrize(
@@ -48,6 +49,7 @@ class TestCSignatureTool:
         si=["fnNeedNumber"],
         td=[r"foo32\.dll.*"],
         ss=("sentinel", ("sentinel2", lambda x: "ff" in x)),
+        cache_size=rules.DEFAULT_FRAME_CACHE_SIZE,
     ):
         with mock.patch(base_module + ".rules.siglists_utils") as mocked_siglists:
             mocked_siglists.IRRELEVANT_SIGNATURE_RE = ig
@@ -55,7 +57,7 @@ class TestCSignatureTool:
             mocked_siglists.SIGNATURES_WITH_LINE_NUMBERS_RE = si
             mocked_siglists.TRIM_DLL_SIGNATURE_RE = td
             mocked_siglists.SIGNATURE_SENTINELS = ss
-            return rules.CSignatureTool()
+            return rules.CSignatureTool(cache_size=cache_size)
 
     def test_c_config_tool_init(self):
         """test_C_config_tool_init: constructor test"""
@@ -209,6 +211,53 @@ class TestCSignatureTool:
         s = self.setup_config_c_sig_tool()
         assert s.normalize_rust_function(function, line) == expected
 
+    def test_normalize_frame_cache(self):
+        s = self.setup_config_c_sig_tool()
+        function = "void nsDocumentViewer::DestroyPresShell()"
+        assert s.normalize_frame(function=function) == (
+            "nsDocumentViewer::DestroyPresShell"
+        )
+        assert (s.frame_cache.hits, s.frame_cache.misses) == (0, 1)
+        assert s.normalize_frame(function=function) == (
+            "nsDocumentViewer::DestroyPresShell"
+        )
+        assert (s.frame_cache.hits, s.frame_cache.misses) == (1, 1)
+
+    def test_normalize_frame_cache_line_numbers(self):
+        # Functions that need line numbers are cached without them
+        s = self.setup_config_c_sig_tool()
+        assert s.normalize_frame(function="fnNeedNumber(int)", line=23) == (
+            "fnNeedNumber:23"
+        )
+        assert s.normalize_frame(function="fnNeedNumber(int)", line=42) == (
+            "fnNeedNumber:42"
+        )
+        assert s.frame_cache.hits == 1
+
+    def test_normalize_frame_cache_rust(self):
+        # The same function is normalized differently depending on whether it's
+        # Rust, so the cache keeps them separate
+        s = self.setup_config_c_sig_tool()
+        function = "expect_failed::h7f635057bfba806a"
+        rust_file = "hg:hg.mozilla.org/a/b:servio/wrapper.rs:44444444444"
+        assert s.normalize_frame(function=function, file=rust_file) == ("expect_failed")
+        assert s.normalize_frame(function=function, file="wrapper.cpp") == function
+        assert s.frame_cache.misses == 2
+
+    def test_normalize_frame_cache_size(self):
+        s = self.setup_config_c_sig_tool(cache_size=2)
+        for function in ("f1", "f2", "f3", "f1"):
+            s.normalize_frame(function=function)
+        assert len(s.frame_cache) == 2
+        assert s.frame_cache.hits == 0
+
+    def test_normalize_frame_cache_disabled(self):
+        s = self.setup_config_c_sig_tool(cache_size=0)
+        for i in range(3):
+            assert s.normalize_frame(function="f<3>(s,t,u)") == "f<T>"
+        assert len(s.frame_cache) == 0
+        assert s.frame_cache.misses == 3
+
     def test_generate_1(self):
         """test_generate_1: simple"""
         s = self.setup_config_c_sig_tool(["a", "b", "c"], ["d", "e", "f"])
@@ -318,6 +367,100 @@ class TestCSignatureTool:
         assert sig == "foo32.dll | g"
 
 
+class TestSiglistMatcher:
+    def build_matcher(self, **kwargs):
+        lists = {
+            "irrelevant": ["ignored1", "both.*"],
+            "prefix": ["pre1", "both"],
+            "line_numbers": ["fnNeedNumber"],
+            "sentinels": ["sentinel", ("sentinel2", lambda x: "ff" in x)],
+        }
+        lists.update(kwargs)
+        return rules.SiglistMatcher(**lists)
+
+    @pytest.mark.parametrize(
+        "frame, expected",
+        [
+            ("foo", (False, False, False, False)),
+            ("ignored1", (False, True, False, False)),
+            ("pre1", (False, False, True, False)),
+            ("bothways", (False, True, True, False)),
+            ("fnNeedNumber", (False, False, False, True)),
+            ("sentinel", (True, False, False, False)),
+        ],
+    )
+    def test_classify(self, frame, expected):
+        matcher = self.build_matcher()
+        assert matcher.classify(frame) == expected
+
+    def test_classify_conditional_sentinel(self):
+        matcher = self.build_matcher()
+        match = matcher.classify("sentinel2")
+        assert len(match.sentinel) == 1
+        assert match.sentinel[0](["ff"])
+
+    def test_classify_is_cached(self):
+        matcher = self.build_matcher()
+        matcher.classify("foo")
+        matcher.classify("foo")
+        assert (matcher.cache.hits, matcher.cache.misses) == (1, 1)
+
+    def test_empty_list_matches_everything(self):
+        # This is what re.compile("|".join([])).match does
+        matcher = self.build_matcher(irrelevant=[])
+        assert matcher.classify("foo").irrelevant
+
+    @pytest.mark.parametrize(
+        "source_list, expected",
+        [
+            ([], None),
+            (["a", "b"], None),
+            (["a", "sentinel", "sentinel"], 1),
+            (["a", "sentinel2", "sentinel"], 2),
+            (["a", "sentinel2", "ff", "sentinel"], 1),
+        ],
+    )
+    def test_find_sentinel(self, source_list, expected):
+        matcher = self.build_matcher()
+        assert matcher.find_sentinel(source_list) == expected
+
+    def test_matches_siglists(self):
+        # Classifying with the real siglists should match using a regex per list
+        irrelevant_re = re.compile("|".join(siglists_utils.IRRELEVANT_SIGNATURE_RE))
+        prefix_re = re.compile("|".join(siglists_utils.PREFIX_SIGNATURE_RE))
+        line_number_re = re.compile(
+            "|".join(siglists_utils.SIGNATURES_WITH_LINE_NUMBERS_RE)
+        )
+        matcher = rules.SiglistMatcher(
+            irrelevant=siglists_utils.IRRELEVANT_SIGNATURE_RE,
+            prefix=siglists_utils.PREFIX_SIGNATURE_RE,
+            line_numbers=siglists_utils.SIGNATURES_WITH_LINE_NUMBERS_RE,
+            sentinels=siglists_utils.SIGNATURE_SENTINELS,
+        )
+
+        frames = [
+            "KiFastSystemCallRet",
+            "mozalloc_abort",
+            "mozilla::ipc::MessageChannel::Send",
+            "nsThread::ProcessNextEvent",
+            "js::RunScript",
+            "",
+        ]
+        for siglist in (
+            siglists_utils.IRRELEVANT_SIGNATURE_RE,
+            siglists_utils.PREFIX_SIGNATURE_RE,
+            siglists_utils.SIGNATURES_WITH_LINE_NUMBERS_RE,
+            siglists_utils.SIGNATURE_SENTINELS,
+        ):
+            frames.extend(item for item in siglist if isinstance(item, str))
+
+        for frame in frames:
+            match = matcher.classify(frame)
+            assert match.irrelevant == bool(irrelevant_re.match(frame)), frame
+            assert match.prefix == bool(prefix_re.match(frame)), frame
+            assert match.line_number == bool(line_number_re.match(frame)), frame
+
+
 class TestJavaSignatureTool:
     def test_bad_stack(self):
         j = rules.JavaSignatureTool()
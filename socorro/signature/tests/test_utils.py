@@ -8,6 +8,7 @@ from ..utils import (
     collapse,
     drop_bad_characters,
     drop_prefix_and_return_type,
+    LRUCache,
     parse_crashid,
     parse_source_file,
 )
@@ -105,6 +106,26 @@ def test_collapse(function, expected):
     assert collapse(**params) == expected
 
 
+def test_collapse_long_symbols():
+    # Very long templated symbols collapse the same as short ones
+    args = ", ".join(["mozilla::Maybe<nsTArray<uint8_t>>"] * 5000)
+    function = "mozilla::Variant<%s>::match(%s)" % (args, args)
+    assert collapse(function, "<", ">", "<T>") == "mozilla::Variant<T>::match(%s)" % (
+        ", ".join(["mozilla::Maybe<T>"] * 5000)
+    )
+
+    function = "A<" * 5000 + "int" + ">" * 5000
+    assert collapse(function, "<", ">", "<T>") == "A<T>"
+
+
+def test_collapse_unclosed_exception():
+    # An unclosed token is kept if the exception is in it
+    assert collapse("<Foo as Bar", "<", ">", "<T>", exceptions=(" as ",)) == (
+        "<Foo as Bar"
+    )
+    assert collapse("Foo<Bar", "<", ">", "<T>", exceptions=(" as ",)) == "Foo<T>"
+
+
 @pytest.mark.parametrize(
     "function, expected",
     [
@@ -274,3 +295,39 @@ def test_drop_prefix_and_return_type(function, expected):
 )
 def test_parse_crashid(item, expected):
     assert parse_crashid(item) == expected
+
+
+class TestLRUCache:
+    def test_get_and_set(self):
+        cache = LRUCache(maxsize=10)
+        assert cache.get("a") is None
+        cache.set("a", 1)
+        assert cache.get("a") == 1
+        assert cache.get("b", "default") == "default"
+        assert (cache.hits, cache.misses) == (1, 2)
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        # Using "a" makes "b" the least recently used
+        cache.get("a")
+        cache.set("c", 3)
+        assert len(cache) == 2
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+
+    def test_disabled(self):
+        cache = LRUCache(maxsize=0)
+        cache.set("a", 1)
+        assert len(cache) == 0
+        assert cache.get("a") is None
+
+    def test_clear(self):
+        cache = LRUCache(maxsize=10)
+        cache.set("a", 1)
+        cache.get("a")
+        cache.clear()
+        assert len(cache) == 0
+        assert (cache.hits, cache.misses) == (0, 0)
@@ -2,8 +2,10 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
-
+from collections import OrderedDict
+from functools import lru_cache
 import re
+import threading
 from urllib.parse import urlparse
 
 from glom import glom
@@ -131,12 +133,12 @@ def parse_source_file(source_file):
     return None
 
 
-def _is_exception(exceptions, before_token, after_token, token):
+def _is_exception(exceptions, function, index, token):
     """Predicate for whether the open token is in an exception context
 
-    :arg exceptions: list of strings or None
-    :arg before_token: the text of the function up to the token delimiter
-    :arg after_token: the text of the function after the token delimiter
+    :arg exceptions: tuple of strings
+    :arg function: the function value being collapsed
+    :arg index: the index of the token delimiter in the function
     :arg token: the token (only if we're looking at a close delimiter
 
     :returns: bool
@@ -144,14 +146,21 @@ def _is_exception(exceptions, before_token, after_token, token):
     """
     if not exceptions:
         return False
-    for s in exceptions:
-        if before_token.endswith(s):
-            return True
-        if s in token:
-            return True
+    # This is function[:index].endswith(s) for each s without copying the string
+    if function.endswith(exceptions, 0, index):
+        return True
+    if token:
+        for s in exceptions:
+            if s in token:
+                return True
     return False
 
 
+@lru_cache(maxsize=None)
+def _get_delimiters_re(open_string, close_string):
+    return re.compile("[%s%s]" % (re.escape(open_string), re.escape(close_string)))
+
+
 def collapse(function, open_string, close_string, replacement="", exceptions=None):
     """Collapses the text between two delimiters in a frame function value
 
@@ -175,6 +184,9 @@ def collapse(function, open_string, close_string, replacement="", exceptions=Non
         ^                              ^^^^ exception string inside token
         open token
 
+    This only looks at the delimiters and copies the text between them in
+    slices, so it runs in linear time even for very long templated symbols.
+
     :arg function: the function value from a frame to collapse tokens in
     :arg open_string: the open delimiter; e.g. ``(``
     :arg close_string: the close delimiter; e.g. ``)``
@@ -185,47 +197,46 @@ def collapse(function, open_string, close_string, replacement="", exceptions=Non
     :returns: new function string with tokens collapsed
 
     """
+    exceptions = tuple(exceptions) if exceptions else ()
     collapsed = []
     open_count = 0
-    open_token = []
+    # Start of the text that hasn't been added to collapsed yet; when
+    # open_count is non-zero, this is the start of the open token
+    start = 0
+
+    for match in _get_delimiters_re(open_string, close_string).finditer(function):
+        i = match.start()
+        char = match.group()
 
-    for i, char in enumerate(function):
         if not open_count:
-            if char == open_string and not _is_exception(
-                exceptions, function[:i], function[i + 1 :], ""
-            ):
-                open_count += 1
-                open_token = [char]
-            else:
-                collapsed.append(char)
+            if char == open_string and not _is_exception(exceptions, function, i, ""):
+                collapsed.append(function[start:i])
+                start = i
+                open_count = 1
+
+        elif char == open_string:
+            open_count += 1
 
         else:
-            if char == open_string:
-                open_count += 1
-                open_token.append(char)
-
-            elif char == close_string:
-                open_count -= 1
-                open_token.append(char)
-
-                if open_count == 0:
-                    token = "".join(open_token)
-                    if _is_exception(
-                        exceptions, function[:i], function[i + 1 :], token
-                    ):
-                        collapsed.append("".join(open_token))
-                    else:
-                        collapsed.append(replacement)
-                    open_token = []
-            else:
-                open_token.append(char)
+            open_count -= 1
+            if open_count == 0:
+                token = function[start : i + 1]
+                if _is_exception(exceptions, function, i, token):
+                    collapsed.append(token)
+                else:
+                    collapsed.append(replacement)
+                start = i + 1
 
     if open_count:
-        token = "".join(open_token)
-        if _is_exception(exceptions, function[:i], function[i + 1 :], token):
-            collapsed.append("".join(open_token))
+        # The token was never closed, so check the exceptions as of the last
+        # character in the function
+        token = function[start:]
+        if _is_exception(exceptions, function, len(function) - 1, token):
+            collapsed.append(token)
         else:
             collapsed.append(replacement)
+    else:
+        collapsed.append(function[start:])
 
     return "".join(collapsed)
 
@@ -362,3 +373,49 @@ def parse_crashid(item):
             crash_id = path.split("/")[-1]
             if is_crash_id_valid(crash_id):
                 return crash_id
+
+
+class LRUCache:
+    """Bounded thread-safe least-recently-used cache
+
+    Keeps track of hits and misses so callers can report the hit rate. A
+    ``maxsize`` of 0 disables the cache: nothing is stored and every lookup is a
+    miss.
+
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
@@ -19,12 +19,21 @@ from markus.testing import MetricsMock
 import pytest
 import requests_mock
 
+from socorro.external.es import connection_context as es_connection_context
 from socorro.external.es.connection_context import (
     ConnectionContext as ESConnectionContext,
 )
 from socorro.lib.datetimeutil import utc_now
 
 
+@pytest.fixture(autouse=True)
+def clear_es_clients():
+    """Drop shared Elasticsearch clients so tests that mock the client get a new one"""
+    es_connection_context._CLIENTS.clear()
+    yield
+    es_connection_context._CLIENTS.clear()
+
+
 @pytest.fixture
 def req_mock():
     """Return requests mock."""
@@ -55,3 +55,50 @@ class TestS3ConnectionContext:
         boto_helper.upload_fileobj(bucket, path, file_data)
         data = conn.load_file(path)
         assert data == file_data
+
+    def test_load_file_to_path(self, boto_helper, tmpdir):
+        config = get_config(cls=S3Connection, values_source={"download_chunk_size": 4})
+        conn = S3Connection(config)
+
+        bucket = conn.config.bucket_name
+        path = "/test/testfile.txt"
+        file_data = b"test file contents"
+
+        boto_helper.create_bucket(bucket)
+        boto_helper.upload_fileobj(bucket, path, file_data)
+        dest_path = str(tmpdir.join("testfile.txt"))
+        conn.load_file_to_path(path, dest_path)
+        with open(dest_path, "rb") as fp:
+            assert fp.read() == file_data
+
+    def test_load_file_to_path_doesnt_exist(self, boto_helper, tmpdir):
+        config = get_config(cls=S3Connection)
+        conn = S3Connection(config)
+
+        bucket = conn.config.bucket_name
+        path = "/test/testfile.txt"
+
+        boto_helper.create_bucket(bucket)
+        dest_path = str(tmpdir.join("testfile.txt"))
+        with pytest.raises(KeyNotFound):
+            conn.load_file_to_path(path, dest_path)
+        assert not tmpdir.join("testfile.txt").exists()
+
+    def test_exists_list_and_delete(self, boto_helper):
+        config = get_config(cls=S3Connection)
+        conn = S3Connection(config)
+
+        bucket = conn.config.bucket_name
+        boto_helper.create_bucket(bucket)
+        boto_helper.upload_fileobj(bucket, "/test/a/1", b"1")
+        boto_helper.upload_fileobj(bucket, "/test/a/2", b"2")
+        boto_helper.upload_fileobj(bucket, "/test/b/1", b"3")
+
+        assert conn.exists("/test/a/1")
+        assert not conn.exists("/test/a/3")
+        assert conn.list_files("/test/a/") == ["/test/a/1", "/test/a/2"]
+
+        conn.delete_file("/test/a/1")
+        # Deleting a file that doesn't exist is fine
+        conn.delete_file("/test/a/3")
+        assert conn.list_files("/test/") == ["/test/a/2", "/test/b/1"]
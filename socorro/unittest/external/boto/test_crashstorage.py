@@ -2,8 +2,10 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
+import hashlib
 import json
 import os.path
+from unittest import mock
 
 from configman.dotdict import DotDict
 import pytest
@@ -18,8 +20,11 @@ from socorro.unittest.external.boto import get_config
 
 
 class TestBotoS3CrashStorage:
-    def get_s3_store(self, tmpdir=None):
-        values_source = {}
+    def get_s3_store(self, tmpdir=None, dedupe_dumps=False, read_dump_pointers=False):
+        values_source = {
+            "dedupe_dumps": dedupe_dumps,
+            "read_dump_pointers": read_dump_pointers,
+        }
         if tmpdir is not None:
             values_source["temporary_file_system_storage_path"] = tmpdir
         return BotoS3CrashStorage(config=get_config(BotoS3CrashStorage, values_source))
@@ -100,6 +105,156 @@ class TestBotoS3CrashStorage:
         )
         assert flash_dump == b"fake flash dump"
 
+    def test_save_raw_crash_dedupe_dumps(self, boto_helper, tmpdir):
+        boto_s3_store = self.get_s3_store(tmpdir=tmpdir, dedupe_dumps=True)
+        bucket = boto_s3_store.conn.bucket
+        boto_helper.create_bucket(bucket)
+
+        dump_hash = hashlib.sha256(b"fake dump").hexdigest()
+        flash_dump_hash = hashlib.sha256(b"fake flash dump").hexdigest()
+        crash_ids = [
+            "0bba929f-8721-460c-dead-a43c20071027",
+            "0bba929f-8721-460c-dead-a43c20071028",
+        ]
+        for crash_id in crash_ids:
+            boto_s3_store.save_raw_crash(
+                {"submitted_timestamp": "2013-01-09T22:21:18.646733+00:00"},
+                MemoryDumpsMapping(
+                    {"dump": b"fake dump", "flash_dump": b"fake flash dump"}
+                ),
+                crash_id,
+            )
+
+        # Dumps are stored once by hash and each crash has pointers to them
+        keys = boto_helper.list(bucket_name=bucket)
+        assert [key for key in keys if key.startswith("v1/dump_by_hash/")] == sorted(
+            ["v1/dump_by_hash/" + dump_hash, "v1/dump_by_hash/" + flash_dump_hash]
+        )
+        assert [key for key in keys if key.startswith("v1/dump/")] == []
+        pointers = boto_helper.download_fileobj(
+            bucket_name=bucket, key="v1/dump_pointers/" + crash_ids[0]
+        )
+        assert json.loads(pointers) == {
+            "dump": dump_hash,
+            "flash_dump": flash_dump_hash,
+        }
+
+        assert boto_s3_store.get_raw_dump(crash_ids[0]) == b"fake dump"
+        assert boto_s3_store.get_raw_dumps(crash_ids[1]) == {
+            "dump": b"fake dump",
+            "flash_dump": b"fake flash dump",
+        }
+        files = boto_s3_store.get_raw_dumps_as_files(crash_ids[1])
+        with open(files["flash_dump"], "rb") as fp:
+            assert fp.read() == b"fake flash dump"
+
+    def test_get_raw_dump_dedupe_dumps_old_layout(self, boto_helper):
+        """Dumps stored per crash are readable with dedupe_dumps on"""
+        boto_s3_store = self.get_s3_store(dedupe_dumps=True)
+        bucket = boto_s3_store.conn.bucket
+        boto_helper.upload_fileobj(
+            bucket_name=bucket,
+            key="v1/dump/0bba929f-8721-460c-dead-a43c20071027",
+            data=b"this is a raw dump",
+        )
+        assert (
+            boto_s3_store.get_raw_dump("0bba929f-8721-460c-dead-a43c20071027")
+            == b"this is a raw dump"
+        )
+
+    def test_get_raw_dump_read_dump_pointers(self, boto_helper):
+        """Dumps stored by hash are readable with read_dump_pointers on"""
+        boto_s3_store = self.get_s3_store(dedupe_dumps=True)
+        bucket = boto_s3_store.conn.bucket
+        boto_helper.create_bucket(bucket)
+        crash_id = "0bba929f-8721-460c-dead-a43c20071027"
+        boto_s3_store.save_raw_crash(
+            {}, MemoryDumpsMapping({"dump": b"fake dump"}), crash_id
+        )
+
+        # By default, pointers aren't looked up when dedupe_dumps is off
+        boto_s3_store = self.get_s3_store(dedupe_dumps=False)
+        with mock.patch.object(
+            boto_s3_store.conn, "load_file", wraps=boto_s3_store.conn.load_file
+        ) as mock_load_file:
+            with pytest.raises(CrashIDNotFound):
+                boto_s3_store.get_raw_dump(crash_id)
+        assert mock_load_file.call_args_list == [mock.call("v1/dump/" + crash_id)]
+
+        boto_s3_store = self.get_s3_store(dedupe_dumps=False, read_dump_pointers=True)
+        assert boto_s3_store.get_raw_dump(crash_id) == b"fake dump"
+        assert boto_s3_store.get_raw_dumps(crash_id) == {"dump": b"fake dump"}
+
+        # Removing the crash removes the dump stored by hash, too
+        boto_s3_store.remove(crash_id)
+        assert boto_s3_store.conn.list_files("") == []
+
+    def test_remove_dedupe_dumps(self, boto_helper):
+        boto_s3_store = self.get_s3_store(dedupe_dumps=True)
+        bucket = boto_s3_store.conn.bucket
+        boto_helper.create_bucket(bucket)
+
+        crash_ids = [
+            "0bba929f-8721-460c-dead-a43c20071027",
+            "0bba929f-8721-460c-dead-a43c20071028",
+        ]
+        boto_s3_store.save_raw_crash(
+            {}, MemoryDumpsMapping({"dump": b"fake dump"}), crash_ids[0]
+        )
+        boto_s3_store.save_raw_crash(
+            {},
+            MemoryDumpsMapping({"dump": b"fake dump", "flash_dump": b"other"}),
+            crash_ids[1],
+        )
+
+        # The shared dump is kept for the other crash
+        boto_s3_store.remove(crash_ids[0])
+        assert boto_s3_store.get_raw_dumps(crash_ids[1]) == {
+            "dump": b"fake dump",
+            "flash_dump": b"other",
+        }
+        with pytest.raises(CrashIDNotFound):
+            boto_s3_store.get_raw_crash(crash_ids[0])
+
+        # Removing the last crash removes everything
+        boto_s3_store.remove(crash_ids[1])
+        assert boto_s3_store.conn.list_files("") == []
+
+        with pytest.raises(CrashIDNotFound):
+            boto_s3_store.remove(crash_ids[1])
+
+    def test_remove_dedupe_dumps_concurrent_save(self, boto_helper):
+        boto_s3_store = self.get_s3_store(dedupe_dumps=True)
+        bucket = boto_s3_store.conn.bucket
+        boto_helper.create_bucket(bucket)
+
+        crash_ids = [
+            "0bba929f-8721-460c-dead-a43c20071027",
+            "0bba929f-8721-460c-dead-a43c20071028",
+        ]
+        boto_s3_store.save_raw_crash(
+            {}, MemoryDumpsMapping({"dump": b"fake dump"}), crash_ids[0]
+        )
+
+        # Save the second crash after the remover has checked references but
+        # before it deletes the dump; the save sees the dump and skips uploading
+        # it
+        delete_file = boto_s3_store.conn.delete_file
+
+        def delete_file_and_save(path):
+            if path.startswith("v1/dump_by_hash/"):
+                boto_s3_store.save_raw_crash(
+                    {}, MemoryDumpsMapping({"dump": b"fake dump"}), crash_ids[1]
+                )
+            delete_file(path)
+
+        with mock.patch.object(
+            boto_s3_store.conn, "delete_file", side_effect=delete_file_and_save
+        ):
+            boto_s3_store.remove(crash_ids[0])
+
+        assert boto_s3_store.get_raw_dump(crash_ids[1]) == b"fake dump"
+
     def test_save_processed_crash(self, boto_helper):
         boto_s3_store = self.get_s3_store()
         bucket = boto_s3_store.conn.bucket
@@ -298,6 +453,30 @@ class TestBotoS3CrashStorage:
             ),
         }
         assert result == expected
+        with open(result["flash_dump"], "rb") as fp:
+            assert fp.read() == b'this is "flash_dump", the second one'
+
+    def test_get_raw_dumps_as_files_missing_dump(self, boto_helper, tmpdir):
+        boto_s3_store = self.get_s3_store(tmpdir=tmpdir)
+        bucket = boto_s3_store.conn.bucket
+        boto_helper.create_bucket(bucket)
+
+        boto_helper.upload_fileobj(
+            bucket_name=bucket,
+            key="v1/dump_names/936ce666-ff3b-4c7a-9674-367fe2120408",
+            data=b'["dump", "flash_dump"]',
+        )
+        boto_helper.upload_fileobj(
+            bucket_name=bucket,
+            key="v1/dump/936ce666-ff3b-4c7a-9674-367fe2120408",
+            data=b'this is "dump", the first one',
+        )
+
+        with pytest.raises(CrashIDNotFound):
+            boto_s3_store.get_raw_dumps_as_files("936ce666-ff3b-4c7a-9674-367fe2120408")
+
+        # The dump that was written was removed
+        assert os.listdir(str(tmpdir)) == []
 
     def test_get_unredacted_processed(self, boto_helper):
         boto_s3_store = self.get_s3_store()
@@ -338,6 +517,118 @@ class TestBotoS3CrashStorage:
                 "0bba929f-dead-dead-dead-a43c20071027"
             )
 
+    def test_get_crash_bundle(self, boto_helper, tmpdir):
+        boto_s3_store = self.get_s3_store(tmpdir=tmpdir)
+        bucket = boto_s3_store.conn.bucket
+        boto_helper.create_bucket(bucket)
+
+        crash_id = "936ce666-ff3b-4c7a-9674-367fe2120408"
+        boto_helper.upload_fileobj(
+            bucket_name=bucket,
+            key="v2/raw_crash/936/20120408/" + crash_id,
+            data=b'{"submitted_timestamp":"2013-01-09T22:21:18.646733+00:00"}',
+        )
+        boto_helper.upload_fileobj(
+            bucket_name=bucket,
+            key="v1/dump_names/" + crash_id,
+            data=b'["dump", "flash_dump"]',
+        )
+        boto_helper.upload_fileobj(
+            bucket_name=bucket, key="v1/dump/" + crash_id, data=b"the dump"
+        )
+        boto_helper.upload_fileobj(
+            bucket_name=bucket, key="v1/flash_dump/" + crash_id, data=b"flash dump"
+        )
+        boto_helper.upload_fileobj(
+            bucket_name=bucket,
+            key="v1/processed_crash/" + crash_id,
+            data=b'{"uuid": "936ce666-ff3b-4c7a-9674-367fe2120408"}',
+        )
+
+        try:
+            raw_crash, dumps, processed_crash = boto_s3_store.get_crash_bundle(crash_id)
+        finally:
+            boto_s3_store.close()
+
+        assert raw_crash == {"submitted_timestamp": "2013-01-09T22:21:18.646733+00:00"}
+        assert processed_crash == {"uuid": crash_id}
+        assert dumps == {
+            "upload_file_minidump": os.path.join(
+                str(tmpdir), crash_id + ".upload_file_minidump.TEMPORARY.dump"
+            ),
+            "flash_dump": os.path.join(
+                str(tmpdir), crash_id + ".flash_dump.TEMPORARY.dump"
+            ),
+        }
+        with open(dumps["upload_file_minidump"], "rb") as fp:
+            assert fp.read() == b"the dump"
+        with open(dumps["flash_dump"], "rb") as fp:
+            assert fp.read() == b"flash dump"
+
+    def test_get_crash_bundle_not_processed(self, boto_helper, tmpdir):
+        boto_s3_store = self.get_s3_store(tmpdir=tmpdir)
+        bucket = boto_s3_store.conn.bucket
+        boto_helper.create_bucket(bucket)
+
+        crash_id = "936ce666-ff3b-4c7a-9674-367fe2120408"
+        boto_helper.upload_fileobj(
+            bucket_name=bucket,
+            key="v2/raw_crash/936/20120408/" + crash_id,
+            data=b'{"ProductName": "Firefox"}',
+        )
+        boto_helper.upload_fileobj(
+            bucket_name=bucket, key="v1/dump_names/" + crash_id, data=b"[]"
+        )
+
+        try:
+            bundle = boto_s3_store.get_crash_bundle(crash_id)
+        finally:
+            boto_s3_store.close()
+
+        assert bundle.raw_crash == {"ProductName": "Firefox"}
+        assert bundle.dumps == {}
+        assert bundle.processed_crash == {}
+
+    def test_get_crash_bundle_missing_dump(self, boto_helper, tmpdir):
+        boto_s3_store = self.get_s3_store(tmpdir=tmpdir)
+        bucket = boto_s3_store.conn.bucket
+        boto_helper.create_bucket(bucket)
+
+        crash_id = "936ce666-ff3b-4c7a-9674-367fe2120408"
+        boto_helper.upload_fileobj(
+            bucket_name=bucket,
+            key="v2/raw_crash/936/20120408/" + crash_id,
+            data=b'{"ProductName": "Firefox"}',
+        )
+        boto_helper.upload_fileobj(
+            bucket_name=bucket,
+            key="v1/dump_names/" + crash_id,
+            data=b'["dump", "flash_dump"]',
+        )
+        boto_helper.upload_fileobj(
+            bucket_name=bucket, key="v1/dump/" + crash_id, data=b"the dump"
+        )
+
+        try:
+            with pytest.raises(CrashIDNotFound):
+                boto_s3_store.get_crash_bundle(crash_id)
+        finally:
+            boto_s3_store.close()
+
+        # The dump that was fetched was cleaned up
+        assert os.listdir(str(tmpdir)) == []
+
+    def test_get_crash_bundle_not_found(self, boto_helper):
+        boto_s3_store = self.get_s3_store()
+        bucket = boto_s3_store.conn.bucket
+        boto_helper.create_bucket(bucket)
+
+        try:
+            with pytest.raises(CrashIDNotFound):
+                boto_s3_store.get_crash_bundle("0bba929f-dead-dead-dead-a43c20071027")
+        finally:
+            boto_s3_store.close()
+
 
 class TestTelemetryBotoS3CrashStorage:
     def get_s3_store(self):
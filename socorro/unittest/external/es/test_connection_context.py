@@ -4,6 +4,14 @@
 
 import datetime
 
+from configman import ConfigurationManager
+from markus.testing import MetricsMock
+import requests_mock
+
+from socorro.external.es.connection_context import (
+    ConnectionContext,
+    PooledRequestsHttpConnection,
+)
 from socorro.lib.datetimeutil import utc_now
 
 # Uncomment these lines to decrease verbosity of the elasticsearch library
@@ -67,3 +75,47 @@ class TestConnectionContext:
         es_conn.delete_expired_indices()
         es_conn.health_check()
         assert list(es_conn.get_indices()) == [current_index_name]
+
+    def build_context(self, **values):
+        values.setdefault("elasticsearch_urls", "http://es.example.com:9200")
+        manager = ConfigurationManager(
+            ConnectionContext.get_required_config(), values_source_list=[values]
+        )
+        return ConnectionContext(manager.get_config())
+
+    def test_connection_is_shared(self):
+        with MetricsMock() as mm:
+            conn = self.build_context().connection()
+            # Other contexts with the same configuration share the client
+            assert self.build_context().connection() is conn
+            with self.build_context()() as conn2:
+                assert conn2 is conn
+            mm.assert_incr_once("es.connection.client_created")
+
+        # Different timeouts and urls get different clients
+        assert self.build_context().connection(timeout=5) is not conn
+        assert (
+            self.build_context(
+                elasticsearch_urls="http://es2.example.com:9200"
+            ).connection()
+            is not conn
+        )
+
+    def test_connection_pool_size(self):
+        conn = self.build_context(elasticsearch_pool_maxsize=25).connection()
+        connections = conn.transport.connection_pool.connections
+        assert len(connections) == 1
+        es_connection = connections[0]
+        assert isinstance(es_connection, PooledRequestsHttpConnection)
+        adapter = es_connection.session.get_adapter("http://es.example.com:9200/")
+        assert adapter._pool_maxsize == 25
+
+    def test_request_metrics(self):
+        conn = self.build_context().connection()
+        with requests_mock.Mocker() as req_mock:
+            req_mock.get(
+                "http://es.example.com:9200/", json={"version": {"number": "1.4.5"}}
+            )
+            with MetricsMock() as mm:
+                conn.info()
+                mm.assert_timing("es.connection.request", tags=["outcome:success"])
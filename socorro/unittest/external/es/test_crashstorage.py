@@ -3,6 +3,8 @@
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
 from copy import deepcopy
+import threading
+import time
 from unittest import mock
 
 from configman.dotdict import DotDict
@@ -13,6 +15,7 @@ import pytest
 from socorro.external.crashstorage_base import Redactor
 from socorro.external.es.crashstorage import (
     convert_booleans,
+    ESBulkCrashStorage,
     ESCrashStorage,
     ESCrashStorageRedactedSave,
     ESCrashStorageRedactedJsonDump,
@@ -753,6 +756,180 @@ class TestESCrashStorage(ElasticsearchTestCase):
             mm.assert_histogram_once("processor.es.index", tags=["outcome:failed"])
 
 
+class TestESBulkCrashStorage(TestCaseWithConfig):
+    """These tests mock out Elasticsearch entirely"""
+
+    def get_storage(self, **kwargs):
+        values = {"bulk_size": 2, "bulk_flush_interval": 0}
+        values.update(kwargs)
+        config = self.get_tuned_config(ESBulkCrashStorage, values)
+        es_storage = ESBulkCrashStorage(config=config, namespace="processor.es")
+        es_storage.es_context = mock.MagicMock()
+        return es_storage
+
+    def get_connection(self, es_storage):
+        return es_storage.es_context.return_value.__enter__.return_value
+
+    def save_crash(self, es_storage, crash_id, **processed_crash):
+        processed_crash.update(
+            {"date_processed": "2012-04-08 10:56:41.558922", "uuid": crash_id}
+        )
+        es_storage.save_processed_crash(
+            raw_crash={"ProductName": "Firefox"}, processed_crash=processed_crash
+        )
+
+    def test_buffers_until_bulk_size(self):
+        es_storage = self.get_storage()
+        conn = self.get_connection(es_storage)
+        conn.bulk.return_value = {"items": [{"index": {"status": 201}}] * 2}
+
+        crash_id_1 = create_new_ooid()
+        self.save_crash(es_storage, crash_id_1)
+        assert conn.bulk.call_count == 0
+
+        crash_id_2 = create_new_ooid()
+        self.save_crash(es_storage, crash_id_2)
+        assert conn.bulk.call_count == 1
+
+        body = conn.bulk.call_args[1]["body"]
+        index = es_storage.get_index_for_crash(
+            string_to_datetime("2012-04-08 10:56:41.558922")
+        )
+        doctype = es_storage.config.elasticsearch.elasticsearch_doctype
+        assert body[0] == {
+            "index": {"_index": index, "_type": doctype, "_id": crash_id_1}
+        }
+        assert body[1]["crash_id"] == crash_id_1
+        assert body[1]["raw_crash"] == {"ProductName": "Firefox"}
+        assert body[2] == {
+            "index": {"_index": index, "_type": doctype, "_id": crash_id_2}
+        }
+        assert body[3]["crash_id"] == crash_id_2
+
+    def test_index_created_once(self):
+        es_storage = self.get_storage(bulk_size=1)
+        conn = self.get_connection(es_storage)
+        conn.bulk.return_value = {"items": [{"index": {"status": 201}}]}
+
+        self.save_crash(es_storage, create_new_ooid())
+        self.save_crash(es_storage, create_new_ooid())
+        assert conn.bulk.call_count == 2
+        assert es_storage.es_context.create_index.call_count == 1
+
+    def test_close_flushes(self):
+        es_storage = self.get_storage(bulk_size=10)
+        conn = self.get_connection(es_storage)
+        conn.bulk.return_value = {"items": [{"index": {"status": 201}}]}
+
+        self.save_crash(es_storage, create_new_ooid())
+        assert conn.bulk.call_count == 0
+        es_storage.close()
+        assert conn.bulk.call_count == 1
+
+    def test_flush_interval(self):
+        es_storage = self.get_storage(bulk_size=10, bulk_flush_interval=0.1)
+        conn = self.get_connection(es_storage)
+        conn.bulk.return_value = {"items": [{"index": {"status": 201}}]}
+
+        try:
+            self.save_crash(es_storage, create_new_ooid())
+            for i in range(20):
+                if conn.bulk.call_count:
+                    break
+                time.sleep(0.1)
+            assert conn.bulk.call_count == 1
+        finally:
+            es_storage.close()
+
+    def test_one_flush_thread(self):
+        es_storage = self.get_storage(bulk_size=100, bulk_flush_interval=60)
+        conn = self.get_connection(es_storage)
+        conn.bulk.return_value = {"items": [{"index": {"status": 201}}] * 10}
+
+        def make_thread(**kwargs):
+            # Widen the window between checking for and creating the thread
+            time.sleep(0.05)
+            return mock.MagicMock()
+
+        barrier = threading.Barrier(10)
+
+        def save():
+            barrier.wait()
+            self.save_crash(es_storage, create_new_ooid())
+
+        threads = [threading.Thread(target=save) for i in range(10)]
+        with mock.patch(
+            "socorro.external.es.crashstorage.threading.Thread",
+            side_effect=make_thread,
+        ) as mock_thread:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        assert mock_thread.call_count == 1
+        es_storage.close()
+        assert conn.bulk.call_count == 1
+
+    def test_retries_only_failed_items(self):
+        es_storage = self.get_storage()
+        conn = self.get_connection(es_storage)
+        conn.bulk.side_effect = [
+            {
+                "items": [
+                    {"index": {"status": 201}},
+                    {
+                        "index": {
+                            "status": 400,
+                            "error": (
+                                "MapperParsingException[failed to parse "
+                                "[processed_crash.version]]; nested: "
+                                "NumberFormatException[For input string: "
+                                '"some bogus value"]; '
+                            ),
+                        }
+                    },
+                ]
+            },
+            {"items": [{"index": {"status": 201}}]},
+        ]
+
+        crash_id_1 = create_new_ooid()
+        crash_id_2 = create_new_ooid()
+        with MetricsMock() as mm:
+            self.save_crash(es_storage, crash_id_1)
+            self.save_crash(es_storage, crash_id_2, version="some bogus value")
+
+            mm.assert_incr(
+                "processor.es.indexerror", tags=["error:numberformatexception"]
+            )
+            mm.assert_histogram("processor.es.bulk_size", value=2)
+            mm.assert_histogram_once(
+                "processor.es.bulk_index", tags=["outcome:successful"]
+            )
+
+        assert conn.bulk.call_count == 2
+        body = conn.bulk.call_args[1]["body"]
+        assert len(body) == 2
+        assert body[1]["crash_id"] == crash_id_2
+        assert body[1]["removed_fields"] == "processed_crash.version"
+        assert "version" not in body[1]["processed_crash"]
+
+    def test_unhandled_error(self):
+        es_storage = self.get_storage(bulk_size=1)
+        conn = self.get_connection(es_storage)
+        conn.bulk.return_value = {
+            "items": [{"index": {"status": 400, "error": "SomethingElseException"}}]
+        }
+
+        with MetricsMock() as mm:
+            self.save_crash(es_storage, create_new_ooid())
+
+            mm.assert_incr("processor.es.indexerror", tags=["error:unhandled"])
+            mm.assert_histogram_once("processor.es.bulk_index", tags=["outcome:failed"])
+        assert conn.bulk.call_count == 1
+
+
 class Test_get_fields_by_analyzer:
     @pytest.mark.parametrize(
         "fields",
@@ -8,6 +8,7 @@ import json
 import requests_mock
 import pytest
 
+from socorro.external.es.supersearch import encode_cursor
 from socorro.lib import BadArgumentError, datetimeutil, search_common
 from socorro.unittest.external.es.base import (
     ElasticsearchTestCase,
@@ -471,6 +472,52 @@ class TestIntegrationSuperSearch(ElasticsearchTestCase):
         assert res["total"] == number_of_crashes
         assert len(res["hits"]) == 0
 
+    def test_get_with_cursor(self):
+        crash_ids = sorted(
+            "%07d-4b1e-47ec-9bbd-65bb1b211016" % i for i in range(1000000, 1000021)
+        )
+        for crash_id in crash_ids:
+            self.index_crash(
+                {"uuid": crash_id, "date_processed": self.now}, crash_id=crash_id
+            )
+        self.es_context.refresh()
+
+        seen = []
+        kwargs = {"_cursor": "*", "_results_number": "10", "_columns": ["date"]}
+        while True:
+            res = self.api.get(**kwargs)
+            assert res["total"] == len(crash_ids)
+            seen.extend(hit["uuid"] for hit in res["hits"])
+            if not res["next_cursor"]:
+                break
+            kwargs["_cursor"] = res["next_cursor"]
+
+        # The crash id is always returned and pages don't overlap
+        assert seen == crash_ids
+
+    def test_get_with_cursor_return_query_mode(self):
+        res = self.api.get(_cursor="*", _return_query=True)
+        assert res["query"]["sort"] == ["processed_crash.uuid"]
+
+        cursor = encode_cursor("0bba929f-8721-460c-dead-a43c20071025")
+        res = self.api.get(_cursor=cursor, _return_query=True)
+        must = res["query"]["query"]["filtered"]["filter"]["bool"]["must"]
+        assert {
+            "range": {
+                "processed_crash.uuid": {"gt": "0bba929f-8721-460c-dead-a43c20071025"}
+            }
+        } in must
+
+    def test_get_with_bad_cursor(self):
+        with pytest.raises(BadArgumentError):
+            self.api.get(_cursor="not a cursor")
+
+        with pytest.raises(BadArgumentError):
+            self.api.get(_cursor="*", _results_offset=10)
+
+        with pytest.raises(BadArgumentError):
+            self.api.get(_cursor="*", _sort="-date")
+
     def test_get_with_sorting(self):
         """Test a search with sort returns expected results"""
         self.index_crash(
@@ -769,6 +816,42 @@ class TestIntegrationSuperSearch(ElasticsearchTestCase):
         with pytest.raises(BadArgumentError):
             self.api.get(_facets=["_cardinality.unknownfield"])
 
+    def test_get_with_min(self):
+        for signature, build in (
+            ("js::break_your_browser", 20180426000000),
+            ("js::break_your_browser", 20180322000000),
+            ("foo(bar)", 20180427000000),
+        ):
+            self.index_crash(
+                {"signature": signature, "build": build, "date_processed": self.now}
+            )
+        self.es_context.refresh()
+
+        # Test a simple min.
+        res = self.api.get(_facets=["_min.build_id"])
+        assert res["facets"]["min_build_id"]["value"] == 20180322000000
+
+        # Test as a level 2 aggregation.
+        res = self.api.get(**{"_aggs.signature": ["_min.build_id"]})
+        mins = {
+            facet["term"]: facet["facets"]["min_build_id"]["value"]
+            for facet in res["facets"]["signature"]
+        }
+        assert mins == {
+            "js::break_your_browser": 20180322000000,
+            "foo(bar)": 20180427000000,
+        }
+
+        # Test the query.
+        res = self.api.get(_facets=["_min.build_id"], _return_query=True)
+        assert res["query"]["aggs"]["min_build_id"] == {
+            "min": {"field": "processed_crash.build"}
+        }
+
+        # Test errors
+        with pytest.raises(BadArgumentError):
+            self.api.get(_facets=["_min.unknownfield"])
+
     def test_get_with_sub_aggregations(self):
         self.index_crash(
             {
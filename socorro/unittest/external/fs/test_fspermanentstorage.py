@@ -28,7 +28,7 @@ class TestFSPermanentStorage:
     def teardown_method(self, method):
         shutil.rmtree(self.fsrts.config.fs_root)
 
-    def _common_config_setup(self):
+    def _common_config_setup(self, **values):
         mock_logging = mock.Mock()
         required_config = FSPermanentStorage.get_required_config()
         required_config.add_option("logger", default=mock_logging)
@@ -37,7 +37,9 @@ class TestFSPermanentStorage:
             app_name="testapp",
             app_version="1.0",
             app_description="app description",
-            values_source_list=[{"logger": mock_logging, "fs_root": FS_ROOT}],
+            values_source_list=[
+                dict({"logger": mock_logging, "fs_root": FS_ROOT}, **values)
+            ],
             argv_source=[],
         )
         return config_manager
@@ -125,3 +127,34 @@ class TestFSPermanentStorage:
         )
         with pytest.raises(CrashIDNotFound):
             self.fsrts.remove(self.CRASH_ID_2)
+
+    def test_dedupe_dumps(self):
+        with self._common_config_setup(dedupe_dumps=True).context() as config:
+            self.fsrts = FSPermanentStorage(config)
+        hash_root = os.path.join(self.fsrts.config.fs_root, "dumps_by_hash")
+
+        self._make_test_crash()
+        self._make_test_crash(self.CRASH_ID_3)
+
+        # Each distinct dump is stored once
+        hashed_files = [
+            os.path.join(dirpath, fn)
+            for dirpath, _, filenames in os.walk(hash_root)
+            for fn in filenames
+        ]
+        assert len(hashed_files) == 2
+        assert all(os.stat(path).st_nlink == 3 for path in hashed_files)
+
+        expected = MemoryDumpsMapping(
+            {"foo": b"bar", self.fsrts.config.dump_field: b"baz"}
+        )
+        assert self.fsrts.get_raw_dumps(self.CRASH_ID_1) == expected
+        assert self.fsrts.get_raw_dumps(self.CRASH_ID_3) == expected
+
+        # Hashed dumps are kept until the last crash using them is removed
+        self.fsrts.remove(self.CRASH_ID_1)
+        assert all(os.path.exists(path) for path in hashed_files)
+        assert self.fsrts.get_raw_dumps(self.CRASH_ID_3) == expected
+
+        self.fsrts.remove(self.CRASH_ID_3)
+        assert not any(os.path.exists(path) for path in hashed_files)
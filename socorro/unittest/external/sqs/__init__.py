@@ -12,13 +12,13 @@ from socorro.external.sqs.crashqueue import SQSCrashQueue
 VISIBILITY_TIMEOUT = 1
 
 
-def get_sqs_config():
-    sqs_config = SQSCrashQueue.get_required_config()
+def get_sqs_config(crashqueue_class=SQSCrashQueue, **overrides):
+    sqs_config = crashqueue_class.get_required_config()
     config_manager = ConfigurationManager(
         [sqs_config],
         app_name="test-sqs",
         app_description="",
-        values_source_list=[environment],
+        values_source_list=[environment, overrides],
         argv_source=[],
     )
     return config_manager.get_config()
@@ -6,7 +6,7 @@ import time
 
 import pytest
 
-from socorro.external.sqs.crashqueue import SQSCrashQueue
+from socorro.external.sqs.crashqueue import PrefetchingSQSCrashQueue, SQSCrashQueue
 from socorro.lib.ooid import create_new_ooid
 from socorro.unittest.external.sqs import get_sqs_config, VISIBILITY_TIMEOUT
 
@@ -88,3 +88,144 @@ class TestSQSCrashQueue:
         assert sorted(published_crash_ids) == sorted(
             [crash_id_1, crash_id_2, crash_id_3]
         )
+
+
+def get_prefetch_config(**overrides):
+    config = {
+        "wait_time_seconds": 1,
+        "idle_wait": 1,
+        "ack_flush_interval": 0.1,
+        "visibility_timeout": VISIBILITY_TIMEOUT,
+    }
+    config.update(overrides)
+    return get_sqs_config(PrefetchingSQSCrashQueue, **config)
+
+
+class TestPrefetchingSQSCrashQueue:
+    def test_iter(self, sqs_helper):
+        standard_crash = create_new_ooid()
+        sqs_helper.publish("standard", standard_crash)
+
+        reprocessing_crash = create_new_ooid()
+        sqs_helper.publish("reprocessing", reprocessing_crash)
+
+        priority_crash = create_new_ooid()
+        sqs_helper.publish("priority", priority_crash)
+
+        crash_queue = PrefetchingSQSCrashQueue(
+            get_prefetch_config(visibility_timeout=30)
+        )
+        try:
+            # Let the prefetch threads fill the buffers so the order doesn't
+            # depend on when messages arrive
+            crash_queue._start_threads()
+            time.sleep(0.5)
+            new_crashes = list(crash_queue.new_crashes())
+        finally:
+            crash_queue.close()
+
+        for item in new_crashes:
+            assert isinstance(item, tuple)
+            assert isinstance(item[0], tuple)  # *args
+            assert isinstance(item[1], dict)  # **kwargs
+            assert list(item[1].keys()) == ["finished_func"]
+
+        crash_ids = [item[0][0] for item in new_crashes]
+        assert crash_ids == [priority_crash, standard_crash, reprocessing_crash]
+
+    def test_crash_arrives_while_waiting(self, sqs_helper):
+        crash_queue = PrefetchingSQSCrashQueue(
+            get_prefetch_config(idle_wait=5, visibility_timeout=30)
+        )
+        try:
+            crash_iter = iter(crash_queue.new_crashes())
+            crash_id = create_new_ooid()
+            sqs_helper.publish("standard", crash_id)
+            args, kwargs = next(crash_iter)
+            assert args == (crash_id,)
+        finally:
+            crash_queue.close()
+
+    def test_batched_ack(self, sqs_helper):
+        crash_ids = [create_new_ooid() for i in range(3)]
+        for crash_id in crash_ids:
+            sqs_helper.publish("standard", crash_id)
+
+        crash_queue = PrefetchingSQSCrashQueue(
+            get_prefetch_config(visibility_timeout=30)
+        )
+        try:
+            new_crashes = list(crash_queue.new_crashes())
+            assert sorted(item[0][0] for item in new_crashes) == sorted(crash_ids)
+
+            for args, kwargs in new_crashes:
+                kwargs["finished_func"]()
+            crash_queue.flush_acks()
+            assert crash_queue._in_flight == {}
+        finally:
+            crash_queue.close()
+
+        # Once the visibility timeout has passed, the crash ids would be
+        # available again if they hadn't been deleted
+        time.sleep(VISIBILITY_TIMEOUT + 1)
+        assert sqs_helper.get_published_crashids("standard") == []
+
+    def test_visibility_extended(self, sqs_helper):
+        crash_id = create_new_ooid()
+        sqs_helper.publish("standard", crash_id)
+
+        crash_queue = PrefetchingSQSCrashQueue(
+            get_prefetch_config(visibility_timeout=2)
+        )
+        try:
+            crash_iter = iter(crash_queue.new_crashes())
+            args, kwargs = next(crash_iter)
+            assert args == (crash_id,)
+
+            # Hold on to the crash past its original visibility timeout; it
+            # shouldn't become visible again
+            time.sleep(4)
+            assert sqs_helper.get_published_crashids("standard") == []
+
+            kwargs["finished_func"]()
+        finally:
+            crash_queue.close()
+
+    def test_max_hold_time(self, sqs_helper):
+        crash_id = create_new_ooid()
+        sqs_helper.publish("standard", crash_id)
+
+        crash_queue = PrefetchingSQSCrashQueue(
+            get_prefetch_config(idle_wait=5, visibility_timeout=2, max_hold_time=1)
+        )
+        try:
+            crash_iter = iter(crash_queue.new_crashes())
+            args, kwargs = next(crash_iter)
+            assert args == (crash_id,)
+
+            # The crash is never acked, so once it has been held too long its
+            # visibility isn't extended and it's delivered again
+            args, kwargs = next(crash_iter)
+            assert args == (crash_id,)
+        finally:
+            crash_queue.close()
+
+    def test_close_releases_buffered(self, sqs_helper):
+        crash_ids = [create_new_ooid() for i in range(3)]
+        for crash_id in crash_ids:
+            sqs_helper.publish("standard", crash_id)
+
+        crash_queue = PrefetchingSQSCrashQueue(
+            get_prefetch_config(visibility_timeout=30)
+        )
+        try:
+            crash_queue._start_threads()
+            time.sleep(0.5)
+        finally:
+            crash_queue.close()
+
+        # The buffered crash ids are available again right away
+        assert crash_queue._in_flight == {}
+        assert sorted(sqs_helper.get_published_crashids("standard")) == sorted(
+            crash_ids
+        )
@@ -9,6 +9,7 @@ from configman.dotdict import DotDict
 import pytest
 
 from socorro.external.crashstorage_base import (
+    CrashIDNotFound,
     CrashStorageBase,
     PolyStorageError,
     PolyCrashStorage,
@@ -77,6 +78,25 @@ class TestCrashStorageBase:
 
             crashstorage.close()
 
+    def test_get_crash_bundle(self):
+        crashstorage = CrashStorageBase(DotDict({"redactor_class": mock.Mock()}))
+        crashstorage.get_raw_crash = mock.Mock(return_value={"ProductName": "Firefox"})
+        crashstorage.get_raw_dumps_as_files = mock.Mock(
+            return_value={"upload_file_minidump": "/tmp/dump"}
+        )
+        crashstorage.get_unredacted_processed = mock.Mock(
+            side_effect=CrashIDNotFound("ooid")
+        )
+
+        raw_crash, dumps, processed_crash = crashstorage.get_crash_bundle("ooid")
+        assert raw_crash == {"ProductName": "Firefox"}
+        assert dumps == {"upload_file_minidump": "/tmp/dump"}
+        assert processed_crash == {}
+
+        crashstorage.get_raw_crash.side_effect = CrashIDNotFound("ooid")
+        with pytest.raises(CrashIDNotFound):
+            crashstorage.get_crash_bundle("ooid")
+
     def test_polyerror(self):
         p = PolyStorageError("hell")
         try:
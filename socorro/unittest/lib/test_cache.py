@@ -3,12 +3,13 @@
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
 import datetime
+import threading
 from unittest import mock
 
+from markus.testing import MetricsMock
 import pytest
 
 from socorro.lib.cache import ExpiringCache
-from socorro.lib.datetimeutil import utc_now
 
 
 class TestExpiringCache:
@@ -19,13 +20,12 @@ class TestExpiringCache:
 
         cache["foo"] = "bar"
         assert cache["foo"] == "bar"
+        assert cache.get("foo") == "bar"
+        assert cache.get("foo2", "default") == "default"
 
-    @mock.patch("socorro.lib.cache.utc_now")
-    def test_expiration(self, mock_utc_now):
-        # Mock utc_now to return the current time so we can set the expiry for
-        # the key
-        now = utc_now()
-        mock_utc_now.return_value = now
+    @mock.patch("socorro.lib.cache.monotonic")
+    def test_expiration(self, mock_monotonic):
+        mock_monotonic.return_value = 1000.0
 
         cache = ExpiringCache(default_ttl=100)
         cache["foo"] = "bar"
@@ -35,19 +35,33 @@ class TestExpiringCache:
 
         # default ttl is 100, so 99 seconds into the future, we should get back
         # both cached values
-        mock_utc_now.return_value = now + datetime.timedelta(seconds=99)
+        mock_monotonic.return_value = 1099.0
         assert cache["foo"] == "bar"
         assert cache["long_foo"] == "bar2"
         assert len(cache) == 2
 
         # ttl is 100, so 101 seconds into the future, we should get a KeyError
         # for one cached key and the other should be fine
-        mock_utc_now.return_value = now + datetime.timedelta(seconds=101)
+        mock_monotonic.return_value = 1101.0
         with pytest.raises(KeyError):
             cache["foo"]
         assert cache["long_foo"] == "bar2"
         assert len(cache) == 1
 
+    @mock.patch("socorro.lib.cache.monotonic")
+    def test_timedelta_ttl(self, mock_monotonic):
+        mock_monotonic.return_value = 1000.0
+
+        cache = ExpiringCache(default_ttl=100)
+        cache.set("foo", value="bar", ttl=datetime.timedelta(seconds=1000))
+
+        mock_monotonic.return_value = 1999.0
+        assert cache["foo"] == "bar"
+
+        mock_monotonic.return_value = 2001.0
+        with pytest.raises(KeyError):
+            cache["foo"]
+
     def test_max_size(self):
         cache = ExpiringCache(max_size=5)
         cache["foo1"] = 1
@@ -61,40 +75,122 @@ class TestExpiringCache:
         cache["foo6"] = 1
 
         assert list(cache.keys()) == ["foo2", "foo3", "foo4", "foo5", "foo6"]
+        assert cache.evictions == 1
+
+    def test_lru_eviction(self):
+        cache = ExpiringCache(max_size=3)
+        cache["foo1"] = 1
+        cache["foo2"] = 1
+        cache["foo3"] = 1
 
-    @mock.patch("socorro.lib.cache.utc_now")
-    def test_flush(self, mock_utc_now):
-        now = utc_now()
-        now_plus_10 = now + datetime.timedelta(seconds=10)
-        now_plus_20 = now + datetime.timedelta(seconds=20)
+        # Accessing foo1 makes foo2 the least recently used key
+        assert cache["foo1"] == 1
+        cache["foo4"] = 1
 
-        mock_utc_now.return_value = now
+        assert list(cache.keys()) == ["foo3", "foo1", "foo4"]
+
+    @mock.patch("socorro.lib.cache.monotonic")
+    def test_flush(self, mock_monotonic):
+        mock_monotonic.return_value = 1000.0
         cache = ExpiringCache(default_ttl=100)
 
         # At time now
         cache["foo"] = "bar"
 
         # At time now + 10
-        mock_utc_now.return_value = now_plus_10
+        mock_monotonic.return_value = 1010.0
         cache["foo10"] = "bar"
 
         # At time now + 20
-        mock_utc_now.return_value = now_plus_20
+        mock_monotonic.return_value = 1020.0
         cache["foo20"] = "bar"
 
         assert cache._data == {
-            "foo": [now + cache._default_ttl, "bar"],
-            "foo10": [now_plus_10 + cache._default_ttl, "bar"],
-            "foo20": [now_plus_20 + cache._default_ttl, "bar"],
+            "foo": (1100.0, "bar"),
+            "foo10": (1110.0, "bar"),
+            "foo20": (1120.0, "bar"),
         }
 
         # Set to now + 105 which expires the first, but not the other two
-        mock_utc_now.return_value = now + datetime.timedelta(seconds=105)
+        mock_monotonic.return_value = 1105.0
         cache.flush()
 
         # We don't want to trigger eviction or anything like that, so check
         # the contents of the internal data structure directly
         assert cache._data == {
-            "foo10": [now_plus_10 + cache._default_ttl, "bar"],
-            "foo20": [now_plus_20 + cache._default_ttl, "bar"],
+            "foo10": (1110.0, "bar"),
+            "foo20": (1120.0, "bar"),
         }
+        assert cache.expirations == 1
+
+    @mock.patch("socorro.lib.cache.monotonic")
+    def test_flush_after_reset(self, mock_monotonic):
+        mock_monotonic.return_value = 1000.0
+        cache = ExpiringCache(default_ttl=100)
+        cache["foo"] = "bar"
+
+        # Setting the key again extends its expiration, so the first expiration
+        # time doesn't remove it
+        mock_monotonic.return_value = 1050.0
+        cache["foo"] = "bar2"
+
+        mock_monotonic.return_value = 1105.0
+        cache.flush()
+        assert cache._data == {"foo": (1150.0, "bar2")}
+
+        mock_monotonic.return_value = 1155.0
+        cache.flush()
+        assert cache._data == {}
+
+    @mock.patch("socorro.lib.cache.monotonic")
+    def test_expiry_heap_is_compacted(self, mock_monotonic):
+        mock_monotonic.return_value = 1000.0
+        cache = ExpiringCache(default_ttl=100)
+
+        # Setting the same key repeatedly leaves stale expiration entries which
+        # get dropped
+        for i in range(100):
+            cache["foo"] = i
+        assert len(cache._expiry) < 20
+
+    def test_stats(self):
+        with MetricsMock() as mm:
+            cache = ExpiringCache(max_size=1, metrics_prefix="test")
+            cache["foo"] = 1
+            assert cache["foo"] == 1
+            with pytest.raises(KeyError):
+                cache["bar"]
+            cache["bar"] = 1
+
+        assert (cache.hits, cache.misses, cache.evictions) == (1, 1, 1)
+        mm.assert_incr("test.cache", value=1, tags=["result:hit"])
+        mm.assert_incr("test.cache", value=1, tags=["result:miss"])
+        mm.assert_incr("test.cache", value=1, tags=["result:evict"])
+
+    def test_no_stats(self):
+        with MetricsMock() as mm:
+            cache = ExpiringCache()
+            cache["foo"] = 1
+            assert cache["foo"] == 1
+        assert mm.get_records() == []
+
+    def test_threads(self):
+        cache = ExpiringCache(max_size=50)
+
+        def set_and_get(thread_id):
+            for i in range(1000):
+                key = "%s:%s" % (thread_id, i % 100)
+                cache[key] = i
+                cache.get(key)
+
+        threads = [
+            threading.Thread(target=set_and_get, args=(thread_id,))
+            for thread_id in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(cache) == 50
+        assert len(list(cache)) == 50
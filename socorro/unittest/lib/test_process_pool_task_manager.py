@@ -0,0 +1,185 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import os
+import signal
+
+from configman.dotdict import DotDict
+
+from socorro.lib.process_pool_task_manager import ProcessPoolTaskManager
+from socorro.lib.task_manager import default_task_func
+
+
+def get_config(**kwargs):
+    config = DotDict()
+    config.number_of_processes = 2
+    config.maximum_queue_size = 4
+    config.idle_delay = 1
+    config.quit_on_empty_queue = True
+    config.worker_stats_interval = 0
+    config.update(kwargs)
+    return config
+
+
+class TestProcessPoolTaskManager:
+    def test_constructor(self):
+        config = get_config()
+        tm = ProcessPoolTaskManager(config)
+        assert tm.config == config
+        assert tm.task_func == default_task_func
+        assert tm.number_of_processes == 2
+        assert not tm.quit
+
+    def test_doing_work_in_processes(self, tmpdir):
+        config = get_config()
+
+        def write_pid(item):
+            # Each task writes a file recording which process did it
+            path = os.path.join(str(tmpdir), str(item))
+            with open(path, "w") as fp:
+                fp.write(str(os.getpid()))
+
+        tm = ProcessPoolTaskManager(config, task_func=write_pid)
+        tm.blocking_start()
+
+        assert sorted(int(name) for name in os.listdir(str(tmpdir))) == list(range(10))
+        pids = {open(str(tmpdir.join(name))).read() for name in os.listdir(str(tmpdir))}
+        assert str(os.getpid()) not in pids
+        assert sum(stats.jobs for stats in tm.worker_stats.values()) == 10
+        assert not any(process.is_alive() for process in tm.workers.values())
+
+    def test_finished_func_called_in_parent(self):
+        config = get_config()
+        finished = []
+        parent_pid = os.getpid()
+
+        def finished_func(item):
+            finished.append((item, os.getpid()))
+
+        def job_source():
+            for x in range(5):
+                yield ((x,), {"finished_func": lambda x=x: finished_func(x)})
+            yield None
+
+        def task_func(item, finished_func=None):
+            # finished_func is held in the parent and not passed to the worker
+            assert finished_func is None
+
+        tm = ProcessPoolTaskManager(
+            config, job_source_iterator=job_source, task_func=task_func
+        )
+        tm.blocking_start()
+
+        assert sorted(finished) == [(x, parent_pid) for x in range(5)]
+
+    def test_finished_func_called_when_task_fails(self):
+        config = get_config()
+        finished = []
+
+        def job_source():
+            for x in range(3):
+                yield ((x,), {"finished_func": lambda x=x: finished.append(x)})
+            yield None
+
+        def task_func(item):
+            raise ValueError("bad crash")
+
+        tm = ProcessPoolTaskManager(
+            config, job_source_iterator=job_source, task_func=task_func
+        )
+        tm.blocking_start()
+
+        assert sorted(finished) == [0, 1, 2]
+        assert sum(stats.failures for stats in tm.worker_stats.values()) == 3
+
+    def test_worker_init_func(self, tmpdir):
+        config = get_config()
+        state = {"initialized": False}
+
+        def worker_init_func():
+            state["initialized"] = True
+
+        def task_func(item):
+            path = os.path.join(str(tmpdir), str(item))
+            with open(path, "w") as fp:
+                fp.write(str(state["initialized"]))
+
+        tm = ProcessPoolTaskManager(
+            config, task_func=task_func, worker_init_func=worker_init_func
+        )
+        tm.blocking_start()
+
+        # Init happened in the workers, not the parent
+        assert state["initialized"] is False
+        values = {
+            open(str(tmpdir.join(name))).read() for name in os.listdir(str(tmpdir))
+        }
+        assert values == {"True"}
+
+    def test_worker_close_func_flushes_buffer(self, tmpdir):
+        config = get_config()
+        buffer = []
+
+        def task_func(item):
+            # Buffer items like a bulk crash storage does
+            buffer.append(item)
+
+        def worker_close_func():
+            path = os.path.join(str(tmpdir), str(os.getpid()))
+            with open(path, "w") as fp:
+                fp.write(",".join(str(item) for item in buffer))
+
+        tm = ProcessPoolTaskManager(
+            config, task_func=task_func, worker_close_func=worker_close_func
+        )
+        tm.blocking_start()
+
+        # Each worker flushed what it buffered when it quit
+        flushed = []
+        for name in os.listdir(str(tmpdir)):
+            data = open(str(tmpdir.join(name))).read()
+            flushed.extend(int(item) for item in data.split(",") if item)
+        assert sorted(flushed) == list(range(10))
+
+    def test_dead_worker_is_replaced(self):
+        config = get_config(number_of_processes=1, maximum_queue_size=1)
+        finished = []
+
+        def job_source():
+            for x in range(3):
+                yield ((x,), {"finished_func": lambda x=x: finished.append(x)})
+            yield None
+
+        def task_func(item):
+            if item == 1:
+                os._exit(1)
+
+        tm = ProcessPoolTaskManager(
+            config, job_source_iterator=job_source, task_func=task_func
+        )
+        tm.blocking_start()
+
+        # The job that killed the worker is not acked so it can be redelivered
+        assert sorted(finished) == [0, 2]
+        assert len(tm.workers) == 1
+
+    def test_killed_worker_doesnt_block_others(self):
+        config = get_config(number_of_processes=2, maximum_queue_size=2)
+        finished = []
+
+        def job_source():
+            for x in range(6):
+                yield ((x,), {"finished_func": lambda x=x: finished.append(x)})
+            yield None
+
+        def task_func(item):
+            if item == 1:
+                os.kill(os.getpid(), signal.SIGKILL)
+
+        tm = ProcessPoolTaskManager(
+            config, job_source_iterator=job_source, task_func=task_func
+        )
+        tm.blocking_start()
+
+        assert sorted(finished) == [0, 2, 3, 4, 5]
@@ -0,0 +1,36 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+from markus.testing import MetricsMock
+
+from socorro.processor.rules.base import Rule
+
+
+class SkippedRule(Rule):
+    def predicate(self, raw_crash, raw_dumps, processed_crash, proc_meta):
+        return False
+
+
+class TestRule:
+    def test_act_metrics(self):
+        rule = Rule()
+        with MetricsMock() as mm:
+            rule.act({}, {}, {}, {})
+
+            tags = ["rule:Rule"]
+            mm.assert_timing_once("processor.rule.act.timing", tags=tags)
+            mm.assert_timing_once("processor.rule.predicate.timing", tags=tags)
+            mm.assert_timing_once("processor.rule.action.timing", tags=tags)
+            mm.assert_timing_once("processor.rule.act.cputime", tags=tags)
+            mm.assert_not_incr("processor.rule.skipped", tags=tags)
+
+    def test_act_metrics_skipped(self):
+        rule = SkippedRule()
+        with MetricsMock() as mm:
+            rule.act({}, {}, {}, {})
+
+            tags = ["rule:SkippedRule"]
+            mm.assert_timing_once("processor.rule.predicate.timing", tags=tags)
+            mm.assert_incr_once("processor.rule.skipped", tags=tags)
+            mm.assert_not_timing("processor.rule.action.timing", tags=tags)
@@ -12,6 +12,7 @@ from markus.testing import MetricsMock
 from socorro.processor.processor_pipeline import ProcessorPipeline
 from socorro.processor.rules.breakpad import (
     BreakpadStackwalkerRule2015,
+    BreakpadStackwalkerServerRule,
     CrashingThreadRule,
     JitCrashCategorizeRule,
     MinidumpSha256Rule,
@@ -355,6 +356,127 @@ class TestBreakpadTransformRule2015:
             processor_meta["processor_notes"][1] == "MDSW failed with -1: unknown error"
         )
 
+    @mock.patch("socorro.processor.rules.breakpad.subprocess")
+    def test_output_cache(self, mocked_subprocess_module, tmpdir):
+        stackwalker = tmpdir.join("stackwalker")
+        stackwalker.write("stackwalker binary")
+        dump = tmpdir.join("a_fake_dump.dump")
+        dump.write("minidump")
+
+        output_cache = mock.Mock()
+        cached = {}
+        output_cache.get.side_effect = cached.get
+        output_cache.set.side_effect = cached.__setitem__
+
+        rule = self.build_rule()
+        rule.command_pathname = str(stackwalker)
+        rule.output_cache = output_cache
+
+        mocked_subprocess_handle = mocked_subprocess_module.Popen.return_value
+        mocked_subprocess_handle.stdout.read.return_value = (
+            canonical_stackwalker_output_str
+        )
+        mocked_subprocess_handle.wait.return_value = 0
+
+        raw_crash = copy.deepcopy(canonical_standard_raw_crash)
+        raw_dumps = {rule.dump_field: str(dump)}
+
+        # The first time the stackwalker runs and its output is cached
+        processed_crash = {}
+        rule.act(raw_crash, raw_dumps, processed_crash, get_basic_processor_meta())
+        assert processed_crash["json_dump"] == canonical_stackwalker_output
+        assert mocked_subprocess_module.Popen.call_count == 1
+        assert len(cached) == 1
+
+        # The second time the output comes from the cache
+        processed_crash = {}
+        with MetricsMock() as mm:
+            rule.act(raw_crash, raw_dumps, processed_crash, get_basic_processor_meta())
+            mm.assert_incr(
+                "processor.breakpadstackwalkerrule.output_cache", tags=["result:hit"]
+            )
+            mm.assert_not_incr("processor.breakpadstackwalkerrule.run")
+        assert processed_crash["json_dump"] == canonical_stackwalker_output
+        assert processed_crash["mdsw_return_code"] == 0
+        assert processed_crash["success"] is True
+        assert mocked_subprocess_module.Popen.call_count == 1
+
+        # A different raw crash is a different key
+        raw_crash["ProductName"] = "Thunderbird"
+        rule.act(raw_crash, raw_dumps, {}, get_basic_processor_meta())
+        assert mocked_subprocess_module.Popen.call_count == 2
+        assert len(cached) == 2
+
+        # With bypass on, the stackwalker always runs
+        rule.output_cache_bypass = True
+        rule.act(raw_crash, raw_dumps, {}, get_basic_processor_meta())
+        assert mocked_subprocess_module.Popen.call_count == 3
+
+    @mock.patch("socorro.processor.rules.breakpad.subprocess")
+    def test_output_cache_failure_not_cached(self, mocked_subprocess_module, tmpdir):
+        stackwalker = tmpdir.join("stackwalker")
+        stackwalker.write("stackwalker binary")
+        dump = tmpdir.join("a_fake_dump.dump")
+        dump.write("minidump")
+
+        output_cache = mock.Mock()
+        output_cache.get.return_value = None
+
+        rule = self.build_rule()
+        rule.command_pathname = str(stackwalker)
+        rule.output_cache = output_cache
+
+        mocked_subprocess_handle = mocked_subprocess_module.Popen.return_value
+        mocked_subprocess_handle.stdout.read.return_value = "{}\n"
+        mocked_subprocess_handle.wait.return_value = 124
+
+        raw_crash = copy.deepcopy(canonical_standard_raw_crash)
+        rule.act(
+            raw_crash, {rule.dump_field: str(dump)}, {}, get_basic_processor_meta(),
+        )
+        assert output_cache.set.call_count == 0
+
+    @mock.patch("socorro.processor.rules.breakpad.subprocess")
+    def test_output_cache_missing_symbols_not_cached(
+        self, mocked_subprocess_module, tmpdir
+    ):
+        stackwalker = tmpdir.join("stackwalker")
+        stackwalker.write("stackwalker binary")
+        dump = tmpdir.join("a_fake_dump.dump")
+        dump.write("minidump")
+
+        output_cache = mock.Mock()
+        output_cache.get.return_value = None
+
+        rule = self.build_rule()
+        rule.command_pathname = str(stackwalker)
+        rule.output_cache = output_cache
+
+        output = copy.deepcopy(canonical_stackwalker_output)
+        output["modules"] = [
+            {"filename": "xul.dll", "missing_symbols": True},
+            {"filename": "ntdll.dll", "missing_symbols": False},
+        ]
+        mocked_subprocess_handle = mocked_subprocess_module.Popen.return_value
+        mocked_subprocess_handle.stdout.read.return_value = json.dumps(output)
+        mocked_subprocess_handle.wait.return_value = 0
+
+        raw_crash = copy.deepcopy(canonical_standard_raw_crash)
+        processed_crash = {}
+        with MetricsMock() as mm:
+            rule.act(
+                raw_crash,
+                {rule.dump_field: str(dump)},
+                processed_crash,
+                get_basic_processor_meta(),
+            )
+            mm.assert_incr(
+                "processor.breakpadstackwalkerrule.output_cache",
+                tags=["result:missingsymbols"],
+            )
+        assert processed_crash["success"] is True
+        assert output_cache.set.call_count == 0
+
     @mock.patch("socorro.processor.rules.breakpad.os.unlink")
     def test_temp_file_context(self, mocked_unlink):
         rule = self.build_rule()
@@ -376,6 +498,88 @@ class TestBreakpadTransformRule2015:
         mocked_unlink.reset_mock()
 
 
+class TestBreakpadStackwalkerServerRule:
+    def build_rule(self):
+        pprcb = ProcessorPipeline.required_config.breakpad
+
+        return BreakpadStackwalkerServerRule(
+            dump_field="upload_file_minidump",
+            symbols_urls=["https://localhost"],
+            command_pathname=pprcb.command_pathname.default,
+            command_line=pprcb.command_line.default,
+            kill_timeout=5,
+            symbol_tmp_path="/tmp/symbols/tmp",
+            symbol_cache_path="/tmp/symbols/cache",
+            tmp_storage_path="/tmp",
+            pool_size=2,
+            max_requests=10,
+        )
+
+    def test_server_command_line_args(self):
+        rule = self.build_rule()
+        assert rule.server_command_line_args() == [
+            "/stackwalk/stackwalker",
+            "--server",
+            "--symbols-url",
+            "https://localhost",
+            "--symbols-cache",
+            "/tmp/symbols/cache",
+            "--symbols-tmp",
+            "/tmp/symbols/tmp",
+        ]
+
+    def test_everything_we_hoped_for(self):
+        rule = self.build_rule()
+        rule.pool = mock.Mock()
+        rule.pool.run.return_value = (canonical_stackwalker_output_str, 0)
+
+        raw_crash = copy.deepcopy(canonical_standard_raw_crash)
+        raw_dumps = {
+            rule.dump_field: "a_fake_dump.dump",
+            "upload_file_minidump_flash1": "flash1.dump",
+            "memory_report": "memory_report.json.gz",
+        }
+        processed_crash = {}
+        processor_meta = get_basic_processor_meta()
+
+        with MetricsMock() as mm:
+            rule.act(raw_crash, raw_dumps, processed_crash, processor_meta)
+
+            assert processed_crash["json_dump"] == canonical_stackwalker_output
+            assert processed_crash["mdsw_return_code"] == 0
+            assert processed_crash["success"] is True
+            assert processed_crash["additional_minidumps"] == [
+                "upload_file_minidump_flash1"
+            ]
+            assert processed_crash["upload_file_minidump_flash1"]["success"] is True
+            assert rule.pool.run.mock_calls == [
+                mock.call("a_fake_dump.dump", raw_crash),
+                mock.call("flash1.dump", raw_crash),
+            ]
+
+            mm.assert_incr(
+                "processor.breakpadstackwalkerrule.run",
+                tags=["outcome:success", "exitcode:0"],
+            )
+
+    def test_timeout(self):
+        rule = self.build_rule()
+        rule.pool = mock.Mock()
+        rule.pool.run.return_value = ("", 124)
+
+        raw_crash = copy.deepcopy(canonical_standard_raw_crash)
+        raw_dumps = {rule.dump_field: "a_fake_dump.dump"}
+        processed_crash = {}
+        processor_meta = get_basic_processor_meta()
+
+        rule.act(raw_crash, raw_dumps, processed_crash, processor_meta)
+
+        assert processed_crash["json_dump"] == {}
+        assert processed_crash["mdsw_return_code"] == 124
+        assert processed_crash["success"] is False
+        assert processor_meta["processor_notes"][-1] == "MDSW timeout (SIGKILL)"
+
+
 class TestJitCrashCategorizeRule:
     def build_rule(self):
         pprcj = ProcessorPipeline.required_config.jit
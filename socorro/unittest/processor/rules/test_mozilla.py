@@ -7,6 +7,7 @@ from io import BytesIO
 import json
 from unittest import mock
 
+from markus.testing import MetricsMock
 import requests_mock
 import pytest
 
@@ -1376,6 +1377,28 @@ class TestBetaVersionRule:
         assert processed_crash["version"] == "3.0b1"
         assert processor_meta["processor_notes"] == []
 
+    def test_cache_metrics(self):
+        processed_crash = {
+            "product": "Firefox",
+            "release_channel": "beta",
+            "version": "3.0",
+            "build": "20001001101010",
+        }
+
+        rule = self.build_rule()
+        with MetricsMock() as mm:
+            with requests_mock.Mocker() as req_mock:
+                req_mock.get(
+                    self.API_URL
+                    + "?product=Firefox&channel=beta&build_id=20001001101010",
+                    json={"hits": [{"version_string": "3.0b1"}], "total": 1},
+                )
+                for i in range(2):
+                    rule.act({}, {}, dict(processed_crash), get_basic_processor_meta())
+
+        mm.assert_incr("processor.betaversionrule.cache", tags=["result:miss"])
+        mm.assert_incr("processor.betaversionrule.cache", tags=["result:hit"])
+
     def test_release_channel(self):
         """Release channel doesn't trigger rule"""
         raw_crash = {}
@@ -1491,6 +1514,107 @@ class TestBetaVersionRule:
         assert processed_crash["version"] == "3.0b1"
         assert processor_meta["processor_notes"] == []
 
+    def test_preload(self):
+        rule = BetaVersionRule(
+            version_string_api=self.API_URL, version_strings_api=self.API_URL + "s",
+        )
+        with requests_mock.Mocker() as req_mock:
+            req_mock.get(
+                self.API_URL + "s?channel=beta&channel=aurora",
+                json={
+                    "hits": [
+                        {
+                            "product": "Firefox",
+                            "channel": "beta",
+                            "build_id": "20001001101010",
+                            "version_string": "3.0b1",
+                        },
+                        {
+                            "product": "Firefox",
+                            "channel": "aurora",
+                            "build_id": "20001001101011",
+                            "version_string": "3.0b2",
+                        },
+                    ],
+                    "total": 2,
+                },
+            )
+            with MetricsMock() as mm:
+                assert rule.preload() == 2
+            mm.assert_gauge("processor.betaversionrule.preload.size", value=2)
+
+            # Preloaded version strings don't require a lookup
+            processed_crash = {
+                "product": "Firefox",
+                "release_channel": "beta",
+                "version": "3.0",
+                "build": "20001001101010",
+            }
+            processor_meta = get_basic_processor_meta()
+            with mock.patch.object(rule, "_start_preload_thread"):
+                rule.action({}, {}, processed_crash, processor_meta)
+
+        assert processed_crash["version"] == "3.0b1"
+        assert [req.url.split("?")[0] for req in req_mock.request_history] == [
+            self.API_URL + "s"
+        ]
+
+    def test_preload_channel_case(self):
+        rule = BetaVersionRule(
+            version_string_api=self.API_URL, version_strings_api=self.API_URL + "s",
+        )
+        with requests_mock.Mocker() as req_mock:
+            req_mock.get(
+                self.API_URL + "s?channel=beta&channel=aurora",
+                json={
+                    "hits": [
+                        {
+                            "product": "Firefox",
+                            "channel": "beta",
+                            "build_id": "20001001101010",
+                            "version_string": "3.0b1",
+                        }
+                    ],
+                    "total": 1,
+                },
+            )
+            rule.preload()
+
+            # The crash's release channel is matched case-insensitively, so
+            # this doesn't make a lookup request
+            processed_crash = {
+                "product": "Firefox",
+                "release_channel": "Beta",
+                "version": "3.0",
+                "build": "20001001101010",
+            }
+            processor_meta = get_basic_processor_meta()
+            with mock.patch.object(rule, "_start_preload_thread"):
+                rule.action({}, {}, processed_crash, processor_meta)
+
+            assert req_mock.call_count == 1
+        assert processed_crash["version"] == "3.0b1"
+
+    def test_preload_thread(self):
+        rule = BetaVersionRule(
+            version_string_api=self.API_URL, version_strings_api=self.API_URL + "s",
+        )
+        with mock.patch.object(rule, "preload") as mock_preload:
+            rule._start_preload_thread()
+            thread = rule._preload_thread
+            rule.close()
+            thread.join(timeout=5)
+
+        # The thread loaded version strings once and stopped when the rule was
+        # closed
+        assert not thread.is_alive()
+        assert mock_preload.call_count == 1
+
+    def test_no_preload_thread(self):
+        rule = self.build_rule()
+        rule._start_preload_thread()
+        assert rule._preload_thread is None
+
 
 class TestOsPrettyName:
     @pytest.mark.parametrize(
@@ -1709,6 +1833,37 @@ class TestSignatureGeneratorRule:
         )
         assert processor_meta["processor_notes"] == []
 
+    def test_frame_cache_metrics(self):
+        rule = SignatureGeneratorRule(frame_cache_size=100)
+        processed_crash = {
+            "json_dump": {
+                "crash_info": {"crashing_thread": 0},
+                "crashing_thread": 0,
+                "threads": [
+                    {
+                        "frames": [
+                            {"frame": 0, "function": "Alpha::Echo", "file": "a.cpp"},
+                            {"frame": 1, "function": "Alpha::Echo", "file": "a.cpp"},
+                            {"frame": 2, "function": "Bravo::Echo", "file": "b.cpp"},
+                        ]
+                    }
+                ],
+            }
+        }
+
+        with MetricsMock() as mm:
+            rule.action({}, {}, copy.deepcopy(processed_crash), {"processor_notes": []})
+            mm.assert_incr("processor.signaturegeneratorrule.frame_cache.hit", value=1)
+            mm.assert_incr("processor.signaturegeneratorrule.frame_cache.miss", value=2)
+            mm.assert_gauge(
+                "processor.signaturegeneratorrule.frame_cache.size", value=2
+            )
+
+            mm.clear_records()
+            rule.action({}, {}, copy.deepcopy(processed_crash), {"processor_notes": []})
+            mm.assert_incr("processor.signaturegeneratorrule.frame_cache.hit", value=3)
+            mm.assert_not_incr("processor.signaturegeneratorrule.frame_cache.miss")
+
     def test_empty_raw_and_processed_crashes(self):
         rule = SignatureGeneratorRule()
         raw_crash = {}
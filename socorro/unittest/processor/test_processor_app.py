@@ -2,12 +2,17 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
+import functools
 from unittest import mock
 
 from configman.dotdict import DotDict
 import pytest
 
-from socorro.external.crashstorage_base import CrashIDNotFound, PolyStorageError
+from socorro.external.crashstorage_base import (
+    CrashIDNotFound,
+    CrashStorageBase,
+    PolyStorageError,
+)
 from socorro.processor.processor_app import ProcessorApp
 
 
@@ -36,6 +41,10 @@ class TestProcessorApp:
         config.source = DotDict()
         mocked_source_crashstorage = mock.Mock()
         mocked_source_crashstorage.id = "mocked_source_crashstorage"
+        # Use the base get_crash_bundle so tests can mock the individual getters
+        mocked_source_crashstorage.get_crash_bundle.side_effect = functools.partial(
+            CrashStorageBase.get_crash_bundle, mocked_source_crashstorage
+        )
         config.source.crashstorage_class = mock.Mock(
             return_value=mocked_source_crashstorage
         )
@@ -73,6 +82,17 @@ class TestProcessorApp:
         assert next(g) is None
         assert next(g) == ((3,), {})
 
+    def test_close_worker(self):
+        config = self.get_standard_config()
+        pa = ProcessorApp(config)
+        pa._setup_source_and_destination()
+        pa._setup_worker()
+        pa._close_worker()
+
+        pa.source.close.assert_called_once_with()
+        pa.destination.close.assert_called_once_with()
+        pa.processor.close.assert_called_once_with()
+
     def test_transform_success(self):
         config = self.get_standard_config()
         pa = ProcessorApp(config)
@@ -2,14 +2,21 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
+import os
+import pstats
 from unittest import mock
 
 from configman import ConfigurationManager
 from configman.dotdict import DotDict
 
 from socorro.processor.processor_pipeline import ProcessorPipeline
+from socorro.processor.rules.breakpad import (
+    BreakpadStackwalkerRule2015,
+    BreakpadStackwalkerServerRule,
+)
 from socorro.processor.rules.general import CPUInfoRule, OSInfoRule
 from socorro.processor.rules.base import Rule
+from socorro.processor.stackwalker_cache import DiskStackwalkerCache
 
 
 class BadRule(Rule):
@@ -18,10 +25,10 @@ class BadRule(Rule):
 
 
 class TestProcessorPipeline:
-    def get_config(self):
+    def get_config(self, values_source=None):
         cm = ConfigurationManager(
             definition_source=ProcessorPipeline.get_required_config(),
-            values_source_list=[],
+            values_source_list=[values_source or {}],
         )
         config = cm.get_config()
         config.database_class = mock.Mock()
@@ -105,3 +112,52 @@ class TestProcessorPipeline:
             " we've been here before; yep"
         )
         assert processed_crash.processor_notes == expected
+
+    def test_stackwalker_rule(self):
+        config = self.get_config()
+        rule = ProcessorPipeline(config).get_stackwalker_rule(config)
+        assert type(rule) == BreakpadStackwalkerRule2015
+
+    def test_stackwalker_server_rule(self):
+        config = self.get_config()
+        config.breakpad.server_pool_size = 2
+        rule = ProcessorPipeline(config).get_stackwalker_rule(config)
+        assert type(rule) == BreakpadStackwalkerServerRule
+        assert rule.pool.size == 2
+        assert rule.pool.max_requests == 1000
+
+    def test_stackwalker_rule_output_cache(self, tmpdir):
+        config = self.get_config(
+            {
+                "breakpad.output_cache.cache_class": (
+                    "socorro.processor.stackwalker_cache.DiskStackwalkerCache"
+                ),
+                "breakpad.output_cache.cache_path": str(tmpdir),
+                "breakpad.output_cache.bypass": True,
+            }
+        )
+        rule = ProcessorPipeline(config).get_stackwalker_rule(config)
+        assert isinstance(rule.output_cache, DiskStackwalkerCache)
+        assert rule.output_cache.cache_path == str(tmpdir)
+        assert rule.output_cache_bypass is True
+
+    def test_profiling(self, tmpdir):
+        config = self.get_config()
+        config.profiling.profile_dir = str(tmpdir)
+        config.profiling.sample_rate = 1.0
+        config.profiling.keep_slowest = 2
+
+        p = ProcessorPipeline(config, rules=[CPUInfoRule(), OSInfoRule()])
+        for i in range(4):
+            p.process_crash(DotDict({"uuid": str(i)}), {}, DotDict())
+
+        # Only the slowest profiles are kept
+        profiles = os.listdir(str(tmpdir))
+        assert len(profiles) == 2
+        assert all(name.endswith(".prof") for name in profiles)
+        stats = pstats.Stats(str(tmpdir.join(profiles[0])))
+        assert stats.total_calls > 0
+
+    def test_profiling_disabled(self):
+        p = ProcessorPipeline(self.get_config(), rules=[CPUInfoRule()])
+        assert p.profiler is None
@@ -0,0 +1,53 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import os
+from unittest import mock
+
+from markus.testing import MetricsMock
+
+from socorro.processor.profiling import SlowestCrashProfiler
+
+
+class TestSlowestCrashProfiler:
+    def test_not_sampled(self, tmpdir):
+        profiler = SlowestCrashProfiler(
+            profile_dir=str(tmpdir), sample_rate=0.0, keep_slowest=5
+        )
+        with profiler.profile("crash1"):
+            pass
+        assert os.listdir(str(tmpdir)) == []
+
+    def test_keeps_slowest(self, tmpdir):
+        profiler = SlowestCrashProfiler(
+            profile_dir=str(tmpdir), sample_rate=1.0, keep_slowest=2
+        )
+        with MetricsMock() as mm:
+            # Fake how long each crash took
+            with mock.patch("socorro.processor.profiling.time.perf_counter") as pc:
+                for crash_id, elapsed in [("a", 3), ("b", 1), ("c", 5), ("d", 2)]:
+                    pc.side_effect = [0, elapsed]
+                    with profiler.profile(crash_id):
+                        pass
+
+            assert (
+                len(mm.filter_records("incr", stat="processor.profiling.sampled")) == 4
+            )
+            assert len(mm.filter_records("incr", stat="processor.profiling.saved")) == 3
+
+        assert sorted(os.listdir(str(tmpdir))) == [
+            "00003000ms_a.prof",
+            "00005000ms_c.prof",
+        ]
+
+    def test_exception_still_profiled(self, tmpdir):
+        profiler = SlowestCrashProfiler(
+            profile_dir=str(tmpdir), sample_rate=1.0, keep_slowest=2
+        )
+        try:
+            with profiler.profile("crash1"):
+                raise ValueError("bad")
+        except ValueError:
+            pass
+        assert len(os.listdir(str(tmpdir))) == 1
@@ -0,0 +1,58 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import os
+
+from configman.dotdict import DotDict
+
+from socorro.external.boto.connection_context import S3Connection
+from socorro.processor.stackwalker_cache import (
+    DiskStackwalkerCache,
+    S3StackwalkerCache,
+)
+from socorro.unittest.external.boto import get_config
+
+
+class TestDiskStackwalkerCache:
+    def build_cache(self, tmpdir, max_size=1000):
+        return DiskStackwalkerCache(
+            DotDict({"cache_path": str(tmpdir), "max_size": max_size})
+        )
+
+    def test_get_set(self, tmpdir):
+        cache = self.build_cache(tmpdir)
+        assert cache.get("abcdef") is None
+
+        cache.set("abcdef", b'{"status": "OK"}')
+        assert cache.get("abcdef") == b'{"status": "OK"}'
+        assert os.listdir(str(tmpdir.join("ab"))) == ["abcdef.json"]
+
+    def test_evicts_least_recently_used(self, tmpdir):
+        cache = self.build_cache(tmpdir, max_size=250)
+        cache.set("aa1", b"x" * 100)
+        cache.set("bb2", b"x" * 100)
+
+        # Make aa1 the least recently used and then use bb2
+        os.utime(str(tmpdir.join("aa", "aa1.json")), (1000, 1000))
+        os.utime(str(tmpdir.join("bb", "bb2.json")), (2000, 2000))
+        assert cache.get("bb2") is not None
+
+        cache.set("cc3", b"x" * 100)
+        assert cache.get("aa1") is None
+        assert cache.get("bb2") is not None
+        assert cache.get("cc3") is not None
+
+
+class TestS3StackwalkerCache:
+    def test_get_set(self, boto_helper):
+        config = get_config(
+            cls=S3StackwalkerCache, values_source={"resource_class": S3Connection},
+        )
+        cache = S3StackwalkerCache(config)
+        boto_helper.create_bucket(cache.conn.bucket)
+
+        assert cache.get("abcdef") is None
+        cache.set("abcdef", b'{"status": "OK"}')
+        assert cache.get("abcdef") == b'{"status": "OK"}'
+        assert boto_helper.list(cache.conn.bucket) == ["v1/stackwalker_output/abcdef"]
@@ -0,0 +1,141 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import json
+import sys
+import textwrap
+
+import pytest
+
+from socorro.processor.stackwalker_pool import (
+    StackwalkerServerPool,
+    TIMEOUT_RETURN_CODE,
+)
+
+
+FAKE_SERVER = textwrap.dedent(
+    """\
+    import json
+    import os
+    import signal
+    import sys
+    import time
+
+    stdin = sys.stdin.buffer
+    stdout = sys.stdout.buffer
+    while True:
+        header = stdin.readline()
+        if not header:
+            break
+        request = json.loads(stdin.read(int(header)))
+        minidump = request["minidump"]
+        if minidump == "hang":
+            time.sleep(60)
+        elif minidump == "segfault":
+            os.kill(os.getpid(), signal.SIGSEGV)
+        response = json.dumps(
+            {
+                "status": "OK",
+                "minidump": minidump,
+                "pid": os.getpid(),
+                "raw_crash": request.get("raw_crash"),
+            }
+        ).encode("utf-8")
+        stdout.write(b"%d\\n" % len(response) + response)
+        stdout.flush()
+    """
+)
+
+
+@pytest.fixture
+def fake_server_args(tmpdir):
+    path = tmpdir.join("fake_stackwalker.py")
+    path.write(FAKE_SERVER)
+    return [sys.executable, str(path)]
+
+
+class TestStackwalkerServerPool:
+    def test_run(self, fake_server_args):
+        pool = StackwalkerServerPool(fake_server_args, size=2, kill_timeout=5)
+        try:
+            output, return_code = pool.run("/tmp/dump.dmp", {"ProductName": "Firefox"})
+            assert return_code == 0
+            data = json.loads(output)
+            assert data["status"] == "OK"
+            assert data["minidump"] == "/tmp/dump.dmp"
+            assert data["raw_crash"] == {"ProductName": "Firefox"}
+        finally:
+            pool.close()
+
+    def test_servers_are_reused(self, fake_server_args):
+        pool = StackwalkerServerPool(fake_server_args, size=1, kill_timeout=5)
+        try:
+            pids = {json.loads(pool.run("dump", {})[0])["pid"] for i in range(3)}
+            assert len(pids) == 1
+        finally:
+            pool.close()
+
+    def test_max_requests_recycles(self, fake_server_args):
+        pool = StackwalkerServerPool(
+            fake_server_args, size=1, kill_timeout=5, max_requests=2
+        )
+        try:
+            pids = [json.loads(pool.run("dump", {})[0])["pid"] for i in range(4)]
+            assert pids[0] == pids[1]
+            assert pids[1] != pids[2]
+            assert pids[2] == pids[3]
+        finally:
+            pool.close()
+
+    def test_timeout(self, fake_server_args):
+        pool = StackwalkerServerPool(fake_server_args, size=1, kill_timeout=0.5)
+        try:
+            output, return_code = pool.run("hang", {})
+            assert output == ""
+            assert return_code == TIMEOUT_RETURN_CODE
+
+            # The hung server was replaced
+            output, return_code = pool.run("dump", {})
+            assert return_code == 0
+        finally:
+            pool.close()
+
+    def test_server_dies(self, fake_server_args):
+        pool = StackwalkerServerPool(fake_server_args, size=1, kill_timeout=5)
+        try:
+            output, return_code = pool.run("segfault", {})
+            assert output == ""
+            assert return_code == -11
+
+            # The dead server was replaced
+            output, return_code = pool.run("dump", {})
+            assert return_code == 0
+        finally:
+            pool.close()
+
+    def test_request_error_discards_server(self, fake_server_args):
+        pool = StackwalkerServerPool(fake_server_args, size=1, kill_timeout=5)
+        try:
+            pool.run("dump", {})
+            servers = list(pool._servers)
+
+            # The raw crash can't be serialized
+            with pytest.raises(TypeError):
+                pool.run("dump", {"bad": object()})
+
+            # The server was stopped and discarded
+            assert not any(server.is_alive() for server in servers)
+            assert not (set(pool._servers) & set(servers))
+            output, return_code = pool.run("dump", {})
+            assert return_code == 0
+        finally:
+            pool.close()
+
+    def test_close(self, fake_server_args):
+        pool = StackwalkerServerPool(fake_server_args, size=1, kill_timeout=5)
+        pool.run("dump", {})
+        servers = list(pool._servers)
+        pool.close()
+        assert servers
+        assert not any(server.is_alive() for server in servers)
@@ -0,0 +1,171 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import json
+import os
+
+from configman.dotdict import DotDict
+import pytest
+
+from socorro.scripts.benchmark_processor import (
+    format_change,
+    get_pipeline_config,
+    load_corpus,
+    main,
+    percentile,
+    ReplayProcessorPipeline,
+)
+
+
+CRASH_ID = "de1bb258-cbbf-4589-a673-34f800160918"
+
+RAW_CRASH = {
+    "uuid": CRASH_ID,
+    "ProductName": "Firefox",
+    "Version": "80.0",
+    "BuildID": "20200801000000",
+    "ReleaseChannel": "beta",
+    "CrashTime": "1596300000",
+    "StartupTime": "1596290000",
+    "submitted_timestamp": "2020-08-01T17:00:00+00:00",
+}
+
+JSON_DUMP = {
+    "status": "OK",
+    "system_info": {"os": "Windows NT", "cpu_arch": "x86", "cpu_count": 4},
+    "crash_info": {"type": "EXCEPTION_ACCESS_VIOLATION_READ", "crashing_thread": 0},
+    "crashing_thread": {
+        "threads_index": 0,
+        "frames": [
+            {
+                "frame": 0,
+                "module": "xul.dll",
+                "function": "js::GCMarker::drainMarkStack",
+            }
+        ],
+    },
+    "threads": [
+        {
+            "frames": [
+                {
+                    "frame": 0,
+                    "module": "xul.dll",
+                    "function": "js::GCMarker::drainMarkStack",
+                }
+            ]
+        }
+    ],
+}
+
+PROCESSED_CRASH = {
+    "uuid": CRASH_ID,
+    "product": "Firefox",
+    "release_channel": "beta",
+    "build": "20200801000000",
+    "version": "80.0b3",
+    "json_dump": JSON_DUMP,
+    "mdsw_return_code": 0,
+}
+
+
+@pytest.fixture
+def corpusdir(tmpdir):
+    path = tmpdir.join("v2", "raw_crash", CRASH_ID[0:3], "20" + CRASH_ID[-6:])
+    path.ensure(dir=True)
+    path.join(CRASH_ID).write(json.dumps(RAW_CRASH))
+
+    path = tmpdir.join("v1", "processed_crash")
+    path.ensure(dir=True)
+    path.join(CRASH_ID).write(json.dumps(PROCESSED_CRASH))
+
+    # A crash without processed data is skipped
+    other_crash_id = "0bba929f-8721-460c-dead-a43c20071027"
+    path = tmpdir.join(
+        "v2", "raw_crash", other_crash_id[0:3], "20" + other_crash_id[-6:]
+    )
+    path.ensure(dir=True)
+    path.join(other_crash_id).write(json.dumps({"uuid": other_crash_id}))
+    return tmpdir
+
+
+def test_percentile():
+    assert percentile([], 50) == 0.0
+    assert percentile([1, 2, 3, 4], 50) == 2
+    assert percentile(list(range(1, 101)), 95) == 95
+    assert percentile([5], 99) == 5
+
+
+@pytest.mark.parametrize(
+    "value, baseline_value, higher_is_better, expected",
+    [
+        (1.05, 1.0, False, "  (5.0% worse)"),
+        (0.95, 1.0, False, "  (5.0% better)"),
+        (1.05, 1.0, True, "  (5.0% better)"),
+        (0.95, 1.0, True, "  (5.0% worse)"),
+        (1.0, None, False, ""),
+    ],
+)
+def test_format_change(value, baseline_value, higher_is_better, expected):
+    assert format_change(value, baseline_value, higher_is_better) == expected
+
+
+def test_load_corpus(corpusdir):
+    crashes = load_corpus(str(corpusdir))
+    assert [crash.crash_id for crash in crashes] == [CRASH_ID]
+    assert crashes[0].raw_crash["ProductName"] == "Firefox"
+    assert crashes[0].raw_dumps == {}
+
+
+def test_replay(corpusdir, tmpdir):
+    crashes = load_corpus(str(corpusdir))
+    config = get_pipeline_config()
+    config.breakpad.tmp_storage_path = str(tmpdir)
+    pipeline = ReplayProcessorPipeline(config, recorded=crashes)
+
+    raw_crash = DotDict(crashes[0].raw_crash)
+    processed_crash = pipeline.process_crash(raw_crash, crashes[0].raw_dumps, DotDict())
+
+    # Stackwalker output and beta version were replayed from the recording
+    assert processed_crash["json_dump"]["status"] == "OK"
+    assert processed_crash["mdsw_return_code"] == 0
+    assert processed_crash["version"] == "80.0b3"
+    assert processed_crash["signature"] == "js::GCMarker::drainMarkStack"
+
+
+def test_main(corpusdir, tmpdir, capsys):
+    output = str(tmpdir.join("results.json"))
+    assert (
+        main(["--warmup=0", "--iterations=2", "--output", output, str(corpusdir)]) == 0
+    )
+
+    with open(output) as fp:
+        results = json.load(fp)
+    assert results["crashes"] == 2
+    assert results["latency_ms"]["p50"] > 0
+    assert "SignatureGeneratorRule" in results["rules"]
+    assert results["rules"]["SignatureGeneratorRule"]["act_timing_mean_ms"] > 0
+
+    stdout = capsys.readouterr().out
+    assert "Throughput:" in stdout
+    assert "SignatureGeneratorRule" in stdout
+
+
+def test_main_baseline_regression(corpusdir, tmpdir):
+    baseline = str(tmpdir.join("baseline.json"))
+    assert main(["--warmup=0", "--output", baseline, str(corpusdir)]) == 0
+
+    # Make the baseline impossibly fast so this run is a regression
+    with open(baseline) as fp:
+        results = json.load(fp)
+    results["latency_ms"]["p95"] = 0.000001
+    with open(baseline, "w") as fp:
+        json.dump(results, fp)
+
+    args = ["--warmup=0", "--baseline", baseline, "--max-regression=10"]
+    assert main(args + [str(corpusdir)]) == 1
+
+
+def test_main_no_crashes(tmpdir):
+    assert main([str(tmpdir)]) == 1
+    assert main([os.path.join(str(tmpdir), "missing")]) == 1
@@ -0,0 +1,188 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import json
+import os
+from unittest import mock
+
+import pytest
+import requests_mock
+
+from socorro.scripts.fetch_crash_data import (
+    DEFAULT_RETRY_AFTER,
+    main,
+    parse_retry_after,
+    RateLimitedError,
+    RateLimitedSession,
+    write_atomically,
+)
+
+
+HOST = "http://example.com"
+CRASH_ID = "de1bb258-cbbf-4589-a673-34f800160918"
+CRASH_ID_2 = "de1bb258-cbbf-4589-a673-34f800160919"
+
+
+def raw_crash_url(crash_id, file_format="meta", name=None):
+    url = HOST + "/api/RawCrash/?crash_id=%s&format=%s" % (crash_id, file_format)
+    if name:
+        url += "&name=" + name
+    return url
+
+
+def register_crash(req_mock, crash_id):
+    req_mock.get(
+        raw_crash_url(crash_id),
+        json={"uuid": crash_id, "dump_checksums": {"upload_file_minidump": "abc"}},
+    )
+    req_mock.get(raw_crash_url(crash_id, "raw", "dump"), content=b"minidump")
+    req_mock.get(
+        HOST + "/api/ProcessedCrash/?crash_id=%s&format=meta" % crash_id,
+        json={"uuid": crash_id, "signature": "OOM | small"},
+    )
+
+
+def list_files(outputdir):
+    files = []
+    for dirpath, dirnames, filenames in os.walk(outputdir):
+        for filename in filenames:
+            files.append(os.path.relpath(os.path.join(dirpath, filename), outputdir))
+    return sorted(files)
+
+
+def fetch(outputdir, *crash_ids):
+    return main(
+        ["--host", HOST, "--processed", "--workers", "2", str(outputdir)]
+        + list(crash_ids)
+    )
+
+
+class TestMain:
+    def test_fetch(self, tmpdir):
+        with requests_mock.Mocker() as req_mock:
+            register_crash(req_mock, CRASH_ID)
+            register_crash(req_mock, CRASH_ID_2)
+            assert fetch(tmpdir, CRASH_ID, CRASH_ID_2) == 0
+
+        assert list_files(str(tmpdir)) == [
+            "v1/dump/" + CRASH_ID,
+            "v1/dump/" + CRASH_ID_2,
+            "v1/dump_names/" + CRASH_ID,
+            "v1/dump_names/" + CRASH_ID_2,
+            "v1/processed_crash/" + CRASH_ID,
+            "v1/processed_crash/" + CRASH_ID_2,
+            "v2/raw_crash/de1/20160918/" + CRASH_ID,
+            "v2/raw_crash/de1/20160919/" + CRASH_ID_2,
+        ]
+        assert tmpdir.join("v1", "dump", CRASH_ID).read() == "minidump"
+        assert json.loads(tmpdir.join("v1", "dump_names", CRASH_ID).read()) == [
+            "upload_file_minidump"
+        ]
+
+    def test_skips_fetched_crashes(self, tmpdir):
+        with requests_mock.Mocker() as req_mock:
+            register_crash(req_mock, CRASH_ID)
+            assert fetch(tmpdir, CRASH_ID) == 0
+            call_count = req_mock.call_count
+
+            assert fetch(tmpdir, CRASH_ID) == 0
+            assert req_mock.call_count == call_count
+
+    def test_refetches_incomplete_crashes(self, tmpdir):
+        with requests_mock.Mocker() as req_mock:
+            register_crash(req_mock, CRASH_ID)
+            assert fetch(tmpdir, CRASH_ID) == 0
+            call_count = req_mock.call_count
+
+            # Remove the dump as if the previous run was interrupted
+            tmpdir.join("v1", "dump", CRASH_ID).remove()
+            assert fetch(tmpdir, CRASH_ID) == 0
+            assert req_mock.call_count == call_count * 2
+            assert tmpdir.join("v1", "dump", CRASH_ID).exists()
+
+    def test_missing_crash(self, tmpdir, capsys):
+        with requests_mock.Mocker() as req_mock:
+            req_mock.get(raw_crash_url(CRASH_ID), status_code=404)
+            register_crash(req_mock, CRASH_ID_2)
+            assert fetch(tmpdir, CRASH_ID, CRASH_ID_2) == 0
+
+        assert "%s: does not exist." % CRASH_ID in capsys.readouterr().out
+        assert tmpdir.join("v1", "processed_crash", CRASH_ID_2).exists()
+
+    def test_error(self, tmpdir):
+        with requests_mock.Mocker() as req_mock:
+            register_crash(req_mock, CRASH_ID)
+            req_mock.get(raw_crash_url(CRASH_ID, "raw", "dump"), status_code=400)
+            assert fetch(tmpdir, CRASH_ID) == 1
+
+        # Nothing was saved for the crash, so it'll be fetched again next time
+        assert not tmpdir.join("v2").exists()
+
+
+class TestRateLimitedSession:
+    def test_retries_after_429(self):
+        with requests_mock.Mocker() as req_mock:
+            req_mock.get(
+                HOST,
+                [
+                    {"status_code": 429, "headers": {"Retry-After": "0"}},
+                    {"status_code": 200, "text": "ok"},
+                ],
+            )
+            resp = RateLimitedSession().get(HOST)
+            assert resp.text == "ok"
+            assert req_mock.call_count == 2
+
+    def test_pauses_all_requests(self):
+        session = RateLimitedSession()
+        with requests_mock.Mocker() as req_mock:
+            req_mock.get(
+                HOST,
+                [
+                    {"status_code": 429, "headers": {"Retry-After": "5"}},
+                    {"status_code": 200, "text": "ok"},
+                ],
+            )
+            with mock.patch("socorro.scripts.fetch_crash_data.time") as mock_time:
+                mock_time.monotonic.side_effect = [100, 100, 100, 105, 105]
+                session.get(HOST)
+                mock_time.sleep.assert_called_once_with(5)
+
+    def test_gives_up(self):
+        with requests_mock.Mocker() as req_mock:
+            req_mock.get(HOST, status_code=429, headers={"Retry-After": "0"})
+            with pytest.raises(RateLimitedError):
+                RateLimitedSession(max_attempts=3).get(HOST)
+            assert req_mock.call_count == 3
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        (None, DEFAULT_RETRY_AFTER),
+        ("", DEFAULT_RETRY_AFTER),
+        ("120", 120),
+        ("-5", 0),
+        ("garbage", DEFAULT_RETRY_AFTER),
+        # HTTP dates in the past mean we can retry now
+        ("Wed, 21 Oct 2015 07:28:00 GMT", 0),
+    ],
+)
+def test_parse_retry_after(value, expected):
+    assert parse_retry_after(value) == expected
+
+
+def test_write_atomically(tmpdir):
+    fn = str(tmpdir.join("a", "b", "file"))
+    write_atomically(fn, b"data")
+    assert open(fn, "rb").read() == b"data"
+
+    with mock.patch("socorro.scripts.fetch_crash_data.os.replace") as mock_replace:
+        mock_replace.side_effect = OSError("disk full")
+        with pytest.raises(OSError):
+            write_atomically(fn, b"new data")
+
+    # The old file is intact and the temp file was cleaned up
+    assert open(fn, "rb").read() == b"data"
+    assert os.listdir(str(tmpdir.join("a", "b"))) == ["file"]
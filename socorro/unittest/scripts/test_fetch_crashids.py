@@ -5,8 +5,12 @@
 import operator
 
 import pytest
+import requests_mock
 
-from socorro.scripts.fetch_crashids import INFINITY
+from socorro.scripts.fetch_crashids import fetch_crashids, INFINITY
+
+
+HOST = "http://example.com"
 
 
 @pytest.mark.parametrize(
@@ -44,3 +48,80 @@ def test_infinity_lhs_subtraction():
 def test_infinity_rhs_subtraction():
     with pytest.raises(ValueError):
         5 - INFINITY
+
+
+def crash_ids(start, end):
+    return ["de1bb258-cbbf-4589-a673-34f8%08d" % i for i in range(start, end)]
+
+
+def cursor_pages(count):
+    """Build Super Search responses for paging through count crash ids with a cursor
+
+    Like Super Search, total only counts the hits after the cursor.
+
+    """
+    pages = []
+    for start in range(0, count, 1000):
+        end = min(start + 1000, count)
+        pages.append(
+            {
+                "json": {
+                    "hits": [{"uuid": uuid} for uuid in crash_ids(start, end)],
+                    "total": count - start,
+                    "next_cursor": "cursor%d" % end if end < count else None,
+                }
+            }
+        )
+    return pages
+
+
+def test_fetch_crashids_cursor():
+    with requests_mock.Mocker() as req_mock:
+        req_mock.get(HOST + "/api/SuperSearch/", cursor_pages(3000))
+        params = {"product": "Firefox"}
+        assert list(fetch_crashids(HOST, params, 10000)) == crash_ids(0, 3000)
+
+        first, second, third = req_mock.request_history
+        assert first.qs["_cursor"] == ["*"]
+        assert first.qs["_facets_size"] == ["0"]
+        assert "_results_offset" not in first.qs
+        assert second.qs["_cursor"] == ["cursor1000"]
+        assert third.qs["_cursor"] == ["cursor2000"]
+
+
+def test_fetch_crashids_cursor_num_results():
+    with requests_mock.Mocker() as req_mock:
+        req_mock.get(HOST + "/api/SuperSearch/", cursor_pages(3000))
+        params = {"product": "Firefox"}
+        assert list(fetch_crashids(HOST, params, 2500)) == crash_ids(0, 2500)
+
+        first, second, third = req_mock.request_history
+        assert third.qs["_results_number"] == ["500"]
+
+
+def test_fetch_crashids_sorted_uses_offset():
+    with requests_mock.Mocker() as req_mock:
+        req_mock.get(
+            HOST + "/api/SuperSearch/",
+            [
+                {
+                    "json": {
+                        "hits": [{"uuid": uuid} for uuid in crash_ids(0, 1000)],
+                        "total": 1200,
+                    }
+                },
+                {
+                    "json": {
+                        "hits": [{"uuid": uuid} for uuid in crash_ids(1000, 1200)],
+                        "total": 1200,
+                    }
+                },
+            ],
+        )
+        params = {"product": "Firefox", "_sort": "-date"}
+        assert list(fetch_crashids(HOST, params, 1100)) == crash_ids(0, 1100)
+
+        first, second = req_mock.request_history
+        assert "_cursor" not in first.qs
+        assert second.qs["_results_offset"] == ["1000"]
+        assert second.qs["_results_number"] == ["100"]
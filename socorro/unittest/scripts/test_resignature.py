@@ -0,0 +1,166 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import csv
+import gzip
+import io
+import json
+from unittest import mock
+
+import pytest
+
+from socorro.scripts.resignature import (
+    FSSource,
+    get_source,
+    main,
+    Report,
+    S3Source,
+)
+
+
+def build_processed_crash(crash_id, signature, function):
+    return {
+        "uuid": crash_id,
+        "signature": signature,
+        "json_dump": {
+            "crash_info": {"crashing_thread": 0},
+            "crashing_thread": 0,
+            "threads": [{"frames": [{"frame": 0, "function": function}]}],
+        },
+    }
+
+
+CRASHES = [
+    # (crash id, stored signature, top frame function)
+    ("0bba929f-8721-460c-dead-a43c20071025", "OldSignature", "js::GCMarker::drain"),
+    ("0bba929f-8721-460c-dead-a43c20071026", "OldSignature", "js::GCMarker::drain"),
+    ("1bba929f-8721-460c-dead-a43c20071025", "nsThread::Run", "nsThread::Run"),
+]
+
+
+@pytest.fixture
+def fs_root(tmpdir):
+    for crash_id, signature, function in CRASHES:
+        # FSPermanentStorage puts crashes in root/yyyymmdd/name/radix...
+        path = tmpdir.join("20" + crash_id[-6:], "name", crash_id[0:2], crash_id[2:4])
+        path.ensure(dir=True)
+        path.join(crash_id + ".json").write(json.dumps({"uuid": crash_id}))
+        with gzip.open(str(path.join(crash_id + ".jsonz")), "wb") as fp:
+            processed_crash = build_processed_crash(crash_id, signature, function)
+            fp.write(json.dumps(processed_crash).encode("utf-8"))
+    return str(tmpdir)
+
+
+class TestFSSource:
+    def test_list_and_load(self, fs_root):
+        source = FSSource(fs_root)
+        items = list(source.list())
+        assert len(items) == 3
+
+        crash_id, raw_crash, processed_crash = source.load(items[0])
+        assert crash_id == CRASHES[0][0]
+        assert raw_crash == {"uuid": crash_id}
+        assert processed_crash["signature"] == "OldSignature"
+
+
+class TestS3Source:
+    def test_list_and_load(self):
+        crash_id, signature, function = CRASHES[0]
+        processed_crash = build_processed_crash(crash_id, signature, function)
+        objects = {
+            "v1/processed_crash/" + crash_id: processed_crash,
+            "v2/raw_crash/0bb/20071025/" + crash_id: {"uuid": crash_id},
+        }
+
+        client = mock.MagicMock()
+        client.get_paginator.return_value.paginate.return_value = [
+            {"Contents": [{"Key": "v1/processed_crash/" + crash_id}]}
+        ]
+        client.get_object.side_effect = lambda Bucket, Key: {
+            "Body": io.BytesIO(json.dumps(objects[Key]).encode("utf-8"))
+        }
+
+        source = S3Source("crashbucket", "0bb")
+        source._client = client
+
+        assert list(source.list()) == [crash_id]
+        client.get_paginator.return_value.paginate.assert_called_with(
+            Bucket="crashbucket", Prefix="v1/processed_crash/0bb"
+        )
+        loaded_crash_id, raw_crash, processed_crash = source.load(crash_id)
+        assert loaded_crash_id == crash_id
+        assert raw_crash == {"uuid": crash_id}
+        assert processed_crash["signature"] == signature
+
+
+def test_get_source(tmpdir):
+    source = get_source("s3://crashbucket/0bb")
+    assert (source.bucket, source.crashid_prefix) == ("crashbucket", "0bb")
+    assert isinstance(get_source(str(tmpdir)), FSSource)
+    with pytest.raises(ValueError):
+        get_source(str(tmpdir.join("missing")))
+
+
+class TestReport:
+    def test_rows(self):
+        report = Report(max_examples=1)
+        report.add("id1", "a", "b", None)
+        report.add("id2", "a", "b", None)
+        report.add("id3", "c", "c", None)
+        report.add("id4", None, None, "ValueError: bad")
+
+        assert (report.total, report.changed, len(report.errors)) == (3, 2, 1)
+        assert list(report.rows()) == [
+            {
+                "old_signature": "a",
+                "new_signature": "b",
+                "count": 2,
+                "crash_ids": ["id1"],
+            }
+        ]
+        assert len(list(report.rows(include_unchanged=True))) == 2
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_main_csv(fs_root, tmpdir, workers):
+    output = str(tmpdir.join("report.csv"))
+    assert main(["--workers", str(workers), "--output", output, fs_root]) == 0
+
+    with open(output, "r") as fp:
+        rows = list(csv.reader(fp))
+    assert rows == [
+        ["old_signature", "new_signature", "count", "crash_ids"],
+        [
+            "OldSignature",
+            "js::GCMarker::drain",
+            "2",
+            "0bba929f-8721-460c-dead-a43c20071025 0bba929f-8721-460c-dead-a43c20071026",
+        ],
+    ]
+
+
+def test_main_jsonl(fs_root, capsys):
+    assert (
+        main(["--workers", "1", "--format", "jsonl", "--include-unchanged", fs_root])
+        == 0
+    )
+
+    stdout, stderr = capsys.readouterr()
+    rows = [json.loads(line) for line in stdout.splitlines()]
+    assert [(row["old_signature"], row["count"]) for row in rows] == [
+        ("OldSignature", 2),
+        ("nsThread::Run", 1),
+    ]
+    assert "3 crashes, 2 changed signature, 0 errors" in stderr
+
+
+def test_main_errors(fs_root, tmpdir, capsys):
+    bad = tmpdir.join("20071025", "name", "ff", "bad-crash.jsonz")
+    bad.ensure()
+    bad.write("not gzip")
+    assert main(["--workers", "1", fs_root]) == 1
+
+    stdout, stderr = capsys.readouterr()
+    assert "WARNING: " in stderr
+    assert "bad-crash.jsonz" in stderr
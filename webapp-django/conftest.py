@@ -2,6 +2,18 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
+import pytest
+
+from crashstats.crashstats.configman_utils import reset_implementations
+
+
 # Load the socorro/unittest/conftest.py file so webapp tests can use those
 # pytest fixtures
 pytest_plugins = ["socorro.unittest.conftest"]
+
+
+@pytest.fixture(autouse=True)
+def reset_configman_implementations():
+    """Drop implementation instances cached by tests"""
+    yield
+    reset_implementations()
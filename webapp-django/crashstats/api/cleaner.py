@@ -2,6 +2,7 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
+import functools
 import re
 import warnings
 
@@ -38,63 +39,101 @@ class Cleaner:
     def __init__(self, allowlist, debug=False):
         self.allowlist = allowlist
         self.debug = debug
+        self.plan = compile_plan(allowlist)
 
     def start(self, data):
-        self._scrub(data, self.allowlist)
+        """Scrub data in place."""
+        cleaned = self.clean(data)
+        if isinstance(data, dict):
+            data.clear()
+            data.update(cleaned)
+        else:
+            data[:] = cleaned
+
+    def clean(self, data):
+        """Return a scrubbed copy of data without changing data.
+
+        Only the containers the allowlist applies to are copied--values that
+        are kept are shared with data.
 
-    def _scrub(self, result, api_allowlist):
-        if isinstance(api_allowlist, (list, tuple)):
+        """
+        return self._clean(data, self.plan)
+
+    def _clean(self, result, plan):
+        if isinstance(plan, SmartAllowlistMatcher):
             if isinstance(result, dict):
-                self._scrub_item(result, api_allowlist)
+                return self._clean_item(result, plan)
+            return self._clean_list(result, plan)
+
+        result = dict(result)
+        for result_key, subplan in plan.items():
+            if result_key == self.ANY:
+                for key, thing in result.items():
+                    if isinstance(subplan, SmartAllowlistMatcher):
+                        if isinstance(thing, dict):
+                            result[key] = self._clean_item(thing, subplan)
+                        elif isinstance(thing, (list, tuple)):
+                            result[key] = self._clean_list(thing, subplan)
+                    else:
+                        result[key] = self._clean(thing, subplan)
             else:
-                self._scrub_list(result, api_allowlist)
-        else:
-            for result_key, allowlist in api_allowlist.items():
-                if result_key == self.ANY:
-                    if isinstance(allowlist, (list, tuple)):
-                        if isinstance(result, dict):
-                            for key, thing in result.items():
-                                if isinstance(thing, dict):
-                                    self._scrub_item(thing, allowlist)
-                                elif isinstance(thing, (list, tuple)):
-                                    self._scrub_list(thing, allowlist)
+                data = result[result_key]
+                if isinstance(data, dict):
+                    result[result_key] = self._clean(data, subplan)
+                elif isinstance(data, list):
+                    result[result_key] = [self._clean(item, subplan) for item in data]
+        return result
+
+    def _clean_item(self, data, matcher):
+        cleaned = {key: value for key, value in data.items() if key in matcher}
+        if self.debug and len(cleaned) != len(data):
+            for key in data:
+                if key not in cleaned:
+                    # warnings.warn() never redirects the same message to
+                    # the logger more than once in the same python
+                    # process. Doing this helps developers notice/remember
+                    # which fields are being left out
+                    warnings.warn("Skipping %r" % (key,))
+        return cleaned
+
+    def _clean_list(self, sequence, matcher):
+        return [self._clean_item(data, matcher) for data in sequence]
+
+
+def compile_plan(allowlist):
+    """Compile an allowlist into a cleaning plan.
+
+    The plan has the same structure as the allowlist with each list of keys
+    replaced by a ``SmartAllowlistMatcher``. Matchers are shared between plans
+    for the same list of keys.
+
+    """
+    if isinstance(allowlist, (list, tuple)):
+        return get_matcher(tuple(allowlist))
+    return {key: compile_plan(value) for key, value in allowlist.items()}
 
-                    else:
-                        for datum in result.values():
-                            self._scrub(datum, allowlist)
-                else:
-                    data = result[result_key]
-                    if isinstance(data, dict):
-                        self._scrub(data, allowlist)
-                    elif isinstance(data, list):
-                        self._scrub_list(data, allowlist)
-
-    def _scrub_item(self, data, allowlist):
-        matcher = SmartAllowlistMatcher(allowlist)
-        for key in list(data.keys()):
-            if key not in matcher:
-                # warnings.warn() never redirects the same message to
-                # the logger more than once in the same python
-                # process. Doing this helps developers notice/remember
-                # which fields are being left out
-                if self.debug:
-                    msg = "Skipping %r" % (key,)
-                    warnings.warn(msg)
-                del data[key]
-
-    def _scrub_list(self, sequence, allowlist):
-        for i, data in enumerate(sequence):
-            self._scrub_item(data, allowlist)
-            sequence[i] = data
+
+@functools.lru_cache(maxsize=128)
+def get_matcher(allowlist):
+    """Return a SmartAllowlistMatcher for a tuple of keys."""
+    return SmartAllowlistMatcher(allowlist)
 
 
 class SmartAllowlistMatcher:
+    """Matches keys against an allowlist where ``*`` matches any word characters
+    and dashes."""
+
     def __init__(self, allowlist):
-        def format(item):
-            return "^" + item.replace("*", r"[\w-]*") + "$"
+        self.exact = frozenset(item for item in allowlist if "*" not in item)
 
-        items = [format(x) for x in allowlist]
-        self.regex = re.compile("|".join(items))
+        patterns = [
+            re.escape(item).replace(r"\*", r"[\w-]*")
+            for item in allowlist
+            if "*" in item
+        ]
+        self.regex = re.compile("|".join(patterns)) if patterns else None
 
     def __contains__(self, key):
-        return bool(self.regex.match(key))
+        if key in self.exact:
+            return True
+        return self.regex is not None and self.regex.fullmatch(key) is not None
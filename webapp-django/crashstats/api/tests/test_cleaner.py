@@ -4,7 +4,7 @@
 
 from unittest import mock
 
-from crashstats.api.cleaner import Cleaner, SmartAllowlistMatcher
+from crashstats.api.cleaner import Cleaner, compile_plan, SmartAllowlistMatcher
 
 
 class TestCleaner:
@@ -102,6 +102,19 @@ class TestCleaner:
         }
         assert data == expect
 
+    def test_clean_doesnt_change_data(self):
+        allowlist = {"hits": ("foo", "bar")}
+        data = {"hits": [{"foo": 1, "bar": 2, "baz": 3}], "total": 1}
+        cleaner = Cleaner(allowlist)
+        cleaned = cleaner.clean(data)
+        assert cleaned == {"hits": [{"foo": 1, "bar": 2}], "total": 1}
+        assert data == {"hits": [{"foo": 1, "bar": 2, "baz": 3}], "total": 1}
+
+    def test_plans_share_matchers(self):
+        plan = compile_plan({"hits": ("foo", "bar*")})
+        other_plan = compile_plan(["foo", "bar*"])
+        assert plan["hits"] is other_plan
+
 
 class TestSmartAllowlistMatcher:
     def test_basic_in(self):
@@ -113,3 +126,10 @@ class TestSmartAllowlistMatcher:
         assert "thing" in matcher
         assert "things" in matcher
         assert "nothing" not in matcher
+
+    def test_exact_keys_are_literal(self):
+        matcher = SmartAllowlistMatcher(["json_dump.foo", "bar.*"])
+        assert "json_dump.foo" in matcher
+        assert "json_dumpXfoo" not in matcher
+        assert "bar.baz" in matcher
+        assert "barXbaz" not in matcher
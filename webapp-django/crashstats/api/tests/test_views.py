@@ -856,6 +856,7 @@ API_MODEL_NAMES = [
     "SuperSearchUnredacted",
     "UnredactedCrash",
     "VersionString",
+    "VersionStrings",
 ]
 
 
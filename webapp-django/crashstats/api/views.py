@@ -248,7 +248,7 @@ def model_wrapper(request, model_name):
                     # not allowlisted
                     debug=settings.DEBUG,
                 )
-                cleaner.start(result)
+                result = cleaner.clean(result)
 
     else:
         # custom override of the status code
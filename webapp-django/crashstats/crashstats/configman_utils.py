@@ -7,11 +7,15 @@ Utility functions for working with configman components.
 """
 
 import importlib
+import os
+import threading
 
 from configman import ConfigurationManager, configuration, Namespace
 from configman.environment import environment
 
 from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 from django.utils.module_loading import import_string
 
 from socorro.app.socorro_app import App
@@ -42,8 +46,26 @@ def get_s3_context():
     return cls(config)
 
 
+#: Settings that configman configuration is built from
+CONFIG_SETTINGS = ("SOCORRO_CONFIG", "CRASHQUEUE")
+
+# Configuration built by get_config() and the generation it was built in
+_CONFIG = None
+_GENERATION = 0
+_LOCK = threading.Lock()
+
+# Per-thread map of (implementation class, namespace) -> instance along with the
+# generation it was built in
+_IMPLEMENTATIONS = threading.local()
+
+
 def config_from_configman():
-    """Generate a configman DotDict to pass to configman components."""
+    """Generate a configman DotDict to pass to configman components.
+
+    This builds a new configuration every time. Use ``get_config()`` to get the
+    shared one.
+
+    """
     definition_source = Namespace()
     definition_source.namespace("logging")
     definition_source.logging = App.required_config.logging
@@ -72,3 +94,70 @@ def config_from_configman():
         definition_source=definition_source,
         values_source_list=[settings.SOCORRO_CONFIG],
     )
+
+
+def get_config():
+    """Return the configman DotDict shared by the process.
+
+    The configuration is built on first use and rebuilt after
+    ``reset_implementations()``.
+
+    """
+    global _CONFIG
+    config = _CONFIG
+    if config is None:
+        with _LOCK:
+            if _CONFIG is None:
+                _CONFIG = config_from_configman()
+            config = _CONFIG
+    return config
+
+
+def get_implementation(implementation_class, namespace=""):
+    """Return an instance of a configman implementation class.
+
+    Instances are built once with the shared configuration and reused for later
+    calls. Implementations keep state for the request they're handling, so each
+    thread gets its own instance.
+
+    :arg implementation_class: the implementation class
+    :arg namespace: the namespace of the configuration to build it with
+
+    :returns: the implementation instance
+
+    """
+    if getattr(_IMPLEMENTATIONS, "generation", None) != _GENERATION:
+        _IMPLEMENTATIONS.generation = _GENERATION
+        _IMPLEMENTATIONS.instances = {}
+
+    key = (implementation_class, namespace)
+    instance = _IMPLEMENTATIONS.instances.get(key)
+    if instance is None:
+        config = get_config()
+        if namespace:
+            config = config[namespace]
+        instance = implementation_class(config=config)
+        _IMPLEMENTATIONS.instances[key] = instance
+    return instance
+
+
+def reset_implementations():
+    """Drop the shared configuration and all implementation instances.
+
+    They're rebuilt the next time they're used.
+
+    """
+    global _CONFIG, _GENERATION
+    with _LOCK:
+        _CONFIG = None
+        _GENERATION += 1
+
+
+@receiver(setting_changed)
+def _reset_on_setting_changed(setting, **kwargs):
+    if setting in CONFIG_SETTINGS:
+        reset_implementations()
+
+
+# Forked processes shouldn't share connections with their parent
+os.register_at_fork(after_in_child=reset_implementations)
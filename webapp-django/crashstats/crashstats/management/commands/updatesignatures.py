@@ -9,17 +9,30 @@ Maintain Signature data using crash data in Elasticsearch.
 import datetime
 
 from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
 from django.utils import timezone
 from django.utils.dateparse import parse_datetime
 
 from crashstats.crashstats.models import Signature
 from crashstats.supersearch.models import SuperSearch
 from socorro.external.es.super_search_fields import SuperSearchFieldsData
-from socorro.lib.datetimeutil import string_to_datetime
 
 
-# Maximum number of results returned for a super search query
-MAX_PAGE = 1000
+# Maximum number of buckets a super search aggregation can return
+MAX_FACETS_SIZE = 10000
+
+# Number of signatures to upsert in one statement
+UPSERT_BATCH_SIZE = 1000
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+UPSERT_SQL = """
+INSERT INTO {table} (signature, first_build, first_date)
+VALUES {values}
+ON CONFLICT (signature) DO UPDATE SET
+    first_build = LEAST({table}.first_build, EXCLUDED.first_build),
+    first_date = LEAST({table}.first_date, EXCLUDED.first_date)
+"""
 
 
 class Command(BaseCommand):
@@ -46,18 +59,72 @@ class Command(BaseCommand):
             "--dry-run", action="store_true", help="Whether or not to do a dry run."
         )
 
-    def update_crashstats_signature(self, signature, report_date, report_build):
-        report_build = int(report_build)
-        report_date = string_to_datetime(report_date)
-        try:
-            sig = Signature.objects.get(signature=signature)
-            sig.first_build = min(report_build, sig.first_build)
-            sig.first_date = min(report_date, sig.first_date)
-        except Signature.DoesNotExist:
-            sig = Signature.objects.create(
-                signature=signature, first_build=report_build, first_date=report_date
+    def fetch_signature_data(self, api, all_fields, start_datetime, end_datetime):
+        """Yields (signature, first build, first date) for crashes in a window
+
+        Super Search computes the minimum build id and date for each signature,
+        so this costs one query per window regardless of the number of crashes.
+        If the window has more signatures than an aggregation can return, it
+        gets split in half and each half is fetched separately.
+
+        """
+        params = {
+            "date": [
+                ">={}".format(start_datetime.isoformat()),
+                "<{}".format(end_datetime.isoformat()),
+            ],
+            # Not all crashes have a build id, so skip the ones that don't.
+            "build_id": ">0",
+            "_aggs.signature": ["_min.build_id", "_min.date"],
+            # Replaces the default signature facet, which we don't need
+            "_facets": ["_cardinality.signature"],
+            "_facets_size": MAX_FACETS_SIZE,
+            "_results_number": 0,
+            "_fields": all_fields,
+        }
+        resp = api.get(**params)
+        buckets = resp["facets"].get("signature", [])
+
+        if len(buckets) >= MAX_FACETS_SIZE:
+            # The aggregation may have dropped signatures, so split the window
+            middle_datetime = start_datetime + (end_datetime - start_datetime) / 2
+            middle_datetime = middle_datetime.replace(microsecond=0)
+            if middle_datetime <= start_datetime:
+                raise CommandError(
+                    "too many signatures between %s and %s"
+                    % (start_datetime, end_datetime)
+                )
+            yield from self.fetch_signature_data(
+                api, all_fields, start_datetime, middle_datetime
+            )
+            yield from self.fetch_signature_data(
+                api, all_fields, middle_datetime, end_datetime
             )
-        sig.save()
+            return
+
+        for bucket in buckets:
+            min_build_id = bucket["facets"]["min_build_id"]["value"]
+            min_date = bucket["facets"]["min_date"]["value"]
+            if min_build_id is None or min_date is None:
+                continue
+
+            yield (
+                bucket["term"],
+                int(min_build_id),
+                # Elasticsearch returns dates as milliseconds since the epoch
+                EPOCH + datetime.timedelta(milliseconds=min_date),
+            )
+
+    def upsert_signatures(self, signature_data):
+        """Inserts signatures or moves their first build and date earlier"""
+        table = connection.ops.quote_name(Signature._meta.db_table)
+        with transaction.atomic(), connection.cursor() as cursor:
+            for i in range(0, len(signature_data), UPSERT_BATCH_SIZE):
+                batch = signature_data[i : i + UPSERT_BATCH_SIZE]
+                sql = UPSERT_SQL.format(
+                    table=table, values=", ".join(["(%s, %s, %s)"] * len(batch))
+                )
+                cursor.execute(sql, [value for row in batch for value in row])
 
     def handle(self, **options):
         start_datetime = options.get("last_success")
@@ -85,78 +152,33 @@ class Command(BaseCommand):
         if not end_datetime > start_datetime:
             raise CommandError("start time must be before end time.")
 
-        # Do a super search and get the signature, buildid, and date processed for
-        # every crash in the range
+        # Do a super search and get the first build id and date processed for
+        # every signature in the range
         all_fields = SuperSearchFieldsData().get()
         api = SuperSearch()
         self.stdout.write("Looking at %s to %s" % (start_datetime, end_datetime))
 
-        params = {
-            "date": [
-                ">={}".format(start_datetime.isoformat()),
-                "<{}".format(end_datetime.isoformat()),
-            ],
-            "_columns": ["signature", "build_id", "date"],
-            "_facets_size": 0,
-            "_fields": all_fields,
-            # Set up first page
-            "_results_offset": 0,
-            "_results_number": MAX_PAGE,
-        }
-
         results = {}
-        crashids_count = 0
-
-        while True:
-            resp = api.get(**params)
-            hits = resp["hits"]
-            for hit in hits:
-                crashids_count += 1
-
-                if not hit["build_id"]:
-                    # Not all crashes have a build id, so skip the ones that don't.
-                    continue
-
-                if hit["signature"] in results:
-                    data = results[hit["signature"]]
-                    data["build_id"] = min(data["build_id"], hit["build_id"])
-                    data["date"] = min(data["date"], hit["date"])
-                else:
-                    data = {
-                        "signature": hit["signature"],
-                        "build_id": hit["build_id"],
-                        "date": hit["date"],
-                    }
-                results[hit["signature"]] = data
-
-            # If there are no more crash ids to get, we return
-            total = resp["total"]
-            if not hits or crashids_count >= total:
-                break
-
-            # Get the next page, but only as many results as we need
-            params["_results_offset"] += MAX_PAGE
-            params["_results_number"] = min(
-                # MAX_PAGE is the maximum we can request
-                MAX_PAGE,
-                # The number of results Super Search can return to us that is hasn't returned so far
-                total - crashids_count,
-            )
+        signature_data = self.fetch_signature_data(
+            api, all_fields, start_datetime, end_datetime
+        )
+        for signature, build_id, date in signature_data:
+            # Signatures can show up in more than one window if it got split
+            if signature in results:
+                build_id = min(build_id, results[signature][1])
+                date = min(date, results[signature][2])
+            results[signature] = (signature, build_id, date)
 
-        signature_data = results.values()
+        signature_data = sorted(results.values())
 
         # Save signature data to the db
-        for item in signature_data:
-            if options["dry_run"]:
+        if options["dry_run"]:
+            for signature, build_id, date in signature_data:
                 self.stdout.write(
                     "Inserting/updating signature (%s, %s, %s)"
-                    % (item["signature"], item["date"], item["build_id"])
-                )
-            else:
-                self.update_crashstats_signature(
-                    signature=item["signature"],
-                    report_date=item["date"],
-                    report_build=item["build_id"],
+                    % (signature, date, build_id)
                 )
+        else:
+            self.upsert_signatures(signature_data)
 
         self.stdout.write("Inserted/updated %d signatures." % len(signature_data))
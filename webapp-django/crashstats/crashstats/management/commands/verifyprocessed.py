@@ -16,6 +16,7 @@ from functools import partial
 import markus
 from more_itertools import chunked
 
+from django.core.cache import cache
 from django.core.management.base import BaseCommand, CommandError
 from django.db.utils import IntegrityError
 from django.utils import timezone
@@ -36,6 +37,14 @@ WORKER_TIMEOUT = 15 * 60
 # Number of entropy items to pass to a check_crashids subprocess
 CHUNK_SIZE = 4
 
+# Number of crash ids to look up in one Elasticsearch query; this is the maximum
+# number of results a super search query can return
+ES_BATCH_SIZE = 1000
+
+# Number of seconds to keep the results of checked entropy chunks around so a
+# failed run can pick up where it left off
+CHECKPOINT_TIMEOUT = 2 * 24 * 60 * 60
+
 
 metrics = markus.get_metrics("cron.verifyprocessed")
 
@@ -55,6 +64,56 @@ def is_in_s3(s3_client, bucket, crash_id):
     return True
 
 
+def find_missing_in_s3(s3_client, bucket, crash_ids):
+    """Returns the crash ids that don't have a processed crash in S3.
+
+    This lists processed crash keys in order starting at the first crash id and
+    diffs them against the sorted crash ids, so it takes one request per 1,000
+    keys instead of one per crash id. Processed crashes from other days are
+    interleaved with the ones we're looking for, so if listing has taken as many
+    requests as checking the remaining crash ids one at a time would, it switches
+    to doing that.
+
+    """
+    crash_ids = sorted(crash_ids)
+    if not crash_ids:
+        return []
+
+    prefix = PROCESSED_CRASH_TEMPLATE % ""
+    paginator = s3_client.get_paginator("list_objects_v2")
+    page_iterator = paginator.paginate(
+        Bucket=bucket,
+        # All crash ids in a raw crash prefix share the entropy
+        Prefix=prefix + crash_ids[0][:3],
+        # Start right before the first crash id
+        StartAfter=prefix + crash_ids[0][:-1],
+    )
+
+    missing = []
+    index = 0
+    for num_requests, page in enumerate(page_iterator, start=1):
+        for item in page.get("Contents", []):
+            processed_crash_id = item["Key"][len(prefix) :]
+            while index < len(crash_ids) and crash_ids[index] < processed_crash_id:
+                missing.append(crash_ids[index])
+                index += 1
+            if index < len(crash_ids) and crash_ids[index] == processed_crash_id:
+                index += 1
+            if index == len(crash_ids):
+                return missing
+
+        if num_requests >= len(crash_ids) - index:
+            break
+    else:
+        # We listed all the processed crashes, so the rest are missing
+        return missing + crash_ids[index:]
+
+    for crash_id in crash_ids[index:]:
+        if not is_in_s3(s3_client, bucket, crash_id):
+            missing.append(crash_id)
+    return missing
+
+
 def check_elasticsearch(supersearch, crash_ids):
     """Checks Elasticsearch and returns list of missing crash ids.
 
@@ -75,6 +134,7 @@ def check_elasticsearch(supersearch, crash_ids):
         "_columns": ["uuid"],
         "_facets": [],
         "_facets_size": 0,
+        "_results_number": len(crash_ids),
     }
     search_results = supersearch.get(**params)
 
@@ -97,26 +157,34 @@ def check_crashids(entropy_chunk, date):
         paginator = s3_client.get_paginator("list_objects_v2")
         page_iterator = paginator.paginate(Bucket=bucket, Prefix=raw_crash_key_prefix)
 
-        for page in page_iterator:
-            # NOTE(willkg): Keys look like /v2/raw_crash/ENTRPOY/DATE/CRASHID
-            crash_ids = [
-                item["Key"].split("/")[-1] for item in page.get("Contents", [])
-            ]
-
-            if not crash_ids:
-                continue
+        # NOTE(willkg): Keys look like /v2/raw_crash/ENTRPOY/DATE/CRASHID
+        crash_ids = [
+            item["Key"].split("/")[-1]
+            for page in page_iterator
+            for item in page.get("Contents", [])
+        ]
+
+        if not crash_ids:
+            continue
+
+        # Check S3 first
+        missing_in_s3 = find_missing_in_s3(s3_client, bucket, crash_ids)
+        missing.extend(missing_in_s3)
+
+        # Check Elasticsearch in batches for crashes that were saved to S3
+        missing_in_s3 = set(missing_in_s3)
+        crash_ids = [
+            crash_id for crash_id in crash_ids if crash_id not in missing_in_s3
+        ]
+        for crash_ids_batch in chunked(crash_ids, ES_BATCH_SIZE):
+            missing_in_es = check_elasticsearch(supersearch, crash_ids_batch)
+            missing.extend(missing_in_es)
 
-            # Check S3 first
-            for crash_id in crash_ids:
-                if not is_in_s3(s3_client, bucket, crash_id):
-                    missing.append(crash_id)
+    return list(set(missing))
 
-            # Check Elasticsearch in batches
-            for crash_ids_batch in chunked(crash_ids, 100):
-                missing_in_es = check_elasticsearch(supersearch, crash_ids_batch)
-                missing.extend(missing_in_es)
 
-    return list(set(missing))
+def get_checkpoint_key(date, entropy_chunk):
+    return "verifyprocessed:%s:%s" % (date, entropy_chunk[0])
 
 
 class Command(BaseCommand):
@@ -144,24 +212,63 @@ class Command(BaseCommand):
                     yield x + y + z
 
     def find_missing(self, num_workers, date):
+        """Returns crash ids for the date that weren't processed
+
+        Results for each entropy chunk are saved as they come in, so if the run
+        fails, the next run for the same date only checks the remaining chunks.
+
+        """
         check_crashids_for_date = partial(check_crashids, date=date)
 
+        entropy_chunks = [
+            tuple(chunk) for chunk in chunked(self.get_entropy(), CHUNK_SIZE)
+        ]
+        checkpoint_keys = {
+            chunk: get_checkpoint_key(date, chunk) for chunk in entropy_chunks
+        }
+        checkpoints = cache.get_many(list(checkpoint_keys.values()))
+
         missing = []
-        entropy_chunked = chunked(self.get_entropy(), CHUNK_SIZE)
+        todo = []
+        for chunk in entropy_chunks:
+            if checkpoint_keys[chunk] in checkpoints:
+                missing.extend(checkpoints[checkpoint_keys[chunk]])
+            else:
+                todo.append(chunk)
+
+        if checkpoints:
+            self.stdout.write(
+                "Resuming: %d of %d entropy chunks already checked."
+                % (len(checkpoints), len(entropy_chunks))
+            )
+
         if num_workers == 1:
-            for result in map(check_crashids_for_date, entropy_chunked):
+            results = map(check_crashids_for_date, todo)
+            for chunk, result in zip(todo, results):
+                cache.set(checkpoint_keys[chunk], result, CHECKPOINT_TIMEOUT)
                 missing.extend(result)
         else:
             with concurrent.futures.ProcessPoolExecutor(
                 max_workers=num_workers
             ) as executor:
-                for result in executor.map(
-                    check_crashids_for_date, entropy_chunked, timeout=WORKER_TIMEOUT
-                ):
+                results = executor.map(
+                    check_crashids_for_date, todo, timeout=WORKER_TIMEOUT
+                )
+                for chunk, result in zip(todo, results):
+                    cache.set(checkpoint_keys[chunk], result, CHECKPOINT_TIMEOUT)
                     missing.extend(result)
 
         return list(missing)
 
+    def clear_checkpoints(self, date):
+        """Removes saved results for a date so the next run checks everything"""
+        cache.delete_many(
+            [
+                get_checkpoint_key(date, tuple(chunk))
+                for chunk in chunked(self.get_entropy(), CHUNK_SIZE)
+            ]
+        )
+
     def handle_missing(self, date, missing):
         """Report crash ids for missing processed crashes."""
         metrics.gauge("missing_processed", len(missing))
@@ -204,5 +311,6 @@ class Command(BaseCommand):
         # Find new missing crashes.
         missing = self.find_missing(options["num_workers"], check_date_formatted)
         self.handle_missing(check_date_formatted, missing)
+        self.clear_checkpoints(check_date_formatted)
 
         self.stdout.write("Done!")
@@ -11,8 +11,11 @@ import datetime
 import functools
 import hashlib
 import logging
+import random
 import time
 
+import markus
+
 from django.conf import settings
 from django.core.cache import cache
 from django.db import models
@@ -26,11 +29,16 @@ from socorro.lib.ooid import is_crash_id_valid
 from socorro.lib.requestslib import session_with_retries
 from socorro.external.boto.crash_data import SimplifiedCrashData, TelemetryCrashData
 
-from crashstats.crashstats.configman_utils import config_from_configman
+from crashstats.crashstats.configman_utils import get_implementation
 
 
 logger = logging.getLogger("crashstats.models")
 
+FETCH_METRICS = markus.get_metrics("webapp.fetch")
+
+# Fraction of cache_seconds that ttls of cached fetches are randomly shortened by
+CACHE_TTL_JITTER = 0.1
+
 
 # Django models first
 
@@ -310,43 +318,25 @@ def _clean_query(query, max_length=30):
     return cleaned
 
 
-def measure_fetches(method):
-    @functools.wraps(method)
-    def inner(*args, **kwargs):
-        t0 = time.time()
-        result = method(*args, **kwargs)
-        if not (isinstance(result, tuple) and len(result) == 2):
-            # happens when fetch() is used recursively
-            return result
-        result, hit_or_miss = result
-        if not getattr(settings, "ANALYZE_MODEL_FETCHES", False):
-            return result
-        t1 = time.time()
-        self = args[0]
-        msecs = int((t1 - t0) * 1000)
-        hit_or_miss = "HIT" if hit_or_miss else "MISS"
+def canonical_params(params):
+    """Return a version of params where equivalent parameters compare equal.
 
-        try:
-            value = self.__class__.__name__
-            key = "all_classes"
-            all_ = cache.get(key) or []
-            if value not in all_:
-                all_.append(value)
-                cache.set(key, all_, 60 * 60 * 24)
-
-            valuekey = hashlib.md5(value.encode("utf-8")).hexdigest()
-            for prefix, incr in (("times", msecs), ("uses", 1)):
-                key = "%s_%s_%s" % (prefix, hit_or_miss, valuekey)
-                try:
-                    cache.incr(key, incr)
-                except ValueError:
-                    cache.set(key, incr, 60 * 60 * 24)
-        except Exception:
-            logger.error("Unable to collect model fetches data", exc_info=True)
-        finally:
-            return result
+    Dicts are turned into tuples of items sorted by key and sets are sorted, so
+    passing the same parameters in a different order gets the same result.
 
-    return inner
+    """
+    if isinstance(params, dict):
+        return tuple(
+            sorted(
+                ((key, canonical_params(value)) for key, value in params.items()),
+                key=lambda item: repr(item[0]),
+            )
+        )
+    if isinstance(params, (list, tuple)):
+        return tuple(canonical_params(value) for value in params)
+    if isinstance(params, (set, frozenset)):
+        return tuple(sorted((canonical_params(value) for value in params), key=repr))
+    return params
 
 
 class SocorroCommon:
@@ -358,6 +348,14 @@ class SocorroCommon:
     # default cache expiration time if applicable
     cache_seconds = 60 * 60
 
+    # how long after expiring a cached value can be returned while it's being
+    # refreshed; None means the same as cache_seconds
+    cache_stale_seconds = None
+
+    # how long other requests wait for a request computing a value before
+    # computing it themselves
+    cache_lock_seconds = 30
+
     # At the moment, we're supporting talk HTTP to the middleware AND
     # instantiating implementation classes so this is None by default.
     implementation = None
@@ -368,7 +366,6 @@ class SocorroCommon:
     # web GET or POST requests
     api_user = None
 
-    @measure_fetches
     def fetch(
         self,
         implementation,
@@ -382,29 +379,85 @@ class SocorroCommon:
         retries=None,
         retry_sleeptime=None,
     ):
-        cache_key = None
+        name = implementation.__class__.__name__
+        implementation_method = getattr(implementation, method)
 
         if (
-            settings.CACHE_IMPLEMENTATION_FETCHES
-            and not dont_cache
-            and self.cache_seconds
+            not settings.CACHE_IMPLEMENTATION_FETCHES
+            or dont_cache
+            or not self.cache_seconds
         ):
-            name = implementation.__class__.__name__
-            key_string = name + repr(params)
-            cache_key = hashlib.md5(key_string.encode("utf-8")).hexdigest()
-
-            if not refresh_cache:
-                result = cache.get(cache_key)
-                if result is not None:
-                    logger.debug("CACHE HIT %s" % implementation.__class__.__name__)
-                    return result, True
-
-        implementation_method = getattr(implementation, method)
-        result = implementation_method(**params)
-        if cache_key:
-            cache.set(cache_key, result, self.cache_seconds)
+            with FETCH_METRICS.timer("time", tags=["model:%s" % name]):
+                return implementation_method(**params)
+
+        key_string = "v2:%s:%r" % (name, canonical_params(params))
+        cache_key = hashlib.md5(key_string.encode("utf-8")).hexdigest()
+        lock_key = cache_key + ":lock"
+
+        def refresh():
+            with FETCH_METRICS.timer("time", tags=["model:%s" % name]):
+                result = implementation_method(**params)
+            # Shorten ttls by a random amount so that keys cached at the same
+            # time don't all expire at the same time
+            ttl = self.cache_seconds * (1 - random.uniform(0, CACHE_TTL_JITTER))
+            entry = {"value": result, "fresh_until": time.time() + ttl}
+            stale_seconds = self.cache_stale_seconds
+            if stale_seconds is None:
+                stale_seconds = self.cache_seconds
+            cache.set(cache_key, entry, ttl + stale_seconds)
+            return result
 
-        return result, False
+        def refresh_with_lock():
+            try:
+                return refresh()
+            finally:
+                cache.delete(lock_key)
+
+        def incr(result):
+            FETCH_METRICS.incr("cache", tags=["result:%s" % result, "model:%s" % name])
+
+        if refresh_cache:
+            incr("refresh")
+            return refresh()
+
+        entry = cache.get(cache_key)
+        if entry is not None:
+            if entry["fresh_until"] > time.time():
+                incr("hit")
+                return entry["value"]
+
+            # The entry is stale. One request refreshes it and the others get
+            # the stale value in the meantime.
+            if not cache.add(lock_key, True, self.cache_lock_seconds):
+                incr("stale")
+                return entry["value"]
+            incr("refresh")
+            return refresh_with_lock()
+
+        # Nothing is cached. One request computes the value and the others
+        # wait for it.
+        if cache.add(lock_key, True, self.cache_lock_seconds):
+            incr("miss")
+            return refresh_with_lock()
+
+        deadline = time.monotonic() + self.cache_lock_seconds
+        sleep_seconds = 0.05
+        while time.monotonic() < deadline:
+            time.sleep(sleep_seconds)
+            sleep_seconds = min(sleep_seconds * 2, 1)
+            entry = cache.get(cache_key)
+            if entry is not None:
+                incr("coalesced")
+                return entry["value"]
+            # If the request holding the lock failed, the lock is gone and
+            # this request can compute the value now
+            if cache.add(lock_key, True, self.cache_lock_seconds):
+                incr("miss")
+                return refresh_with_lock()
+
+        # The request holding the lock took too long
+        incr("miss")
+        return refresh()
 
     def _complete_url(self, url):
         if url.startswith("/"):
@@ -415,10 +468,9 @@ class SocorroCommon:
 
     def get_implementation(self):
         if self.implementation:
-            config = config_from_configman()
-            if self.implementation_config_namespace:
-                config = config[self.implementation_config_namespace]
-            return self.implementation(config=config)
+            return get_implementation(
+                self.implementation, self.implementation_config_namespace
+            )
         return None
 
 
@@ -928,6 +980,29 @@ class SignatureFirstDate(SocorroMiddleware):
         return {"hits": hits, "total": len(hits)}
 
 
+def filter_version_strings(channel, versions):
+    """Returns the version strings that apply to a crash report for the channel
+
+    :arg channel: the release channel of the crash report
+    :arg versions: list of version strings for the product, channel, and build id
+
+    :returns: list of version strings
+
+    """
+    if versions and channel.lower() in ("aurora", "beta"):
+        if "b" in versions[0]:
+            # If we're looking at betas which have a "b" in the versions, then
+            # ignore "rc" versions because they didn't get released
+            versions = [version for version in versions if "rc" not in version]
+
+        else:
+            # If we're looking at non-betas, then only return "rc" versions
+            # because this crash report is in the beta channel and not the
+            # release channel
+            versions = [version for version in versions if "rc" in version]
+    return versions
+
+
 class VersionString(SocorroMiddleware):
     # NOTE(willkg): This is implemented with a Django model.
 
@@ -956,25 +1031,75 @@ class VersionString(SocorroMiddleware):
             ).values_list("version_string", flat=True)
         )
 
-        if versions:
-            if params["channel"].lower() in ("aurora", "beta"):
-                if "b" in versions[0]:
-                    # If we're looking at betas which have a "b" in the
-                    # versions, then ignore "rc" versions because they didn't
-                    # get released
-                    versions = [version for version in versions if "rc" not in version]
-
-                else:
-                    # If we're looking at non-betas, then only return "rc"
-                    # versions because this crash report is in the beta channel
-                    # and not the release channel
-                    versions = [version for version in versions if "rc" in version]
-
+        versions = filter_version_strings(params["channel"], versions)
         versions = [{"version_string": vers} for vers in versions]
 
         return {"hits": versions, "total": len(versions)}
 
 
+class VersionStrings(SocorroMiddleware):
+    # NOTE(willkg): This is implemented with a Django model.
+
+    # Set to a short cache time because it's just a db lookup. Making it non-0
+    # is to prevent the stampeding herd when all the processor nodes load
+    # version strings after a deploy.
+    cache_seconds = 2 * 60  # 2 minutes only
+
+    possible_params = (("product", list), ("channel", list), "min_build_id")
+
+    # If min_build_id isn't specified, return builds from the last this many days
+    DEFAULT_DAYS = 90
+
+    HELP_TEXT = """
+    API used by Socorro processor for loading the version strings of recent
+    builds in bulk. For each (product, channel, build_id) combination, this
+    returns the version string VersionString would return first.
+    """
+
+    API_ALLOWLIST = {"hits": ("product", "channel", "build_id", "version_string")}
+
+    def get(self, *args, **kwargs):
+        params = self.parse_parameters(kwargs)
+
+        min_build_id = params.get("min_build_id")
+        if not min_build_id:
+            min_date = datetime.datetime.utcnow() - datetime.timedelta(
+                days=self.DEFAULT_DAYS
+            )
+            min_build_id = min_date.strftime("%Y%m%d%H%M%S")
+
+        qs = ProductVersion.objects.filter(build_id__gte=min_build_id)
+        if params.get("product"):
+            qs = qs.filter(product_name__in=params["product"])
+        if params.get("channel"):
+            qs = qs.filter(
+                release_channel__in=[channel.lower() for channel in params["channel"]]
+            )
+
+        # Group version strings by (product, channel, build_id) keeping the order
+        # VersionString would see them in
+        grouped = {}
+        for product, channel, build_id, version_string in qs.order_by("id").values_list(
+            "product_name", "release_channel", "build_id", "version_string"
+        ):
+            grouped.setdefault((product, channel, build_id), []).append(version_string)
+
+        hits = []
+        for (product, channel, build_id), versions in sorted(grouped.items()):
+            versions = filter_version_strings(channel, versions)
+            if versions:
+                hits.append(
+                    {
+                        "product": product,
+                        "channel": channel,
+                        "build_id": build_id,
+                        "version_string": versions[0],
+                    }
+                )
+
+        return {"hits": hits, "total": len(hits)}
+
+
 class BugzillaBugInfo(SocorroCommon):
     # This is for how long we cache the metadata of each individual bug.
     BUG_CACHE_SECONDS = 60 * 60
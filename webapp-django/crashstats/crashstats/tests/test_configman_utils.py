@@ -0,0 +1,72 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import threading
+from unittest import mock
+
+from crashstats.crashstats import configman_utils
+from crashstats.crashstats.configman_utils import (
+    get_config,
+    get_implementation,
+    reset_implementations,
+)
+
+
+class FakeImplementation:
+    def __init__(self, config):
+        self.config = config
+
+
+class TestGetImplementation:
+    def test_instances_are_reused(self):
+        impl = get_implementation(FakeImplementation)
+        assert impl.config is get_config()
+        assert get_implementation(FakeImplementation) is impl
+
+    def test_namespace(self):
+        impl = get_implementation(FakeImplementation, "crashdata")
+        assert impl.config is get_config()["crashdata"]
+        assert get_implementation(FakeImplementation) is not impl
+
+    def test_config_is_built_once(self):
+        with mock.patch(
+            "crashstats.crashstats.configman_utils.config_from_configman",
+            wraps=configman_utils.config_from_configman,
+        ) as mock_config_from_configman:
+            reset_implementations()
+            get_implementation(FakeImplementation)
+            get_implementation(FakeImplementation, "crashdata")
+            get_config()
+        assert mock_config_from_configman.call_count == 1
+
+    def test_reset(self):
+        impl = get_implementation(FakeImplementation)
+        config = get_config()
+        reset_implementations()
+        assert get_config() is not config
+        assert get_implementation(FakeImplementation) is not impl
+
+    def test_reset_on_setting_changed(self, settings):
+        impl = get_implementation(FakeImplementation)
+        settings.SOCORRO_CONFIG = dict(settings.SOCORRO_CONFIG)
+        assert get_implementation(FakeImplementation) is not impl
+
+    def test_other_settings_dont_reset(self, settings):
+        impl = get_implementation(FakeImplementation)
+        settings.DEBUG = not settings.DEBUG
+        assert get_implementation(FakeImplementation) is impl
+
+    def test_threads_get_own_instance(self):
+        impl = get_implementation(FakeImplementation)
+        thread_impls = []
+
+        def target():
+            thread_impls.append(get_implementation(FakeImplementation))
+
+        thread = threading.Thread(target=target)
+        thread.start()
+        thread.join()
+
+        assert thread_impls[0] is not impl
+        assert thread_impls[0].config is impl.config
@@ -2,10 +2,12 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
+import datetime
 import random
 from urllib.parse import urlparse, parse_qs
 from unittest import mock
 
+from markus.testing import MetricsMock
 import pytest
 
 from django.core.cache import cache
@@ -281,6 +283,200 @@ class TestVersionString(DjangoTestCase):
         assert resp == {"hits": [{"version_string": "50.0b1"}], "total": 1}
 
 
+class TestVersionStrings(DjangoTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def create_version(self, product, channel, build_id, version_string):
+        models.ProductVersion.objects.create(
+            product_name=product,
+            release_channel=channel,
+            build_id=build_id,
+            version_string=version_string,
+            major_version=int(version_string.split(".")[0]),
+        )
+
+    def test_recent_builds(self):
+        self.create_version("Firefox", "beta", "20161129164126", "51.0b5")
+        self.create_version("Firefox", "beta", "20161104212021", "50.0rc2")
+        self.create_version("Firefox", "beta", "20160920155715", "50.0b1rc1")
+        self.create_version("Firefox", "beta", "20160920155715", "50.0b1")
+        self.create_version("Firefox", "release", "20161104212021", "50.0")
+        self.create_version("DevEdition", "aurora", "20161129164126", "52.0b1")
+        # Too old
+        self.create_version("Firefox", "beta", "20150920155715", "41.0b1")
+
+        api = models.VersionStrings()
+        resp = api.get(channel=["beta", "aurora"], min_build_id="20160101000000")
+        assert resp == {
+            "hits": [
+                {
+                    "product": "DevEdition",
+                    "channel": "aurora",
+                    "build_id": "20161129164126",
+                    "version_string": "52.0b1",
+                },
+                {
+                    "product": "Firefox",
+                    "channel": "beta",
+                    "build_id": "20160920155715",
+                    "version_string": "50.0b1",
+                },
+                {
+                    "product": "Firefox",
+                    "channel": "beta",
+                    "build_id": "20161104212021",
+                    "version_string": "50.0rc2",
+                },
+                {
+                    "product": "Firefox",
+                    "channel": "beta",
+                    "build_id": "20161129164126",
+                    "version_string": "51.0b5",
+                },
+            ],
+            "total": 4,
+        }
+
+        resp = api.get(product="DevEdition", min_build_id="20160101000000")
+        assert [hit["version_string"] for hit in resp["hits"]] == ["52.0b1"]
+
+    def test_default_min_build_id(self):
+        recent = datetime.datetime.utcnow() - datetime.timedelta(days=1)
+        self.create_version(
+            "Firefox", "beta", recent.strftime("%Y%m%d%H%M%S"), "80.0b1"
+        )
+        self.create_version("Firefox", "beta", "20161129164126", "51.0b5")
+
+        api = models.VersionStrings()
+        resp = api.get()
+        assert [hit["version_string"] for hit in resp["hits"]] == ["80.0b1"]
+
+
+class FetchCounter:
+    def __init__(self):
+        self.calls = 0
+
+    def get(self, **params):
+        self.calls += 1
+        return {"calls": self.calls}
+
+
+class TestFetch(DjangoTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.api = models.SocorroCommon()
+        self.implementation = FetchCounter()
+
+    def fetch(self, **params):
+        return self.api.fetch(self.implementation, params=params)
+
+    def test_cached(self):
+        with MetricsMock() as metrics_mock:
+            assert self.fetch(product="Firefox", version="1.0") == {"calls": 1}
+            assert self.fetch(version="1.0", product="Firefox") == {"calls": 1}
+            assert self.fetch(product="Thunderbird") == {"calls": 2}
+
+        metrics_mock.assert_incr(
+            "webapp.fetch.cache", tags=["result:miss", "model:FetchCounter"]
+        )
+        metrics_mock.assert_incr(
+            "webapp.fetch.cache", tags=["result:hit", "model:FetchCounter"]
+        )
+        metrics_mock.assert_timing("webapp.fetch.time", tags=["model:FetchCounter"])
+
+    def test_dont_cache(self):
+        assert self.api.fetch(self.implementation, params={}, dont_cache=True) == {
+            "calls": 1
+        }
+        assert self.api.fetch(self.implementation, params={}, dont_cache=True) == {
+            "calls": 2
+        }
+
+    def test_refresh_cache(self):
+        assert self.fetch() == {"calls": 1}
+        assert self.api.fetch(self.implementation, params={}, refresh_cache=True) == {
+            "calls": 2
+        }
+        assert self.fetch() == {"calls": 2}
+
+    @mock.patch("crashstats.crashstats.models.time")
+    def test_stale_while_revalidate(self, mock_time):
+        mock_time.time.return_value = 1000.0
+        assert self.fetch() == {"calls": 1}
+
+        # After the value expires, requests get the stale value while another
+        # request holds the lock
+        mock_time.time.return_value = 1000.0 + self.api.cache_seconds + 1
+        with mock.patch.object(cache, "add", return_value=False):
+            with MetricsMock() as metrics_mock:
+                assert self.fetch() == {"calls": 1}
+        metrics_mock.assert_incr(
+            "webapp.fetch.cache", tags=["result:stale", "model:FetchCounter"]
+        )
+
+        # Once the lock is free, the next request refreshes the value
+        assert self.fetch() == {"calls": 2}
+        assert self.fetch() == {"calls": 2}
+
+    @mock.patch("crashstats.crashstats.models.time")
+    def test_coalesced(self, mock_time):
+        mock_time.time.return_value = 1000.0
+        mock_time.monotonic.return_value = 1000.0
+
+        # Another request is computing the value and finishes while this one
+        # waits
+        other_api = models.SocorroCommon()
+        other_implementation = FetchCounter()
+        other_implementation.calls = 10
+
+        def sleep(seconds):
+            other_api.fetch(other_implementation, params={}, refresh_cache=True)
+
+        mock_time.sleep.side_effect = sleep
+        with mock.patch.object(cache, "add", return_value=False):
+            with MetricsMock() as metrics_mock:
+                assert self.fetch() == {"calls": 11}
+
+        assert self.implementation.calls == 0
+        metrics_mock.assert_incr(
+            "webapp.fetch.cache", tags=["result:coalesced", "model:FetchCounter"]
+        )
+
+    @mock.patch("crashstats.crashstats.models.time")
+    def test_coalesced_timeout(self, mock_time):
+        mock_time.time.return_value = 1000.0
+        mock_time.monotonic.side_effect = [1000.0, 1000.0, 1000.0 + 31]
+
+        # Another request holds the lock but never finishes
+        with mock.patch.object(cache, "add", return_value=False):
+            assert self.fetch() == {"calls": 1}
+
+    @mock.patch("crashstats.crashstats.models.time")
+    def test_coalesced_lock_holder_fails(self, mock_time):
+        mock_time.time.return_value = 1000.0
+        mock_time.monotonic.return_value = 1000.0
+
+        # Another request holds the lock, fails, and releases the lock; this
+        # request takes the lock and computes the value without waiting out
+        # the lock timeout
+        with mock.patch.object(cache, "add", side_effect=[False, True]):
+            with MetricsMock() as metrics_mock:
+                assert self.fetch() == {"calls": 1}
+
+        assert mock_time.sleep.call_count == 1
+        metrics_mock.assert_incr(
+            "webapp.fetch.cache", tags=["result:miss", "model:FetchCounter"]
+        )
+
+    def test_canonical_params(self):
+        assert models.canonical_params(
+            {"b": [1, {"y": 2, "x": 1}], "a": {3, 1, 2}}
+        ) == (("a", (1, 2, 3)), ("b", (1, (("x", 1), ("y", 2)))))
+
+
 class TestMiddlewareModels(DjangoTestCase):
     def setUp(self):
         super().setUp()
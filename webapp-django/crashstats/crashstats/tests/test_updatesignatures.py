@@ -2,22 +2,26 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
+import datetime
 import io
 from unittest import mock
 
 from django.core.management import call_command
 
 from crashstats.crashstats.models import Signature
+from crashstats.crashstats.management.commands import updatesignatures
 
 
 class FakeModel:
     def __init__(self):
         self._get_steps = []
+        self.get_calls = []
 
     def add_get_step(self, response):
         self._get_steps.append({"response": response})
 
     def get(self, *args, **kwargs):
+        self.get_calls.append(dict(kwargs))
         if not self._get_steps:
             raise Exception("Unexpected call to .get()")
 
@@ -25,6 +29,39 @@ class FakeModel:
         return step["response"]
 
 
+def build_response(*signatures):
+    """Builds a SuperSearch response with minimum build id and date aggregations
+
+    :arg signatures: ``(signature, min build id, min date)`` tuples where the date
+        is in ``YYYY-mm-ddTHH:MM:SS`` format in UTC
+
+    """
+    buckets = []
+    for signature, build_id, date in signatures:
+        date = datetime.datetime.strptime(date, "%Y-%m-%dT%H:%M:%S").replace(
+            tzinfo=datetime.timezone.utc
+        )
+        buckets.append(
+            {
+                "term": signature,
+                "count": 1,
+                "facets": {
+                    "min_build_id": {"value": build_id},
+                    "min_date": {"value": date.timestamp() * 1000},
+                },
+            }
+        )
+    return {
+        "errors": [],
+        "hits": [],
+        "total": len(buckets),
+        "facets": {
+            "signature": buckets,
+            "cardinality_signature": {"value": len(buckets)},
+        },
+    }
+
+
 class TestUpdateSignaturesCommand:
     def fetch_crashstats_signature_data(self):
         return [
@@ -46,7 +83,7 @@ class TestUpdateSignaturesCommand:
         mock_supersearch.return_value = supersearch
 
         # Mock SuperSearch to return no results
-        supersearch.add_get_step({"errors": [], "hits": [], "total": 0, "facets": {}})
+        supersearch.add_get_step(build_response())
 
         out = io.StringIO()
         call_command("updatesignatures", stdout=out)
@@ -54,6 +91,33 @@ class TestUpdateSignaturesCommand:
         # Assert that nothing got inserted
         assert self.fetch_crashstats_signature_data() == []
 
+    @mock.patch(
+        "crashstats.crashstats.management.commands.updatesignatures.SuperSearch"
+    )
+    def test_query(self, mock_supersearch, db):
+        supersearch = FakeModel()
+        mock_supersearch.return_value = supersearch
+        supersearch.add_get_step(build_response())
+
+        out = io.StringIO()
+        call_command(
+            "updatesignatures",
+            "--last-success=2018-05-03T16:10",
+            "--run-time=2018-05-03T17:00",
+            stdout=out,
+        )
+
+        # Minimum build id and date are computed by Elasticsearch and crashes
+        # with no build id are ignored
+        params = supersearch.get_calls[0]
+        assert params["date"] == [
+            ">=2018-05-03T16:00:00",
+            "<2018-05-03T17:00:00",
+        ]
+        assert params["build_id"] == ">0"
+        assert params["_aggs.signature"] == ["_min.build_id", "_min.date"]
+        assert params["_results_number"] == 0
+
     @mock.patch(
         "crashstats.crashstats.management.commands.updatesignatures.SuperSearch"
     )
@@ -65,20 +129,9 @@ class TestUpdateSignaturesCommand:
         data = self.fetch_crashstats_signature_data()
         assert len(data) == 0
 
-        # Mock SuperSearch to return 1 crash
+        # Mock SuperSearch to return 1 signature
         supersearch.add_get_step(
-            {
-                "errors": [],
-                "hits": [
-                    {
-                        "build_id": "20180420000000",
-                        "date": "2018-05-03T16:00:00.00000+00:00",
-                        "signature": "OOM | large",
-                    }
-                ],
-                "total": 1,
-                "facets": {},
-            }
+            build_response(("OOM | large", 20180420000000, "2018-05-03T16:00:00"))
         )
 
         out = io.StringIO()
@@ -94,20 +147,13 @@ class TestUpdateSignaturesCommand:
             }
         ]
 
-        # Mock SuperSearch to return 1 crash with different data
+        # Mock SuperSearch to return the signature with an earlier build and date
+        # and another one
         supersearch.add_get_step(
-            {
-                "errors": [],
-                "hits": [
-                    {
-                        "build_id": "20180320000000",
-                        "date": "2018-05-03T12:00:00.00000+00:00",
-                        "signature": "OOM | large",
-                    }
-                ],
-                "total": 1,
-                "facets": {},
-            }
+            build_response(
+                ("OOM | large", 20180320000000, "2018-05-03T12:00:00"),
+                ("OOM | small", 20180320000000, "2018-05-03T12:00:00"),
+            )
         )
 
         # Run updatesignatures again
@@ -121,95 +167,105 @@ class TestUpdateSignaturesCommand:
                 "first_build": "20180320000000",
                 "first_date": "2018-05-03 12:00:00+00:00",
                 "signature": "OOM | large",
-            }
+            },
+            {
+                "first_build": "20180320000000",
+                "first_date": "2018-05-03 12:00:00+00:00",
+                "signature": "OOM | small",
+            },
         ]
 
+        # Mock SuperSearch to return the signature with a later build and date
+        supersearch.add_get_step(
+            build_response(("OOM | large", 20180520000000, "2018-05-04T12:00:00"))
+        )
+
+        out = io.StringIO()
+        call_command("updatesignatures", stdout=out)
+
+        # Signature kept the earliest build and date
+        data = self.fetch_crashstats_signature_data()
+        assert data[0] == {
+            "first_build": "20180320000000",
+            "first_date": "2018-05-03 12:00:00+00:00",
+            "signature": "OOM | large",
+        }
+
     @mock.patch(
         "crashstats.crashstats.management.commands.updatesignatures.SuperSearch"
     )
-    def test_multiple_crash_processing(self, mock_supersearch, db):
-        """Test processing multiple crashes with same signature."""
+    def test_signature_with_no_minimums(self, mock_supersearch, db):
+        """Test signatures Elasticsearch has no minimum build id for are ignored."""
         supersearch = FakeModel()
         mock_supersearch.return_value = supersearch
 
-        # Mock SuperSearch to return 4 crashes covering two signatures
-        supersearch.add_get_step(
-            {
-                "errors": [],
-                "hits": [
-                    {
-                        "build_id": "20180426000000",
-                        # This is the earliest date of the three
-                        "date": "2018-05-03T16:00:00.00000+00:00",
-                        "signature": "OOM | large",
-                    },
-                    {
-                        # This is the earliest build id of the three
-                        "build_id": "20180322000000",
-                        "date": "2018-05-03T18:00:00.00000+00:00",
-                        "signature": "OOM | large",
-                    },
-                    {
-                        "build_id": "20180427000000",
-                        "date": "2018-05-03T19:00:00.000000+00:00",
-                        "signature": "OOM | large",
-                    },
-                    {
-                        "build_id": "20180322140748",
-                        "date": "2018-05-03T18:22:34.969718+00:00",
-                        "signature": "shutdownhang | js::DispatchTyped<T>",
-                    },
-                ],
-                "total": 4,
-                "facets": {},
-            }
+        response = build_response(
+            ("OOM | large", 20180420000000, "2018-05-03T16:00:00")
         )
+        response["facets"]["signature"][0]["facets"]["min_build_id"]["value"] = None
+        supersearch.add_get_step(response)
 
         out = io.StringIO()
         call_command("updatesignatures", stdout=out)
 
-        # Two signatures got inserted
-        data = self.fetch_crashstats_signature_data()
-        assert sorted(data, key=lambda item: item["first_build"]) == [
-            {
-                "first_build": "20180322000000",
-                "first_date": "2018-05-03 16:00:00+00:00",
-                "signature": "OOM | large",
-            },
-            {
-                "first_build": "20180322140748",
-                "first_date": "2018-05-03 18:22:34.969718+00:00",
-                "signature": "shutdownhang | js::DispatchTyped<T>",
-            },
-        ]
+        assert self.fetch_crashstats_signature_data() == []
 
     @mock.patch(
         "crashstats.crashstats.management.commands.updatesignatures.SuperSearch"
     )
-    def test_crash_with_no_buildid(self, mock_supersearch, db):
-        """Test crashes with no build id are ignored."""
+    def test_splits_window_with_too_many_signatures(self, mock_supersearch, db):
         supersearch = FakeModel()
         mock_supersearch.return_value = supersearch
 
-        # Mock SuperSearch to return 1 crash with no build id
+        # The whole window fills the aggregation, so it gets split in half and
+        # the results for the halves get merged
+        supersearch.add_get_step(
+            build_response(
+                ("OOM | large", 20180420000000, "2018-05-03T16:00:00"),
+                ("OOM | small", 20180420000000, "2018-05-03T16:00:00"),
+            )
+        )
+        supersearch.add_get_step(
+            build_response(("OOM | large", 20180420000000, "2018-05-03T16:10:00"))
+        )
         supersearch.add_get_step(
+            build_response(("OOM | large", 20180320000000, "2018-05-03T16:50:00"))
+        )
+
+        out = io.StringIO()
+        with mock.patch.object(updatesignatures, "MAX_FACETS_SIZE", 2):
+            call_command(
+                "updatesignatures",
+                "--last-success=2018-05-03T16:10",
+                "--run-time=2018-05-03T17:00",
+                stdout=out,
+            )
+
+        assert [params["date"] for params in supersearch.get_calls] == [
+            [">=2018-05-03T16:00:00", "<2018-05-03T17:00:00"],
+            [">=2018-05-03T16:00:00", "<2018-05-03T16:30:00"],
+            [">=2018-05-03T16:30:00", "<2018-05-03T17:00:00"],
+        ]
+        assert self.fetch_crashstats_signature_data() == [
             {
-                "errors": [],
-                "hits": [
-                    {
-                        "build_id": "",
-                        "date": "2018-05-03T16:00:00.00000+00:00",
-                        "signature": "OOM | large",
-                    }
-                ],
-                "total": 1,
-                "facets": {},
+                "first_build": "20180320000000",
+                "first_date": "2018-05-03 16:10:00+00:00",
+                "signature": "OOM | large",
             }
+        ]
+
+    @mock.patch(
+        "crashstats.crashstats.management.commands.updatesignatures.SuperSearch"
+    )
+    def test_dry_run(self, mock_supersearch, db):
+        supersearch = FakeModel()
+        mock_supersearch.return_value = supersearch
+        supersearch.add_get_step(
+            build_response(("OOM | large", 20180420000000, "2018-05-03T16:00:00"))
         )
 
         out = io.StringIO()
-        call_command("updatesignatures", stdout=out)
+        call_command("updatesignatures", "--dry-run", stdout=out)
 
-        # The crash has no build id, so it gets ignored and nothing gets
-        # inserted
+        assert "Inserting/updating signature (OOM | large, " in out.getvalue()
         assert self.fetch_crashstats_signature_data() == []
@@ -3,11 +3,20 @@
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
 import os
+from unittest import mock
+
+from botocore.exceptions import ClientError
+import pytest
 
 from django.conf import settings
+from django.core.cache import cache
 
 from crashstats.crashstats.models import MissingProcessedCrash
-from crashstats.crashstats.management.commands.verifyprocessed import Command
+from crashstats.crashstats.management.commands import verifyprocessed
+from crashstats.crashstats.management.commands.verifyprocessed import (
+    Command,
+    find_missing_in_s3,
+)
 from socorro.lib.datetimeutil import utc_now
 from socorro.lib.ooid import create_new_ooid, date_from_ooid
 
@@ -22,7 +31,63 @@ def get_small_entropy(self):
         yield item
 
 
+def build_s3_client(processed_crash_ids, page_size=1000):
+    """Builds a fake S3 client with processed crashes for the given crash ids"""
+    keys = sorted(
+        "v1/processed_crash/%s" % crash_id for crash_id in processed_crash_ids
+    )
+
+    def paginate(Bucket, Prefix, StartAfter):
+        matching = [key for key in keys if key.startswith(Prefix) and key > StartAfter]
+        for i in range(0, len(matching), page_size):
+            yield {"Contents": [{"Key": key} for key in matching[i : i + page_size]]}
+
+    def head_object(Bucket, Key):
+        if Key not in keys:
+            raise ClientError({"Error": {"Code": "404"}}, "HeadObject")
+
+    s3_client = mock.MagicMock()
+    s3_client.exceptions.ClientError = ClientError
+    s3_client.get_paginator.return_value.paginate.side_effect = paginate
+    s3_client.head_object.side_effect = head_object
+    return s3_client
+
+
+class TestFindMissingInS3:
+    def test_diffs_listing(self):
+        crash_ids = ["000" + create_new_ooid()[3:] for i in range(5)]
+        other_crash_ids = ["000" + create_new_ooid()[3:] for i in range(5)]
+        s3_client = build_s3_client(crash_ids[1:4] + other_crash_ids)
+
+        missing = find_missing_in_s3(s3_client, BUCKET_NAME, crash_ids)
+        assert sorted(missing) == sorted([crash_ids[0], crash_ids[4]])
+        s3_client.head_object.assert_not_called()
+
+    def test_switches_to_head_requests(self):
+        crash_ids = [
+            "000a0000-0000-0000-0000-000000%s" % TODAY[2:],
+            "000b0000-0000-0000-0000-000000%s" % TODAY[2:],
+            "000d0000-0000-0000-0000-000000%s" % TODAY[2:],
+        ]
+        # Lots of processed crashes from other days between ours
+        other_crash_ids = [
+            "000c%04d-0000-0000-0000-000000200101" % i for i in range(100)
+        ]
+        s3_client = build_s3_client(crash_ids[:2] + other_crash_ids, page_size=1)
+
+        missing = find_missing_in_s3(s3_client, BUCKET_NAME, crash_ids)
+        assert missing == [crash_ids[2]]
+        assert s3_client.head_object.called
+
+    def test_no_crash_ids(self):
+        assert find_missing_in_s3(build_s3_client([]), BUCKET_NAME, []) == []
+
+
 class TestVerifyProcessed:
+    def setup_method(self):
+        # Checkpoints are kept in the cache
+        cache.clear()
+
     def fetch_crashids(self):
         return MissingProcessedCrash.objects.order_by("crash_id").values_list(
             "crash_id", flat=True
@@ -164,3 +229,39 @@ class TestVerifyProcessed:
         assert "Missing: %s" % crash_ids[1] in captured.out
 
         assert crash_ids == list(self.fetch_crashids())
+
+    def test_resumes_from_checkpoints(self, monkeypatch):
+        monkeypatch.setattr(Command, "get_entropy", get_small_entropy)
+        monkeypatch.setattr(verifyprocessed, "CHUNK_SIZE", 1)
+
+        calls = []
+
+        def fake_check_crashids(entropy_chunk, date):
+            calls.append(entropy_chunk)
+            if entropy_chunk == ("222",):
+                raise Exception("intermittent failure")
+            return [entropy_chunk[0] + "-missing"]
+
+        monkeypatch.setattr(verifyprocessed, "check_crashids", fake_check_crashids)
+
+        cmd = Command()
+        with pytest.raises(Exception):
+            cmd.find_missing(num_workers=1, date=TODAY)
+        assert calls == [("000",), ("111",), ("222",)]
+
+        # The next run only checks the chunk that failed
+        calls.clear()
+        monkeypatch.setattr(
+            verifyprocessed,
+            "check_crashids",
+            lambda entropy_chunk, date: calls.append(entropy_chunk) or [],
+        )
+        missing = cmd.find_missing(num_workers=1, date=TODAY)
+        assert calls == [("222",)]
+        assert sorted(missing) == ["000-missing", "111-missing"]
+
+        # Clearing checkpoints makes the next run check everything again
+        cmd.clear_checkpoints(TODAY)
+        calls.clear()
+        cmd.find_missing(num_workers=1, date=TODAY)
+        assert calls == [("000",), ("111",), ("222",)]
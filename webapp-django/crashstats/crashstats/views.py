@@ -136,9 +136,8 @@ def report_index(request, crash_id, default_context=None):
         # hold nothing back
         context["raw_keys"] = context["raw"].keys()
     else:
-        context["raw_keys"] = [
-            x for x in context["raw"] if x in models.RawCrash.API_ALLOWLIST()
-        ]
+        allowlist = frozenset(models.RawCrash.API_ALLOWLIST())
+        context["raw_keys"] = [x for x in context["raw"] if x in allowlist]
     # Sort keys case-insensitively
     context["raw_keys"] = sorted(context["raw_keys"], key=lambda s: s.lower())
 
@@ -58,6 +58,11 @@ JOBS = [
         "cmd": "archivescraper",
         "frequency": "1h",
     },
+    {
+        # Materialize topcrashers reports for featured versions every hour
+        "cmd": "updatetopcrashers",
+        "frequency": "1h",
+    },
 ]
 
 # Map of cmd -> job_spec
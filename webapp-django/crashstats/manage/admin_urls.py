@@ -9,11 +9,6 @@ from crashstats.manage import admin
 
 app_name = "manage"
 urlpatterns = [
-    url(
-        "^analyze-model-fetches/$",
-        admin.analyze_model_fetches,
-        name="analyze_model_fetches",
-    ),
     url("^crash-me-now/$", admin.crash_me_now, name="crash_me_now"),
     url("^graphics-devices/$", admin.graphics_devices, name="graphics_devices"),
     url("^sitestatus/$", admin.site_status, name="site_status"),
@@ -554,9 +554,6 @@ if SENTRY_DSN:
 
 GOOGLE_ANALYTICS_ID = config("GOOGLE_ANALYTICS_ID", None)
 
-# Set to True enable analysis of all model fetches
-ANALYZE_MODEL_FETCHES = config("ANALYZE_MODEL_FETCHES", True, cast=bool)
-
 # This `IMPLEMENTATIONS_DATABASE_URL` is optional. By default, the
 # implementation classes will use the config coming from `DATABASE_URL`.
 # For local development you might want to connect to different databases
@@ -17,6 +17,7 @@ SUPERSEARCH_META_PARAMS = (
     ("_aggs.product.version", list),
     ("_aggs.android_cpu_abi.android_manufacturer.android_model", list),
     ("_columns", list),
+    "_cursor",
     ("_facets", list),
     ("_facets_size", int),
     "_fields",
@@ -146,6 +147,7 @@ class SuperSearch(ESSocorroMiddleware):
 
         for field in set(allowed_fields):
             allowed_fields.add("_cardinality.%s" % field)
+            allowed_fields.add("_min.%s" % field)
 
         # Now make sure all fields listing fields only have unrestricted
         # values.
@@ -6,7 +6,7 @@ import datetime
 
 from django.utils.timezone import utc
 
-from crashstats.topcrashers.views import get_date_boundaries
+from crashstats.supersearch.utils import get_date_boundaries
 
 
 class TestDateBoundaries:
@@ -0,0 +1,78 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Materializes topcrashers reports for featured versions of active products.
+
+This covers reports for all platforms in realtime mode ranging by report date
+for all process types and day ranges. The topcrashers view runs the searches
+live for everything else.
+"""
+
+import logging
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from crashstats.crashstats.models import Product
+from crashstats.crashstats.utils import get_version_context_for_product
+from crashstats.topcrashers.utils import (
+    get_process_types,
+    materialize_topcrashers,
+    POSSIBLE_DAYS,
+)
+
+
+logger = logging.getLogger("crashstats.topcrashers")
+
+
+class Command(BaseCommand):
+    help = "Materialize topcrashers reports for featured versions."
+
+    def handle(self, **options):
+        end_date = timezone.now().replace(microsecond=0)
+        # "all" is an alias for "any"
+        process_types = [pt for pt in get_process_types() if pt != "all"]
+        facets_size = settings.TCBS_RESULT_COUNTS[0]
+
+        products = Product.objects.active_products().values_list(
+            "product_name", flat=True
+        )
+        for product in products:
+            versions = [
+                item["version"]
+                for item in get_version_context_for_product(product)
+                if item["is_featured"]
+            ]
+            for version in versions:
+                failed = 0
+                for process_type in process_types:
+                    for days in POSSIBLE_DAYS:
+                        # One failed report shouldn't keep the rest from being
+                        # materialized; the view runs the searches live for
+                        # reports that aren't
+                        try:
+                            materialize_topcrashers(
+                                product=product,
+                                version=version,
+                                process_type=process_type,
+                                days=days,
+                                end_date=end_date,
+                                range_type="report",
+                                facets_size=facets_size,
+                            )
+                        except Exception:
+                            failed += 1
+                            logger.exception(
+                                "error materializing topcrashers for %s %s %s %s",
+                                product,
+                                version,
+                                process_type,
+                                days,
+                            )
+                self.stdout.write(
+                    "Materialized topcrashers for %s %s (%s failed)"
+                    % (product, version, failed)
+                )
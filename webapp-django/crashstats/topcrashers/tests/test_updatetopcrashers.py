@@ -0,0 +1,106 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import io
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+
+from crashstats.crashstats.models import Product
+from crashstats.crashstats.tests.testbase import DjangoTestCase
+from crashstats.supersearch.models import SuperSearchUnredacted
+from crashstats.topcrashers.tests.test_utils import build_results
+from crashstats.topcrashers.utils import get_materialized_topcrashers, POSSIBLE_DAYS
+
+
+@mock.patch(
+    "crashstats.topcrashers.management.commands.updatetopcrashers"
+    ".get_version_context_for_product"
+)
+class TestUpdateTopcrashers(DjangoTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.calls = []
+
+        def mocked_supersearch_get(**params):
+            self.calls.append(params)
+            if "hang_type" in params["_aggs.signature"]:
+                return build_results(("OOM", 10), ("shutdownhang", 5))
+            return build_results(("shutdownhang", 20))
+
+        SuperSearchUnredacted.implementation().get.side_effect = mocked_supersearch_get
+
+        Product.objects.all().delete()
+        Product.objects.create(product_name="Firefox")
+
+    def test_command(self, mock_get_version_context):
+        mock_get_version_context.return_value = [
+            {"product": "Firefox", "version": "77.0a1", "is_featured": True},
+            {"product": "Firefox", "version": "76.0", "is_featured": False},
+        ]
+
+        out = io.StringIO()
+        call_command("updatetopcrashers", stdout=out)
+        assert "Materialized topcrashers for Firefox 77.0a1" in out.getvalue()
+
+        # 2 searches for each process type and day range
+        assert len(self.calls) == 2 * 5 * len(POSSIBLE_DAYS)
+        for days in POSSIBLE_DAYS:
+            assert get_materialized_topcrashers(
+                product="Firefox",
+                version="77.0a1",
+                process_type="content",
+                days=days,
+                range_type="report",
+                facets_size=50,
+            )
+        assert not get_materialized_topcrashers(
+            product="Firefox",
+            version="76.0",
+            process_type="content",
+            days=7,
+            range_type="report",
+            facets_size=50,
+        )
+
+    def test_failed_report(self, mock_get_version_context):
+        mock_get_version_context.return_value = [
+            {"product": "Firefox", "version": "77.0a1", "is_featured": True}
+        ]
+
+        def mocked_supersearch_get(**params):
+            if "content" in (params.get("process_type") or []):
+                raise Exception("search timed out")
+            return build_results(("OOM", 10))
+
+        SuperSearchUnredacted.implementation().get.side_effect = mocked_supersearch_get
+
+        out = io.StringIO()
+        call_command("updatetopcrashers", stdout=out)
+        assert (
+            "Materialized topcrashers for Firefox 77.0a1 (%s failed)"
+            % len(POSSIBLE_DAYS)
+            in out.getvalue()
+        )
+
+        # Reports after the failed ones are still materialized
+        for process_type in ("browser", "gpu"):
+            assert get_materialized_topcrashers(
+                product="Firefox",
+                version="77.0a1",
+                process_type=process_type,
+                days=7,
+                range_type="report",
+                facets_size=50,
+            )
+        assert not get_materialized_topcrashers(
+            product="Firefox",
+            version="77.0a1",
+            process_type="content",
+            days=7,
+            range_type="report",
+            facets_size=50,
+        )
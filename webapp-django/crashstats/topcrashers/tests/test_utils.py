@@ -0,0 +1,111 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import datetime
+
+from django.core.cache import cache
+from django.utils.timezone import utc
+
+from crashstats.crashstats.tests.testbase import DjangoTestCase
+from crashstats.supersearch.models import SuperSearchUnredacted
+from crashstats.topcrashers.utils import (
+    get_materialized_topcrashers,
+    get_topcrashers_stats,
+    materialize_topcrashers,
+)
+
+
+def build_results(*signatures):
+    return {
+        "hits": [],
+        "facets": {
+            "signature": [
+                {
+                    "term": signature,
+                    "count": count,
+                    "facets": {"platform": [{"term": "Windows NT", "count": count}]},
+                }
+                for signature, count in signatures
+            ]
+        },
+        "total": sum(count for _, count in signatures),
+    }
+
+
+class TestMaterializeTopcrashers(DjangoTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.calls = []
+
+        def mocked_supersearch_get(**params):
+            self.calls.append(params)
+            if "hang_type" in params["_aggs.signature"]:
+                return build_results(("OOM", 10), ("shutdownhang", 5))
+            return build_results(("shutdownhang", 20))
+
+        SuperSearchUnredacted.implementation().get.side_effect = mocked_supersearch_get
+
+    def test_materialize(self):
+        end_date = datetime.datetime(2020, 5, 10, 12, 0, 0, tzinfo=utc)
+        assert (
+            get_materialized_topcrashers(
+                product="Firefox",
+                version="76.0",
+                process_type="any",
+                days=7,
+                range_type="report",
+                facets_size=50,
+            )
+            is None
+        )
+
+        materialize_topcrashers(
+            product="Firefox",
+            version="76.0",
+            process_type="any",
+            days=7,
+            end_date=end_date,
+            range_type="report",
+            facets_size=50,
+        )
+        assert len(self.calls) == 2
+        assert self.calls[0]["version"] == ["76.0"]
+        assert "process_type" not in self.calls[0]
+        assert self.calls[1]["_facets_size"] == 100
+
+        # "all" is an alias for "any"
+        materialized = get_materialized_topcrashers(
+            product="Firefox",
+            version="76.0",
+            process_type="all",
+            days=7,
+            range_type="report",
+            facets_size=50,
+        )
+        assert materialized["end_date"] == end_date
+
+        platforms = [{"name": "Windows", "short_name": "win"}]
+        total, stats = get_topcrashers_stats(
+            materialized["search_results"],
+            materialized["previous_range_results"],
+            platforms,
+        )
+        assert total == 15
+        assert [item.signature_term for item in stats] == ["OOM", "shutdownhang"]
+        assert stats[0].previous_signature is None
+        assert stats[1].previous_signature.rank == 0
+
+        # Other parameters aren't materialized
+        assert (
+            get_materialized_topcrashers(
+                product="Firefox",
+                version="76.0",
+                process_type="any",
+                days=7,
+                range_type="report",
+                facets_size=100,
+            )
+            is None
+        )
@@ -7,6 +7,7 @@ import datetime
 import freezegun
 import pyquery
 
+from django.core.cache import cache
 from django.urls import reverse
 from django.utils.encoding import smart_text
 from django.utils.timezone import utc
@@ -14,6 +15,7 @@ from django.utils.timezone import utc
 from crashstats.crashstats.models import Signature, BugAssociation
 from crashstats.crashstats.tests.test_views import BaseTestViews
 from crashstats.supersearch.models import SuperSearchUnredacted
+from crashstats.topcrashers.utils import get_materialized_key
 
 
 class TestTopCrasherViews(BaseTestViews):
@@ -262,6 +264,60 @@ class TestTopCrasherViews(BaseTestViews):
             assert today in smart_text(response.content)
             assert now not in smart_text(response.content)
 
+    def test_materialized(self):
+        def mocked_supersearch_get(**params):
+            raise AssertionError("materialized reports don't run searches")
+
+        SuperSearchUnredacted.implementation().get.side_effect = mocked_supersearch_get
+
+        end_date = datetime.datetime(2020, 5, 10, 12, 0, 0, tzinfo=utc)
+        cache.set(
+            get_materialized_key("WaterWolf", "19.0", "browser", 7, "report", 50),
+            {
+                "end_date": end_date,
+                "search_results": {
+                    "hits": [],
+                    "facets": {
+                        "signature": [
+                            {
+                                "term": "mozCool()",
+                                "count": 80,
+                                "facets": {
+                                    "platform": [{"term": "WaterWolf", "count": 80}],
+                                    "is_garbage_collecting": [],
+                                    "hang_type": [],
+                                    "process_type": [],
+                                    "startup_crash": [],
+                                    "histogram_uptime": [],
+                                    "cardinality_install_time": {"value": 11},
+                                },
+                            }
+                        ]
+                    },
+                    "total": 80,
+                },
+                "previous_range_results": {
+                    "hits": [],
+                    "facets": {"signature": []},
+                    "total": 0,
+                },
+            },
+        )
+
+        try:
+            response = self.client.get(
+                self.base_url, {"product": "WaterWolf", "version": "19.0"}
+            )
+        finally:
+            cache.clear()
+        assert response.status_code == 200
+        content = smart_text(response.content)
+        assert "mozCool()" in content
+
+        # The date range comes from when the report was materialized
+        assert end_date.isoformat() in content
+        assert (end_date - datetime.timedelta(days=7)).isoformat() in content
+
     def test_by_build(self):
         def mocked_supersearch_get(**params):
             assert "build_id" in params
@@ -0,0 +1,192 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Topcrashers reports are built from two large SuperSearch aggregations. The
+``updatetopcrashers`` cron job materializes the reports people look at most in
+the cache so the topcrashers view doesn't have to run them live.
+"""
+
+import datetime
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+from crashstats.crashstats.utils import get_comparison_signatures, SignatureStats
+from crashstats.supersearch.models import SuperSearchUnredacted
+from crashstats.supersearch.utils import get_date_boundaries
+
+
+#: Day ranges the topcrashers view supports
+POSSIBLE_DAYS = [1, 3, 7, 14, 28]
+
+#: How long materialized reports are kept in seconds; the updatetopcrashers job
+#: runs every hour
+MATERIALIZED_TTL = 2 * 60 * 60
+
+
+def datetime_to_build_id(date):
+    """Return a build_id-like string from a datetime. """
+    return date.strftime("%Y%m%d%H%M%S")
+
+
+def get_process_types():
+    """Return the process type values the topcrashers view supports."""
+    # settings.PROCESS_TYPES might contain tuple to indicate that some
+    # are actual labels.
+    process_types = []
+    for option in settings.PROCESS_TYPES:
+        if isinstance(option, (list, tuple)):
+            process_types.append(option[0])
+        else:
+            process_types.append(option)
+    return process_types
+
+
+def get_topcrashers_results(**kwargs):
+    """Run the searches for a topcrashers report.
+
+    :returns: tuple of the search results for the date range and the search
+        results for the previous date range or None if there were no crashes
+
+    """
+    params = kwargs
+    range_type = params.pop("_range_type")
+    dates = get_date_boundaries(params)
+
+    params["_aggs.signature"] = [
+        "platform",
+        "is_garbage_collecting",
+        "hang_type",
+        "process_type",
+        "startup_crash",
+        "_histogram.uptime",
+        "_cardinality.install_time",
+    ]
+    params["_histogram_interval.uptime"] = 60
+
+    # We don't care about no results, only facets.
+    params["_results_number"] = 0
+
+    if params.get("process_type") in ("any", "all"):
+        params["process_type"] = None
+
+    if range_type == "build":
+        params["build_id"] = [
+            ">=" + datetime_to_build_id(dates[0]),
+            "<" + datetime_to_build_id(dates[1]),
+        ]
+
+    api = SuperSearchUnredacted()
+    search_results = api.get(**params)
+
+    if search_results["total"] <= 0:
+        return search_results, None
+
+    # Run the same query but for the previous date range, so we can
+    # compare the rankings and show rank changes.
+    delta = (dates[1] - dates[0]) * 2
+    params["date"] = [
+        ">=" + (dates[1] - delta).isoformat(),
+        "<" + dates[0].isoformat(),
+    ]
+    params["_aggs.signature"] = ["platform"]
+    params["_facets_size"] *= 2
+
+    if range_type == "build":
+        params["date"][1] = "<" + dates[1].isoformat()
+        params["build_id"] = [
+            ">=" + datetime_to_build_id(dates[1] - delta),
+            "<" + datetime_to_build_id(dates[0]),
+        ]
+
+    previous_range_results = api.get(**params)
+    return search_results, previous_range_results
+
+
+def get_topcrashers_stats(search_results, previous_range_results, platforms):
+    """Return the total number of crashes and SignatureStats for a report.
+
+    :arg search_results: search results for the date range
+    :arg previous_range_results: search results for the previous date range
+    :arg platforms: list of platform dicts
+
+    :returns: tuple of total number of crashes and list of SignatureStats
+
+    """
+    signatures_stats = []
+    total_results = search_results["total"]
+    if total_results > 0:
+        previous_signatures = get_comparison_signatures(previous_range_results)
+
+        for index, signature in enumerate(search_results["facets"]["signature"]):
+            previous_signature = previous_signatures.get(signature["term"])
+            signatures_stats.append(
+                SignatureStats(
+                    signature=signature,
+                    num_total_crashes=search_results["total"],
+                    rank=index,
+                    platforms=platforms,
+                    previous_signature=previous_signature,
+                )
+            )
+    return total_results, signatures_stats
+
+
+def get_materialized_key(product, version, process_type, days, range_type, facets_size):
+    """Return the cache key for a materialized topcrashers report."""
+    if process_type == "all":
+        process_type = "any"
+    key_string = repr((product, version, process_type, days, range_type, facets_size))
+    return "topcrashers:materialized:%s" % (
+        hashlib.md5(key_string.encode("utf-8")).hexdigest()
+    )
+
+
+def get_materialized_topcrashers(
+    product, version, process_type, days, range_type, facets_size
+):
+    """Return a materialized topcrashers report.
+
+    :returns: dict with ``end_date``, ``search_results``, and
+        ``previous_range_results`` keys or None if the report isn't materialized
+
+    """
+    return cache.get(
+        get_materialized_key(
+            product, version, process_type, days, range_type, facets_size
+        )
+    )
+
+
+def materialize_topcrashers(
+    product, version, process_type, days, end_date, range_type, facets_size
+):
+    """Run the searches for a topcrashers report and save the results.
+
+    The report covers the ``days`` days before ``end_date`` for all platforms.
+
+    """
+    start_date = end_date - datetime.timedelta(days=days)
+    search_results, previous_range_results = get_topcrashers_results(
+        product=product,
+        version=[version],
+        platform=None,
+        process_type=process_type,
+        date=["<" + end_date.isoformat(), ">=" + start_date.isoformat()],
+        _facets_size=facets_size,
+        _range_type=range_type,
+    )
+    cache.set(
+        get_materialized_key(
+            product, version, process_type, days, range_type, facets_size
+        ),
+        {
+            "end_date": end_date,
+            "search_results": search_results,
+            "previous_range_results": previous_range_results,
+        },
+        MATERIALIZED_TTL,
+    )
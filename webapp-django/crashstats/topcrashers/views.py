@@ -15,89 +15,19 @@ from session_csrf import anonymous_csrf
 
 from crashstats.crashstats import models
 from crashstats.crashstats.decorators import check_days_parameter, pass_default_context
-from crashstats.crashstats.utils import get_comparison_signatures, SignatureStats
-from crashstats.supersearch.models import SuperSearchUnredacted
-from crashstats.supersearch.utils import get_date_boundaries
 from crashstats.topcrashers.forms import TopCrashersForm
-
-
-def datetime_to_build_id(date):
-    """Return a build_id-like string from a datetime. """
-    return date.strftime("%Y%m%d%H%M%S")
-
-
-def get_topcrashers_stats(**kwargs):
-    """Return the results of a search."""
-    params = kwargs
-    range_type = params.pop("_range_type")
-    dates = get_date_boundaries(params)
-
-    params["_aggs.signature"] = [
-        "platform",
-        "is_garbage_collecting",
-        "hang_type",
-        "process_type",
-        "startup_crash",
-        "_histogram.uptime",
-        "_cardinality.install_time",
-    ]
-    params["_histogram_interval.uptime"] = 60
-
-    # We don't care about no results, only facets.
-    params["_results_number"] = 0
-
-    if params.get("process_type") in ("any", "all"):
-        params["process_type"] = None
-
-    if range_type == "build":
-        params["build_id"] = [
-            ">=" + datetime_to_build_id(dates[0]),
-            "<" + datetime_to_build_id(dates[1]),
-        ]
-
-    api = SuperSearchUnredacted()
-    search_results = api.get(**params)
-
-    signatures_stats = []
-    total_results = search_results["total"]
-    if total_results > 0:
-        # Run the same query but for the previous date range, so we can
-        # compare the rankings and show rank changes.
-        delta = (dates[1] - dates[0]) * 2
-        params["date"] = [
-            ">=" + (dates[1] - delta).isoformat(),
-            "<" + dates[0].isoformat(),
-        ]
-        params["_aggs.signature"] = ["platform"]
-        params["_facets_size"] *= 2
-
-        if range_type == "build":
-            params["date"][1] = "<" + dates[1].isoformat()
-            params["build_id"] = [
-                ">=" + datetime_to_build_id(dates[1] - delta),
-                "<" + datetime_to_build_id(dates[0]),
-            ]
-
-        previous_range_results = api.get(**params)
-        previous_signatures = get_comparison_signatures(previous_range_results)
-
-        for index, signature in enumerate(search_results["facets"]["signature"]):
-            previous_signature = previous_signatures.get(signature["term"])
-            signatures_stats.append(
-                SignatureStats(
-                    signature=signature,
-                    num_total_crashes=search_results["total"],
-                    rank=index,
-                    platforms=models.Platform.objects.values(),
-                    previous_signature=previous_signature,
-                )
-            )
-    return total_results, signatures_stats
+from crashstats.topcrashers.utils import (
+    get_materialized_topcrashers,
+    get_process_types,
+    get_topcrashers_results,
+    get_topcrashers_stats,
+    POSSIBLE_DAYS,
+)
 
 
 @pass_default_context
 @anonymous_csrf
-@check_days_parameter([1, 3, 7, 14, 28], default=7)
+@check_days_parameter(POSSIBLE_DAYS, default=7)
 def topcrashers(request, days=None, possible_days=None, default_context=None):
     context = default_context or {}
 
@@ -153,20 +83,12 @@ def topcrashers(request, days=None, possible_days=None, default_context=None):
     elif tcbs_mode == "byday":
         end_date = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
 
-    # settings.PROCESS_TYPES might contain tuple to indicate that some
-    # are actual labels.
-    process_types = []
-    for option in settings.PROCESS_TYPES:
-        if isinstance(option, (list, tuple)):
-            process_types.append(option[0])
-        else:
-            process_types.append(option)
-    if crash_type not in process_types:
+    if crash_type not in get_process_types():
         crash_type = "browser"
 
     context["crash_type"] = crash_type
 
-    platforms = models.Platform.objects.values()
+    platforms = list(models.Platform.objects.values())
     if os_name not in (item["name"] for item in platforms):
         os_name = None
 
@@ -180,6 +102,42 @@ def topcrashers(request, days=None, possible_days=None, default_context=None):
         result_count = settings.TCBS_RESULT_COUNTS[0]
 
     context["result_count"] = result_count
+
+    # Reports for all platforms and a single version in realtime mode are
+    # materialized by the updatetopcrashers cron job
+    materialized = None
+    if tcbs_mode == "realtime" and os_name is None and len(versions) == 1:
+        materialized = get_materialized_topcrashers(
+            product=product,
+            version=versions[0],
+            process_type=crash_type,
+            days=days,
+            range_type=range_type,
+            facets_size=result_count,
+        )
+
+    if materialized is not None:
+        end_date = materialized["end_date"]
+        search_results = materialized["search_results"]
+        previous_range_results = materialized["previous_range_results"]
+    else:
+        search_results, previous_range_results = get_topcrashers_results(
+            product=product,
+            version=versions,
+            platform=os_name,
+            process_type=crash_type,
+            date=[
+                "<" + end_date.isoformat(),
+                ">=" + (end_date - datetime.timedelta(days=days)).isoformat(),
+            ],
+            _facets_size=result_count,
+            _range_type=range_type,
+        )
+
+    total_number_of_crashes, topcrashers_stats = get_topcrashers_stats(
+        search_results, previous_range_results, platforms
+    )
+
     context["query"] = {
         "product": product,
         "versions": versions,
@@ -192,19 +150,6 @@ def topcrashers(request, days=None, possible_days=None, default_context=None):
         "start_date": end_date - datetime.timedelta(days=days),
     }
 
-    total_number_of_crashes, topcrashers_stats = get_topcrashers_stats(
-        product=product,
-        version=versions,
-        platform=os_name,
-        process_type=crash_type,
-        date=[
-            "<" + end_date.isoformat(),
-            ">=" + context["query"]["start_date"].isoformat(),
-        ],
-        _facets_size=result_count,
-        _range_type=range_type,
-    )
-
     count_of_included_crashes = 0
     signatures = []
 